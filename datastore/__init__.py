@@ -3,17 +3,37 @@ This module is responsible for handling the user data in the database
 and the user container in the blob storage.
 """
 
+import datetime
+import functools
 import json
+import threading
+import urllib.parse
+import weakref
 import datastore.db.queries.user as user
 import datastore.db.queries.picture as picture
 import datastore.db.metadata.picture_set as data_picture_set
 import datastore.blob as blob
 import datastore.blob.azure_storage_api as azure_storage
 from azure.storage.blob import BlobServiceClient, ContainerClient
+from datastore.cache import MISSING, LRUCache
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Validity of the account SAS of the cached blob service clients. A service
+# client is replaced ACCOUNT_SAS_REFRESH_MARGIN before its SAS expires.
+ACCOUNT_SAS_VALIDITY = datetime.timedelta(hours=1)
+ACCOUNT_SAS_REFRESH_MARGIN = datetime.timedelta(minutes=10)
+CLIENT_TTL = (ACCOUNT_SAS_VALIDITY - ACCOUNT_SAS_REFRESH_MARGIN).total_seconds()
+
+# The blob service clients keyed by (storage url, account) and the container
+# clients keyed by (storage url, account, container name) of each client
+# scope, see _client_caches
+_scoped_client_caches = weakref.WeakKeyDictionary()
+_scoped_client_caches_lock = threading.Lock()
+# Names of the containers known to exist, keyed by (storage url, container name)
+_existing_containers = LRUCache(maxsize=65536, ttl=24 * 3600.0)
+
 
 class UserAlreadyExistsError(Exception):
     pass
@@ -116,24 +136,183 @@ async def new_user(cursor, email, connection_string, tier="user") -> User:
         raise Exception("Datastore Unhandled Error " + str(e))
 
 
+class _ProcessScope:
+    """The scope of the sync clients, which can be used anywhere in the process."""
+
+
+_PROCESS_SCOPE = _ProcessScope()
+
+
+def _client_scope():
+    """
+    Returns the scope in which a cached client can be used. The sync clients
+    can be used anywhere in the process; datastore.aio scopes its clients to
+    the running event loop.
+    """
+    return _PROCESS_SCOPE
+
+
+def _client_caches(scope):
+    """
+    Returns the caches (service clients, container clients) of a client
+    scope, see _client_scope. The caches of the closed event loops are
+    dropped, as their clients cannot be used anymore.
+    """
+    with _scoped_client_caches_lock:
+        for closed in [
+            other
+            for other in _scoped_client_caches
+            if getattr(other, "is_closed", lambda: False)()
+        ]:
+            del _scoped_client_caches[closed]
+        caches = _scoped_client_caches.get(scope)
+        if caches is None:
+            caches = (
+                LRUCache(maxsize=16, ttl=CLIENT_TTL),
+                LRUCache(maxsize=4096, ttl=CLIENT_TTL),
+            )
+            _scoped_client_caches[scope] = caches
+        return caches
+
+
+def _all_client_caches() -> list:
+    """
+    Returns the caches (service clients, container clients) of every client scope.
+    """
+    with _scoped_client_caches_lock:
+        return list(_scoped_client_caches.values())
+
+
+def _drop_missing_container(storage_url, response):
+    """
+    Response hook of the blob service clients: when the storage service
+    reports that the container of a request does not exist, e.g. because it
+    was deleted by another process, its cached existence and clients are
+    dropped so the next get_user_container_client creates it again.
+    """
+    http_response = response.http_response
+    if (
+        http_response.status_code != 404
+        or http_response.headers.get("x-ms-error-code") != "ContainerNotFound"
+    ):
+        return
+    segments = urllib.parse.urlparse(response.http_request.url).path.split("/")
+
+    def is_missing(cache_key):
+        return cache_key[0] == storage_url and cache_key[-1] in segments
+
+    _existing_containers.invalidate_matching(is_missing)
+    for _, container_clients in _all_client_caches():
+        container_clients.invalidate_matching(is_missing)
+
+
+def _response_hook(storage_url):
+    """
+    Returns the response hook of the blob service clients of storage_url.
+    """
+    return functools.partial(_drop_missing_container, storage_url)
+
+
+async def _get_blob_service_client(storage_url, account, key):
+    """
+    Returns the cached blob service client of the storage account, created
+    with a new account SAS when it is missing or its SAS is about to expire.
+    """
+    service_clients, _ = _client_caches(_client_scope())
+    cache_key = (storage_url, account)
+    blob_service_client = service_clients.get(cache_key)
+    if blob_service_client is MISSING:
+        sas = blob.get_account_sas(account, key, ACCOUNT_SAS_VALIDITY)
+        blob_service_client = BlobServiceClient.from_connection_string(
+            conn_str=storage_url,
+            credential=sas,
+            raw_response_hook=_response_hook(storage_url),
+        )
+        service_clients.set(cache_key, blob_service_client)
+    return blob_service_client
+
+
 async def get_user_container_client(user_id, storage_url, account, key, tier="user"):
     """
     Get the container client of a user
 
+    The clients are cached for the process: the container client of a user
+    is reused as long as the SAS of its service client is valid, and a
+    container known to exist is not checked again until the storage service
+    reports it missing (see invalidate_container_clients).
+
     Parameters:
     - user_id (int): The id of the user.
 
     Returns: ContainerClient object
     """
-    sas = blob.get_account_sas(account, key)
-    # Get the container client
-    container_client = await azure_storage.mount_container(
-        storage_url, str(user_id), True, tier, sas
-    )
+    container_name = azure_storage.build_container_name(str(user_id), tier)
+    blob_service_client = await _get_blob_service_client(storage_url, account, key)
+    _, container_clients = _client_caches(_client_scope())
+    cache_key = (storage_url, account, container_name)
+    cached = container_clients.get(cache_key)
+    # A container client shares the SAS of the service client it comes from
+    if cached is not MISSING and cached[0] is blob_service_client:
+        return cached[1]
+
+    if _existing_containers.get((storage_url, container_name)) is not MISSING:
+        container_client = blob_service_client.get_container_client(container_name)
+    else:
+        # Get the container client
+        container_client = await azure_storage.mount_container(
+            storage_url,
+            str(user_id),
+            True,
+            tier,
+            blob_service_client=blob_service_client,
+        )
     if isinstance(container_client, ContainerClient):
+        _existing_containers.set((storage_url, container_name), True)
+        container_clients.set(cache_key, (blob_service_client, container_client))
         return container_client
 
 
+def invalidate_container_clients(user_id=None, tier="user"):
+    """
+    Drops the cached container client and existence of the container of a
+    user, or every cached client if no user is given. It should be called
+    when a container is deleted; a container deleted by another process is
+    dropped once the storage service reports it missing.
+    """
+    if user_id is None:
+        with _scoped_client_caches_lock:
+            _scoped_client_caches.clear()
+        _existing_containers.invalidate()
+        return
+    container_name = azure_storage.build_container_name(str(user_id), tier)
+    caches = [container_clients for _, container_clients in _all_client_caches()]
+    for cache in caches + [_existing_containers]:
+        cache.invalidate_matching(lambda cache_key: cache_key[-1] == container_name)
+
+
+def get_container_client_cache_stats():
+    """
+    Returns the hit and miss counters and the size of the client caches, the
+    client caches of every client scope being added up.
+    """
+
+    def add_up(caches):
+        stats = [cache.stats() for cache in caches]
+        return {
+            "hits": sum(s["hits"] for s in stats),
+            "misses": sum(s["misses"] for s in stats),
+            "size": sum(s["size"] for s in stats),
+            "maxsize": sum(s["maxsize"] for s in stats),
+        }
+
+    client_caches = _all_client_caches()
+    return {
+        "service_clients": add_up([caches[0] for caches in client_caches]),
+        "container_clients": add_up([caches[1] for caches in client_caches]),
+        "existing_containers": _existing_containers.stats(),
+    }
+
+
 async def create_picture_set(
     cursor, container_client, nb_pictures: int, user_id: str, folder_name=None
 ):
@@ -200,37 +379,52 @@ async def get_picture_sets_info(cursor, user_id: str):
         raise user.UserNotFoundError(f"User not found based on the given id: {user_id}")
 
     result = {}
-    picture_sets = picture.get_user_picture_sets(cursor, user_id)
-    for picture_set in picture_sets:
-        picture_set_id = picture_set[0]
-        picture_set_name = picture_set[1]
-        nb_picture = picture.count_pictures(cursor, picture_set_id)
+    picture_sets = picture.get_user_picture_sets_overview(cursor, user_id)
+    if len(picture_sets) == 0:
+        raise picture.GetPictureSetError(
+            f"Error: PictureSet not found for user:{user_id}"
+        )
+    for picture_set_id, picture_set_name, nb_picture in picture_sets:
         result[str(picture_set_id)] = [picture_set_name, nb_picture]
     return result
 
 
+def _check_picture_set_access(cursor, user_id, picture_set_id):
+    """
+    Checks that the user exists and owns the picture set.
+    """
+    # Check if user exists
+    if not user.is_a_user_id(cursor=cursor, user_id=str(user_id)):
+        raise user.UserNotFoundError(
+            f"User not found based on the given id: {user_id}"
+        )
+    # Check if picture set exists
+    if not picture.is_a_picture_set_id(cursor, picture_set_id):
+        raise picture.PictureSetNotFoundError(
+            f"Picture set not found based on the given id: {picture_set_id}"
+        )
+    # Check user is owner of the picture set
+    if str(picture.get_picture_set_owner_id(cursor, picture_set_id)) != str(user_id):
+        raise UserNotOwnerError(
+            f"User can't access this folder, user uuid :{user_id}, folder name : {picture_set_id}"
+        )
+
+
+def _picture_blob_name(picture_set_name, picture_id, picture_metadata: dict) -> str:
+    """
+    Returns the name of the blob of a picture, from its link if it has one.
+    """
+    if "link" in picture_metadata:
+        return picture_metadata["link"]
+    return azure_storage.build_blob_name(str(picture_set_name), str(picture_id), None)
+
+
 async def get_picture_set_pictures(cursor, user_id, picture_set_id, container_client):
     """
     This function retrieves the pictures of a picture set from the database.
     """
     try:
-        # Check if user exists
-        if not user.is_a_user_id(cursor=cursor, user_id=str(user_id)):
-            raise user.UserNotFoundError(
-                f"User not found based on the given id: {user_id}"
-            )
-        # Check if picture set exists
-        if not picture.is_a_picture_set_id(cursor, picture_set_id):
-            raise picture.PictureSetNotFoundError(
-                f"Picture set not found based on the given id: {picture_set_id}"
-            )
-        # Check user is owner of the picture set
-        if str(picture.get_picture_set_owner_id(cursor, picture_set_id)) != str(
-            user_id
-        ):
-            raise UserNotOwnerError(
-                f"User can't access this folder, user uuid :{user_id}, folder name : {picture_set_id}"
-            )
+        _check_picture_set_access(cursor, user_id, picture_set_id)
         picture_set_name = picture.get_picture_set_name(cursor, picture_set_id)
         # Get the pictures
         pictures = picture.get_picture_set_pictures(cursor, picture_set_id)
@@ -249,12 +443,7 @@ async def get_picture_set_pictures(cursor, user_id, picture_set_id, container_cl
             pic_id = pic[0]
             pic_metadata = pic[1]
             pic_metadata["id"] = pic_id
-            if "link" in pic_metadata:
-                blob_link = pic_metadata["link"]
-            else:
-                blob_link = azure_storage.build_blob_name(
-                    str(picture_set_name), str(pic_id), None
-                )
+            blob_link = _picture_blob_name(picture_set_name, pic_id, pic_metadata)
             blob_obj = await azure_storage.get_blob(container_client, blob_link)
             pic_metadata.pop("link", None)
             pic_metadata["blob"] = blob_obj
@@ -271,6 +460,159 @@ async def get_picture_set_pictures(cursor, user_id, picture_set_id, container_cl
         raise Exception("Datastore Unhandled Error " + str(e))
 
 
+async def iter_picture_set_pictures(
+    cursor,
+    user_id,
+    picture_set_id,
+    container_client,
+    check_count: bool = True,
+    with_blobs: bool = True,
+    max_concurrency: int = azure_storage.MAX_CONCURRENCY,
+):
+    """
+    This function yields the pictures of a picture set as their blobs are
+    downloaded, at most max_concurrency at the same time. Unlike
+    get_picture_set_pictures, the pictures are not all held in memory and
+    come in the order their download completes.
+
+    Args:
+        cursor: The cursor object to interact with the database.
+        user_id (str): id of the user that should be the owner of the picture set
+        picture_set_id (str): id of the picture set
+        container_client: The container client of the user.
+        check_count (bool): check that the storage has as many pictures as the database
+        with_blobs (bool): download the blobs. If False, the metadata has the
+            "blob_name" and "url" of the picture instead and the blob is None.
+            The url is not signed, see get_picture_urls for a readable url.
+        max_concurrency (int): the maximum number of downloads running at the same time
+
+    Yields:
+        (metadata, blob) of each picture, the metadata having the "id" of the picture
+    """
+    try:
+        _check_picture_set_access(cursor, user_id, picture_set_id)
+        picture_set_name = picture.get_picture_set_name(cursor, picture_set_id)
+        pictures = picture.get_picture_set_pictures(cursor, picture_set_id)
+        if len(pictures) == 0:
+            return
+        if check_count and len(pictures) != await azure_storage.get_image_count(
+            container_client, str(picture_set_name)
+        ):
+            raise Warning(
+                "The number of pictures in the database '"
+                + str(len(pictures))
+                + "' does not match the number of pictures in the blob storage"
+            )
+        metadata_by_blob_name = {}
+        for pic_id, pic_metadata in pictures:
+            pic_metadata["id"] = pic_id
+            blob_name = _picture_blob_name(picture_set_name, pic_id, pic_metadata)
+            pic_metadata.pop("link", None)
+            metadata_by_blob_name[blob_name] = pic_metadata
+        if not with_blobs:
+            for blob_name, pic_metadata in metadata_by_blob_name.items():
+                blob_client = container_client.get_blob_client(blob_name)
+                pic_metadata["blob_name"] = blob_name
+                # The url without the credential of the container client
+                pic_metadata["url"] = blob_client.url.split("?")[0]
+                yield pic_metadata, None
+            return
+        for blob_name, blob_obj in azure_storage.iter_blobs(
+            container_client, list(metadata_by_blob_name), max_concurrency
+        ):
+            yield metadata_by_blob_name.pop(blob_name), blob_obj
+    except (
+        user.UserNotFoundError,
+        picture.PictureSetNotFoundError,
+        UserNotOwnerError,
+    ) as e:
+        raise e
+    except Exception as e:
+        raise Exception("Datastore Unhandled Error " + str(e))
+
+
+async def get_picture_urls(
+    cursor,
+    user_id,
+    picture_ids: list,
+    container_client,
+    account_key: str = None,
+    expiry=azure_storage.DOWNLOAD_SAS_EXPIRY,
+):
+    """
+    This function returns urls the clients can download the pictures from
+    directly, without their content going through the datastore. Each url is
+    signed with a SAS that can only read the blob of the picture and expires
+    after expiry.
+
+    Args:
+        cursor: The cursor object to interact with the database.
+        user_id (str): id of the user that should be the owner of the pictures
+        picture_ids (list): ids of the pictures
+        container_client: The container client of the user.
+        account_key (str): the key of the storage account, defaults to the key
+            used by the container client
+        expiry (timedelta): the validity of the urls
+
+    Returns:
+        dict {picture_id: url}
+    """
+    try:
+        # Check if user exists
+        if not user.is_a_user_id(cursor=cursor, user_id=str(user_id)):
+            raise user.UserNotFoundError(
+                f"User not found based on the given id: {user_id}"
+            )
+        rows = picture.get_pictures_owner(cursor, picture_ids)
+        found = {str(row[0]) for row in rows}
+        for picture_id in picture_ids:
+            if str(picture_id) not in found:
+                raise picture.PictureNotFoundError(
+                    f"Picture not found based on the given id: {picture_id}"
+                )
+        urls = {}
+        for pic_id, pic_metadata, picture_set_id, picture_set_name, owner_id in rows:
+            # Check user is owner of the picture set where the picture is
+            if str(owner_id) != str(user_id):
+                raise UserNotOwnerError(
+                    f"User can't access this picture, user uuid :{user_id}, picture : {pic_id}"
+                )
+            blob_name = _picture_blob_name(picture_set_name, pic_id, pic_metadata)
+            urls[str(pic_id)] = azure_storage.build_blob_sas_url(
+                container_client, blob_name, account_key, expiry
+            )
+        return urls
+    except (
+        user.UserNotFoundError,
+        picture.PictureNotFoundError,
+        UserNotOwnerError,
+    ) as e:
+        raise e
+    except Exception as e:
+        raise Exception("Datastore Unhandled Error " + str(e))
+
+
+async def get_picture_url(
+    cursor,
+    user_id,
+    picture_id,
+    container_client,
+    account_key: str = None,
+    expiry=azure_storage.DOWNLOAD_SAS_EXPIRY,
+):
+    """
+    This function returns the url the clients can download a picture from
+    directly, see get_picture_urls.
+
+    Returns:
+        the signed url of the picture
+    """
+    urls = await get_picture_urls(
+        cursor, user_id, [picture_id], container_client, account_key, expiry
+    )
+    return urls[str(picture_id)]
+
+
 async def delete_picture_set_permanently(
     cursor, user_id, picture_set_id, container_client
 ):
@@ -307,7 +649,13 @@ async def delete_picture_set_permanently(
             )
 
         # Delete the folder in the blob storage
-        await azure_storage.delete_folder(container_client, str(picture_set_id))
+        deletion = await azure_storage.delete_folder(
+            container_client, str(picture_set_id)
+        )
+        if deletion["failed"]:
+            raise azure_storage.DeleteFolderError(
+                f"{len(deletion['failed'])} blobs of the picture set {picture_set_id} could not be deleted: {deletion['failed']}"
+            )
         # Delete the picture set
         picture.delete_picture_set(cursor, picture_set_id)
 
@@ -317,6 +665,7 @@ async def delete_picture_set_permanently(
         picture.PictureSetNotFoundError,
         picture.PictureSetDeleteError,
         UserNotOwnerError,
+        azure_storage.DeleteFolderError,
     ) as e:
         raise e
     except Exception as e:
@@ -325,7 +674,12 @@ async def delete_picture_set_permanently(
 
 
 async def upload_pictures(
-    cursor, user_id, hashed_pictures, container_client, picture_set_id=None
+    cursor,
+    user_id,
+    hashed_pictures,
+    container_client,
+    picture_set_id=None,
+    max_concurrency: int = azure_storage.MAX_CONCURRENCY,
 ):
     """
     Upload a picture that we don't know the seed to the user container
@@ -335,6 +689,7 @@ async def upload_pictures(
     - user_id (str): The UUID of the user.
     - hashed_pictures ([str]): The images to upload.
     - container_client: The container client of the user.
+    - max_concurrency (int): The maximum number of uploads running at the same time.
     """
     try:
 
@@ -355,38 +710,50 @@ async def upload_pictures(
             folder_name = picture.get_picture_set_name(cursor, picture_set_id)
             if folder_name is None:
                 folder_name = str(picture_set_id)
-        pic_ids = []
-        for picture_hash in hashed_pictures:
-            # Create picture instance in DB
-            picture_id = picture.new_picture_unknown(
+        # The pictures rows are created in a savepoint, released only once
+        # every blob is uploaded
+        with cursor.connection.transaction():
+            # Create all the picture instances in DB
+            pic_ids = picture.new_pictures(
                 cursor=cursor,
                 picture=empty_picture,
-                nb_objects=len(hashed_pictures),
                 picture_set_id=picture_set_id,
+                nb_pictures=len(hashed_pictures),
+                nb_objects=len(hashed_pictures),
             )
-            # Upload the picture to the Blob Storage
-            response = await azure_storage.upload_image(
+            # Update the pictures metadata in the DB
+            picture.update_pictures_metadata(
+                cursor,
+                [
+                    (
+                        str(picture_id),
+                        json.dumps(
+                            {
+                                "link": azure_storage.build_blob_name(
+                                    folder_name, str(picture_id), None
+                                ),
+                                "description": "Uploaded through the API",
+                            }
+                        ),
+                        len(hashed_pictures),
+                    )
+                    for picture_id in pic_ids
+                ],
+            )
+            # Upload the pictures to the Blob Storage, the uploaded blobs are
+            # removed if one of them fails
+            await azure_storage.upload_images(
                 container_client,
                 str(folder_name),
                 str(picture_set_id),
-                picture_hash,
-                str(picture_id),
-            )
-            # Update the picture metadata in the DB
-            data = {
-                "link": azure_storage.build_blob_name(folder_name, str(picture_id), None),
-                "description": "Uploaded through the API",
-            }
-
-            if not response:
-                raise BlobUploadError("Error uploading the picture")
-
-            picture.update_picture_metadata(
-                cursor, str(picture_id), json.dumps(data), len(hashed_pictures)
+                [
+                    (str(picture_id), picture_hash)
+                    for picture_id, picture_hash in zip(pic_ids, hashed_pictures)
+                ],
+                max_concurrency,
             )
-            pic_ids.append(picture_id)
         return pic_ids
-    except BlobUploadError or azure_storage.UploadImageError:
+    except (BlobUploadError, azure_storage.UploadImageError):
         raise BlobUploadError("Error uploading the picture")
     except user.UserNotFoundError:
         raise
@@ -0,0 +1,229 @@
+"""
+This module is the async version of the functions of the datastore module
+used on the hot paths of a backend running on an event loop: getting the
+container client of a user and reading the pictures of a picture set. It runs
+on psycopg AsyncCursor and azure.storage.blob.aio clients.
+
+The client caches are the ones of the datastore module, scoped to the running
+event loop since the async clients can only be used in the event loop they
+are created in.
+"""
+
+import asyncio
+
+import datastore.blob as blob
+import datastore.blob.azure_storage_api as azure_storage
+import datastore.blob.azure_storage_api.aio as azure_storage_aio
+import datastore.db.queries.picture as picture
+import datastore.db.queries.picture.aio as picture_aio
+import datastore.db.queries.user as user
+import datastore.db.queries.user.aio as user_aio
+from azure.storage.blob.aio import BlobServiceClient, ContainerClient
+from datastore import (
+    ACCOUNT_SAS_VALIDITY,
+    UserNotOwnerError,
+    _client_caches,
+    _drop_missing_container,
+    _existing_containers,
+    _picture_blob_name,
+)
+from datastore.cache import MISSING
+
+
+def _client_scope():
+    """
+    Returns the running event loop: the async clients can only be used in
+    the event loop they are created in.
+    """
+    return asyncio.get_running_loop()
+
+
+def _response_hook(storage_url):
+    """
+    Returns the response hook of the async blob service clients of
+    storage_url, which await it.
+    """
+
+    async def hook(response):
+        _drop_missing_container(storage_url, response)
+
+    return hook
+
+
+async def _get_blob_service_client(storage_url, account, key):
+    """
+    Returns the cached async blob service client of the storage account,
+    created with a new account SAS when it is missing or its SAS is about to
+    expire.
+    """
+    service_clients, _ = _client_caches(_client_scope())
+    cache_key = (storage_url, account)
+    blob_service_client = service_clients.get(cache_key)
+    if blob_service_client is MISSING:
+        sas = blob.get_account_sas(account, key, ACCOUNT_SAS_VALIDITY)
+        blob_service_client = BlobServiceClient.from_connection_string(
+            conn_str=storage_url,
+            credential=sas,
+            raw_response_hook=_response_hook(storage_url),
+        )
+        service_clients.set(cache_key, blob_service_client)
+    return blob_service_client
+
+
+async def get_user_container_client(user_id, storage_url, account, key, tier="user"):
+    """
+    Get the async container client of a user
+
+    The clients are cached for the running event loop, see
+    datastore.get_user_container_client.
+
+    Parameters:
+    - user_id (int): The id of the user.
+
+    Returns: ContainerClient object
+    """
+    container_name = azure_storage.build_container_name(str(user_id), tier)
+    blob_service_client = await _get_blob_service_client(storage_url, account, key)
+    _, container_clients = _client_caches(_client_scope())
+    cache_key = (storage_url, account, container_name)
+    cached = container_clients.get(cache_key)
+    # A container client shares the SAS of the service client it comes from
+    if cached is not MISSING and cached[0] is blob_service_client:
+        return cached[1]
+
+    if _existing_containers.get((storage_url, container_name)) is not MISSING:
+        container_client = blob_service_client.get_container_client(container_name)
+    else:
+        container_client = await azure_storage_aio.mount_container(
+            storage_url,
+            str(user_id),
+            True,
+            tier,
+            blob_service_client=blob_service_client,
+        )
+    if isinstance(container_client, ContainerClient):
+        _existing_containers.set((storage_url, container_name), True)
+        container_clients.set(cache_key, (blob_service_client, container_client))
+        return container_client
+
+
+async def _check_picture_set_access(cursor, user_id, picture_set_id):
+    """
+    Checks that the user exists and owns the picture set.
+    """
+    if not await user_aio.is_a_user_id(cursor=cursor, user_id=str(user_id)):
+        raise user.UserNotFoundError(
+            f"User not found based on the given id: {user_id}"
+        )
+    if not await picture_aio.is_a_picture_set_id(cursor, picture_set_id):
+        raise picture.PictureSetNotFoundError(
+            f"Picture set not found based on the given id: {picture_set_id}"
+        )
+    owner_id = await picture_aio.get_picture_set_owner_id(cursor, picture_set_id)
+    if str(owner_id) != str(user_id):
+        raise UserNotOwnerError(
+            f"User can't access this folder, user uuid :{user_id}, folder name : {picture_set_id}"
+        )
+
+
+async def get_picture_set_pictures(cursor, user_id, picture_set_id, container_client):
+    """
+    This function retrieves the pictures of a picture set from the database,
+    see datastore.get_picture_set_pictures.
+    """
+    try:
+        await _check_picture_set_access(cursor, user_id, picture_set_id)
+        picture_set_name = await picture_aio.get_picture_set_name(
+            cursor, picture_set_id
+        )
+        pictures = await picture_aio.get_picture_set_pictures(cursor, picture_set_id)
+        result = []
+        if len(pictures) == 0:
+            return result
+        elif len(pictures) != await azure_storage_aio.get_image_count(
+            container_client, str(picture_set_name)
+        ):
+            raise Warning(
+                "The number of pictures in the database '"
+                + str(len(pictures))
+                + "' does not match the number of pictures in the blob storage"
+            )
+        for pic in pictures:
+            pic_id = pic[0]
+            pic_metadata = pic[1]
+            pic_metadata["id"] = pic_id
+            blob_link = _picture_blob_name(picture_set_name, pic_id, pic_metadata)
+            blob_obj = await azure_storage_aio.get_blob(container_client, blob_link)
+            pic_metadata.pop("link", None)
+            pic_metadata["blob"] = blob_obj
+            result.append(pic_metadata)
+        return result
+    except (
+        user.UserNotFoundError,
+        picture.PictureSetNotFoundError,
+        UserNotOwnerError,
+    ) as e:
+        raise e
+    except Exception as e:
+        raise Exception("Datastore Unhandled Error " + str(e))
+
+
+async def iter_picture_set_pictures(
+    cursor,
+    user_id,
+    picture_set_id,
+    container_client,
+    check_count: bool = True,
+    with_blobs: bool = True,
+    max_concurrency: int = azure_storage.MAX_CONCURRENCY,
+):
+    """
+    This function yields the pictures of a picture set as their blobs are
+    downloaded on the event loop, at most max_concurrency at the same time,
+    see datastore.iter_picture_set_pictures.
+
+    Yields:
+        (metadata, blob) of each picture, the metadata having the "id" of the picture
+    """
+    try:
+        await _check_picture_set_access(cursor, user_id, picture_set_id)
+        picture_set_name = await picture_aio.get_picture_set_name(
+            cursor, picture_set_id
+        )
+        pictures = await picture_aio.get_picture_set_pictures(cursor, picture_set_id)
+        if len(pictures) == 0:
+            return
+        if check_count and len(pictures) != await azure_storage_aio.get_image_count(
+            container_client, str(picture_set_name)
+        ):
+            raise Warning(
+                "The number of pictures in the database '"
+                + str(len(pictures))
+                + "' does not match the number of pictures in the blob storage"
+            )
+        metadata_by_blob_name = {}
+        for pic_id, pic_metadata in pictures:
+            pic_metadata["id"] = pic_id
+            blob_name = _picture_blob_name(picture_set_name, pic_id, pic_metadata)
+            pic_metadata.pop("link", None)
+            metadata_by_blob_name[blob_name] = pic_metadata
+        if not with_blobs:
+            for blob_name, pic_metadata in metadata_by_blob_name.items():
+                blob_client = container_client.get_blob_client(blob_name)
+                pic_metadata["blob_name"] = blob_name
+                # The url without the credential of the container client
+                pic_metadata["url"] = blob_client.url.split("?")[0]
+                yield pic_metadata, None
+            return
+        async for blob_name, blob_obj in azure_storage_aio.iter_blobs(
+            container_client, list(metadata_by_blob_name), max_concurrency
+        ):
+            yield metadata_by_blob_name.pop(blob_name), blob_obj
+    except (
+        user.UserNotFoundError,
+        picture.PictureSetNotFoundError,
+        UserNotOwnerError,
+    ) as e:
+        raise e
+    except Exception as e:
+        raise Exception("Datastore Unhandled Error " + str(e))
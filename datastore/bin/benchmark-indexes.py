@@ -0,0 +1,338 @@
+"""
+This script measures the latency of every read query of datastore.db.queries
+and nachet.db.queries (or fertiscan.db.queries) before and after the index
+migration of the schema.
+
+The schema is first seeded with generated users, picture sets, pictures,
+inferences or inspections through the query functions themselves. The
+migration indexes are then dropped, each query is timed, the migration is
+applied and each query is timed again. The in-process caches of the query
+modules are cleared before each call, so cached lookups are timed against
+the database. Everything runs in a single transaction that is rolled back,
+so the database is left untouched.
+
+Usage:
+- python datastore/bin/benchmark-indexes.py nachet [--users N] [--sets N] [--pictures N] [--objects N] [--repeat N]
+- python datastore/bin/benchmark-indexes.py fertiscan [--users N] [--sets N] [--inspections N] [--repeat N]
+
+The database is given by the NACHET_DB_URL and NACHET_SCHEMA_TESTING (or
+FERTISCAN_DB_URL and FERTISCAN_SCHEMA_TESTING) environment variables.
+"""
+
+import argparse
+import inspect
+import json
+import os
+import re
+import statistics
+import time
+import uuid
+
+import datastore.db as db
+import datastore.db.queries.picture as picture
+import datastore.db.queries.user as user
+from datastore.db.metadata.picture_set import build_picture_set_metadata
+
+MIGRATIONS = {
+    "nachet": ["nachet/db/bytebase/fk_indexes_nachet_0.0.11.sql"],
+    "fertiscan": [
+        "fertiscan/db/bytebase/inspection_listing_index.sql",
+        "fertiscan/db/bytebase/fk_indexes_0.0.19.sql",
+        "fertiscan/db/bytebase/search_index.sql",
+    ],
+}
+
+# The schema the migrations are written for, replaced by the tested schema
+MIGRATION_SCHEMAS = {"nachet": "nachet_0.0.11", "fertiscan": "fertiscan_0.0.19"}
+
+# Functions starting with these prefixes only read the database
+READ_PREFIXES = ("get_", "is_", "has_", "count_", "check_", "search_")
+
+# Read functions that only report on the in-process caches
+NOT_QUERIES = {"get_cache_stats", "get_cached_ml_structure"}
+
+
+def query_modules(app: str) -> list:
+    """Return the query modules benchmarked for the given application."""
+    if app == "nachet":
+        import nachet.db.queries.inference as inference
+        import nachet.db.queries.machine_learning as machine_learning
+        import nachet.db.queries.seed as seed
+
+        return [picture, user, inference, machine_learning, seed]
+    import fertiscan.db.queries.ingredient as ingredient
+    import fertiscan.db.queries.inspection as fertiscan_inspection
+    import fertiscan.db.queries.label as label
+    import fertiscan.db.queries.metric as metric
+    import fertiscan.db.queries.nutrients as nutrients
+    import fertiscan.db.queries.organization as organization
+    import fertiscan.db.queries.registration_number as registration_number
+    import fertiscan.db.queries.search as search
+    import fertiscan.db.queries.specification as specification
+    import fertiscan.db.queries.sub_label as sub_label
+
+    return [
+        picture,
+        user,
+        fertiscan_inspection,
+        label,
+        metric,
+        nutrients,
+        organization,
+        registration_number,
+        specification,
+        sub_label,
+        ingredient,
+        search,
+    ]
+
+
+def cache_invalidators(app: str) -> list:
+    """Return the functions clearing the in-process caches of the application."""
+    if app == "nachet":
+        import nachet.db.queries.machine_learning as machine_learning
+        import nachet.db.queries.seed as seed
+
+        return [seed.invalidate_seed_catalogue, machine_learning.invalidate_ml_caches]
+    import fertiscan.db.queries.reference as reference
+
+    return [reference.invalidate_reference_data]
+
+
+def seed_nachet(cursor, run_id, users, sets, pictures, objects) -> dict:
+    """
+    This function seeds the nachet schema and returns the ids of a sample
+    of the created rows, keyed by the name of the query parameters.
+    """
+    import nachet.db.queries.inference as inference
+    import nachet.db.queries.seed as seed
+
+    seed_ids = [seed.new_seed(cursor, f"benchmark-{run_id}-{i}") for i in range(10)]
+    sample = {}
+    for u in range(users):
+        user_id = user.register_user(cursor, f"benchmark-{run_id}-{u}@email")
+        for s in range(sets):
+            picture_set_id = picture.new_picture_set(
+                cursor,
+                json.dumps(build_picture_set_metadata(user_id, pictures)),
+                user_id,
+                f"benchmark-{s}",
+            )
+            picture_ids = picture.new_pictures(
+                cursor, json.dumps({}), picture_set_id, pictures, seed_ids[s % 10], objects
+            )
+            for picture_id in picture_ids:
+                inference_id = inference.new_inference(
+                    cursor, json.dumps({}), user_id, picture_id, "benchmark", None
+                )
+                box = json.dumps({"topX": 0, "topY": 0, "bottomX": 1, "bottomY": 1})
+                object_ids = inference.new_inference_objects(
+                    cursor, inference_id, [box] * objects, 1
+                )
+                inference.new_seed_objects(
+                    cursor,
+                    [(seed_ids[i % 10], object_id, 0.9) for i, object_id in enumerate(object_ids)],
+                )
+        print(f"Seeded user {u + 1}/{users}")
+    sample.update(
+        user_id=user_id,
+        email=f"benchmark-{run_id}-{users - 1}@email",
+        picture_set_id=picture_set_id,
+        picture_id=picture_id,
+        inference_id=inference_id,
+        object_id=object_ids[0],
+        inference_object_id=object_ids[0],
+        seed_id=seed_ids[0],
+        seed_name=f"benchmark-{run_id}-0",
+        seed_names=[f"benchmark-{run_id}-{i}" for i in range(10)],
+    )
+    cursor.execute("SELECT id FROM seed_obj WHERE object_id = %s", (object_ids[0],))
+    sample["seed_object_id"] = cursor.fetchone()[0]
+    return sample
+
+
+def seed_fertiscan(cursor, run_id, users, sets, inspections) -> dict:
+    """
+    This function seeds the fertiscan schema with copies of the test analysis
+    and returns the ids of a sample of the created rows, keyed by the name of
+    the query parameters.
+    """
+    import fertiscan.db.queries.inspection as fertiscan_inspection
+    from fertiscan.db.metadata.inspection import build_inspection_import
+
+    with open("tests/fertiscan/analyse.json") as f:
+        analysis = json.load(f)
+    for u in range(users):
+        user_id = user.register_user(cursor, f"benchmark-{run_id}-{u}@email")
+        for _ in range(sets):
+            picture_set_id = picture.new_picture_set(cursor, json.dumps({}), user_id)
+            for _ in range(inspections):
+                formatted = build_inspection_import(analysis, user_id, picture_set_id)
+                inspection_json = fertiscan_inspection.new_inspection_with_label_info(
+                    cursor, user_id, formatted
+                )
+        print(f"Seeded user {u + 1}/{users}")
+    label_id = inspection_json["product"]["label_id"]
+    sample = {
+        "user_id": user_id,
+        "email": f"benchmark-{run_id}-{users - 1}@email",
+        "picture_set_id": picture_set_id,
+        "inspection_id": inspection_json["inspection_id"],
+        "label_id": label_id,
+        "label_info_id": label_id,
+        "label_information_id": label_id,
+        "verified": False,
+        "name": "Nitrogen",
+        "symbol": "N",
+        "unit": "kg",
+        "type_name": "instructions",
+        "search_text": analysis["fertiliser_name"][:5],
+    }
+    # One child row of the last label per parameter name
+    for param, table in (
+        ("metric_id", "metric"),
+        ("guaranteed_id", "guaranteed"),
+        ("sub_label_id", "sub_label"),
+        ("information_id", "organization_information"),
+        ("specification_id", "specification"),
+    ):
+        cursor.execute(f"SELECT id FROM {table} WHERE label_id = %s LIMIT 1", (label_id,))
+        if row := cursor.fetchone():
+            sample[param] = row[0]
+    # get_inspection_snapshot is timed on a fresh snapshot, not on its fallback
+    fertiscan_inspection.refresh_inspection_snapshots(cursor, [sample["inspection_id"]])
+    return sample
+
+
+def read_queries(modules: list, sample: dict):
+    """
+    This function lists the read queries of the modules with their arguments
+    taken from the sample.
+
+    Returns:
+    - A tuple (queries, skipped) of the (name, function, kwargs) that can be
+      called and of the names of those with parameters missing from the sample.
+    """
+    queries, skipped = [], []
+    for module in modules:
+        for name, function in inspect.getmembers(module, inspect.isfunction):
+            if (
+                function.__module__ != module.__name__
+                or not name.startswith(READ_PREFIXES)
+                or name in NOT_QUERIES
+            ):
+                continue
+            kwargs = {}
+            missing = False
+            for param in list(inspect.signature(function).parameters.values())[1:]:
+                if param.name in sample:
+                    kwargs[param.name] = sample[param.name]
+                elif param.default is inspect.Parameter.empty:
+                    missing = True
+            full_name = f"{module.__name__}.{name}"
+            if missing:
+                skipped.append(full_name)
+            else:
+                queries.append((full_name, function, kwargs))
+    return queries, skipped
+
+
+def time_queries(connection, cursor, queries: list, repeat: int, invalidators: list) -> dict:
+    """
+    This function runs each query repeat times, each in its own savepoint,
+    after clearing the in-process caches with the invalidators.
+
+    Returns:
+    - The median latency of each query in milliseconds, None if it failed.
+    """
+    results = {}
+    for name, function, kwargs in queries:
+        timings = []
+        try:
+            for _ in range(repeat):
+                for invalidate in invalidators:
+                    invalidate()
+                with connection.transaction():
+                    start = time.perf_counter()
+                    function(cursor, **kwargs)
+                    timings.append((time.perf_counter() - start) * 1000)
+            results[name] = statistics.median(timings)
+        except Exception as e:
+            print(f"{name} failed: {e}")
+            results[name] = None
+    return results
+
+
+def migration_statements(app: str, schema: str) -> list:
+    """Return the statements of the migrations of the app, for the given schema."""
+    statements = []
+    for path in MIGRATIONS[app]:
+        with open(path) as f:
+            content = f.read().replace(f'"{MIGRATION_SCHEMAS[app]}"', f'"{schema}"')
+        content = re.sub(r"--[^\n]*", "", content)
+        statements.extend(s.strip() for s in content.split(";") if s.strip())
+    return statements
+
+
+def index_names(statements: list) -> list:
+    """Return the names of the indexes created by the statements."""
+    return [
+        match.group(1)
+        for statement in statements
+        if (match := re.search(r"CREATE INDEX IF NOT EXISTS (\w+)", statement))
+    ]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("app", choices=["nachet", "fertiscan"])
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--sets", type=int, default=10)
+    parser.add_argument("--pictures", type=int, default=20, help="pictures per set (nachet)")
+    parser.add_argument("--objects", type=int, default=5, help="objects per inference (nachet)")
+    parser.add_argument("--inspections", type=int, default=5, help="inspections per set (fertiscan)")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    prefix = args.app.upper()
+    schema = os.environ.get(f"{prefix}_SCHEMA_TESTING")
+    connection = db.connect_db(os.environ.get(f"{prefix}_DB_URL"), schema)
+    cursor = db.cursor(connection)
+    db.create_search_path(connection, cursor, schema)
+    run_id = uuid.uuid4().hex[:8]
+    try:
+        if args.app == "nachet":
+            sample = seed_nachet(
+                cursor, run_id, args.users, args.sets, args.pictures, args.objects
+            )
+        else:
+            sample = seed_fertiscan(
+                cursor, run_id, args.users, args.sets, args.inspections
+            )
+        queries, skipped = read_queries(query_modules(args.app), sample)
+        invalidators = cache_invalidators(args.app)
+        statements = migration_statements(args.app, schema)
+
+        for name in index_names(statements):
+            cursor.execute(f'DROP INDEX IF EXISTS "{schema}"."{name}"')
+        cursor.execute("ANALYZE")
+        before = time_queries(connection, cursor, queries, args.repeat, invalidators)
+
+        for statement in statements:
+            cursor.execute(statement)
+        cursor.execute("ANALYZE")
+        after = time_queries(connection, cursor, queries, args.repeat, invalidators)
+
+        print(f"\n{'query':<80} {'before ms':>10} {'after ms':>10} {'speedup':>8}")
+        for name, _, _ in queries:
+            if before[name] is None or after[name] is None:
+                print(f"{name:<80} {'failed':>10}")
+                continue
+            speedup = before[name] / after[name] if after[name] else float("inf")
+            print(f"{name:<80} {before[name]:>10.3f} {after[name]:>10.3f} {speedup:>7.1f}x")
+        if skipped:
+            print("\nSkipped (parameters not in the sample): " + ", ".join(skipped))
+    finally:
+        connection.rollback()
+        cursor.close()
+        connection.close()
@@ -51,13 +51,14 @@ def create_container_client(blob_service_client, container_name):
         raise Exception("Datastore.blob Unhandled Exception")
 
 
-def get_account_sas(account_name: str, key: str):
+def get_account_sas(account_name: str, key: str, validity: timedelta = timedelta(minutes=5)):
     """
     This function returns the account sas token
 
     Parameters:
     - name: the name of the storage account
     - key: the key of the storage account
+    - validity: the time before the token expires (default is 5 minutes)
 
     Returns: str
     """
@@ -77,6 +78,6 @@ def get_account_sas(account_name: str, key: str):
             tag=True,
             filter_by_tag=True,
         ),
-        expiry=datetime.now() + timedelta(minutes=5),
+        expiry=datetime.now() + validity,
     )
     return account_sas
@@ -1,9 +1,25 @@
 import datetime
 import hashlib
+import itertools
 import json
 import os
-
-from azure.storage.blob import BlobServiceClient, ContainerClient, BlobProperties
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from azure.core import MatchConditions
+from azure.core.exceptions import (
+    ResourceExistsError,
+    ResourceModifiedError,
+    ResourceNotFoundError,
+)
+from azure.storage.blob import (
+    BlobProperties,
+    PartialBatchErrorException,
+    BlobSasPermissions,
+    BlobServiceClient,
+    ContainerClient,
+    generate_blob_sas,
+)
 
 
 class GenerateHashError(Exception):
@@ -42,6 +58,18 @@ class ConnectionStringError(Exception):
     pass
 
 
+class MoveBlobError(Exception):
+    pass
+
+
+class DeleteFolderError(Exception):
+    pass
+
+
+class BlobSasError(Exception):
+    pass
+
+
 """
 ---- user-container based structure -----
 - container name is user id
@@ -51,8 +79,206 @@ class ConnectionStringError(Exception):
 date, in the container
 - inside the project folder, there is an image file and a json file with
 the image inference results
+- at the root of the container, a folder registry blob keeps track of every
+folder (name, uuid, creation date and image count) so lookups do not need to
+list the whole container
 """
 
+FOLDER_REGISTRY_BLOB = "folder_registry.json"
+FOLDER_REGISTRY_MAX_RETRIES = 5
+
+# Maximum number of blob requests sent at the same time by bulk operations
+MAX_CONCURRENCY = 8
+# Maximum number of blobs in a batch request (Azure limit)
+MAX_BATCH_SIZE = 256
+# Validity of the read-only SAS given to the storage service to copy a blob
+COPY_SAS_EXPIRY = datetime.timedelta(minutes=15)
+# Validity of the read-only SAS url given to a client to download a blob
+DOWNLOAD_SAS_EXPIRY = datetime.timedelta(minutes=10)
+# Seconds between two checks of a pending copy, and before giving up on it
+COPY_POLL_INTERVAL = 0.5
+COPY_TIMEOUT = 300
+
+
+def run_concurrently(function, arguments: list, max_concurrency: int = MAX_CONCURRENCY):
+    """
+    Calls function with each tuple of arguments, running at most
+    max_concurrency calls at the same time.
+
+    The aio module runs the calls on the event loop instead of a thread pool.
+
+    Returns: the list of results in the order of the arguments. A call that
+    failed has the exception it raised as result.
+    """
+
+    def call(args):
+        try:
+            return function(*args)
+        except Exception as error:
+            return error
+
+    if not arguments:
+        return []
+    with ThreadPoolExecutor(max_workers=max(1, max_concurrency)) as executor:
+        return list(executor.map(call, arguments))
+
+
+def iter_blobs(
+    container_client, blob_names: list, max_concurrency: int = MAX_CONCURRENCY
+):
+    """
+    Downloads the blobs, at most max_concurrency at the same time, and yields
+    (blob name, content) as each download completes, so only the blobs being
+    downloaded or not yet consumed are held in memory.
+
+    The aio module has an async generator running the downloads on the event
+    loop instead of a thread pool.
+
+    Raises: GetBlobError when a download fails, the other downloads are cancelled
+    """
+    blob_names = iter(blob_names)
+    with ThreadPoolExecutor(max_workers=max(1, max_concurrency)) as executor:
+        pending = {}
+        try:
+            for blob_name in itertools.islice(blob_names, max(1, max_concurrency)):
+                future = executor.submit(_download_blob, container_client, blob_name)
+                pending[future] = blob_name
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    blob_name = pending.pop(future)
+                    for next_name in itertools.islice(blob_names, 1):
+                        next_future = executor.submit(
+                            _download_blob, container_client, next_name
+                        )
+                        pending[next_future] = next_name
+                    yield blob_name, future.result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def _blob_batches(container_client, blob_names: list) -> list:
+    """
+    Splits blob_names in (container_client, batch) arguments of _delete_blob_batch
+    """
+    return [
+        (container_client, blob_names[i : i + MAX_BATCH_SIZE])
+        for i in range(0, len(blob_names), MAX_BATCH_SIZE)
+    ]
+
+
+def _is_folder_json(blob_name: str) -> bool:
+    """
+    Checks if a blob name follows the folder json convention: folder/folder.json
+    """
+    return (
+        blob_name.split(".")[-1] == "json"
+        and blob_name.count("/") == 1
+        and blob_name.split("/")[0] == blob_name.split("/")[1].split(".")[0]
+    )
+
+
+async def build_folder_registry(container_client):
+    """
+    This function rebuilds the folder registry of a container by listing its
+    blobs once. It is used when a container predates the registry or when the
+    registry blob is missing or unreadable.
+
+    Parameters:
+    - container_client: the Azure container client
+
+    Returns: the registry as a dict {folder_name: {folder_uuid, date_created, image_count}}
+    """
+    try:
+        folder_blobs = []
+        image_counts = {}
+        for blob in container_client.list_blobs():
+            if _is_folder_json(blob.name):
+                folder_blobs.append(blob.name)
+            elif blob.name.split(".")[-1] != "json" and blob.name.count("/") > 0:
+                folder = blob.name.split("/")[0]
+                image_counts[folder] = image_counts.get(folder, 0) + 1
+        registry = {}
+        for blob_name in folder_blobs:
+            folder_json = json.loads(await get_blob(container_client, blob_name))
+            folder_name = folder_json["folder_name"]
+            registry[folder_name] = {
+                "folder_uuid": folder_json.get("folder_uuid"),
+                "date_created": folder_json.get("date_created"),
+                "image_count": image_counts.get(folder_name, 0),
+            }
+        return registry
+    except FolderListError as error:
+        raise error
+    except Exception as error:
+        print(error)
+        raise FolderListError(f"Error building folder registry: {str(error)}")
+
+
+async def _read_folder_registry(container_client):
+    """
+    Reads the folder registry blob of a container.
+
+    Returns: a tuple (registry, etag). The etag is None if the registry does
+    not exist yet, in which case the registry is rebuilt from the container.
+    """
+    blob_client = container_client.get_blob_client(FOLDER_REGISTRY_BLOB)
+    try:
+        downloader = blob_client.download_blob()
+        registry = json.loads(downloader.readall())
+        if not isinstance(registry, dict):
+            raise ValueError("Folder registry is not a json object")
+        return registry, downloader.properties.etag
+    except (ResourceNotFoundError, ValueError, TypeError):
+        return await build_folder_registry(container_client), None
+
+
+async def get_folder_registry(container_client) -> dict:
+    """
+    This function returns the folder registry of a container in a single request
+
+    Parameters:
+    - container_client: the Azure container client
+
+    Returns: the registry as a dict {folder_name: {folder_uuid, date_created, image_count}}
+    """
+    registry, _ = await _read_folder_registry(container_client)
+    return registry
+
+
+async def update_folder_registry(container_client, update):
+    """
+    This function applies an update to the folder registry of a container.
+    The registry blob is written with an etag condition so concurrent writers
+    do not overwrite each other; on conflict the update is retried on a fresh
+    copy of the registry.
+
+    Parameters:
+    - container_client: the Azure container client
+    - update: a function taking the registry dict and modifying it in place
+
+    Returns: the updated registry
+    """
+    blob_client = container_client.get_blob_client(FOLDER_REGISTRY_BLOB)
+    for _ in range(FOLDER_REGISTRY_MAX_RETRIES):
+        registry, etag = await _read_folder_registry(container_client)
+        update(registry)
+        try:
+            if etag is None:
+                blob_client.upload_blob(json.dumps(registry), overwrite=False)
+            else:
+                blob_client.upload_blob(
+                    json.dumps(registry),
+                    overwrite=True,
+                    etag=etag,
+                    match_condition=MatchConditions.IfNotModified,
+                )
+            return registry
+        except (ResourceExistsError, ResourceModifiedError):
+            continue
+    raise FolderListError("Could not update the folder registry: too many conflicts")
+
 
 async def generate_hash(image):
     """
@@ -109,6 +335,7 @@ async def mount_container(
     create_container=True,
     tier="user",
     credentials="",
+    blob_service_client=None,
 ):
     """
     Creates a container_client as an object that can be used in other functions.
@@ -118,14 +345,16 @@ async def mount_container(
     - container_uuid: the uuid of the container (usually the user uuid)
     - create_container: a boolean value to specify if the container should be created if it doesnt exist (default is True)
     - tier: the tier of the container (default is user, should be changed if the structure changes to accomodate other type of containers)
+    - blob_service_client: the service client to use instead of creating one from the connection string and credentials
 
     Returns:
     - container_client: the container client object
     """
     try:
-        blob_service_client = BlobServiceClient.from_connection_string(
-            conn_str=connection_string, credential=credentials
-        )
+        if blob_service_client is None:
+            blob_service_client = BlobServiceClient.from_connection_string(
+                conn_str=connection_string, credential=credentials
+            )
         if blob_service_client:
             container_name = build_container_name(str(container_uuid), tier)
             container_client = blob_service_client.get_container_client(container_name)
@@ -190,8 +419,24 @@ async def upload_image(
                 "picture_uuid": f"{str(image_uuid)}",
                 "picture_set_uuid": f"{str(folder_uuid)}",
             }
-            blob_client = container_client.upload_blob(blob_name, image, overwrite=True)
+            try:
+                blob_client = container_client.upload_blob(
+                    blob_name, image, overwrite=False
+                )
+                is_new_image = True
+            except ResourceExistsError:
+                blob_client = container_client.upload_blob(
+                    blob_name, image, overwrite=True
+                )
+                is_new_image = False
             blob_client.set_blob_tags(metadata)
+            if is_new_image:
+
+                def increment_image_count(registry):
+                    if str(folder_name) in registry:
+                        registry[str(folder_name)]["image_count"] += 1
+
+                await update_folder_registry(container_client, increment_image_count)
             return blob_name
     except CreateDirectoryError or UploadImageError as e:
         raise e
@@ -200,6 +445,115 @@ async def upload_image(
         raise Exception("Datastore.blob.azure_storage unHandled Error")
 
 
+def _download_blob(container_client, blob_name):
+    """
+    Downloads the content of a blob
+    """
+    try:
+        return container_client.get_blob_client(str(blob_name)).download_blob().readall()
+    except Exception as error:
+        raise GetBlobError(str(error) + "\nError getting blob:" + str(blob_name))
+
+
+def _upload_tagged_blob(container_client, blob_name, data, tags: dict):
+    """
+    Uploads a new blob with its tags in a single request
+    """
+    container_client.upload_blob(blob_name, data, overwrite=False, tags=tags)
+    return blob_name
+
+
+def _delete_blob_batch(container_client, blob_names: list):
+    """
+    Deletes up to MAX_BATCH_SIZE blobs in a single batch request
+    """
+    container_client.delete_blobs(*blob_names)
+    return blob_names
+
+
+def _delete_blob_batch_report(container_client, blob_names: list) -> dict:
+    """
+    Deletes up to MAX_BATCH_SIZE blobs in a single batch request. A blob that
+    does not exist anymore counts as deleted.
+
+    Returns: a dict {blob name: error} of the blobs that could not be deleted
+    """
+    try:
+        container_client.delete_blobs(*blob_names)
+        return {}
+    except PartialBatchErrorException as error:
+        failed = {}
+        for blob_name, part in zip(blob_names, error.parts):
+            if not 200 <= part.status_code < 300 and part.status_code != 404:
+                failed[blob_name] = f"{part.status_code} {part.reason}"
+        return failed
+
+
+async def upload_images(
+    container_client,
+    folder_name,
+    folder_uuid,
+    images: list,
+    max_concurrency: int = MAX_CONCURRENCY,
+):
+    """
+    uploads several images to the specified folder within the user's container.
+    The folder is checked once, the images are uploaded concurrently with their
+    tags and the folder registry is updated once. If an upload fails, the
+    images already uploaded are deleted so the folder is left unchanged.
+
+    Parameters:
+    - container_client: the Azure container client
+    - folder_name: the name of the destination folder
+    - folder_uuid : uuid of the picture_set
+    - images: list of (image_uuid, image) to upload
+    - max_concurrency: the maximum number of uploads running at the same time
+
+    Returns: the list of blob names in the order of images
+    """
+    try:
+        if not await is_a_folder(container_client, folder_name):
+            raise CreateDirectoryError(f"Folder:{folder_name} does not exist")
+        uploads = [
+            (
+                container_client,
+                build_blob_name(str(folder_name), str(image_uuid)),
+                image,
+                {
+                    "picture_uuid": f"{str(image_uuid)}",
+                    "picture_set_uuid": f"{str(folder_uuid)}",
+                },
+            )
+            for image_uuid, image in images
+        ]
+        results = run_concurrently(_upload_tagged_blob, uploads, max_concurrency)
+        errors = [result for result in results if isinstance(result, Exception)]
+        if errors:
+            uploaded = [
+                result for result in results if not isinstance(result, Exception)
+            ]
+            run_concurrently(
+                _delete_blob_batch,
+                _blob_batches(container_client, uploaded),
+                max_concurrency,
+            )
+            raise UploadImageError(
+                f"{len(errors)} of {len(uploads)} images could not be uploaded: {errors[0]}"
+            )
+
+        def add_image_count(registry):
+            if str(folder_name) in registry:
+                registry[str(folder_name)]["image_count"] += len(results)
+
+        await update_folder_registry(container_client, add_image_count)
+        return results
+    except (CreateDirectoryError, UploadImageError) as e:
+        raise e
+    except Exception as error:
+        print(error)
+        raise Exception("Datastore.blob.azure_storage unHandled Error")
+
+
 async def is_a_folder(container_client, folder_name):
     """
     This function checks if a folder exists in the container
@@ -211,8 +565,8 @@ async def is_a_folder(container_client, folder_name):
     Returns: True if the folder exists, False otherwise
     """
     try:
-        directories = await get_directories(container_client)
-        if str(folder_name) in directories:
+        registry = await get_folder_registry(container_client)
+        if str(folder_name) in registry:
             return True
         else:
             return False
@@ -225,6 +579,21 @@ async def is_a_folder(container_client, folder_name):
         raise Exception("Datastore.blob.azure_storage : Unhandled Error")
 
 
+def _register_folder(folder_data: dict):
+    """
+    Returns a registry update adding the folder described by folder_data
+    """
+
+    def register(registry):
+        registry[str(folder_data["folder_name"])] = {
+            "folder_uuid": folder_data.get("folder_uuid"),
+            "date_created": folder_data.get("date_created"),
+            "image_count": 0,
+        }
+
+    return register
+
+
 async def create_folder(container_client, folder_uuid=None, folder_name=None):
     """
     creates a folder in the user's container
@@ -260,6 +629,9 @@ async def create_folder(container_client, folder_uuid=None, folder_name=None):
             )
             metadata = {"picture_set_uuid": f"{str(folder_uuid)}"}
             blob_client.set_blob_tags(metadata)
+            await update_folder_registry(
+                container_client, _register_folder(folder_data)
+            )
             return True
         else:
             raise CreateDirectoryError("Folder already exists")
@@ -318,6 +690,9 @@ async def create_dev_container_folder(
             )
             metadata = {"picture_set_uuid": f"{str(folder_uuid)}"}
             blob_client.set_blob_tags(metadata)
+            await update_folder_registry(
+                dev_container_client, _register_folder(folder_data)
+            )
             return True
         else:
             raise CreateDirectoryError("Folder already exists")
@@ -351,31 +726,17 @@ async def upload_inference_result(container_client, folder_name, result, hash_va
 
 async def get_folder_uuid(container_client, folder_name):
     """
-    gets the uuid of a folder in the user's container given the folder name by
-    iterating through the folder json files and extracting the name
-    to match given folder name
+    gets the uuid of a folder in the user's container given the folder name
+    from the container folder registry
     """
     try:
-        blob_list = container_client.list_blobs()
-        for blob in blob_list:
-
-            if (
-                blob.name.split(".")[-1] == "json"
-                and blob.name.count("/") == 1
-                and blob.name.split("/")[0] == blob.name.split("/")[1].split(".")[0]
-            ):
-                folder_json = await get_blob(container_client, blob.name)
-
-                if folder_json:
-                    folder_json = json.loads(folder_json)
-
-                    if folder_json["folder_name"] == folder_name:
-                        if "folder_uuid" not in folder_json:
-                            raise GetFolderUUIDError(
-                                "Folder UUID not found in folder metadata"
-                            )
-                        return folder_json["folder_uuid"]
-        raise GetFolderUUIDError(f"Folder '{folder_name}' not found")
+        registry = await get_folder_registry(container_client)
+        if str(folder_name) not in registry:
+            raise GetFolderUUIDError(f"Folder '{folder_name}' not found")
+        folder_uuid = registry[str(folder_name)].get("folder_uuid")
+        if folder_uuid is None:
+            raise GetFolderUUIDError("Folder UUID not found in folder metadata")
+        return folder_uuid
     except GetFolderUUIDError as error:
         raise error
     except Exception as error:
@@ -388,45 +749,28 @@ async def get_image_count(container_client, folder_name):
     gets the number of images in a folder in the user's container
     """
     try:
-        folder_uuid = await get_folder_uuid(container_client, folder_name)
-        if folder_uuid:
-            blob_list = container_client.list_blobs()
-            count = 0
-            for blob in blob_list:
-
-                if (blob.name.split("/")[0] == folder_name) and (
-                    blob.name.split(".")[-1] != "json"
-                ):
-                    count += 1
-            return count
+        registry = await get_folder_registry(container_client)
+        if str(folder_name) not in registry:
+            raise GetFolderUUIDError(f"Folder '{folder_name}' not found")
+        if registry[str(folder_name)].get("folder_uuid"):
+            return registry[str(folder_name)]["image_count"]
         else:
             return False
-    except GetFolderUUIDError as error:
+    except (GetFolderUUIDError, FolderListError) as error:
         print(error)
         return False
 
 
 async def get_directories(container_client):
     """
-    returns a list of folder names in the user's container
+    returns a dict of folder names and their image count in the user's container
     """
     try:
-        directories = {}
-        blob_list = container_client.list_blobs()
-        for blob in blob_list:
-            if (
-                blob.name.split(".")[-1] == "json"
-                and blob.name.count("/") == 1
-                and blob.name.split("/")[0] == blob.name.split("/")[1].split(".")[0]
-            ):
-                json_blob = await get_blob(container_client, blob.name)
-                if json_blob:
-                    folder_json = json.loads(json_blob)
-                    image_count = await get_image_count(
-                        container_client, folder_json["folder_name"]
-                    )
-                    directories[folder_json["folder_name"]] = image_count
-        return directories
+        registry = await get_folder_registry(container_client)
+        return {
+            folder_name: folder["image_count"]
+            for folder_name, folder in registry.items()
+        }
     except FolderListError as error:
         raise error
     except Exception as error:
@@ -451,7 +795,7 @@ async def download_container(container_client, container_name, local_dir):
         # List blobs in the container
         blob_list = container_client.list_blobs()
         # Iterate through each blob
-        for i, blob in enumerate(blob_list):
+        for blob in blob_list:
             # Create a blob client
             blob_client = container_client.get_blob_client(
                 container=container_name, blob=blob
@@ -463,7 +807,6 @@ async def download_container(container_client, container_name, local_dir):
             with open(local_file_path, "wb") as file:
                 blob_data = blob_client.download_blob(blob=blob.name)
                 blob_data.readinto(file)
-                #  nb_downloaded_files = i
     except Exception:
         raise Exception("Error downloading container")
 
@@ -502,26 +845,207 @@ async def get_blobs_from_tag(container_client: ContainerClient, tag: str):
         raise GetBlobError(f"Error getting blobs: {str(e)}")
 
 
-async def delete_folder(container_client: ContainerClient, picture_set_id):
+async def find_folder_blobs(
+    container_client: ContainerClient, picture_set_id, use_tag_index: bool = False
+) -> list:
+    """
+    This function finds the blobs tagged with the id of a picture set.
+
+    By default, only the blobs under the folders of the picture set in the
+    folder registry are listed, or every blob of the container if the picture
+    set has no folder in the registry. The server side tag index of the
+    container is used instead if use_tag_index is True. The tag index is
+    updated asynchronously by Azure, so it can miss the blobs tagged a few
+    seconds ago.
+
+    Parameters:
+    - container_client: the Azure container client
+    - picture_set_id: id of the picture set
+    - use_tag_index: look the blobs up in the tag index of the container
+
+    Returns: the list of blob names
+    """
+    try:
+        tag = str(picture_set_id)
+        if use_tag_index:
+            blobs = container_client.find_blobs_by_tags(
+                f"\"picture_set_uuid\" = '{tag}'"
+            )
+            return [blob.name for blob in blobs]
+        registry = await get_folder_registry(container_client)
+        prefixes = [
+            f"{folder_name}/"
+            for folder_name, folder in registry.items()
+            if folder.get("folder_uuid") == tag
+        ]
+        blob_names = []
+        # Without a folder in the registry, the whole container is listed
+        for prefix in prefixes or [None]:
+            blobs = container_client.list_blobs(
+                name_starts_with=prefix, include=["tags"]
+            )
+            for blob in blobs:
+                if (blob.tags or {}).get("picture_set_uuid") == tag:
+                    blob_names.append(blob.name)
+        return blob_names
+    except FolderListError as error:
+        raise error
+    except Exception as error:
+        print(error)
+        raise FolderListError(f"Error finding the blobs of {picture_set_id}: {str(error)}")
+
+
+async def delete_folder(
+    container_client: ContainerClient,
+    picture_set_id,
+    use_tag_index: bool = False,
+    max_concurrency: int = MAX_CONCURRENCY,
+):
     """
-    This function deletes a folder in the user's container
+    This function deletes a folder in the user's container. The blobs of the
+    folder (see find_folder_blobs) are deleted with batch requests of up to
+    MAX_BATCH_SIZE blobs, at most max_concurrency batches at the same time.
+    The folder is removed from the folder registry once all its blobs are
+    deleted.
 
     Parameters:
     - container_client: the Azure container client
     - picture_set_id: id of the picture set related to the folder to delete
+    - use_tag_index: look the blobs up in the tag index of the container
+    - max_concurrency: the maximum number of batch requests running at the same time
 
-    Returns: True if the folder is deleted, False otherwise
+    Returns: a dict with the list of "deleted" blob names and the "failed"
+    blob names with their error: {"deleted": [...], "failed": {name: error}}
     """
     try:
-        blobs = await get_blobs_from_tag(container_client, picture_set_id)
-        for blob in blobs:
-            container_client.delete_blob(blob.name)
-        return True
+        blob_names = await find_folder_blobs(
+            container_client, picture_set_id, use_tag_index
+        )
+        batches = _blob_batches(container_client, blob_names)
+        results = run_concurrently(_delete_blob_batch_report, batches, max_concurrency)
+        failed = {}
+        for (_, batch), result in zip(batches, results):
+            if isinstance(result, Exception):
+                failed.update({blob_name: str(result) for blob_name in batch})
+            else:
+                failed.update(result)
+
+        if not failed:
+
+            def unregister_folder(registry):
+                for folder_name, folder in list(registry.items()):
+                    if folder.get("folder_uuid") == str(picture_set_id):
+                        del registry[folder_name]
+
+            await update_folder_registry(container_client, unregister_folder)
+        return {
+            "deleted": [blob_name for blob_name in blob_names if blob_name not in failed],
+            "failed": failed,
+        }
+    except FolderListError as error:
+        raise DeleteFolderError(str(error))
+    except Exception as error:
+        print(error)
+        raise DeleteFolderError(f"Error deleting the folder {picture_set_id}: {str(error)}")
 
-    except GetFolderUUIDError:
-        return False
-    except Exception:
-        return False
+
+def build_copy_source_url(blob_client, account_key: str = None) -> str:
+    """
+    This function returns the url the storage service reads a blob from when
+    copying it. The url is signed with a read-only SAS valid for
+    COPY_SAS_EXPIRY if the account key is known (given or used by the client),
+    otherwise it carries the SAS of the client.
+
+    Parameters:
+    - blob_client: the Azure blob client of the source blob
+    - account_key: the key of the storage account (optional)
+
+    Returns: the url of the source blob
+    """
+    if account_key is None:
+        account_key = getattr(blob_client.credential, "account_key", None)
+    if account_key is None:
+        return blob_client.url
+    return _read_only_blob_url(blob_client, account_key, COPY_SAS_EXPIRY)
+
+
+def _read_only_blob_url(blob_client, account_key: str, expiry: datetime.timedelta):
+    """
+    Returns the url of a blob signed with a read-only SAS of the blob valid for expiry
+    """
+    sas = generate_blob_sas(
+        account_name=blob_client.account_name,
+        container_name=blob_client.container_name,
+        blob_name=blob_client.blob_name,
+        account_key=account_key,
+        permission=BlobSasPermissions(read=True),
+        expiry=datetime.datetime.now(datetime.timezone.utc) + expiry,
+    )
+    return "{}?{}".format(blob_client.url.split("?")[0], sas)
+
+
+def build_blob_sas_url(
+    container_client,
+    blob_name: str,
+    account_key: str = None,
+    expiry: datetime.timedelta = DOWNLOAD_SAS_EXPIRY,
+) -> str:
+    """
+    This function returns an url a client can download a blob from directly:
+    the url is signed with a SAS that can only read this blob and expires
+    after expiry. The SAS of the container client is never part of the url.
+
+    Parameters:
+    - container_client: the Azure container client of the blob
+    - blob_name: the name of the blob
+    - account_key: the key of the storage account, defaults to the key used by
+      the container client
+    - expiry: the validity of the url
+
+    Returns: the signed url of the blob
+    """
+    blob_client = container_client.get_blob_client(str(blob_name))
+    if account_key is None:
+        account_key = getattr(blob_client.credential, "account_key", None)
+    if account_key is None:
+        raise BlobSasError(
+            "The account key is required to sign the url of the blob: " + str(blob_name)
+        )
+    return _read_only_blob_url(blob_client, account_key, expiry)
+
+
+def _copy_blob(
+    container_client_source,
+    container_client_destination,
+    blob_name_source,
+    blob_name_dest,
+    tags: dict,
+    account_key: str = None,
+    timeout: float = COPY_TIMEOUT,
+):
+    """
+    Copies a blob server side, with its tags set by the copy request, and
+    waits for the copy to complete
+    """
+    source_client = container_client_source.get_blob_client(blob_name_source)
+    destination_client = container_client_destination.get_blob_client(blob_name_dest)
+    copy = destination_client.start_copy_from_url(
+        build_copy_source_url(source_client, account_key), tags=tags
+    )
+    status = copy["copy_status"]
+    waited = 0.0
+    while status == "pending":
+        if waited >= timeout:
+            destination_client.abort_copy(copy["copy_id"])
+            raise MoveBlobError(
+                f"The copy of {blob_name_source} did not complete in {timeout}s"
+            )
+        time.sleep(COPY_POLL_INTERVAL)
+        waited += COPY_POLL_INTERVAL
+        status = destination_client.get_blob_properties().copy.status
+    if status != "success":
+        raise MoveBlobError(f"The copy of {blob_name_source} ended with status {status}")
+    return blob_name_dest
 
 
 async def move_blob(
@@ -530,29 +1054,104 @@ async def move_blob(
     folder_uuid,
     container_client_source,
     container_client_destination,
+    account_key: str = None,
 ):
     """
-    This function move a blob from a container to another
+    This function move a blob from a container to another. The blob is copied
+    by the storage service, its content does not go through this process.
 
     Parameters:
     - blob_name: the name of the blob to move
     - container_client_source: the Azure container client where the blob is
     - container_client_destination : the Azure container client where the blob will be moved
+    - account_key: the key of the storage account, see build_copy_source_url (optional)
     """
     try:
-        blob_client = container_client_source.get_blob_client(blob_name_source)
-
-        blob = blob_client.download_blob().readall()
-
-        blob_client_destination = container_client_destination.get_blob_client(
-            blob_name_dest
-        )
-
-        blob_client_destination.upload_blob(blob, overwrite=True)
         metadata = {"picture_set_uuid": f"{str(folder_uuid)}"}
-        blob_client_destination.set_blob_tags(metadata)
-
+        _copy_blob(
+            container_client_source,
+            container_client_destination,
+            blob_name_source,
+            blob_name_dest,
+            metadata,
+            account_key,
+        )
         container_client_source.delete_blob(blob_name_source)
         return True
     except Exception as e:
         raise Exception(f"Error moving blob: {e}")
+
+
+async def move_blobs(
+    blob_names: list,
+    folder_uuid,
+    container_client_source,
+    container_client_destination,
+    account_key: str = None,
+    max_concurrency: int = MAX_CONCURRENCY,
+    timeout: float = COPY_TIMEOUT,
+):
+    """
+    This function moves several blobs from a container to another. The blobs
+    are copied by the storage service, at most max_concurrency at the same
+    time, with their picture_set_uuid tag set by the copy request. Once every
+    copy is complete, the sources are deleted with batch requests. If a copy
+    fails, the copies already done are deleted and the sources are kept.
+
+    Parameters:
+    - blob_names: list of (source blob name, destination blob name)
+    - folder_uuid: the uuid of the destination folder, set as picture_set_uuid tag
+    - container_client_source: the Azure container client where the blobs are
+    - container_client_destination : the Azure container client where the blobs will be moved
+    - account_key: the key of the storage account, see build_copy_source_url (optional)
+    - max_concurrency: the maximum number of copies running at the same time
+    - timeout: the seconds to wait for a copy to complete
+
+    Returns: the list of destination blob names in the order of blob_names
+    """
+    try:
+        metadata = {"picture_set_uuid": f"{str(folder_uuid)}"}
+        copies = [
+            (
+                container_client_source,
+                container_client_destination,
+                blob_name_source,
+                blob_name_dest,
+                metadata,
+                account_key,
+                timeout,
+            )
+            for blob_name_source, blob_name_dest in blob_names
+        ]
+        results = run_concurrently(_copy_blob, copies, max_concurrency)
+        errors = [result for result in results if isinstance(result, Exception)]
+        if errors:
+            copied = [
+                result for result in results if not isinstance(result, Exception)
+            ]
+            run_concurrently(
+                _delete_blob_batch,
+                _blob_batches(container_client_destination, copied),
+                max_concurrency,
+            )
+            raise MoveBlobError(
+                f"{len(errors)} of {len(copies)} blobs could not be copied: {errors[0]}"
+            ) from errors[0]
+        deletions = run_concurrently(
+            _delete_blob_batch,
+            _blob_batches(
+                container_client_source,
+                [blob_name_source for blob_name_source, _ in blob_names],
+            ),
+            max_concurrency,
+        )
+        errors = [result for result in deletions if isinstance(result, Exception)]
+        if errors:
+            raise MoveBlobError(
+                f"The blobs were copied but {len(errors)} batches of sources could not be deleted: {errors[0]}"
+            ) from errors[0]
+        return results
+    except MoveBlobError as error:
+        raise error
+    except Exception as error:
+        raise MoveBlobError(f"Error moving blobs: {str(error)}") from error
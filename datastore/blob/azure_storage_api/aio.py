@@ -0,0 +1,684 @@
+"""
+Async blob I/O on azure.storage.blob.aio clients.
+
+This module is the async version of the functions of
+datastore.blob.azure_storage_api used on the hot paths of a backend running
+on an event loop: reading and uploading pictures, the folder registry and
+deleting or moving the blobs of a folder. The concurrent requests run on the
+event loop instead of a thread pool. The constants, exceptions and pure
+helpers (blob names, SAS urls) are the ones of the sync module.
+"""
+
+import asyncio
+import datetime
+import itertools
+import json
+
+from azure.core import MatchConditions
+from azure.core.exceptions import (
+    ResourceExistsError,
+    ResourceModifiedError,
+    ResourceNotFoundError,
+)
+from azure.storage.blob import PartialBatchErrorException
+from azure.storage.blob.aio import BlobServiceClient
+
+from datastore.blob.azure_storage_api import (
+    COPY_POLL_INTERVAL,
+    COPY_TIMEOUT,
+    FOLDER_REGISTRY_BLOB,
+    FOLDER_REGISTRY_MAX_RETRIES,
+    MAX_CONCURRENCY,
+    ConnectionStringError,
+    CreateDirectoryError,
+    DeleteFolderError,
+    FolderListError,
+    GetBlobError,
+    GetFolderUUIDError,
+    MountContainerError,
+    MoveBlobError,
+    UploadImageError,
+    _blob_batches,
+    _is_folder_json,
+    _register_folder,
+    build_blob_name,
+    build_container_name,
+    build_copy_source_url,
+)
+
+
+async def run_concurrently(
+    function, arguments: list, max_concurrency: int = MAX_CONCURRENCY
+):
+    """
+    Awaits function with each tuple of arguments, running at most
+    max_concurrency calls at the same time on the event loop.
+
+    Returns: the list of results in the order of the arguments. A call that
+    failed has the exception it raised as result.
+    """
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+    async def call(args):
+        async with semaphore:
+            return await function(*args)
+
+    return await asyncio.gather(
+        *(call(args) for args in arguments), return_exceptions=True
+    )
+
+
+async def _download_blob(container_client, blob_name):
+    """
+    Downloads the content of a blob
+    """
+    try:
+        downloader = await container_client.get_blob_client(
+            str(blob_name)
+        ).download_blob()
+        return await downloader.readall()
+    except Exception as error:
+        raise GetBlobError(str(error) + "\nError getting blob:" + str(blob_name))
+
+
+async def iter_blobs(
+    container_client, blob_names: list, max_concurrency: int = MAX_CONCURRENCY
+):
+    """
+    Downloads the blobs, at most max_concurrency at the same time on the event
+    loop, and yields (blob name, content) as each download completes.
+
+    Raises: GetBlobError when a download fails, the other downloads are cancelled
+    """
+    blob_names = iter(blob_names)
+    pending = {}
+
+    def start(blob_name):
+        task = asyncio.ensure_future(_download_blob(container_client, blob_name))
+        pending[task] = blob_name
+
+    try:
+        for blob_name in itertools.islice(blob_names, max(1, max_concurrency)):
+            start(blob_name)
+        while pending:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                blob_name = pending.pop(task)
+                for next_name in itertools.islice(blob_names, 1):
+                    start(next_name)
+                yield blob_name, task.result()
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def get_blob(container_client, blob_name):
+    """
+    gets the contents of a specified blob in the user's container
+    """
+    try:
+        blob_client = container_client.get_blob_client(str(blob_name))
+        blob = await blob_client.download_blob()
+        return await blob.readall()
+    except Exception as error:
+        raise GetBlobError(str(error) + "\nError getting blob:" + str(blob_name))
+
+
+async def build_folder_registry(container_client):
+    """
+    This function rebuilds the folder registry of a container by listing its
+    blobs once, see datastore.blob.azure_storage_api.build_folder_registry.
+
+    Returns: the registry as a dict {folder_name: {folder_uuid, date_created, image_count}}
+    """
+    try:
+        folder_blobs = []
+        image_counts = {}
+        async for blob in container_client.list_blobs():
+            if _is_folder_json(blob.name):
+                folder_blobs.append(blob.name)
+            elif blob.name.split(".")[-1] != "json" and blob.name.count("/") > 0:
+                folder = blob.name.split("/")[0]
+                image_counts[folder] = image_counts.get(folder, 0) + 1
+        registry = {}
+        for blob_name in folder_blobs:
+            folder_json = json.loads(await get_blob(container_client, blob_name))
+            folder_name = folder_json["folder_name"]
+            registry[folder_name] = {
+                "folder_uuid": folder_json.get("folder_uuid"),
+                "date_created": folder_json.get("date_created"),
+                "image_count": image_counts.get(folder_name, 0),
+            }
+        return registry
+    except FolderListError as error:
+        raise error
+    except Exception as error:
+        print(error)
+        raise FolderListError(f"Error building folder registry: {str(error)}")
+
+
+async def _read_folder_registry(container_client):
+    """
+    Reads the folder registry blob of a container.
+
+    Returns: a tuple (registry, etag). The etag is None if the registry does
+    not exist yet, in which case the registry is rebuilt from the container.
+    """
+    blob_client = container_client.get_blob_client(FOLDER_REGISTRY_BLOB)
+    try:
+        downloader = await blob_client.download_blob()
+        registry = json.loads(await downloader.readall())
+        if not isinstance(registry, dict):
+            raise ValueError("Folder registry is not a json object")
+        return registry, downloader.properties.etag
+    except (ResourceNotFoundError, ValueError, TypeError):
+        return await build_folder_registry(container_client), None
+
+
+async def get_folder_registry(container_client) -> dict:
+    """
+    This function returns the folder registry of a container in a single request
+
+    Returns: the registry as a dict {folder_name: {folder_uuid, date_created, image_count}}
+    """
+    registry, _ = await _read_folder_registry(container_client)
+    return registry
+
+
+async def update_folder_registry(container_client, update):
+    """
+    This function applies an update to the folder registry of a container,
+    retrying on a fresh copy of the registry when a concurrent writer changed
+    it, see datastore.blob.azure_storage_api.update_folder_registry.
+
+    Parameters:
+    - container_client: the Azure container client
+    - update: a function taking the registry dict and modifying it in place
+
+    Returns: the updated registry
+    """
+    blob_client = container_client.get_blob_client(FOLDER_REGISTRY_BLOB)
+    for _ in range(FOLDER_REGISTRY_MAX_RETRIES):
+        registry, etag = await _read_folder_registry(container_client)
+        update(registry)
+        try:
+            if etag is None:
+                await blob_client.upload_blob(json.dumps(registry), overwrite=False)
+            else:
+                await blob_client.upload_blob(
+                    json.dumps(registry),
+                    overwrite=True,
+                    etag=etag,
+                    match_condition=MatchConditions.IfNotModified,
+                )
+            return registry
+        except (ResourceExistsError, ResourceModifiedError):
+            continue
+    raise FolderListError("Could not update the folder registry: too many conflicts")
+
+
+async def is_a_folder(container_client, folder_name):
+    """
+    This function checks if a folder exists in the container
+
+    Returns: True if the folder exists, False otherwise
+    """
+    try:
+        registry = await get_folder_registry(container_client)
+        return str(folder_name) in registry
+    except FolderListError as e:
+        print(e)
+        raise FolderListError(
+            "Error getting folder list, could not check if its a folder"
+        )
+    except Exception:
+        raise Exception("Datastore.blob.azure_storage : Unhandled Error")
+
+
+async def get_image_count(container_client, folder_name):
+    """
+    gets the number of images in a folder in the user's container
+    """
+    try:
+        registry = await get_folder_registry(container_client)
+        if str(folder_name) not in registry:
+            raise GetFolderUUIDError(f"Folder '{folder_name}' not found")
+        if registry[str(folder_name)].get("folder_uuid"):
+            return registry[str(folder_name)]["image_count"]
+        else:
+            return False
+    except (GetFolderUUIDError, FolderListError) as error:
+        print(error)
+        return False
+
+
+async def create_folder(container_client, folder_uuid=None, folder_name=None):
+    """
+    creates a folder in the user's container
+
+    Parameters:
+    - container_client: the container client object to interact with the Azure storage account
+    - folder_uuid: the uuid of the folder to be created
+    - folder_name: the name of the folder to be created (usually it's uuid)
+    """
+    try:
+        if folder_uuid is None and folder_name is None:
+            raise CreateDirectoryError("Folder name and uuid not provided")
+        elif folder_uuid is None:
+            raise CreateDirectoryError("Folder uuid not provided")
+        if folder_name is None:
+            folder_name = folder_uuid
+        if await is_a_folder(container_client, folder_name):
+            raise CreateDirectoryError("Folder already exists")
+        folder_data = {
+            "folder_name": folder_name,
+            "date_created": str(datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")),
+        }
+        if folder_uuid is not None:
+            folder_data["folder_uuid"] = str(folder_uuid)
+        file_name = build_blob_name(str(folder_name), str(folder_name), "json")
+        blob_client = await container_client.upload_blob(
+            file_name, json.dumps(folder_data), overwrite=True
+        )
+        await blob_client.set_blob_tags({"picture_set_uuid": f"{str(folder_uuid)}"})
+        await update_folder_registry(container_client, _register_folder(folder_data))
+        return True
+    except CreateDirectoryError as error:
+        raise error
+    except FolderListError as error:
+        print(error)
+        raise CreateDirectoryError("Error getting folder list, could not create folder")
+    except Exception as error:
+        print(error)
+        raise Exception("Datastore unHandled Error")
+
+
+async def mount_container(
+    connection_string,
+    container_uuid,
+    create_container=True,
+    tier="user",
+    credentials="",
+    blob_service_client=None,
+):
+    """
+    Returns the async client of a container, creating the container and its
+    General folder if it does not exist and create_container is True.
+
+    Parameters:
+    - connection_string: the connection string to the azure storage account
+    - container_uuid: the uuid of the container (usually the user uuid)
+    - create_container: create the container if it doesnt exist (default is True)
+    - tier: the tier of the container (default is user)
+    - blob_service_client: the async service client to use instead of creating
+      one from the connection string and credentials
+
+    Returns:
+    - container_client: the async container client
+    """
+    try:
+        if blob_service_client is None:
+            blob_service_client = BlobServiceClient.from_connection_string(
+                conn_str=connection_string, credential=credentials
+            )
+        container_name = build_container_name(str(container_uuid), tier)
+        container_client = blob_service_client.get_container_client(container_name)
+        if await container_client.exists():
+            return container_client
+        if not create_container:
+            raise MountContainerError("Container does not exist")
+        container_client = await blob_service_client.create_container(container_name)
+        # create general directory for new user container
+        if await create_folder(container_client, "General"):
+            return container_client
+        raise MountContainerError("Error creating general directory")
+    except ValueError as error:
+        raise ConnectionStringError(
+            "The given connection string is invalid: " + error.__str__()
+        )
+    except (MountContainerError, ConnectionStringError) as error:
+        raise error
+    except Exception as error:
+        raise Exception("Unhandeled error:" + error.__str__())
+
+
+async def _upload_tagged_blob(container_client, blob_name, data, tags: dict):
+    """
+    Uploads a new blob with its tags in a single request
+    """
+    await container_client.upload_blob(blob_name, data, overwrite=False, tags=tags)
+    return blob_name
+
+
+async def _delete_blob_batch(container_client, blob_names: list):
+    """
+    Deletes up to MAX_BATCH_SIZE blobs in a single batch request
+    """
+    await container_client.delete_blobs(*blob_names)
+    return blob_names
+
+
+async def _delete_blob_batch_report(container_client, blob_names: list) -> dict:
+    """
+    Deletes up to MAX_BATCH_SIZE blobs in a single batch request. A blob that
+    does not exist anymore counts as deleted.
+
+    Returns: a dict {blob name: error} of the blobs that could not be deleted
+    """
+    try:
+        await container_client.delete_blobs(*blob_names)
+        return {}
+    except PartialBatchErrorException as error:
+        failed = {}
+        for blob_name, part in zip(blob_names, error.parts):
+            if not 200 <= part.status_code < 300 and part.status_code != 404:
+                failed[blob_name] = f"{part.status_code} {part.reason}"
+        return failed
+
+
+async def upload_images(
+    container_client,
+    folder_name,
+    folder_uuid,
+    images: list,
+    max_concurrency: int = MAX_CONCURRENCY,
+):
+    """
+    uploads several images to the specified folder within the user's container,
+    see datastore.blob.azure_storage_api.upload_images. If an upload fails,
+    the images already uploaded are deleted so the folder is left unchanged.
+
+    Parameters:
+    - container_client: the Azure container client
+    - folder_name: the name of the destination folder
+    - folder_uuid : uuid of the picture_set
+    - images: list of (image_uuid, image) to upload
+    - max_concurrency: the maximum number of uploads running at the same time
+
+    Returns: the list of blob names in the order of images
+    """
+    try:
+        if not await is_a_folder(container_client, folder_name):
+            raise CreateDirectoryError(f"Folder:{folder_name} does not exist")
+        uploads = [
+            (
+                container_client,
+                build_blob_name(str(folder_name), str(image_uuid)),
+                image,
+                {
+                    "picture_uuid": f"{str(image_uuid)}",
+                    "picture_set_uuid": f"{str(folder_uuid)}",
+                },
+            )
+            for image_uuid, image in images
+        ]
+        results = await run_concurrently(_upload_tagged_blob, uploads, max_concurrency)
+        errors = [result for result in results if isinstance(result, Exception)]
+        if errors:
+            uploaded = [
+                result for result in results if not isinstance(result, Exception)
+            ]
+            await run_concurrently(
+                _delete_blob_batch,
+                _blob_batches(container_client, uploaded),
+                max_concurrency,
+            )
+            raise UploadImageError(
+                f"{len(errors)} of {len(uploads)} images could not be uploaded: {errors[0]}"
+            )
+
+        def add_image_count(registry):
+            if str(folder_name) in registry:
+                registry[str(folder_name)]["image_count"] += len(results)
+
+        await update_folder_registry(container_client, add_image_count)
+        return results
+    except (CreateDirectoryError, UploadImageError) as e:
+        raise e
+    except Exception as error:
+        print(error)
+        raise Exception("Datastore.blob.azure_storage unHandled Error")
+
+
+async def upload_image(
+    container_client, folder_name, folder_uuid, image: str, image_uuid
+):
+    """
+    uploads the image to the specified folder within the user's container,
+    replacing the blob of an image uploaded before
+
+    Parameters:
+    - container_client: the Azure container client
+    - folder_name: the name of the destination folder
+    - folder_uuid : uuid of the picture_set
+    - image: the content of the image
+    - image_uuid: uuid of the picture
+
+    Returns: the name of the blob of the image
+    """
+    try:
+        if not await is_a_folder(container_client, folder_name):
+            raise CreateDirectoryError(f"Folder:{folder_name} does not exist")
+        blob_name = build_blob_name(str(folder_name), str(image_uuid))
+        metadata = {
+            "picture_uuid": f"{str(image_uuid)}",
+            "picture_set_uuid": f"{str(folder_uuid)}",
+        }
+        try:
+            blob_client = await container_client.upload_blob(
+                blob_name, image, overwrite=False
+            )
+            is_new_image = True
+        except ResourceExistsError:
+            blob_client = await container_client.upload_blob(
+                blob_name, image, overwrite=True
+            )
+            is_new_image = False
+        await blob_client.set_blob_tags(metadata)
+        if is_new_image:
+
+            def increment_image_count(registry):
+                if str(folder_name) in registry:
+                    registry[str(folder_name)]["image_count"] += 1
+
+            await update_folder_registry(container_client, increment_image_count)
+        return blob_name
+    except CreateDirectoryError as e:
+        raise e
+    except Exception as error:
+        print(error)
+        raise Exception("Datastore.blob.azure_storage unHandled Error")
+
+
+async def find_folder_blobs(
+    container_client, picture_set_id, use_tag_index: bool = False
+) -> list:
+    """
+    This function finds the blobs tagged with the id of a picture set, see
+    datastore.blob.azure_storage_api.find_folder_blobs.
+
+    Returns: the list of blob names
+    """
+    try:
+        tag = str(picture_set_id)
+        if use_tag_index:
+            blobs = container_client.find_blobs_by_tags(
+                f"\"picture_set_uuid\" = '{tag}'"
+            )
+            return [blob.name async for blob in blobs]
+        registry = await get_folder_registry(container_client)
+        prefixes = [
+            f"{folder_name}/"
+            for folder_name, folder in registry.items()
+            if folder.get("folder_uuid") == tag
+        ]
+        blob_names = []
+        # Without a folder in the registry, the whole container is listed
+        for prefix in prefixes or [None]:
+            blobs = container_client.list_blobs(
+                name_starts_with=prefix, include=["tags"]
+            )
+            async for blob in blobs:
+                if (blob.tags or {}).get("picture_set_uuid") == tag:
+                    blob_names.append(blob.name)
+        return blob_names
+    except FolderListError as error:
+        raise error
+    except Exception as error:
+        print(error)
+        raise FolderListError(f"Error finding the blobs of {picture_set_id}: {str(error)}")
+
+
+async def delete_folder(
+    container_client,
+    picture_set_id,
+    use_tag_index: bool = False,
+    max_concurrency: int = MAX_CONCURRENCY,
+):
+    """
+    This function deletes a folder in the user's container with batch
+    requests, see datastore.blob.azure_storage_api.delete_folder. The folder
+    is removed from the folder registry once all its blobs are deleted.
+
+    Returns: a dict with the list of "deleted" blob names and the "failed"
+    blob names with their error: {"deleted": [...], "failed": {name: error}}
+    """
+    try:
+        blob_names = await find_folder_blobs(
+            container_client, picture_set_id, use_tag_index
+        )
+        batches = _blob_batches(container_client, blob_names)
+        results = await run_concurrently(
+            _delete_blob_batch_report, batches, max_concurrency
+        )
+        failed = {}
+        for (_, batch), result in zip(batches, results):
+            if isinstance(result, Exception):
+                failed.update({blob_name: str(result) for blob_name in batch})
+            else:
+                failed.update(result)
+
+        if not failed:
+
+            def unregister_folder(registry):
+                for folder_name, folder in list(registry.items()):
+                    if folder.get("folder_uuid") == str(picture_set_id):
+                        del registry[folder_name]
+
+            await update_folder_registry(container_client, unregister_folder)
+        return {
+            "deleted": [blob_name for blob_name in blob_names if blob_name not in failed],
+            "failed": failed,
+        }
+    except FolderListError as error:
+        raise DeleteFolderError(str(error))
+    except Exception as error:
+        print(error)
+        raise DeleteFolderError(f"Error deleting the folder {picture_set_id}: {str(error)}")
+
+
+async def _copy_blob(
+    container_client_source,
+    container_client_destination,
+    blob_name_source,
+    blob_name_dest,
+    tags: dict,
+    account_key: str = None,
+    timeout: float = COPY_TIMEOUT,
+):
+    """
+    Copies a blob server side, with its tags set by the copy request, and
+    waits for the copy to complete without blocking the event loop
+    """
+    source_client = container_client_source.get_blob_client(blob_name_source)
+    destination_client = container_client_destination.get_blob_client(blob_name_dest)
+    copy = await destination_client.start_copy_from_url(
+        build_copy_source_url(source_client, account_key), tags=tags
+    )
+    status = copy["copy_status"]
+    waited = 0.0
+    while status == "pending":
+        if waited >= timeout:
+            await destination_client.abort_copy(copy["copy_id"])
+            raise MoveBlobError(
+                f"The copy of {blob_name_source} did not complete in {timeout}s"
+            )
+        await asyncio.sleep(COPY_POLL_INTERVAL)
+        waited += COPY_POLL_INTERVAL
+        status = (await destination_client.get_blob_properties()).copy.status
+    if status != "success":
+        raise MoveBlobError(f"The copy of {blob_name_source} ended with status {status}")
+    return blob_name_dest
+
+
+async def move_blobs(
+    blob_names: list,
+    folder_uuid,
+    container_client_source,
+    container_client_destination,
+    account_key: str = None,
+    max_concurrency: int = MAX_CONCURRENCY,
+    timeout: float = COPY_TIMEOUT,
+):
+    """
+    This function moves several blobs from a container to another with server
+    side copies, see datastore.blob.azure_storage_api.move_blobs. If a copy
+    fails, the copies already done are deleted and the sources are kept.
+
+    Parameters:
+    - blob_names: list of (source blob name, destination blob name)
+    - folder_uuid: the uuid of the destination folder, set as picture_set_uuid tag
+    - container_client_source: the Azure container client where the blobs are
+    - container_client_destination : the Azure container client where the blobs will be moved
+    - account_key: the key of the storage account, see build_copy_source_url (optional)
+    - max_concurrency: the maximum number of copies running at the same time
+    - timeout: the seconds to wait for a copy to complete
+
+    Returns: the list of destination blob names in the order of blob_names
+    """
+    try:
+        metadata = {"picture_set_uuid": f"{str(folder_uuid)}"}
+        copies = [
+            (
+                container_client_source,
+                container_client_destination,
+                blob_name_source,
+                blob_name_dest,
+                metadata,
+                account_key,
+                timeout,
+            )
+            for blob_name_source, blob_name_dest in blob_names
+        ]
+        results = await run_concurrently(_copy_blob, copies, max_concurrency)
+        errors = [result for result in results if isinstance(result, Exception)]
+        if errors:
+            copied = [
+                result for result in results if not isinstance(result, Exception)
+            ]
+            await run_concurrently(
+                _delete_blob_batch,
+                _blob_batches(container_client_destination, copied),
+                max_concurrency,
+            )
+            raise MoveBlobError(
+                f"{len(errors)} of {len(copies)} blobs could not be copied: {errors[0]}"
+            ) from errors[0]
+        deletions = await run_concurrently(
+            _delete_blob_batch,
+            _blob_batches(
+                container_client_source,
+                [blob_name_source for blob_name_source, _ in blob_names],
+            ),
+            max_concurrency,
+        )
+        errors = [result for result in deletions if isinstance(result, Exception)]
+        if errors:
+            raise MoveBlobError(
+                f"The blobs were copied but {len(errors)} batches of sources could not be deleted: {errors[0]}"
+            ) from errors[0]
+        return results
+    except MoveBlobError as error:
+        raise error
+    except Exception as error:
+        raise MoveBlobError(f"Error moving blobs: {str(error)}") from error
@@ -0,0 +1,70 @@
+"""
+This module contains the in-memory cache used to avoid querying the database
+for data that rarely changes.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+# Returned by LRUCache.get when the key is not cached
+MISSING = object()
+
+
+class LRUCache:
+    """
+    A bounded least recently used cache whose entries expire after ttl seconds.
+    Hits and misses are counted so they can be exported as metrics.
+    """
+
+    def __init__(self, maxsize: int = 256, ttl: float = 300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=MISSING):
+        """Return the cached value of key, or default if it is missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry[0] > self.ttl:
+                self._entries.pop(key, None)
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        """Cache value under key, evicting the least recently used entry if full."""
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key=MISSING):
+        """Drop the entry of key, or every entry if no key is given."""
+        with self._lock:
+            if key is MISSING:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def invalidate_matching(self, predicate):
+        """Drop the entries whose key matches predicate."""
+        with self._lock:
+            for key in [key for key in self._entries if predicate(key)]:
+                del self._entries[key]
+
+    def stats(self) -> dict:
+        """Return the hit and miss counters and the size of the cache."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+            }
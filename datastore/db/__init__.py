@@ -2,11 +2,37 @@
 This module contains the function interacting with the database directly.
 """
 
+import threading
+from contextlib import contextmanager
+
 import psycopg
 from dotenv import load_dotenv
+from psycopg_pool import ConnectionPool
 
 load_dotenv()
 
+# One pool per (connection string, schema), e.g. one for nachet and one for fertiscan
+_pools: dict[tuple[str, str], ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+POOL_DEFAULTS = {
+    "min_size": 1,
+    "max_size": 10,
+    "max_lifetime": 3600.0,
+    "max_idle": 600.0,
+    "timeout": 30.0,
+}
+
+
+class PoolSettingsError(ValueError):
+    pass
+
+
+def _check_encoding(connection):
+    assert connection.info.encoding == "utf-8", (
+        "Encoding is not UTF8: " + connection.info.encoding
+    )
+
 
 def connect_db(conn_str: str, schema: str):
     """Connect to the postgresql database and return the connection."""
@@ -15,13 +41,143 @@ def connect_db(conn_str: str, schema: str):
         autocommit=False,
         options=f"-c search_path={schema},public",
     )
-    assert connection.info.encoding == "utf-8", (
-        "Encoding is not UTF8: " + connection.info.encoding
-    )
+    _check_encoding(connection)
+    # The search_path is set by the options, see create_search_path
+    connection._datastore_schema = schema
     # psycopg.extras.register_uuid()
     return connection
 
 
+def _pool_settings(pool, schema: str, **settings) -> dict:
+    """
+    Return the settings of a new pool, or check them against an existing one.
+
+    Only the settings explicitly given are compared, so a later call without
+    settings (e.g. from transaction) returns the pool as it was created.
+    """
+    given = {name: value for name, value in settings.items() if value is not None}
+    if pool is None:
+        return {**POOL_DEFAULTS, **given}
+    mismatch = {
+        name: (getattr(pool, name), value)
+        for name, value in given.items()
+        if getattr(pool, name) != value
+    }
+    if mismatch:
+        raise PoolSettingsError(
+            f"The pool of the schema {schema} already exists with other settings "
+            f"(current, requested): {mismatch}"
+        )
+    return {}
+
+
+def _reset_search_path(connection, schema: str):
+    """Restore the search_path of a pooled connection moved to another schema."""
+    if getattr(connection, "_datastore_schema", None) != schema:
+        connection.execute(f"""SET search_path TO "{schema}",public;""")
+        connection.commit()
+        connection._datastore_schema = schema
+
+
+def get_pool(
+    conn_str: str,
+    schema: str,
+    min_size: int = None,
+    max_size: int = None,
+    max_lifetime: float = None,
+    max_idle: float = None,
+    timeout: float = None,
+) -> ConnectionPool:
+    """
+    Return the connection pool of the given schema, creating it on first use.
+
+    The connections of the pool are opened with the search_path of the schema
+    already set, are checked before being handed out and are recycled after
+    max_lifetime seconds. A connection moved to another schema with
+    create_search_path gets its search_path back when returned to the pool.
+
+    The settings default to POOL_DEFAULTS and only apply when the pool is
+    created; asking for an existing pool with other settings raises a
+    PoolSettingsError.
+
+    Parameters:
+    - conn_str (str): The connection string of the database.
+    - schema (str): The schema used by the connections of the pool.
+    - min_size (int): The minimum number of connections kept open.
+    - max_size (int): The maximum number of connections of the pool.
+    - max_lifetime (float): The number of seconds after which a connection is replaced.
+    - max_idle (float): The number of seconds an unused connection is kept open.
+    - timeout (float): The number of seconds to wait for a connection.
+
+    Returns:
+    - The connection pool.
+    """
+    key = (conn_str, schema)
+    settings = {
+        "min_size": min_size,
+        "max_size": max_size,
+        "max_lifetime": max_lifetime,
+        "max_idle": max_idle,
+        "timeout": timeout,
+    }
+    with _pools_lock:
+        pool = _pools.get(key)
+        settings = _pool_settings(pool, schema, **settings)
+        if pool is None:
+
+            def configure(connection):
+                _check_encoding(connection)
+                # Lets create_search_path skip the round trip for pooled connections
+                connection._datastore_schema = schema
+                connection.commit()
+
+            def reset(connection):
+                _reset_search_path(connection, schema)
+
+            pool = _pools[key] = ConnectionPool(
+                conninfo=conn_str,
+                kwargs={
+                    "autocommit": False,
+                    "options": f"-c search_path={schema},public",
+                },
+                **settings,
+                configure=configure,
+                reset=reset,
+                check=ConnectionPool.check_connection,
+                name=f"datastore-{schema}",
+                open=True,
+            )
+    return pool
+
+
+@contextmanager
+def transaction(conn_str: str, schema: str):
+    """
+    Yield a cursor from a pooled connection of the given schema.
+
+    The transaction is committed when the block exits normally and rolled back
+    if an exception is raised. The connection is then returned to the pool.
+
+    Usage:
+        with db.transaction(conn_str, schema) as cursor:
+            user.get_user_id(cursor, email)
+    """
+    with (
+        get_pool(conn_str, schema).connection() as connection,
+        connection.cursor() as cur,
+    ):
+        yield cur
+
+
+def close_pools():
+    """Close all the connection pools."""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
+
+
 def cursor(connection):
     """Return a cursor for the given connection."""
     return connection.cursor()
@@ -35,8 +191,12 @@ def end_query(connection, cursor):
 
 
 def create_search_path(connection, cur, schema):
+    if getattr(connection, "_datastore_schema", None) == schema:
+        # Pooled connections are opened with the search_path already set
+        return
     cur.execute(f"""SET search_path TO "{schema}";""")
     connection.commit()
+    connection._datastore_schema = schema
 
 
 if __name__ == "__main__":
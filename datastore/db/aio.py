@@ -0,0 +1,134 @@
+"""
+This module contains the async version of the functions interacting with the
+database directly, on psycopg AsyncConnection and AsyncConnectionPool.
+"""
+
+from contextlib import asynccontextmanager
+
+import psycopg
+from psycopg_pool import AsyncConnectionPool
+
+from datastore.db import _check_encoding, _pool_settings, _pools_lock
+
+# One pool per (connection string, schema), e.g. one for nachet and one for fertiscan
+_pools: dict[tuple[str, str], AsyncConnectionPool] = {}
+
+
+async def connect_db(conn_str: str, schema: str):
+    """Connect to the postgresql database and return the async connection."""
+    connection = await psycopg.AsyncConnection.connect(
+        conninfo=conn_str,
+        autocommit=False,
+        options=f"-c search_path={schema},public",
+    )
+    _check_encoding(connection)
+    connection._datastore_schema = schema
+    return connection
+
+
+def cursor(connection):
+    """Return an async cursor for the given connection."""
+    return connection.cursor()
+
+
+async def end_query(connection, cursor):
+    """Commit the transaction and close the cursor and connection."""
+    await connection.commit()
+    await cursor.close()
+    await connection.close()
+
+
+async def create_search_path(connection, cur, schema):
+    if getattr(connection, "_datastore_schema", None) == schema:
+        # Pooled connections are opened with the search_path already set
+        return
+    await cur.execute(f"""SET search_path TO "{schema}";""")
+    await connection.commit()
+    connection._datastore_schema = schema
+
+
+async def _reset_search_path(connection, schema: str):
+    if getattr(connection, "_datastore_schema", None) != schema:
+        await connection.execute(f"""SET search_path TO "{schema}",public;""")
+        await connection.commit()
+        connection._datastore_schema = schema
+
+
+async def get_pool(
+    conn_str: str,
+    schema: str,
+    min_size: int = None,
+    max_size: int = None,
+    max_lifetime: float = None,
+    max_idle: float = None,
+    timeout: float = None,
+) -> AsyncConnectionPool:
+    """
+    Return the async connection pool of the given schema, opening it on first use.
+
+    See datastore.db.get_pool for the parameters.
+    """
+    key = (conn_str, schema)
+    settings = {
+        "min_size": min_size,
+        "max_size": max_size,
+        "max_lifetime": max_lifetime,
+        "max_idle": max_idle,
+        "timeout": timeout,
+    }
+    # Nothing is awaited while the lock is held, the pool is opened after
+    with _pools_lock:
+        pool = _pools.get(key)
+        settings = _pool_settings(pool, schema, **settings)
+        if pool is None:
+
+            async def configure(connection):
+                _check_encoding(connection)
+                connection._datastore_schema = schema
+                await connection.commit()
+
+            async def reset(connection):
+                await _reset_search_path(connection, schema)
+
+            pool = _pools[key] = AsyncConnectionPool(
+                conninfo=conn_str,
+                kwargs={
+                    "autocommit": False,
+                    "options": f"-c search_path={schema},public",
+                },
+                **settings,
+                configure=configure,
+                reset=reset,
+                check=AsyncConnectionPool.check_connection,
+                name=f"datastore-{schema}",
+                open=False,
+            )
+    # Safe to call again on an open pool, and waits for a concurrent opening
+    await pool.open()
+    return pool
+
+
+@asynccontextmanager
+async def transaction(conn_str: str, schema: str):
+    """
+    Yield an async cursor from a pooled connection of the given schema.
+
+    The transaction is committed when the block exits normally and rolled back
+    if an exception is raised.
+
+    Usage:
+        async with db.transaction(conn_str, schema) as cursor:
+            await user.get_user_id(cursor, email)
+    """
+    pool = await get_pool(conn_str, schema)
+    async with pool.connection() as connection, connection.cursor() as cur:
+        yield cur
+
+
+async def close_pools():
+    """Close all the async connection pools."""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        await pool.close()
@@ -167,6 +167,78 @@ def new_picture_unknown(cursor, picture, picture_set_id: str, nb_objects=0):
         raise PictureUploadError("Error: Picture not uploaded")
 
 
+def new_pictures(
+    cursor, picture, picture_set_id: str, nb_pictures: int, seed_id: str = None, nb_objects=0
+):
+    """
+    This function uploads several NEW PICTURES to the database in a single query.
+    If a seed is given, every picture is linked to it.
+
+    Parameters:
+    - cursor (cursor): The cursor of the database.
+    - picture (str): The Picture METADATA of each picture. Must be formatted as a json
+    - picture_set_id (str): The UUID of the Picture_set the pictures are in.
+    - nb_pictures (int): The number of pictures to create.
+    - seed_id (str, optional): The UUID of the seed the pictures are linked to.
+    - nb_objects (int): The number of objects in each picture.
+
+    Returns:
+    - The list of UUID of the pictures.
+    """
+    try:
+        if seed_id is None:
+            query = """
+                INSERT INTO 
+                    picture(
+                        picture,
+                        picture_set_id,
+                        nb_obj
+                        )
+                SELECT
+                    %s, %s, %s
+                FROM
+                    generate_series(1, %s)
+                RETURNING id
+                """
+            cursor.execute(query, (picture, picture_set_id, nb_objects, nb_pictures))
+        else:
+            query = """
+                WITH new_picture AS (
+                    INSERT INTO 
+                        picture(
+                            picture,
+                            picture_set_id,
+                            nb_obj
+                            )
+                    SELECT
+                        %s, %s, %s
+                    FROM
+                        generate_series(1, %s)
+                    RETURNING id
+                ), new_picture_seed AS (
+                    INSERT INTO 
+                        picture_seed(
+                            seed_id,
+                            picture_id
+                            )
+                    SELECT
+                        %s, id
+                    FROM
+                        new_picture
+                )
+                SELECT id FROM new_picture
+                """
+            cursor.execute(
+                query, (picture, picture_set_id, nb_objects, nb_pictures, seed_id)
+            )
+        picture_ids = [row[0] for row in cursor.fetchall()]
+        if len(picture_ids) != nb_pictures:
+            raise PictureUploadError("Error: Pictures not uploaded")
+        return picture_ids
+    except Exception:
+        raise PictureUploadError("Error: Pictures not uploaded")
+
+
 def get_picture_set(cursor, picture_set_id: str):
     """
     This function retrieves a PictureSet from the database.
@@ -249,6 +321,130 @@ def get_user_picture_sets(cursor, user_id: str):
         )
 
 
+def get_user_picture_sets_overview(cursor, user_id: str):
+    """
+    This function retrieves all the PictureSets of a specific user with their
+    number of pictures in a single query.
+
+    Args:
+    - cursor (cursor): The cursor of the database.
+    - user_id (str): uuid of the user
+
+    Returns:
+    - The list of (picture_set_id, name, nb_pictures)
+    """
+    try:
+        query = """
+            SELECT
+                picture_set.id,
+                picture_set.name,
+                COUNT(picture.id)
+            FROM
+                picture_set
+            LEFT JOIN
+                picture
+            ON
+                picture.picture_set_id = picture_set.id
+            WHERE
+                picture_set.owner_id = %s
+            GROUP BY
+                picture_set.id
+            ORDER BY
+                picture_set.id
+            """
+        cursor.execute(query, (user_id,))
+        return cursor.fetchall()
+    except Exception:
+        raise GetPictureSetError(
+            f"Error: Error retrieving picture_sets for user:{user_id}"
+        )
+
+
+def get_user_picture_sets_info(
+    cursor, user_id: str, limit: int = None, after_picture_set_id: str = None
+):
+    """
+    This function retrieves the PictureSets of a specific user with, for each
+    of their pictures, if the picture is validated and if an inference exists.
+    Everything is retrieved in a single query.
+
+    The picture sets are ordered by id. To get them page by page, give a limit
+    and the id of the last picture set of the previous page.
+
+    Args:
+    - cursor (cursor): The cursor of the database.
+    - user_id (str): uuid of the user
+    - limit (int, optional): The maximum number of picture sets to return.
+    - after_picture_set_id (str, optional): Only return the picture sets after this one.
+
+    Returns:
+    - The list of (picture_set_id, name, nb_pictures, pictures) where pictures
+    is a list of {picture_id, is_validated, inference_exist}
+    """
+    try:
+        query = """
+            SELECT
+                picture_set.id,
+                picture_set.name,
+                COUNT(picture.id),
+                COALESCE(
+                    json_agg(
+                        json_build_object(
+                            'picture_id', picture.id,
+                            'is_validated', EXISTS(
+                                SELECT 
+                                    1 
+                                FROM 
+                                    picture_seed
+                                WHERE 
+                                    picture_seed.picture_id = picture.id
+                            ),
+                            'inference_exist', EXISTS(
+                                SELECT 
+                                    1 
+                                FROM 
+                                    inference
+                                WHERE 
+                                    inference.picture_id = picture.id
+                            )
+                        )
+                    ) FILTER (WHERE picture.id IS NOT NULL),
+                    '[]'::json
+                )
+            FROM
+                picture_set
+            LEFT JOIN
+                picture
+            ON
+                picture.picture_set_id = picture_set.id
+            WHERE
+                picture_set.owner_id = %(user_id)s
+                AND (
+                    %(after_picture_set_id)s::uuid IS NULL 
+                    OR picture_set.id > %(after_picture_set_id)s::uuid
+                )
+            GROUP BY
+                picture_set.id
+            ORDER BY
+                picture_set.id
+            LIMIT
+                %(limit)s
+            """
+        cursor.execute(
+            query,
+            {
+                "user_id": user_id,
+                "after_picture_set_id": after_picture_set_id,
+                "limit": limit,
+            },
+        )
+        return cursor.fetchall()
+    except Exception:
+        raise GetPictureSetError(
+            f"Error: Error retrieving picture_sets for user:{user_id}"
+        )
+
+
 def get_picture(cursor, picture_id: str):
     """
     This function retrieves a Picture from the database.
@@ -509,6 +705,39 @@ def update_picture_metadata(cursor, picture_id: str, metadata: dict, nb_objects:
         raise PictureUpdateError(f"Error: Picture metadata not updated:{picture_id}")
 
 
+def update_pictures_metadata(cursor, pictures: list):
+    """
+    This function updates the metadata of several pictures in a single query.
+
+    Parameters:
+    - cursor (cursor): The cursor of the database.
+    - pictures (list): The list of (picture_id, metadata, nb_objects) to update.
+    The metadata must be formatted as a json.
+
+    Returns:
+    - None
+    """
+    try:
+        if not pictures:
+            return
+        picture_ids, metadata, nb_objects = (list(column) for column in zip(*pictures))
+        query = """
+            UPDATE
+                picture
+            SET
+                picture = updated.picture,
+                nb_obj = updated.nb_obj
+            FROM
+                unnest(%s::uuid[], %s::json[], %s::integer[])
+                    AS updated(id, picture, nb_obj)
+            WHERE
+                picture.id = updated.id
+            """
+        cursor.execute(query, ([str(id) for id in picture_ids], metadata, nb_objects))
+    except Exception:
+        raise PictureUpdateError("Error: Pictures metadata not updated")
+
+
 def is_a_picture_set_id(cursor, picture_set_id):
     """
     This function checks if a picture_set_id exists in the database.
@@ -607,6 +836,40 @@ def get_picture_set_owner_id(cursor, picture_set_id):
         raise PictureSetNotFoundError(f"Error: PictureSet not found:{picture_set_id}")
 
 
+def get_pictures_owner(cursor, picture_ids: list):
+    """
+    This function retrieves several pictures with their picture_set and the
+    owner of the picture_set in a single query.
+
+    Parameters:
+    - cursor (cursor): The cursor of the database.
+    - picture_ids (list): The UUIDs of the pictures to retrieve.
+
+    Returns:
+    - A list of (picture_id, picture, picture_set_id, picture_set_name, owner_id).
+      The pictures not found are not in the list.
+    """
+    try:
+        query = """
+            SELECT
+                p.id,
+                p.picture,
+                ps.id,
+                COALESCE(ps.name, ps.id::text),
+                ps.owner_id
+            FROM
+                picture p
+            JOIN
+                picture_set ps ON p.picture_set_id = ps.id
+            WHERE
+                p.id = ANY(%s::uuid[])
+            """
+        cursor.execute(query, ([str(picture_id) for picture_id in picture_ids],))
+        return cursor.fetchall()
+    except Exception:
+        raise GetPictureError(f"Error: Error while getting pictures:{picture_ids}")
+
+
 def update_picture_picture_set_id(cursor, picture_id, new_picture_set_id):
     """
     This function updates the picture_set_id of a picture in the database.
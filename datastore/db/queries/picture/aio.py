@@ -0,0 +1,112 @@
+"""
+This module contains the queries related to the Picture and PictureSet tables
+used on the hot paths of the async API, written for psycopg AsyncCursor. See
+datastore.db.queries.picture for the other queries and the exceptions.
+"""
+
+from datastore.db.queries.picture import GetPictureError, PictureSetNotFoundError
+
+
+async def get_picture_set_name(cursor, picture_set_id: str):
+    """
+    This function retrieves the name of a PictureSet from the database.
+
+    Parameters:
+    - cursor (AsyncCursor): The cursor of the database.
+    - picture_set_id (str): The UUID of the PictureSet to retrieve.
+
+    Returns:
+    - The name of the PictureSet.
+    """
+    try:
+        query = """
+            SELECT
+                name
+            FROM
+                picture_set
+            WHERE
+                id = %s
+                """
+        await cursor.execute(query, (picture_set_id,))
+        name = (await cursor.fetchone())[0]
+        return name if name is not None else picture_set_id
+    except Exception:
+        raise PictureSetNotFoundError(f"Error: PictureSet not found:{picture_set_id}")
+
+
+async def get_picture_set_pictures(cursor, picture_set_id: str):
+    """
+    This function retrieves all the pictures of a specific picture_set from the database.
+
+    Parameters:
+    - cursor (AsyncCursor): The cursor of the database.
+    - picture_set_id (str): The UUID of the PictureSet to retrieve the pictures from.
+
+    Returns:
+    - The pictures in json format.
+    """
+    try:
+        query = """
+            SELECT
+                id,
+                picture
+            FROM
+                picture
+            WHERE
+                picture_set_id = %s
+            """
+        await cursor.execute(query, (picture_set_id,))
+        return await cursor.fetchall()
+    except Exception:
+        raise GetPictureError(
+            f"Error: Error while getting pictures for picture_set:{picture_set_id}"
+        )
+
+
+async def is_a_picture_set_id(cursor, picture_set_id):
+    """
+    This function checks if a picture_set_id exists in the database.
+
+    Parameters:
+    - cursor (AsyncCursor): The cursor of the database.
+    - picture_set_id (str): The UUID of the picture_set to check.
+    """
+    try:
+        query = """
+            SELECT EXISTS(
+                SELECT 
+                    1 
+                FROM 
+                    picture_set
+                WHERE 
+                    id = %s
+            )
+                """
+        await cursor.execute(query, (picture_set_id,))
+        res = (await cursor.fetchone())[0]
+        return res
+    except Exception:
+        raise Exception("unhandled error")
+
+
+async def get_picture_set_owner_id(cursor, picture_set_id):
+    """
+    This function retrieves the owner_id of a picture_set.
+
+    parameters:
+    - cursor (AsyncCursor) : The cursor of the database.
+    - picture_set_id (str) : The UUID of the picture_set to retrieve the owner_id from.
+    """
+    try:
+        query = """
+            SELECT
+                owner_id
+            FROM
+                picture_set
+            WHERE
+                id = %s
+            """
+        await cursor.execute(query, (picture_set_id,))
+        return str((await cursor.fetchone())[0])
+    except Exception:
+        raise PictureSetNotFoundError(f"Error: PictureSet not found:{picture_set_id}")
@@ -0,0 +1,65 @@
+"""
+This module contains the queries related to the user table used on the hot
+paths of the async API, written for psycopg AsyncCursor. See
+datastore.db.queries.user for the other queries and the exceptions.
+"""
+
+from datastore.db.queries.user import UserNotFoundError
+
+
+async def is_a_user_id(cursor, user_id: str) -> bool:
+    """
+    This function checks if a user is registered in the database.
+
+    Parameters:
+    - cursor (AsyncCursor): The cursor of the database.
+    - user_id (str): The UUID of the user.
+
+    Returns:
+    - True if the user is registered, False otherwise.
+    """
+    try:
+        query = """
+            SELECT EXISTS(
+                SELECT 
+                    1 
+                FROM 
+                    users
+                WHERE 
+                    id = %s
+            )
+                """
+        await cursor.execute(query, (user_id,))
+        res = (await cursor.fetchone())[0]
+        return res
+    except Exception:
+        raise Exception(f"Error: could not check if {user_id} given is a user id")
+
+
+async def get_user_id(cursor, email: str) -> str:
+    """
+    This function retrieves the UUID of a user.
+
+    Parameters:
+    - cursor (AsyncCursor): The cursor of the database.
+    - email (str): Email of the user
+
+    Returns:
+    - The UUID of the user.
+    """
+    try:
+        query = """
+            SELECT 
+                id 
+            FROM 
+                users
+            WHERE 
+                email = %s
+                """
+        await cursor.execute(query, (email,))
+        res = (await cursor.fetchone())[0]
+        return res
+    except TypeError:
+        raise UserNotFoundError(f"Error: user {email} could not be retrieved")
+    except Exception:
+        raise Exception("Unhandled Error")
@@ -5,6 +5,9 @@ from psycopg import sql
 DB_URL = os.environ.get("FERTISCAN_DB_URL")
 SCHEMA = os.environ.get("FERTISCAN_SCHEMA_TESTING")
 
+NACHET_DB_URL = os.environ.get("NACHET_DB_URL")
+NACHET_SCHEMA = os.environ.get("NACHET_SCHEMA_TESTING")
+
 def create_db(DB_URL, SCHEMA : str):
 
     conn = db.connect_db(DB_URL, SCHEMA)
@@ -26,15 +29,36 @@ def create_db(DB_URL, SCHEMA : str):
         path = "fertiscan/db/bytebase/new_inspection_function.sql"
         execute_sql_file(cur, path)
 
+        path = "fertiscan/db/bytebase/new_inspections_function.sql"
+        execute_sql_file(cur, path)
+
         path = "fertiscan/db/bytebase/get_inspection"
         loop_for_sql_files(cur, path)
 
+        path = "fertiscan/db/bytebase/inspection_snapshot.sql"
+        execute_sql_file(cur, path)
+
+        path = "fertiscan/db/bytebase/inspection_listing_index.sql"
+        execute_sql_file(cur, path)
+
+        path = "fertiscan/db/bytebase/fk_indexes_0.0.19.sql"
+        execute_sql_file(cur, path)
+
+        path = "fertiscan/db/bytebase/reference_data_version.sql"
+        execute_sql_file(cur, path)
+
+        path = "fertiscan/db/bytebase/search_index.sql"
+        execute_sql_file(cur, path)
+
         path = "fertiscan/db/bytebase/update_inspection_function.sql"
         execute_sql_file(cur, path)
 
         path = "fertiscan/db/bytebase/update_inspection"
         loop_for_sql_files(cur, path)
 
+        path = "fertiscan/db/bytebase/update_inspection_sections_function.sql"
+        execute_sql_file(cur, path)
+
         path = "fertiscan/db/bytebase/delete_inspection_function.sql"
         execute_sql_file(cur, path)
 
@@ -46,6 +70,29 @@ def create_db(DB_URL, SCHEMA : str):
     
     db.end_query(connection=conn, cursor=cur)
 
+def create_nachet_db(DB_URL, SCHEMA : str):
+
+    conn = db.connect_db(DB_URL, SCHEMA)
+    cur = db.cursor(connection=conn)
+    db.create_search_path(connection=conn, cur=cur, schema=SCHEMA)
+
+    try:
+        # Version stamps of the caches of nachet.db.queries, without them
+        # nothing is cached
+        path = "nachet/db/bytebase/cache_version.sql"
+        execute_sql_file(cur, path)
+
+        path = "nachet/db/bytebase/seed_name_lower_index.sql"
+        execute_sql_file(cur, path)
+
+        path = "nachet/db/bytebase/fk_indexes_nachet_0.0.11.sql"
+        execute_sql_file(cur, path)
+    except Exception as e:
+        conn.rollback()
+        print(e)
+
+    db.end_query(connection=conn, cursor=cur)
+
 def loop_for_sql_files(cursor, folder_path):
     # Loop through all files in the specified folder
     for root, dirs, files in os.walk(folder_path):
@@ -68,3 +115,6 @@ if __name__ == "__main__":
     print("Creating the database for schema: ", SCHEMA)
     print("Database URL: ", DB_URL)
     create_db(DB_URL=DB_URL, SCHEMA=SCHEMA)
+    if NACHET_SCHEMA:
+        print("Creating the database for schema: ", NACHET_SCHEMA)
+        create_nachet_db(DB_URL=NACHET_DB_URL, SCHEMA=NACHET_SCHEMA)
@@ -1,4 +1,8 @@
+import base64
+import binascii
+import json
 import os
+from datetime import datetime
 from uuid import UUID
 
 from azure.storage.blob import ContainerClient
@@ -119,6 +123,75 @@ async def update_inspection(
     return data_inspection.Inspection.model_validate(updated_result)
 
 
+async def update_inspection_sections(
+    cursor: Cursor,
+    inspection_id: str | UUID,
+    user_id: str | UUID,
+    updated_data: dict | data_inspection.Inspection,
+    expected_updated_at: datetime | str,
+):
+    """
+    Update an existing inspection record in the database, writing only the
+    sections that differ from the stored inspection. Unlike update_inspection,
+    the child rows and OLAP dimensions of the unchanged sections are untouched.
+
+    Parameters:
+    - cursor (Cursor): Database cursor for executing queries.
+    - inspection_id (str | UUID): UUID of the inspection to update.
+    - user_id (str | UUID): UUID of the user performing the update.
+    - updated_data (dict | data_inspection.Inspection): Dictionary or Inspection model containing updated inspection data.
+    - expected_updated_at (datetime | str): The updated_at of the inspection the update was made from.
+
+    Returns:
+    - A tuple (data_inspection.Inspection, datetime) of the updated inspection and its new updated_at.
+
+    Raises:
+    - InspectionConflictError: If the inspection was updated since expected_updated_at.
+    - InspectionUpdateError: If an error occurs during the update.
+    """
+    if isinstance(inspection_id, str):
+        inspection_id = UUID(inspection_id)
+    if isinstance(user_id, str):
+        user_id = UUID(user_id)
+    if isinstance(expected_updated_at, str):
+        expected_updated_at = datetime.fromisoformat(expected_updated_at)
+    if not user.is_a_user_id(cursor, str(user_id)):
+        raise user.UserNotFoundError(f"User not found based on the given id: {user_id}")
+
+    if not isinstance(updated_data, data_inspection.Inspection):
+        updated_data = data_inspection.Inspection.model_validate(updated_data)
+
+    try:
+        current_json = inspection.get_inspection_snapshot(cursor, str(inspection_id))
+    except inspection.InspectionNotFoundError:
+        raise inspection.InspectionNotFoundError(
+            f"Inspection not found based on the given id: {inspection_id}"
+        )
+    # Fail before computing the diff, the database checks it again under lock
+    current_updated_at = datetime.fromisoformat(current_json["inspection"]["updated_at"])
+    if current_updated_at != expected_updated_at:
+        raise inspection.InspectionConflictError(
+            f"Inspection {inspection_id} was updated at {current_updated_at}, expected {expected_updated_at}"
+        )
+    current = data_inspection.Inspection.model_validate_json(
+        data_inspection.build_inspection_export_from_json(current_json)
+    )
+
+    sections = data_inspection.diff_inspection_sections(current, updated_data)
+    if not sections:
+        return current, current_updated_at
+    updated_at = inspection.update_inspection_sections(
+        cursor, inspection_id, user_id, expected_updated_at, sections
+    )
+    updated_json = inspection.get_inspection_snapshot(cursor, str(inspection_id))
+    return (
+        data_inspection.Inspection.model_validate_json(
+            data_inspection.build_inspection_export_from_json(updated_json)
+        ),
+        updated_at,
+    )
+
+
 async def get_full_inspection_json(
     cursor: Cursor,
     inspection_id,
@@ -138,73 +211,63 @@ async def get_full_inspection_json(
     Returns:
     - The inspection json.
     """
-    if not inspection.is_a_inspection_id(cursor=cursor, inspection_id=inspection_id):
+    try:
+        # Served from the inspection_snapshot read model, built if stale
+        inspection_json = inspection.get_inspection_snapshot(cursor, inspection_id)
+    except inspection.InspectionNotFoundError:
         raise inspection.InspectionNotFoundError(
             f"Inspection not found based on the given id: {inspection_id}"
         )
 
-    # Check Ids
-    if (
+    # Check Ids against the inspection, given ids that do not exist are ignored
+    db_inspection = inspection_json["inspection"]
+    expected_ids = [
         (
-            picture_set_id is None
-            or picture_set_id == ""
-            or not picture.is_a_picture_set_id(
-                cursor=cursor, picture_set_id=picture_set_id
-            )
-        )
-        or (
-            user_id is None
-            or user_id == ""
-            or not user.is_a_user_id(cursor=cursor, user_id=user_id)
-        )
-        or (label_info_id is None or label_info_id == "")
-        or (company_info_id is None or company_info_id == "")
-        or (manufacturer_info_id is None or manufacturer_info_id == "")
-    ):
-        ids = inspection.get_inspection_fk(cursor, inspection_id)
-        picture_set_id = ids[2]
-        label_info_id = ids[0]
-        company_info_id = ids[3]
-        manufacturer_info_id = ids[4]
-        user_id = ids[1]
-    else:
-        if not picture.is_a_picture_set_id(
-            cursor=cursor, picture_set_id=picture_set_id
+            picture_set_id,
+            "picture_set_id",
+            "Picture set id does not match the picture_set_id in the inspection for the given inspection_id",
+        ),
+        (
+            label_info_id,
+            "label_info_id",
+            "Label info id does not match the label_info_id in the inspection for the given inspection_id",
+        ),
+        (
+            company_info_id,
+            "fertilizer_id",
+            "Company info id does not match the company_info_id in the inspection for the given inspection_id",
+        ),
+        (
+            manufacturer_info_id,
+            "sample_id",
+            "Manufacturer info id does not match the manufacturer_info_id in the inspection for the given inspection_id",
+        ),
+        (
+            user_id,
+            "inspector_id",
+            "User id does not match the user_id in the inspection for the given inspection_id",
+        ),
+    ]
+    if all(given is not None and given != "" for given, _, _ in expected_ids):
+        mismatches = [
+            message
+            for given, key, message in expected_ids
+            if str(given) != str(db_inspection[key])
+        ]
+        if (
+            mismatches
+            and picture.is_a_picture_set_id(cursor=cursor, picture_set_id=picture_set_id)
+            and user.is_a_user_id(cursor=cursor, user_id=user_id)
         ):
-            raise picture.PictureSetNotFoundError(
-                f"Picture set not found based on the given id: {picture_set_id}"
-            )
-        if not user.is_a_user_id(cursor=cursor, user_id=user_id):
-            raise user.UserNotFoundError(
-                f"User not found based on the given id: {user_id}"
-            )
-        ids = inspection.get_inspection_fk(cursor, inspection_id)
-        if not picture_set_id == ids[2]:
-            raise Warning(
-                "Picture set id does not match the picture_set_id in the inspection for the given inspection_id"
-            )
-        if not label_info_id == ids[0]:
-            raise Warning(
-                "Label info id does not match the label_info_id in the inspection for the given inspection_id"
-            )
-        if not company_info_id == ids[3]:
-            raise Warning(
-                "Company info id does not match the company_info_id in the inspection for the given inspection_id"
-            )
-        if not manufacturer_info_id == ids[4]:
-            raise Warning(
-                "Manufacturer info id does not match the manufacturer_info_id in the inspection for the given inspection_id"
-            )
-        if not user_id == ids[1]:
-            raise Warning(
-                "User id does not match the user_id in the inspection for the given inspection_id"
-            )
+            raise Warning(mismatches[0])
 
     # Retrieve pictures
     # pictures_ids = picture.get_picture_in_picture_set(cursor, picture_set_id)
 
     # Retrieve label_info
-    inspection_metadata = data_inspection.build_inspection_export(cursor, inspection_id)
+    inspection_metadata = data_inspection.build_inspection_export(
+        cursor, inspection_id, inspection_json
+    )
 
     return inspection_metadata
 
@@ -238,6 +301,93 @@ async def get_user_analysis_by_verified(cursor: Cursor, user_id, verified: bool)
     return inspection.get_all_user_inspection_filter_verified(cursor, user_id, verified)
 
 
+def _encode_page_cursor(sort_value: datetime | None, inspection_id) -> str:
+    """Encode the keyset of the last inspection of a page as an opaque cursor."""
+    key = [sort_value.isoformat() if sort_value is not None else None, str(inspection_id)]
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+
+def _decode_page_cursor(page_cursor: str) -> tuple:
+    """Decode a cursor returned by get_user_analysis_page into its keyset."""
+    try:
+        sort_value, inspection_id = json.loads(base64.urlsafe_b64decode(page_cursor))
+        if sort_value is not None:
+            sort_value = datetime.fromisoformat(sort_value)
+        return sort_value, str(UUID(inspection_id))
+    except (binascii.Error, TypeError, ValueError) as e:
+        raise ValueError(f"Invalid page cursor: {page_cursor}") from e
+
+
+async def get_user_analysis_page(
+    cursor: Cursor,
+    user_id,
+    page_size: int = 50,
+    page_cursor: str | None = None,
+    sort: str = "updated_at",
+    descending: bool = True,
+    verified: bool | None = None,
+    updated_from: datetime | None = None,
+    updated_to: datetime | None = None,
+    product_name_prefix: str | None = None,
+    with_total_estimate: bool = False,
+):
+    """
+    This function fetch a page of the inspections of a user
+
+    Parameters:
+    - cursor: The cursor object to interact with the database.
+    - user_id: The user id of the user.
+    - page_size: The number of inspections per page.
+    - page_cursor: The next_cursor returned with the previous page, None for the first page.
+    - sort: The column to sort on, "updated_at" or "upload_date".
+    - descending: Sort the newest inspections first.
+    - verified: Only return the inspections with this verified status.
+    - updated_from, updated_to: Only return the inspections updated in [updated_from, updated_to).
+    - product_name_prefix: Only return the labels whose product name starts with this prefix.
+    - with_total_estimate: Also return an estimate of the number of matching inspections.
+
+    Returns:
+    - A dict with the "inspections" of the page (same columns as
+      get_user_analysis_by_verified), the "next_cursor" (None on the last page)
+      and the "total_estimate" (None unless requested).
+    """
+    if not user.is_a_user_id(cursor=cursor, user_id=user_id):
+        raise user.UserNotFoundError(f"User not found based on the given id: {user_id}")
+    after = _decode_page_cursor(page_cursor) if page_cursor else None
+    filters = {
+        "verified": verified,
+        "updated_from": updated_from,
+        "updated_to": updated_to,
+        "product_name_prefix": product_name_prefix,
+    }
+    # Fetch one more row to know if there is a next page
+    rows = inspection.get_user_inspection_page(
+        cursor,
+        user_id,
+        limit=page_size + 1,
+        after=after,
+        sort=sort,
+        descending=descending,
+        **filters,
+    )
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        sort_value = last[2] if sort == "updated_at" else last[1]
+        next_cursor = _encode_page_cursor(sort_value, last[0])
+    total_estimate = None
+    if with_total_estimate:
+        total_estimate = inspection.estimate_user_inspection_count(
+            cursor, user_id, **filters
+        )
+    return {
+        "inspections": rows,
+        "next_cursor": next_cursor,
+        "total_estimate": total_estimate,
+    }
+
+
 async def delete_inspection(
     cursor: Cursor,
     inspection_id: str | UUID,
@@ -251,10 +401,15 @@ async def delete_inspection(
     - cursor (Cursor): Database cursor for executing queries.
     - inspection_id (str | UUID): UUID of the inspection to delete.
     - user_id (str | UUID): UUID of the user performing the deletion.
+    - container_client (ContainerClient): The container client of the user.
 
     Returns:
     - data_inspection.Inspection: The deleted inspection data from the database.
 
+    Raises:
+    - DeleteFolderError: If some blobs of the picture set could not be deleted,
+      in which case the transaction should be rolled back.
+
     """
     if isinstance(inspection_id, str):
         inspection_id = UUID(inspection_id)
@@ -0,0 +1,144 @@
+"""
+This script measures the throughput of new_inspection and delete_inspection
+with the OLAP triggers and new_inspection function of a git reference
+(the baseline) and with the ones of the working tree.
+
+For each version, the SQL files are installed, the test analysis is
+registered --inspections times and every created inspection is deleted.
+Everything runs in a single transaction that is rolled back, so the database
+is left untouched.
+
+Usage:
+- python fertiscan/bin/benchmark-olap-triggers.py [--baseline REF] [--inspections N]
+
+The database is given by the FERTISCAN_DB_URL and FERTISCAN_SCHEMA_TESTING
+environment variables.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import time
+import uuid
+
+import datastore.db as db
+import datastore.db.queries.picture as picture
+import datastore.db.queries.user as user
+from fertiscan.db.metadata.inspection import build_inspection_import
+from fertiscan.db.queries import inspection
+
+OLAP_DIR = "fertiscan/db/bytebase/OLAP"
+SQL_FILES = [
+    "fertiscan/db/bytebase/new_inspections_function.sql",
+    "fertiscan/db/bytebase/new_inspection_function.sql",
+]
+
+
+def read_sql_files(ref: str | None) -> list:
+    """Return the content of the benchmarked SQL files at ref, or in the working tree."""
+    if ref is None:
+        paths = SQL_FILES + sorted(
+            os.path.join(OLAP_DIR, f) for f in os.listdir(OLAP_DIR) if f.endswith(".sql")
+        )
+        contents = []
+        for path in paths:
+            with open(path) as f:
+                contents.append(f.read())
+        return contents
+    listing = subprocess.run(
+        ["git", "ls-tree", "--name-only", f"{ref}:{OLAP_DIR}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout.split()
+    paths = SQL_FILES + sorted(
+        f"{OLAP_DIR}/{f}" for f in listing if f.endswith(".sql")
+    )
+    contents = []
+    for path in paths:
+        shown = subprocess.run(
+            ["git", "show", f"{ref}:{path}"], capture_output=True, text=True
+        )
+        # new_inspections does not exist in the older references
+        if shown.returncode != 0 and path in SQL_FILES:
+            continue
+        shown.check_returncode()
+        contents.append(shown.stdout)
+    return contents
+
+
+def install(cursor, contents: list):
+    """Install the SQL files, dropping the OLAP triggers they replace first."""
+    cursor.execute(
+        """
+        SELECT format('DROP TRIGGER %I ON %I.%I', tgname, nspname, relname)
+        FROM pg_trigger
+        JOIN pg_class ON pg_class.oid = pg_trigger.tgrelid
+        JOIN pg_namespace ON pg_namespace.oid = pg_class.relnamespace
+        JOIN pg_proc ON pg_proc.oid = pg_trigger.tgfoid
+        WHERE NOT tgisinternal AND pg_proc.proname LIKE 'olap\\_%'
+            AND nspname = current_schema()
+        """
+    )
+    for (statement,) in cursor.fetchall():
+        cursor.execute(statement)
+    for content in contents:
+        cursor.execute(content)
+
+
+def run(cursor, user_id, picture_set_id, analysis, nb_inspections: int) -> dict:
+    """
+    This function registers and deletes nb_inspections inspections.
+
+    Returns:
+    - The number of inspections per second of each step.
+    """
+    formatted = build_inspection_import(analysis, user_id, picture_set_id)
+    start = time.perf_counter()
+    inspection_ids = [
+        inspection.new_inspection_with_label_info(cursor, user_id, formatted)[
+            "inspection_id"
+        ]
+        for _ in range(nb_inspections)
+    ]
+    created = time.perf_counter()
+    for inspection_id in inspection_ids:
+        inspection.delete_inspection(cursor, inspection_id, user_id)
+    deleted = time.perf_counter()
+    return {
+        "new_inspection": nb_inspections / (created - start),
+        "delete_inspection": nb_inspections / (deleted - created),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--baseline", default="HEAD~1", help="git reference of the baseline")
+    parser.add_argument("--inspections", type=int, default=200)
+    args = parser.parse_args()
+
+    schema = os.environ.get("FERTISCAN_SCHEMA_TESTING")
+    connection = db.connect_db(os.environ.get("FERTISCAN_DB_URL"), schema)
+    cursor = db.cursor(connection)
+    db.create_search_path(connection, cursor, schema)
+    with open("tests/fertiscan/analyse.json") as f:
+        analysis = json.load(f)
+    try:
+        user_id = user.register_user(cursor, f"benchmark-{uuid.uuid4().hex[:8]}@email")
+        results = {}
+        for name, ref in (("baseline", args.baseline), ("current", None)):
+            install(cursor, read_sql_files(ref))
+            picture_set_id = picture.new_picture_set(cursor, json.dumps({}), user_id)
+            results[name] = run(
+                cursor, user_id, picture_set_id, analysis, args.inspections
+            )
+
+        print(f"\n{'inspections/s':<20} {'baseline':>10} {'current':>10} {'speedup':>8}")
+        for step in ("new_inspection", "delete_inspection"):
+            before, after = results["baseline"][step], results["current"][step]
+            print(f"{step:<20} {before:>10.1f} {after:>10.1f} {after / before:>7.1f}x")
+    finally:
+        connection.rollback()
+        cursor.close()
+        connection.close()
@@ -0,0 +1,230 @@
+"""
+This script back-loads label analyses into Fertiscan.
+
+Each line of the NDJSON files is a record:
+    {"key": "unique key", "analysis": {...}, "images": "relative/image/dir"}
+where analysis is the output of the digitalization pipeline (the analysis_dict
+of fertiscan.register_analysis) and images a directory, relative to
+--images-root, holding the pictures of the label. The key defaults to
+"<file>:<line>".
+
+The records are validated with build_inspection_import in a process pool.
+For each batch, a picture set is created per record, its pictures are
+uploaded with bounded concurrency and every inspection of the batch is
+registered with a single new_inspections call, then the batch is committed
+and its keys appended to the checkpoint file. Rerunning the script with the
+same checkpoint skips the records already ingested or found invalid. If a
+batch fails, it is rolled back and the script stops; the blobs it already
+uploaded are left in the container.
+
+Usage:
+- python fertiscan/bin/bulk-ingest.py --user-id UUID --images-root DIR [--checkpoint FILE]
+    [--batch-size N] [--workers N] [--upload-concurrency N] [--tier TIER] FILE.ndjson [...]
+
+The database and storage are given by the FERTISCAN_DB_URL, FERTISCAN_SCHEMA,
+FERTISCAN_STORAGE_URL, FERTISCAN_BLOB_ACCOUNT and FERTISCAN_BLOB_KEY
+environment variables.
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import pathlib
+import sys
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+import datastore
+import datastore.db as db
+from fertiscan.db.metadata.inspection import build_inspection_import
+from fertiscan.db.queries import inspection
+
+# The picture set of a record is only created once it is validated
+PLACEHOLDER_PICTURE_SET_ID = str(uuid.UUID(int=0))
+
+
+def read_checkpoint(path: str) -> set:
+    """Return the keys of the records already ingested or found invalid."""
+    if not os.path.exists(path):
+        return set()
+    with open(path) as f:
+        return {json.loads(line)["key"] for line in f if line.strip()}
+
+
+def append_checkpoint(path: str, entries: list):
+    """Append the entries to the checkpoint file and flush them to disk."""
+    with open(path, "a") as f:
+        f.writelines(json.dumps(entry) + "\n" for entry in entries)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def read_records(paths: list, done: set):
+    """Yield the records of the NDJSON files that are not in done."""
+    for path in paths:
+        with open(path) as f:
+            for line_number, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                record.setdefault("key", f"{path}:{line_number}")
+                if record["key"] not in done:
+                    yield record
+
+
+def validate_record(args: tuple) -> dict:
+    """
+    This function validates a record with build_inspection_import.
+    It runs in the process pool.
+
+    Returns:
+    - The record with the formatted inspection, or with the validation error.
+    """
+    record, user_id = args
+    try:
+        record["formatted"] = build_inspection_import(
+            record["analysis"], user_id, PLACEHOLDER_PICTURE_SET_ID
+        )
+    except Exception as e:
+        record["error"] = str(e)
+    return record
+
+
+def load_images(images_root: str, images_dir: str | None) -> list:
+    """Return the content of the files of the image directory, sorted by name."""
+    if not images_dir:
+        return []
+    directory = pathlib.Path(images_root, images_dir)
+    return [path.read_bytes() for path in sorted(directory.iterdir()) if path.is_file()]
+
+
+async def ingest_batch(
+    cursor, container_client, user_id, records, images_root, upload_concurrency
+):
+    """
+    This function uploads the pictures of the valid records and registers
+    their inspections with a single query.
+
+    Returns:
+    - A tuple (checkpoint entries, number of uploaded images).
+    """
+    documents = []
+    nb_images = 0
+    for record in records:
+        pictures = load_images(images_root, record.get("images"))
+        picture_set_id = await datastore.create_picture_set(
+            cursor, container_client, len(pictures), user_id
+        )
+        if pictures:
+            await datastore.upload_pictures(
+                cursor,
+                user_id,
+                pictures,
+                container_client,
+                picture_set_id,
+                upload_concurrency,
+            )
+        nb_images += len(pictures)
+        document = json.loads(record["formatted"])
+        document["picture_set_id"] = str(picture_set_id)
+        documents.append(document)
+    results = inspection.new_inspections_with_label_info(cursor, user_id, documents)
+    entries = [
+        {
+            "key": record["key"],
+            "status": "ingested",
+            "inspection_id": result.get("inspection_id"),
+        }
+        for record, result in zip(records, results)
+    ]
+    return entries, nb_images
+
+
+async def main(args):
+    done = read_checkpoint(args.checkpoint)
+    if done:
+        print(f"Resuming: {len(done)} records already in {args.checkpoint}")
+    user_id = args.user_id
+    connection = db.connect_db(
+        os.environ.get("FERTISCAN_DB_URL"), os.environ.get("FERTISCAN_SCHEMA")
+    )
+    cursor = db.cursor(connection)
+    db.create_search_path(connection, cursor, os.environ.get("FERTISCAN_SCHEMA"))
+    container_client = await datastore.get_user_container_client(
+        user_id,
+        os.environ.get("FERTISCAN_STORAGE_URL"),
+        os.environ.get("FERTISCAN_BLOB_ACCOUNT"),
+        os.environ.get("FERTISCAN_BLOB_KEY"),
+        args.tier,
+    )
+
+    records = read_records(args.files, done)
+    start = time.perf_counter()
+    nb_ingested = nb_invalid = nb_images = 0
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+
+        def validate(batch):
+            return pool.map(
+                validate_record,
+                [(record, user_id) for record in batch],
+                chunksize=max(1, len(batch) // (args.workers * 4)),
+            )
+
+        # The next batch is validated while the current one is ingested
+        batch = list(itertools.islice(records, args.batch_size))
+        pending = validate(batch) if batch else None
+        while pending is not None:
+            validated = list(pending)
+            batch = list(itertools.islice(records, args.batch_size))
+            pending = validate(batch) if batch else None
+
+            valid = [record for record in validated if "error" not in record]
+            invalid = [
+                {"key": record["key"], "status": "invalid", "error": record["error"]}
+                for record in validated
+                if "error" in record
+            ]
+            try:
+                entries, batch_images = await ingest_batch(
+                    cursor,
+                    container_client,
+                    user_id,
+                    valid,
+                    args.images_root,
+                    args.upload_concurrency,
+                )
+                connection.commit()
+            except Exception as e:
+                connection.rollback()
+                print(f"Batch failed, rolled back: {e}", file=sys.stderr)
+                append_checkpoint(args.checkpoint, invalid)
+                raise
+            append_checkpoint(args.checkpoint, entries + invalid)
+
+            nb_ingested += len(entries)
+            nb_invalid += len(invalid)
+            nb_images += batch_images
+            elapsed = time.perf_counter() - start
+            print(
+                f"{nb_ingested} ingested, {nb_invalid} invalid, {nb_images} images "
+                f"in {elapsed:.1f}s ({nb_ingested / elapsed:.1f} inspections/s, "
+                f"{nb_images / elapsed:.1f} images/s)"
+            )
+    cursor.close()
+    connection.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("files", nargs="+", help="NDJSON analysis files")
+    parser.add_argument("--user-id", required=True, help="UUID of the inspector")
+    parser.add_argument("--images-root", default=".")
+    parser.add_argument("--checkpoint", default="bulk-ingest.checkpoint")
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--upload-concurrency", type=int, default=8)
+    parser.add_argument("--tier", default="user")
+    asyncio.run(main(parser.parse_args()))
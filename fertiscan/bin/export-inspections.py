@@ -0,0 +1,251 @@
+"""
+This script exports the inspections of Fertiscan for offline analysis.
+
+Each table of fertiscan.db.queries.export (inspection, label_information,
+guaranteed, metric and organization_information) is streamed with a
+server-side cursor and written batch by batch to <output>/<table>.<format>,
+so the memory used does not depend on the number of inspections. Every table
+is read in the same repeatable read transaction and the exported rows carry
+the id of their inspection.
+
+With --state, the export is incremental: only the inspections updated since
+the previous run are exported and the state file is updated with the latest
+inspection.updated_at of this run. Deleted inspections are not reported.
+As updated_at is the start time of the writing transaction, an inspection
+committed after the previous run can have an older updated_at: each run
+starts --overlap seconds before the previous one ended, and skips the
+inspections the state file records as exported in the overlap.
+
+Usage:
+- python fertiscan/bin/export-inspections.py OUTPUT_DIR [--format ndjson|parquet|arrow]
+    [--batch-size N] [--state FILE] [--overlap SECONDS] [--since TIMESTAMP]
+
+The parquet and arrow formats require pyarrow. Each batch is written as a
+row group (parquet) or a record batch (arrow).
+
+The database is given by the FERTISCAN_DB_URL and FERTISCAN_SCHEMA environment variables.
+"""
+
+import argparse
+import datetime
+import json
+import os
+import time
+
+import psycopg
+
+import datastore.db as db
+from fertiscan.db.queries import export
+
+# Seconds by which an incremental export overlaps the previous one, longer
+# than any transaction writing inspections
+EXPORT_OVERLAP = 3600.0
+
+# Arrow types of the PostgreSQL type oids used by the exported columns,
+# any other type is exported as a string
+ARROW_TYPES = {
+    16: "bool_",
+    20: "int64",
+    23: "int32",
+    701: "float64",
+    1082: "date32",
+    1114: "timestamp",
+}
+
+
+def to_json_value(value):
+    """Return value in a type serializable by json."""
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    return str(value)
+
+
+class NdjsonWriter:
+    """Writes each row as a json object on its own line."""
+
+    extension = "ndjson"
+
+    def __init__(self, path, columns):
+        self.names = [column.name for column in columns]
+        self.file = open(path, "w")
+
+    def write(self, rows):
+        for row in rows:
+            record = dict(zip(self.names, map(to_json_value, row)))
+            self.file.write(json.dumps(record) + "\n")
+
+    def close(self):
+        self.file.close()
+
+
+class ArrowWriter:
+    """Writes each batch as a parquet row group or an arrow record batch."""
+
+    def __init__(self, path, columns, file_format):
+        try:
+            import pyarrow
+            import pyarrow.ipc
+            import pyarrow.parquet
+        except ImportError as e:
+            raise SystemExit(
+                f"The {file_format} format requires pyarrow: pip install pyarrow"
+            ) from e
+        self.pyarrow = pyarrow
+        self.schema = pyarrow.schema(
+            [
+                (column.name, self._arrow_type(column.type_code))
+                for column in columns
+            ]
+        )
+        self.string_columns = [
+            i
+            for i, field in enumerate(self.schema)
+            if pyarrow.types.is_string(field.type)
+        ]
+        if file_format == "parquet":
+            self.writer = pyarrow.parquet.ParquetWriter(path, self.schema)
+        else:
+            self.writer = pyarrow.ipc.new_file(path, self.schema)
+
+    def _arrow_type(self, type_code):
+        name = ARROW_TYPES.get(type_code)
+        if name == "timestamp":
+            return self.pyarrow.timestamp("us")
+        return getattr(self.pyarrow, name)() if name else self.pyarrow.string()
+
+    def write(self, rows):
+        columns = [list(column) for column in zip(*rows)]
+        for i in self.string_columns:
+            columns[i] = [None if v is None else str(v) for v in columns[i]]
+        batch = self.pyarrow.record_batch(columns, schema=self.schema)
+        if isinstance(self.writer, self.pyarrow.ipc.RecordBatchFileWriter):
+            self.writer.write_batch(batch)
+        else:
+            self.writer.write_table(self.pyarrow.Table.from_batches([batch]))
+
+    def close(self):
+        self.writer.close()
+
+
+def open_writer(output_dir, table, columns, file_format):
+    """Return the writer of the table in the given format."""
+    path = os.path.join(output_dir, f"{table}.{file_format}")
+    if file_format == "ndjson":
+        return NdjsonWriter(path, columns)
+    return ArrowWriter(path, columns, file_format)
+
+
+def export_table(
+    connection, output_dir, table, file_format, batch_size, since, until, exclude
+):
+    """
+    This function streams a table to its file.
+
+    Returns:
+    - The number of exported rows.
+    """
+    writer = None
+    nb_rows = 0
+    try:
+        for columns, rows in export.iter_export_batches(
+            connection, table, batch_size, since, until, exclude
+        ):
+            if writer is None:
+                writer = open_writer(output_dir, table, columns, file_format)
+            writer.write(rows)
+            nb_rows += len(rows)
+    finally:
+        if writer is not None:
+            writer.close()
+    return nb_rows
+
+
+def read_state(path):
+    """
+    Return the high water mark of the previous run, None if there is none,
+    and the (inspection_id, updated_at) it exported in the overlap.
+    """
+    if not path or not os.path.exists(path):
+        return None, []
+    with open(path) as f:
+        state = json.load(f)
+    value = state.get("updated_at")
+    exported = [
+        (inspection_id, datetime.datetime.fromisoformat(updated_at))
+        for inspection_id, updated_at in state.get("exported", [])
+    ]
+    return datetime.datetime.fromisoformat(value) if value else None, exported
+
+
+def write_state(path, updated_at, exported):
+    """Save the high water mark of this run and its overlap, atomically."""
+    state = {
+        "updated_at": to_json_value(updated_at),
+        "exported": [[str(id), to_json_value(at)] for id, at in exported],
+    }
+    with open(path + ".tmp", "w") as f:
+        json.dump(state, f)
+    os.replace(path + ".tmp", path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("output", help="directory of the exported files")
+    parser.add_argument("--format", choices=["ndjson", "parquet", "arrow"], default="ndjson")
+    parser.add_argument("--batch-size", type=int, default=10000)
+    parser.add_argument("--state", help="state file of the incremental export")
+    parser.add_argument(
+        "--overlap",
+        type=float,
+        default=EXPORT_OVERLAP,
+        help="seconds by which an incremental export overlaps the previous one",
+    )
+    parser.add_argument(
+        "--since",
+        type=datetime.datetime.fromisoformat,
+        help="only export the inspections updated after this time",
+    )
+    args = parser.parse_args()
+
+    overlap = datetime.timedelta(seconds=args.overlap)
+    if args.since:
+        since, exclude = args.since, []
+    else:
+        since, exclude = read_state(args.state)
+        if since is not None:
+            since -= overlap
+    os.makedirs(args.output, exist_ok=True)
+    schema = os.environ.get("FERTISCAN_SCHEMA")
+    connection = db.connect_db(os.environ.get("FERTISCAN_DB_URL"), schema)
+    cursor = db.cursor(connection)
+    db.create_search_path(connection, cursor, schema)
+    # Every table is read from the same snapshot of the database
+    connection.isolation_level = psycopg.IsolationLevel.REPEATABLE_READ
+    connection.read_only = True
+    try:
+        until = export.get_export_high_water_mark(cursor)
+        print(f"Exporting the inspections updated in ({since}, {until}]")
+        for table in export.EXPORT_QUERIES:
+            start = time.perf_counter()
+            nb_rows = export_table(
+                connection,
+                args.output,
+                table,
+                args.format,
+                args.batch_size,
+                since,
+                until,
+                exclude,
+            )
+            elapsed = time.perf_counter() - start
+            print(f"{table}: {nb_rows} rows in {elapsed:.1f}s")
+        if until is not None:
+            exported = export.get_inspection_versions(cursor, until - overlap, until)
+    finally:
+        connection.rollback()
+        cursor.close()
+        connection.close()
+    if args.state and until is not None:
+        write_state(args.state, until, exported)
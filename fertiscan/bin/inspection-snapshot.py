@@ -0,0 +1,101 @@
+"""
+This script maintains the inspection_snapshot read model of Fertiscan.
+
+Usage:
+- python fertiscan/bin/inspection-snapshot.py rebuild [--all] [--batch-size N]
+    Rebuild the snapshots that are missing or stale, or every snapshot with --all.
+    Each batch is committed on its own so the script can be stopped and rerun.
+- python fertiscan/bin/inspection-snapshot.py check [--batch-size N]
+    Compare every snapshot with the export built by the per-section queries
+    and print the inspections that differ.
+
+The database is given by the FERTISCAN_DB_URL and FERTISCAN_SCHEMA environment variables.
+"""
+
+import argparse
+import os
+import sys
+
+import datastore.db as db
+from fertiscan.db.metadata import inspection as data_inspection
+from fertiscan.db.queries import inspection
+
+
+def rebuild_snapshots(connection, cursor, stale_only=True, batch_size=500):
+    """
+    This function rebuilds the inspection snapshots batch by batch.
+
+    Parameters:
+    - connection: The connection to the database.
+    - cursor: The cursor of the database.
+    - stale_only (bool): Only rebuild the missing or stale snapshots.
+    - batch_size (int): The number of inspections rebuilt per transaction.
+
+    Returns:
+    - The number of snapshots rebuilt.
+    """
+    total = 0
+    after_id = None
+    while True:
+        ids = inspection.get_inspection_ids_after(
+            cursor, after_id, batch_size, stale_only
+        )
+        if not ids:
+            return total
+        total += inspection.refresh_inspection_snapshots(cursor, ids)
+        connection.commit()
+        after_id = ids[-1]
+        print(f"{total} snapshots rebuilt")
+
+
+def check_snapshots(cursor, batch_size=500):
+    """
+    This function compares every snapshot with the export of its inspection
+    built by the per-section queries, see check_inspection_snapshot.
+
+    Parameters:
+    - cursor: The cursor of the database.
+    - batch_size (int): The number of inspection ids fetched at once.
+
+    Returns:
+    - A dict of the inconsistent inspection ids and their differing fields.
+    """
+    inconsistent = {}
+    after_id = None
+    while True:
+        ids = inspection.get_inspection_ids_after(cursor, after_id, batch_size)
+        if not ids:
+            return inconsistent
+        for inspection_id in ids:
+            diff = data_inspection.check_inspection_snapshot(cursor, inspection_id)
+            if diff:
+                inconsistent[str(inspection_id)] = diff
+        after_id = ids[-1]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("command", choices=["rebuild", "check"])
+    parser.add_argument("--all", action="store_true", help="rebuild every snapshot")
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    schema = os.environ.get("FERTISCAN_SCHEMA")
+    connection = db.connect_db(os.environ.get("FERTISCAN_DB_URL"), schema)
+    cursor = db.cursor(connection)
+    db.create_search_path(connection, cursor, schema)
+    try:
+        if args.command == "rebuild":
+            total = rebuild_snapshots(
+                connection, cursor, not args.all, args.batch_size
+            )
+            print(f"Done: {total} snapshots rebuilt")
+        else:
+            inconsistent = check_snapshots(cursor, args.batch_size)
+            for inspection_id, fields in inconsistent.items():
+                print(f"{inspection_id}: {', '.join(fields)}")
+            print(f"Done: {len(inconsistent)} inconsistent snapshots")
+            connection.rollback()
+            sys.exit(1 if inconsistent else 0)
+    finally:
+        db.end_query(connection, cursor)
@@ -1,48 +1,60 @@
-
+-- Statement-level triggers: the guaranteed rows inserted or deleted by a
+-- statement are aggregated per label so each label_dimension row is
+-- updated once per statement instead of once per guaranteed.
 CREATE OR REPLACE FUNCTION "fertiscan_0.0.19".olap_guaranteed_creation()
 RETURNS TRIGGER AS $$
 BEGIN
-    IF (TG_OP = 'INSERT') THEN
-        IF (NEW.id IS NOT NULL) AND (NEW.label_id IS NOT NULL) THEN
-        -- Update the label_dimension table with the new guaranteed_analysis_id
-		UPDATE "fertiscan_0.0.19"."label_dimension" 
-		SET guaranteed_ids = array_append(guaranteed_ids, NEW.id)
-		WHERE label_dimension.label_id = NEW.label_id;
-        ELSE
-            -- Raise a warning if the condition is not met
-            RAISE WARNING 'The OLAP dimension of this guaranteed is not updated because the condition is not met';
-        END IF;
+    -- Append the new guaranteed ids to the label_dimension of their label
+    UPDATE "fertiscan_0.0.19"."label_dimension" 
+    SET guaranteed_ids = label_dimension.guaranteed_ids || new_ids.ids
+    FROM (
+        SELECT label_id, array_agg(id) AS ids
+        FROM new_guaranteed
+        WHERE id IS NOT NULL AND label_id IS NOT NULL
+        GROUP BY label_id
+    ) AS new_ids
+    WHERE label_dimension.label_id = new_ids.label_id;
+
+    IF EXISTS (SELECT 1 FROM new_guaranteed WHERE NOT (id IS NOT NULL AND label_id IS NOT NULL)) THEN
+        -- Raise a warning if the condition is not met
+        RAISE WARNING 'The OLAP dimension of this guaranteed is not updated because the condition is not met';
     END IF;
-    RETURN NEW;
+    RETURN NULL;
 END;
 $$ LANGUAGE plpgsql;
 
 DROP TRIGGER IF EXISTS guaranteed_creation ON "fertiscan_0.0.19".guaranteed;
 CREATE TRIGGER guaranteed_creation
 AFTER INSERT ON "fertiscan_0.0.19".guaranteed
-FOR EACH ROW
+REFERENCING NEW TABLE AS new_guaranteed
+FOR EACH STATEMENT
 EXECUTE FUNCTION olap_guaranteed_creation();
 
 CREATE OR REPLACE FUNCTION "fertiscan_0.0.19".olap_guaranteed_deletion()
 RETURNS TRIGGER AS $$
 BEGIN
-    IF (TG_OP = 'DELETE') THEN
-        IF (OLD.id IS NOT NULL) AND (OLD.label_id IS NOT NULL) THEN
-        -- Update the label_dimension table with the new guaranteed_analysis_id
-        UPDATE "fertiscan_0.0.19"."label_dimension" 
-        SET guaranteed_ids = array_remove(guaranteed_ids, OLD.id)
-        WHERE label_dimension.label_id = OLD.label_id;
-        ELSE
-            -- Raise a warning if the condition is not met
-            RAISE WARNING 'The OLAP dimension of this guaranteed is not updated because the condition is not met';
-        END IF;
+    -- Remove the deleted guaranteed ids from the label_dimension of their label
+    UPDATE "fertiscan_0.0.19"."label_dimension" 
+    SET guaranteed_ids = "fertiscan_0.0.19".olap_array_remove_all(label_dimension.guaranteed_ids, old_ids.ids)
+    FROM (
+        SELECT label_id, array_agg(id) AS ids
+        FROM old_guaranteed
+        WHERE id IS NOT NULL AND label_id IS NOT NULL
+        GROUP BY label_id
+    ) AS old_ids
+    WHERE label_dimension.label_id = old_ids.label_id;
+
+    IF EXISTS (SELECT 1 FROM old_guaranteed WHERE id IS NULL OR label_id IS NULL) THEN
+        -- Raise a warning if the condition is not met
+        RAISE WARNING 'The OLAP dimension of this guaranteed is not updated because the condition is not met';
     END IF;
-    RETURN OLD;
+    RETURN NULL;
 END;
 $$ LANGUAGE plpgsql;
 
 DROP TRIGGER IF EXISTS guaranteed_deletion ON "fertiscan_0.0.19".guaranteed;
 CREATE TRIGGER guaranteed_deletion
 AFTER DELETE ON "fertiscan_0.0.19".guaranteed
-FOR EACH ROW
+REFERENCING OLD TABLE AS old_guaranteed
+FOR EACH STATEMENT
 EXECUTE FUNCTION olap_guaranteed_deletion();
@@ -0,0 +1,11 @@
+-- Remove every occurrence of the removed ids from an array of ids, keeping
+-- the order of the remaining ids (array_remove for several ids at once)
+CREATE OR REPLACE FUNCTION "fertiscan_0.0.19".olap_array_remove_all(
+    ids uuid[],
+    removed_ids uuid[]
+)
+RETURNS uuid[] AS $$
+    SELECT COALESCE(array_agg(element ORDER BY ord), '{}')
+    FROM unnest(ids) WITH ORDINALITY AS t(element, ord)
+    WHERE NOT (element = ANY(removed_ids));
+$$ LANGUAGE sql IMMUTABLE;
@@ -1,62 +1,79 @@
-
+-- Statement-level triggers: the metric rows inserted or deleted by a
+-- statement are aggregated per label and metric_type so each label_dimension
+-- row is updated once per statement instead of once per metric.
+-- Metrics of the test types are not part of the OLAP dimension.
 CREATE OR REPLACE FUNCTION "fertiscan_0.0.19".olap_metrics_creation()
 RETURNS TRIGGER AS $$
-DECLARE
-    metric_type TEXT;
 BEGIN
-    IF (TG_OP = 'INSERT') THEN
-        IF (NEW.id IS NOT NULL) AND (NEW.label_id IS NOT NULL) AND (NEW.metric_type IS NOT NULL) THEN
-        -- Update the label_dimension table with the new metrics_id
-        metric_type = NEW.metric_type || '_ids';
-        IF (metric_type ILIKE 'test%') THEN
-                RETURN NEW;
-        END IF;
-        EXECUTE format('UPDATE "fertiscan_0.0.19"."label_dimension" 
-                    SET %I = array_append(%I, %L) 
-                    WHERE label_dimension.label_id = %L', 
-                    metric_type, metric_type, NEW.id, NEW.label_id);
-        ELSE
-            -- Raise a warning if the condition is not met
-            RAISE WARNING 'The OLAP dimension of this metrics is not updated because the condition is not met';
-        END IF;
+    -- Append the new metric ids to the column of their type
+    UPDATE "fertiscan_0.0.19"."label_dimension" 
+    SET weight_ids = label_dimension.weight_ids || new_ids.weight_ids,
+        volume_ids = label_dimension.volume_ids || new_ids.volume_ids,
+        density_ids = label_dimension.density_ids || new_ids.density_ids
+    FROM (
+        SELECT 
+            label_id,
+            COALESCE(array_agg(id) FILTER (WHERE metric_type::text = 'weight'), '{}') AS weight_ids,
+            COALESCE(array_agg(id) FILTER (WHERE metric_type::text = 'volume'), '{}') AS volume_ids,
+            COALESCE(array_agg(id) FILTER (WHERE metric_type::text = 'density'), '{}') AS density_ids
+        FROM new_metric
+        WHERE id IS NOT NULL AND label_id IS NOT NULL AND metric_type IS NOT NULL
+        GROUP BY label_id
+    ) AS new_ids
+    WHERE label_dimension.label_id = new_ids.label_id;
+
+    IF EXISTS (
+        SELECT 1 FROM new_metric 
+        WHERE id IS NULL OR label_id IS NULL OR metric_type IS NULL
+    ) THEN
+        -- Raise a warning if the condition is not met
+        RAISE WARNING 'The OLAP dimension of this metrics is not updated because the condition is not met';
     END IF;
-    RETURN NEW;
+    RETURN NULL;
 END;
 $$ LANGUAGE plpgsql;
 
 DROP TRIGGER IF EXISTS metrics_creation ON "fertiscan_0.0.19".metric;
 CREATE TRIGGER metrics_creation
 AFTER INSERT ON "fertiscan_0.0.19".metric
-FOR EACH ROW
+REFERENCING NEW TABLE AS new_metric
+FOR EACH STATEMENT
 EXECUTE FUNCTION olap_metrics_creation();
 
 CREATE OR REPLACE FUNCTION "fertiscan_0.0.19".olap_metrics_deletion()
 RETURNS TRIGGER AS $$
-DECLARE
-    metric_type TEXT;
 BEGIN
-    IF (TG_OP = 'DELETE') THEN
-        IF (OLD.id IS NOT NULL) AND (OLD.label_id IS NOT NULL) AND (OLD.metric_type IS NOT NULL) THEN
-        -- Update the label_dimension table with the new metrics_id
-        metric_type = OLD.metric_type || '_ids';
-        IF (metric_type ILIKE 'test%') THEN
-                RETURN OLD;
-        END IF;
-        EXECUTE format('UPDATE "fertiscan_0.0.19"."label_dimension" 
-                    SET %I = array_remove(%I, %L) 
-                    WHERE label_dimension.label_id = %L', 
-                    metric_type, metric_type, OLD.id, OLD.label_id);
-        ELSE
-            -- Raise a warning if the condition is not met
-            RAISE WARNING 'The OLAP dimension of this metrics is not updated because the condition is not met';
-        END IF;
+    -- Remove the deleted metric ids from the column of their type
+    UPDATE "fertiscan_0.0.19"."label_dimension" 
+    SET weight_ids = "fertiscan_0.0.19".olap_array_remove_all(label_dimension.weight_ids, old_ids.weight_ids),
+        volume_ids = "fertiscan_0.0.19".olap_array_remove_all(label_dimension.volume_ids, old_ids.volume_ids),
+        density_ids = "fertiscan_0.0.19".olap_array_remove_all(label_dimension.density_ids, old_ids.density_ids)
+    FROM (
+        SELECT 
+            label_id,
+            COALESCE(array_agg(id) FILTER (WHERE metric_type::text = 'weight'), '{}') AS weight_ids,
+            COALESCE(array_agg(id) FILTER (WHERE metric_type::text = 'volume'), '{}') AS volume_ids,
+            COALESCE(array_agg(id) FILTER (WHERE metric_type::text = 'density'), '{}') AS density_ids
+        FROM old_metric
+        WHERE id IS NOT NULL AND label_id IS NOT NULL AND metric_type IS NOT NULL
+        GROUP BY label_id
+    ) AS old_ids
+    WHERE label_dimension.label_id = old_ids.label_id;
+
+    IF EXISTS (
+        SELECT 1 FROM old_metric 
+        WHERE id IS NULL OR label_id IS NULL OR metric_type IS NULL
+    ) THEN
+        -- Raise a warning if the condition is not met
+        RAISE WARNING 'The OLAP dimension of this metrics is not updated because the condition is not met';
     END IF;
-    RETURN OLD;
+    RETURN NULL;
 END;
 $$ LANGUAGE plpgsql;
 
 DROP TRIGGER IF EXISTS metrics_deletion ON "fertiscan_0.0.19".metric;
 CREATE TRIGGER metrics_deletion
 AFTER DELETE ON "fertiscan_0.0.19".metric
-FOR EACH ROW
+REFERENCING OLD TABLE AS old_metric
+FOR EACH STATEMENT
 EXECUTE FUNCTION olap_metrics_deletion();
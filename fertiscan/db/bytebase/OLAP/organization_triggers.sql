@@ -1,40 +1,60 @@
-
+-- Statement-level triggers: the organization_information rows inserted or deleted by a
+-- statement are aggregated per label so each label_dimension row is
+-- updated once per statement instead of once per organization_information.
 CREATE OR REPLACE FUNCTION "fertiscan_0.0.19".olap_organization_information_creation()
 RETURNS TRIGGER AS $$
 BEGIN
-    IF (TG_OP = 'INSERT') THEN
-        IF (NEW.id IS NOT NULL) THEN
-            UPDATE "fertiscan_0.0.19"."label_dimension" 
-            SET organization_info_ids = array_append(organization_info_ids, NEW.id)
-            WHERE label_dimension.label_id = NEW.label_id;
-        ELSE
-            -- Raise a warning if the condition is not met
-            RAISE WARNING 'The OLAP dimension of this organization_information is not updated because the condition is not met';
-        END IF;
+    -- Append the new organization_information ids to the label_dimension of their label
+    UPDATE "fertiscan_0.0.19"."label_dimension" 
+    SET organization_info_ids = label_dimension.organization_info_ids || new_ids.ids
+    FROM (
+        SELECT label_id, array_agg(id) AS ids
+        FROM new_organization_information
+        WHERE id IS NOT NULL AND label_id IS NOT NULL
+        GROUP BY label_id
+    ) AS new_ids
+    WHERE label_dimension.label_id = new_ids.label_id;
+
+    IF EXISTS (SELECT 1 FROM new_organization_information WHERE NOT (id IS NOT NULL AND label_id IS NOT NULL)) THEN
+        -- Raise a warning if the condition is not met
+        RAISE WARNING 'The OLAP dimension of this organization_information is not updated because the condition is not met';
     END IF;
-    RETURN NEW;
+    RETURN NULL;
 END;
 $$ LANGUAGE plpgsql;
 
 DROP TRIGGER IF EXISTS organization_information_creation ON "fertiscan_0.0.19".organization_information;
 CREATE TRIGGER organization_information_creation
 AFTER INSERT ON "fertiscan_0.0.19".organization_information
-FOR EACH ROW
+REFERENCING NEW TABLE AS new_organization_information
+FOR EACH STATEMENT
 EXECUTE FUNCTION olap_organization_information_creation();
 
 CREATE OR REPLACE FUNCTION "fertiscan_0.0.19".olap_organization_information_deletion()
 RETURNS TRIGGER AS $$
 BEGIN
-    IF (TG_OP = 'DELETE') THEN
-        IF (OLD.id IS NOT NULL) THEN
-            UPDATE "fertiscan_0.0.19"."label_dimension" 
-            SET organization_info_ids = array_remove(organization_info_ids, OLD.id)
-            WHERE label_dimension.label_id = OLD.label_id;
-        ELSE
-            -- Raise a warning if the condition is not met
-            RAISE WARNING 'The OLAP dimension of this organization_information is not updated because the condition is not met';
-        END IF;
+    -- Remove the deleted organization_information ids from the label_dimension of their label
+    UPDATE "fertiscan_0.0.19"."label_dimension" 
+    SET organization_info_ids = "fertiscan_0.0.19".olap_array_remove_all(label_dimension.organization_info_ids, old_ids.ids)
+    FROM (
+        SELECT label_id, array_agg(id) AS ids
+        FROM old_organization_information
+        WHERE id IS NOT NULL AND label_id IS NOT NULL
+        GROUP BY label_id
+    ) AS old_ids
+    WHERE label_dimension.label_id = old_ids.label_id;
+
+    IF EXISTS (SELECT 1 FROM old_organization_information WHERE id IS NULL OR label_id IS NULL) THEN
+        -- Raise a warning if the condition is not met
+        RAISE WARNING 'The OLAP dimension of this organization_information is not updated because the condition is not met';
     END IF;
-    RETURN OLD;
+    RETURN NULL;
 END;
 $$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS organization_information_deletion ON "fertiscan_0.0.19".organization_information;
+CREATE TRIGGER organization_information_deletion
+AFTER DELETE ON "fertiscan_0.0.19".organization_information
+REFERENCING OLD TABLE AS old_organization_information
+FOR EACH STATEMENT
+EXECUTE FUNCTION olap_organization_information_deletion();
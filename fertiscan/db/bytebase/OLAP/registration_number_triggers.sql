@@ -1,55 +1,60 @@
--- Trigger function
+-- Statement-level triggers: the registration_number rows inserted or deleted by a
+-- statement are aggregated per label so each label_dimension row is
+-- updated once per statement instead of once per registration_number.
 CREATE OR REPLACE FUNCTION "fertiscan_0.0.19".olap_registration_number_creation()
 RETURNS TRIGGER AS $$
 BEGIN
-    -- Check if the operation is an INSERT
-    IF (TG_OP = 'INSERT') THEN
-        -- Check if the NEW.id is not NULL
-        IF (NEW.id IS NOT NULL) AND (NEW.label_id IS NOT NULL) AND (NEW.identifier IS NOT NULL) THEN
-            -- Update the label_dimension table with the new guaranteed_analysis_id
-            UPDATE "fertiscan_0.0.19"."label_dimension" 
-            SET registration_number_ids = array_append(registration_number_ids, NEW.id)
-            WHERE label_dimension.label_id = NEW.label_id;
-            ELSE
-            -- Raise a warning if the condition is not met
-            RAISE WARNING 'The OLAP dimension of this registration_number is not updated because the condition is not met';
-        END IF;
+    -- Append the new registration_number ids to the label_dimension of their label
+    UPDATE "fertiscan_0.0.19"."label_dimension" 
+    SET registration_number_ids = label_dimension.registration_number_ids || new_ids.ids
+    FROM (
+        SELECT label_id, array_agg(id) AS ids
+        FROM new_registration_number_information
+        WHERE id IS NOT NULL AND label_id IS NOT NULL AND identifier IS NOT NULL
+        GROUP BY label_id
+    ) AS new_ids
+    WHERE label_dimension.label_id = new_ids.label_id;
+
+    IF EXISTS (SELECT 1 FROM new_registration_number_information WHERE NOT (id IS NOT NULL AND label_id IS NOT NULL AND identifier IS NOT NULL)) THEN
+        -- Raise a warning if the condition is not met
+        RAISE WARNING 'The OLAP dimension of this registration_number is not updated because the condition is not met';
     END IF;
-    RETURN NEW;
+    RETURN NULL;
 END;
 $$ LANGUAGE plpgsql;
 
--- Trigger
 DROP TRIGGER IF EXISTS registration_number_creation ON "fertiscan_0.0.19".registration_number_information;
 CREATE TRIGGER registration_number_creation
 AFTER INSERT ON "fertiscan_0.0.19".registration_number_information
-FOR EACH ROW
+REFERENCING NEW TABLE AS new_registration_number_information
+FOR EACH STATEMENT
 EXECUTE FUNCTION olap_registration_number_creation();
 
--- Trigger function
 CREATE OR REPLACE FUNCTION "fertiscan_0.0.19".olap_registration_number_deletion()
 RETURNS TRIGGER AS $$
 BEGIN
-    -- Check if the operation is an INSERT
-    IF (TG_OP = 'DELETE') THEN
-        -- Check if the NEW.id is not NULL
-        IF (OLD.id IS NOT NULL) AND (OLD.label_id IS NOT NULL) THEN
-            -- Update the label_dimension table with the new guaranteed_analysis_id
-            UPDATE "fertiscan_0.0.19"."label_dimension" 
-            SET registration_number_ids = array_remove(registration_number_ids, OLD.id)
-            WHERE label_dimension.label_id = OLD.label_id;
-            ELSE
-            -- Raise a warning if the condition is not met
-            RAISE WARNING 'The OLAP dimension of this registration_number is not updated because the condition is not met';
-        END IF;
+    -- Remove the deleted registration_number ids from the label_dimension of their label
+    UPDATE "fertiscan_0.0.19"."label_dimension" 
+    SET registration_number_ids = "fertiscan_0.0.19".olap_array_remove_all(label_dimension.registration_number_ids, old_ids.ids)
+    FROM (
+        SELECT label_id, array_agg(id) AS ids
+        FROM old_registration_number_information
+        WHERE id IS NOT NULL AND label_id IS NOT NULL
+        GROUP BY label_id
+    ) AS old_ids
+    WHERE label_dimension.label_id = old_ids.label_id;
+
+    IF EXISTS (SELECT 1 FROM old_registration_number_information WHERE id IS NULL OR label_id IS NULL) THEN
+        -- Raise a warning if the condition is not met
+        RAISE WARNING 'The OLAP dimension of this registration_number is not updated because the condition is not met';
     END IF;
-    RETURN NEW;
+    RETURN NULL;
 END;
 $$ LANGUAGE plpgsql;
 
--- Trigger
 DROP TRIGGER IF EXISTS registration_number_deletion ON "fertiscan_0.0.19".registration_number_information;
 CREATE TRIGGER registration_number_deletion
-AFTER INSERT ON "fertiscan_0.0.19".registration_number_information
-FOR EACH ROW
+AFTER DELETE ON "fertiscan_0.0.19".registration_number_information
+REFERENCING OLD TABLE AS old_registration_number_information
+FOR EACH STATEMENT
 EXECUTE FUNCTION olap_registration_number_deletion();
@@ -1,48 +1,60 @@
-
+-- Statement-level triggers: the specification rows inserted or deleted by a
+-- statement are aggregated per label so each label_dimension row is
+-- updated once per statement instead of once per specification.
 CREATE OR REPLACE FUNCTION "fertiscan_0.0.19".olap_specification_creation()
 RETURNS TRIGGER AS $$
 BEGIN
-    IF (TG_OP = 'INSERT') THEN
-        IF (NEW.id IS NOT NULL) AND (NEW.label_id IS NOT NULL) THEN
-        -- Update the label_dimension table with the new specification_analysis_id
-        UPDATE "fertiscan_0.0.19"."label_dimension" 
-        SET specification_ids = array_append(specification_ids, NEW.id)
-        WHERE label_dimension.label_id = NEW.label_id;
-        ELSE
-            -- Raise a warning if the condition is not met
-            RAISE WARNING 'The OLAP dimension of this specification is not updated because the condition is not met';
-        END IF;
+    -- Append the new specification ids to the label_dimension of their label
+    UPDATE "fertiscan_0.0.19"."label_dimension" 
+    SET specification_ids = label_dimension.specification_ids || new_ids.ids
+    FROM (
+        SELECT label_id, array_agg(id) AS ids
+        FROM new_specification
+        WHERE id IS NOT NULL AND label_id IS NOT NULL
+        GROUP BY label_id
+    ) AS new_ids
+    WHERE label_dimension.label_id = new_ids.label_id;
+
+    IF EXISTS (SELECT 1 FROM new_specification WHERE NOT (id IS NOT NULL AND label_id IS NOT NULL)) THEN
+        -- Raise a warning if the condition is not met
+        RAISE WARNING 'The OLAP dimension of this specification is not updated because the condition is not met';
     END IF;
-    RETURN NEW;
+    RETURN NULL;
 END;
 $$ LANGUAGE plpgsql;
 
 DROP TRIGGER IF EXISTS specification_creation ON "fertiscan_0.0.19".specification;
 CREATE TRIGGER specification_creation
 AFTER INSERT ON "fertiscan_0.0.19".specification
-FOR EACH ROW
+REFERENCING NEW TABLE AS new_specification
+FOR EACH STATEMENT
 EXECUTE FUNCTION olap_specification_creation();
 
 CREATE OR REPLACE FUNCTION "fertiscan_0.0.19".olap_specification_deletion()
 RETURNS TRIGGER AS $$
 BEGIN
-    IF (TG_OP = 'DELETE') THEN
-        IF (OLD.id IS NOT NULL) AND (OLD.label_id IS NOT NULL) THEN
-        -- Update the label_dimension table with the new specification_analysis_id
-        UPDATE "fertiscan_0.0.19"."label_dimension" 
-        SET specification_ids = array_remove(specification_ids, OLD.id)
-        WHERE label_dimension.label_id = OLD.label_id;
-        ELSE
-            -- Raise a warning if the condition is not met
-            RAISE WARNING 'The OLAP dimension of this specification is not updated because the condition is not met';
-        END IF;
+    -- Remove the deleted specification ids from the label_dimension of their label
+    UPDATE "fertiscan_0.0.19"."label_dimension" 
+    SET specification_ids = "fertiscan_0.0.19".olap_array_remove_all(label_dimension.specification_ids, old_ids.ids)
+    FROM (
+        SELECT label_id, array_agg(id) AS ids
+        FROM old_specification
+        WHERE id IS NOT NULL AND label_id IS NOT NULL
+        GROUP BY label_id
+    ) AS old_ids
+    WHERE label_dimension.label_id = old_ids.label_id;
+
+    IF EXISTS (SELECT 1 FROM old_specification WHERE id IS NULL OR label_id IS NULL) THEN
+        -- Raise a warning if the condition is not met
+        RAISE WARNING 'The OLAP dimension of this specification is not updated because the condition is not met';
     END IF;
-    RETURN OLD;
+    RETURN NULL;
 END;
 $$ LANGUAGE plpgsql;
 
 DROP TRIGGER IF EXISTS specification_deletion ON "fertiscan_0.0.19".specification;
 CREATE TRIGGER specification_deletion
 AFTER DELETE ON "fertiscan_0.0.19".specification
-FOR EACH ROW
+REFERENCING OLD TABLE AS old_specification
+FOR EACH STATEMENT
 EXECUTE FUNCTION olap_specification_deletion();
@@ -1,62 +1,77 @@
-
+-- Statement-level triggers: the sub_label rows inserted or deleted by a
+-- statement are aggregated per label and sub_type so each label_dimension
+-- row is updated once per statement instead of once per sub_label.
+-- Sub labels of the test sub_types are not part of the OLAP dimension.
 CREATE OR REPLACE FUNCTION "fertiscan_0.0.19".olap_sub_label_creation()
 RETURNS TRIGGER AS $$
-DECLARE
-    type_str TEXT;
 BEGIN
-    IF (TG_OP = 'INSERT') THEN
-        IF (NEW.id IS NOT NULL) AND (NEW.label_id IS NOT NULL) AND (NEW.sub_type_id IS NOT NULL) THEN
-        -- FIND THE SUB_TYPE TO GET THE COLUMN IDENTIFIER
-        SELECT sub_type.type_en INTO type_str FROM "fertiscan_0.0.19".sub_type WHERE sub_type.id = NEW.sub_type_id;
-        IF (type_str ILIKE 'test%') THEN
-            RETURN NEW; -- Do not update the OLAP dimension for test sub_labels
-        END IF;
-        type_str = type_str || '_ids';
-        EXECUTE format('UPDATE "fertiscan_0.0.19".label_dimension 
-					SET %I = array_append(%I, %L) 
-					WHERE label_id = %L;',
-					type_str, type_str, NEW.id, NEW.label_id);
-			
-        END IF;
-    END IF;
-    RETURN NEW;
+    -- Append the new sub_label ids to the column of their sub_type
+    UPDATE "fertiscan_0.0.19".label_dimension 
+    SET instructions_ids = label_dimension.instructions_ids || new_ids.instructions_ids,
+        cautions_ids = label_dimension.cautions_ids || new_ids.cautions_ids,
+        first_aid_ids = label_dimension.first_aid_ids || new_ids.first_aid_ids,
+        warranties_ids = label_dimension.warranties_ids || new_ids.warranties_ids
+    FROM (
+        SELECT 
+            new_sub_label.label_id,
+            COALESCE(array_agg(new_sub_label.id) FILTER (WHERE sub_type.type_en = 'instructions'), '{}') AS instructions_ids,
+            COALESCE(array_agg(new_sub_label.id) FILTER (WHERE sub_type.type_en = 'cautions'), '{}') AS cautions_ids,
+            COALESCE(array_agg(new_sub_label.id) FILTER (WHERE sub_type.type_en = 'first_aid'), '{}') AS first_aid_ids,
+            COALESCE(array_agg(new_sub_label.id) FILTER (WHERE sub_type.type_en = 'warranties'), '{}') AS warranties_ids
+        FROM new_sub_label
+        JOIN "fertiscan_0.0.19".sub_type ON sub_type.id = new_sub_label.sub_type_id
+        WHERE new_sub_label.id IS NOT NULL AND new_sub_label.label_id IS NOT NULL
+        GROUP BY new_sub_label.label_id
+    ) AS new_ids
+    WHERE label_dimension.label_id = new_ids.label_id;
+    RETURN NULL;
 END;
 $$ LANGUAGE plpgsql;
 
 DROP TRIGGER IF EXISTS sub_label_creation ON "fertiscan_0.0.19".sub_label;
 CREATE TRIGGER sub_label_creation
 AFTER INSERT ON "fertiscan_0.0.19".sub_label
-FOR EACH ROW
+REFERENCING NEW TABLE AS new_sub_label
+FOR EACH STATEMENT
 EXECUTE FUNCTION olap_sub_label_creation();
 
 CREATE OR REPLACE FUNCTION "fertiscan_0.0.19".olap_sub_label_deletion()
 RETURNS TRIGGER AS $$
-DECLARE
-    type_str TEXT;
 BEGIN
-    IF (TG_OP = 'DELETE') THEN
-        IF (OLD.id IS NOT NULL) AND (OLD.label_id IS NOT NULL) AND (OLD.sub_type_id IS NOT NULL) THEN
-        -- FIND THE SUB_TYPE TO GET THE COLUMN IDENTIFIER
-        SELECT sub_type.type_en INTO type_str FROM "fertiscan_0.0.19".sub_type WHERE sub_type.id = OLD.sub_type_id;
-        IF (type_str ILIKE 'test%') THEN
-            RETURN OLD; -- Do not update the OLAP dimension for test sub_labels
-        END IF;
-        type_str = type_str || '_ids';
-        EXECUTE format('UPDATE "fertiscan_0.0.19".label_dimension 
-                    SET %I = array_remove(%I, %L) 
-                    WHERE label_id = %L;',
-                    type_str, type_str, OLD.id, OLD.label_id);
-        ELSE
-            -- Raise a warning if the condition is not met
-            RAISE WARNING 'The OLAP dimension of this sub_label is not updated because the condition is not met';
-        END IF;
+    -- Remove the deleted sub_label ids from the column of their sub_type
+    UPDATE "fertiscan_0.0.19".label_dimension 
+    SET instructions_ids = "fertiscan_0.0.19".olap_array_remove_all(label_dimension.instructions_ids, old_ids.instructions_ids),
+        cautions_ids = "fertiscan_0.0.19".olap_array_remove_all(label_dimension.cautions_ids, old_ids.cautions_ids),
+        first_aid_ids = "fertiscan_0.0.19".olap_array_remove_all(label_dimension.first_aid_ids, old_ids.first_aid_ids),
+        warranties_ids = "fertiscan_0.0.19".olap_array_remove_all(label_dimension.warranties_ids, old_ids.warranties_ids)
+    FROM (
+        SELECT 
+            old_sub_label.label_id,
+            COALESCE(array_agg(old_sub_label.id) FILTER (WHERE sub_type.type_en = 'instructions'), '{}') AS instructions_ids,
+            COALESCE(array_agg(old_sub_label.id) FILTER (WHERE sub_type.type_en = 'cautions'), '{}') AS cautions_ids,
+            COALESCE(array_agg(old_sub_label.id) FILTER (WHERE sub_type.type_en = 'first_aid'), '{}') AS first_aid_ids,
+            COALESCE(array_agg(old_sub_label.id) FILTER (WHERE sub_type.type_en = 'warranties'), '{}') AS warranties_ids
+        FROM old_sub_label
+        JOIN "fertiscan_0.0.19".sub_type ON sub_type.id = old_sub_label.sub_type_id
+        WHERE old_sub_label.id IS NOT NULL AND old_sub_label.label_id IS NOT NULL
+        GROUP BY old_sub_label.label_id
+    ) AS old_ids
+    WHERE label_dimension.label_id = old_ids.label_id;
+
+    IF EXISTS (
+        SELECT 1 FROM old_sub_label 
+        WHERE id IS NULL OR label_id IS NULL OR sub_type_id IS NULL
+    ) THEN
+        -- Raise a warning if the condition is not met
+        RAISE WARNING 'The OLAP dimension of this sub_label is not updated because the condition is not met';
     END IF;
-    RETURN OLD;
+    RETURN NULL;
 END;
 $$ LANGUAGE plpgsql;
 
 DROP TRIGGER IF EXISTS sub_label_deletion ON "fertiscan_0.0.19".sub_label;
 CREATE TRIGGER sub_label_deletion
 AFTER DELETE ON "fertiscan_0.0.19".sub_label
-FOR EACH ROW
+REFERENCING OLD TABLE AS old_sub_label
+FOR EACH STATEMENT
 EXECUTE FUNCTION olap_sub_label_deletion();
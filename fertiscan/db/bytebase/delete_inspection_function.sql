@@ -48,6 +48,10 @@ BEGIN
         RAISE EXCEPTION 'Inspector % is not the creator of inspection %', p_inspector_id, p_inspection_id;
     END IF;
 
+    -- Delete the read model of the inspection
+    DELETE FROM "fertiscan_0.0.19".inspection_snapshot
+    WHERE inspection_id = p_inspection_id;
+
     -- Delete the inspection record and retrieve it
     WITH deleted_inspection AS (
         DELETE FROM "fertiscan_0.0.19".inspection
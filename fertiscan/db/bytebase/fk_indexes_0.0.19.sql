@@ -0,0 +1,33 @@
+-- Index migration for fertiscan_0.0.19
+-- The schema only indexes the primary keys, while the queries of
+-- datastore.db.queries and fertiscan.db.queries filter and join on the
+-- foreign keys below. Every statement is idempotent so the migration can be
+-- replayed. inspection.inspector_id is covered by inspection_listing_index.sql.
+-- Benchmark: datastore/bin/benchmark-indexes.py fertiscan
+
+-- Pictures and picture sets
+CREATE INDEX IF NOT EXISTS picture_set_owner_id_idx ON "fertiscan_0.0.19".picture_set (owner_id);
+CREATE INDEX IF NOT EXISTS picture_picture_set_id_idx ON "fertiscan_0.0.19".picture (picture_set_id);
+CREATE INDEX IF NOT EXISTS users_default_set_id_idx ON "fertiscan_0.0.19".users (default_set_id);
+
+-- Inspections
+CREATE INDEX IF NOT EXISTS inspection_label_info_id_idx ON "fertiscan_0.0.19".inspection (label_info_id);
+CREATE INDEX IF NOT EXISTS inspection_picture_set_id_idx ON "fertiscan_0.0.19".inspection (picture_set_id);
+CREATE INDEX IF NOT EXISTS inspection_sample_id_idx ON "fertiscan_0.0.19".inspection (sample_id);
+CREATE INDEX IF NOT EXISTS inspection_fertilizer_id_idx ON "fertiscan_0.0.19".inspection (fertilizer_id);
+CREATE INDEX IF NOT EXISTS fertilizer_latest_inspection_id_idx ON "fertiscan_0.0.19".fertilizer (latest_inspection_id);
+
+-- Label information children
+CREATE INDEX IF NOT EXISTS metric_label_id_idx ON "fertiscan_0.0.19".metric (label_id);
+CREATE INDEX IF NOT EXISTS guaranteed_label_id_idx ON "fertiscan_0.0.19".guaranteed (label_id);
+CREATE INDEX IF NOT EXISTS sub_label_label_id_idx ON "fertiscan_0.0.19".sub_label (label_id);
+CREATE INDEX IF NOT EXISTS ingredient_label_id_idx ON "fertiscan_0.0.19".ingredient (label_id);
+CREATE INDEX IF NOT EXISTS registration_number_information_label_id_idx ON "fertiscan_0.0.19".registration_number_information (label_id);
+CREATE INDEX IF NOT EXISTS organization_information_label_id_idx ON "fertiscan_0.0.19".organization_information (label_id);
+CREATE INDEX IF NOT EXISTS specification_label_id_idx ON "fertiscan_0.0.19".specification (label_id);
+CREATE INDEX IF NOT EXISTS micronutrient_label_id_idx ON "fertiscan_0.0.19".micronutrient (label_id);
+
+-- Locations
+CREATE INDEX IF NOT EXISTS region_province_id_idx ON "fertiscan_0.0.19".region (province_id);
+CREATE INDEX IF NOT EXISTS location_region_id_idx ON "fertiscan_0.0.19".location (region_id);
+CREATE INDEX IF NOT EXISTS location_organization_id_idx ON "fertiscan_0.0.19".location (organization_id);
@@ -0,0 +1,41 @@
+-- Whole inspection in one round trip, composed from the other get_inspection functions
+CREATE OR REPLACE FUNCTION "fertiscan_0.0.19".get_inspection_json(
+inspection_id_value uuid)
+RETURNS jsonb 
+LANGUAGE plpgsql
+AS $function$
+DECLARE
+    inspection_record "fertiscan_0.0.19".inspection%ROWTYPE;
+    label_id_value uuid;
+BEGIN
+    SELECT *
+    INTO inspection_record
+    FROM "fertiscan_0.0.19".inspection
+    WHERE id = inspection_id_value;
+    IF NOT FOUND THEN
+        RETURN NULL;
+    END IF;
+    label_id_value := inspection_record.label_info_id;
+
+    RETURN jsonb_build_object(
+        'inspection', to_jsonb(inspection_record),
+        'product', "fertiscan_0.0.19".get_label_info_json(label_id_value),
+        'metrics', "fertiscan_0.0.19".get_metrics_json(label_id_value),
+        'registration_numbers', 
+            "fertiscan_0.0.19".get_registration_numbers_json(label_id_value)->'registration_numbers',
+        'organizations', 
+            "fertiscan_0.0.19".get_organizations_information_json(label_id_value)->'organizations',
+        'sub_labels', CASE 
+            WHEN EXISTS (
+                SELECT 1 
+                FROM "fertiscan_0.0.19".sub_label 
+                WHERE sub_label.label_id = label_id_value
+            )
+            THEN "fertiscan_0.0.19".get_sub_label_json(label_id_value)
+            ELSE NULL
+        END,
+        'guaranteed_analysis', "fertiscan_0.0.19".get_guaranteed_analysis_json(label_id_value),
+        'ingredients', "fertiscan_0.0.19".get_ingredients_json(label_id_value)->'ingredients'
+    );
+END;
+$function$;
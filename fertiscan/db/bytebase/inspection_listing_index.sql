@@ -0,0 +1,25 @@
+-- Indexes backing the keyset pagination of the inspections of a user
+-- (fertiscan.get_user_analysis_page), one per sortable column. The columns
+-- are nullable, so the listing sorts on COALESCE(column, '-infinity') and
+-- the indexes are built on the same expression.
+DROP INDEX IF EXISTS "fertiscan_0.0.19".inspection_inspector_updated_at_idx;
+DROP INDEX IF EXISTS "fertiscan_0.0.19".inspection_inspector_upload_date_idx;
+
+CREATE INDEX IF NOT EXISTS inspection_inspector_sort_updated_at_idx
+    ON "fertiscan_0.0.19".inspection (
+        inspector_id, COALESCE(updated_at, '-infinity'::timestamp) DESC, id DESC
+    );
+
+CREATE INDEX IF NOT EXISTS inspection_inspector_sort_upload_date_idx
+    ON "fertiscan_0.0.19".inspection (
+        inspector_id, COALESCE(upload_date, '-infinity'::timestamp) DESC, id DESC
+    );
+
+-- Product name prefix filter: lower(product_name) LIKE 'prefix%'
+CREATE INDEX IF NOT EXISTS label_information_lower_product_name_idx
+    ON "fertiscan_0.0.19".label_information (lower(product_name) text_pattern_ops);
+
+-- Main contact of a label
+CREATE INDEX IF NOT EXISTS organization_information_main_contact_idx
+    ON "fertiscan_0.0.19".organization_information (label_id)
+    WHERE is_main_contact;
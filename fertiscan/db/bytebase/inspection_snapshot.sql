@@ -0,0 +1,285 @@
+-- Denormalized read model of the inspections.
+-- Each row holds the get_inspection_json document of an inspection and the
+-- updated_at of the inspection it was built from. Snapshots are only written
+-- by the write paths (new_inspection, update_inspection and
+-- refresh_inspection_snapshot), never by a read: the triggers below delete
+-- the snapshot of an inspection whenever a row of its document changes, and
+-- get_inspection_snapshot falls back to get_inspection_json until the
+-- snapshot is rebuilt.
+CREATE TABLE IF NOT EXISTS "fertiscan_0.0.19"."inspection_snapshot" (
+    "inspection_id" uuid PRIMARY KEY REFERENCES "fertiscan_0.0.19".inspection(id) ON DELETE CASCADE,
+    "snapshot" jsonb NOT NULL,
+    "inspection_updated_at" timestamp,
+    "built_at" timestamp DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Rebuild the snapshot of an inspection and return it
+CREATE OR REPLACE FUNCTION "fertiscan_0.0.19".refresh_inspection_snapshot(
+    p_inspection_id uuid
+)
+RETURNS jsonb
+LANGUAGE plpgsql
+AS $function$
+DECLARE
+    snapshot_value jsonb;
+BEGIN
+    snapshot_value := "fertiscan_0.0.19".get_inspection_json(p_inspection_id);
+    IF snapshot_value IS NULL THEN
+        DELETE FROM "fertiscan_0.0.19".inspection_snapshot
+        WHERE inspection_id = p_inspection_id;
+        RETURN NULL;
+    END IF;
+
+    INSERT INTO "fertiscan_0.0.19".inspection_snapshot (
+        inspection_id, snapshot, inspection_updated_at, built_at
+    )
+    SELECT 
+        inspection.id, snapshot_value, inspection.updated_at, CURRENT_TIMESTAMP
+    FROM "fertiscan_0.0.19".inspection
+    WHERE inspection.id = p_inspection_id
+    ON CONFLICT (inspection_id) DO UPDATE SET
+        snapshot = EXCLUDED.snapshot,
+        inspection_updated_at = EXCLUDED.inspection_updated_at,
+        built_at = EXCLUDED.built_at;
+
+    RETURN snapshot_value;
+END;
+$function$;
+
+-- Return the snapshot of an inspection, or its document built from the
+-- normalized tables if the snapshot is missing or stale. Nothing is written.
+CREATE OR REPLACE FUNCTION "fertiscan_0.0.19".get_inspection_snapshot(
+    p_inspection_id uuid
+)
+RETURNS jsonb
+LANGUAGE plpgsql
+STABLE
+AS $function$
+DECLARE
+    snapshot_value jsonb;
+BEGIN
+    SELECT inspection_snapshot.snapshot
+    INTO snapshot_value
+    FROM "fertiscan_0.0.19".inspection
+    JOIN "fertiscan_0.0.19".inspection_snapshot 
+        ON inspection_snapshot.inspection_id = inspection.id
+    WHERE inspection.id = p_inspection_id
+        AND inspection_snapshot.inspection_updated_at IS NOT DISTINCT FROM inspection.updated_at;
+    IF FOUND THEN
+        RETURN snapshot_value;
+    END IF;
+    RETURN "fertiscan_0.0.19".get_inspection_json(p_inspection_id);
+END;
+$function$;
+
+-- Delete the snapshots of the inspections whose document contains the
+-- changed row. The argument of the trigger is "id" for label_information, or
+-- "inspection" for the inspection table itself.
+CREATE OR REPLACE FUNCTION "fertiscan_0.0.19".delete_inspection_snapshot()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $function$
+DECLARE
+    changed_rows jsonb[];
+    changed_row jsonb;
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        changed_rows := array_append(changed_rows, to_jsonb(OLD));
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        changed_rows := array_append(changed_rows, to_jsonb(NEW));
+    END IF;
+    FOREACH changed_row IN ARRAY changed_rows LOOP
+        IF TG_ARGV[0] = 'inspection' THEN
+            DELETE FROM "fertiscan_0.0.19".inspection_snapshot
+            WHERE inspection_id = (changed_row->>'id')::uuid;
+        ELSE
+            DELETE FROM "fertiscan_0.0.19".inspection_snapshot
+            USING "fertiscan_0.0.19".inspection
+            WHERE inspection_snapshot.inspection_id = inspection.id
+                AND inspection.label_info_id = (changed_row->>TG_ARGV[0])::uuid;
+        END IF;
+    END LOOP;
+    RETURN NULL;
+END;
+$function$;
+
+-- Delete the snapshots of the inspections whose label has a row changed by
+-- the statement, for the tables with a label_id column. Like the OLAP
+-- triggers, it runs once per statement with a single DELETE over the
+-- transition tables, so a statement inserting every row of a label (ex:
+-- new_inspections) does not delete the same snapshots once per row. A trigger
+-- with transition tables fires on a single event, so each table has one
+-- trigger per event.
+CREATE OR REPLACE FUNCTION "fertiscan_0.0.19".delete_label_inspection_snapshots()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $function$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        DELETE FROM "fertiscan_0.0.19".inspection_snapshot
+        USING "fertiscan_0.0.19".inspection
+        WHERE inspection_snapshot.inspection_id = inspection.id
+            AND inspection.label_info_id IN (SELECT label_id FROM new_rows);
+    ELSIF TG_OP = 'DELETE' THEN
+        DELETE FROM "fertiscan_0.0.19".inspection_snapshot
+        USING "fertiscan_0.0.19".inspection
+        WHERE inspection_snapshot.inspection_id = inspection.id
+            AND inspection.label_info_id IN (SELECT label_id FROM old_rows);
+    ELSE
+        DELETE FROM "fertiscan_0.0.19".inspection_snapshot
+        USING "fertiscan_0.0.19".inspection
+        WHERE inspection_snapshot.inspection_id = inspection.id
+            AND inspection.label_info_id IN (
+                SELECT label_id FROM old_rows
+                UNION
+                SELECT label_id FROM new_rows
+            );
+    END IF;
+    RETURN NULL;
+END;
+$function$;
+
+DROP TRIGGER IF EXISTS inspection_snapshot_trigger ON "fertiscan_0.0.19".inspection;
+CREATE TRIGGER inspection_snapshot_trigger
+AFTER UPDATE ON "fertiscan_0.0.19".inspection
+FOR EACH ROW
+EXECUTE FUNCTION "fertiscan_0.0.19".delete_inspection_snapshot('inspection');
+
+DROP TRIGGER IF EXISTS inspection_snapshot_trigger ON "fertiscan_0.0.19".label_information;
+CREATE TRIGGER inspection_snapshot_trigger
+AFTER UPDATE OR DELETE ON "fertiscan_0.0.19".label_information
+FOR EACH ROW
+EXECUTE FUNCTION "fertiscan_0.0.19".delete_inspection_snapshot('id');
+
+DROP TRIGGER IF EXISTS inspection_snapshot_trigger ON "fertiscan_0.0.19".metric;
+DROP TRIGGER IF EXISTS inspection_snapshot_insert ON "fertiscan_0.0.19".metric;
+CREATE TRIGGER inspection_snapshot_insert
+AFTER INSERT ON "fertiscan_0.0.19".metric
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION "fertiscan_0.0.19".delete_label_inspection_snapshots();
+
+DROP TRIGGER IF EXISTS inspection_snapshot_update ON "fertiscan_0.0.19".metric;
+CREATE TRIGGER inspection_snapshot_update
+AFTER UPDATE ON "fertiscan_0.0.19".metric
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION "fertiscan_0.0.19".delete_label_inspection_snapshots();
+
+DROP TRIGGER IF EXISTS inspection_snapshot_delete ON "fertiscan_0.0.19".metric;
+CREATE TRIGGER inspection_snapshot_delete
+AFTER DELETE ON "fertiscan_0.0.19".metric
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION "fertiscan_0.0.19".delete_label_inspection_snapshots();
+
+DROP TRIGGER IF EXISTS inspection_snapshot_trigger ON "fertiscan_0.0.19".registration_number_information;
+DROP TRIGGER IF EXISTS inspection_snapshot_insert ON "fertiscan_0.0.19".registration_number_information;
+CREATE TRIGGER inspection_snapshot_insert
+AFTER INSERT ON "fertiscan_0.0.19".registration_number_information
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION "fertiscan_0.0.19".delete_label_inspection_snapshots();
+
+DROP TRIGGER IF EXISTS inspection_snapshot_update ON "fertiscan_0.0.19".registration_number_information;
+CREATE TRIGGER inspection_snapshot_update
+AFTER UPDATE ON "fertiscan_0.0.19".registration_number_information
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION "fertiscan_0.0.19".delete_label_inspection_snapshots();
+
+DROP TRIGGER IF EXISTS inspection_snapshot_delete ON "fertiscan_0.0.19".registration_number_information;
+CREATE TRIGGER inspection_snapshot_delete
+AFTER DELETE ON "fertiscan_0.0.19".registration_number_information
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION "fertiscan_0.0.19".delete_label_inspection_snapshots();
+
+DROP TRIGGER IF EXISTS inspection_snapshot_trigger ON "fertiscan_0.0.19".organization_information;
+DROP TRIGGER IF EXISTS inspection_snapshot_insert ON "fertiscan_0.0.19".organization_information;
+CREATE TRIGGER inspection_snapshot_insert
+AFTER INSERT ON "fertiscan_0.0.19".organization_information
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION "fertiscan_0.0.19".delete_label_inspection_snapshots();
+
+DROP TRIGGER IF EXISTS inspection_snapshot_update ON "fertiscan_0.0.19".organization_information;
+CREATE TRIGGER inspection_snapshot_update
+AFTER UPDATE ON "fertiscan_0.0.19".organization_information
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION "fertiscan_0.0.19".delete_label_inspection_snapshots();
+
+DROP TRIGGER IF EXISTS inspection_snapshot_delete ON "fertiscan_0.0.19".organization_information;
+CREATE TRIGGER inspection_snapshot_delete
+AFTER DELETE ON "fertiscan_0.0.19".organization_information
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION "fertiscan_0.0.19".delete_label_inspection_snapshots();
+
+DROP TRIGGER IF EXISTS inspection_snapshot_trigger ON "fertiscan_0.0.19".sub_label;
+DROP TRIGGER IF EXISTS inspection_snapshot_insert ON "fertiscan_0.0.19".sub_label;
+CREATE TRIGGER inspection_snapshot_insert
+AFTER INSERT ON "fertiscan_0.0.19".sub_label
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION "fertiscan_0.0.19".delete_label_inspection_snapshots();
+
+DROP TRIGGER IF EXISTS inspection_snapshot_update ON "fertiscan_0.0.19".sub_label;
+CREATE TRIGGER inspection_snapshot_update
+AFTER UPDATE ON "fertiscan_0.0.19".sub_label
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION "fertiscan_0.0.19".delete_label_inspection_snapshots();
+
+DROP TRIGGER IF EXISTS inspection_snapshot_delete ON "fertiscan_0.0.19".sub_label;
+CREATE TRIGGER inspection_snapshot_delete
+AFTER DELETE ON "fertiscan_0.0.19".sub_label
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION "fertiscan_0.0.19".delete_label_inspection_snapshots();
+
+DROP TRIGGER IF EXISTS inspection_snapshot_trigger ON "fertiscan_0.0.19".guaranteed;
+DROP TRIGGER IF EXISTS inspection_snapshot_insert ON "fertiscan_0.0.19".guaranteed;
+CREATE TRIGGER inspection_snapshot_insert
+AFTER INSERT ON "fertiscan_0.0.19".guaranteed
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION "fertiscan_0.0.19".delete_label_inspection_snapshots();
+
+DROP TRIGGER IF EXISTS inspection_snapshot_update ON "fertiscan_0.0.19".guaranteed;
+CREATE TRIGGER inspection_snapshot_update
+AFTER UPDATE ON "fertiscan_0.0.19".guaranteed
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION "fertiscan_0.0.19".delete_label_inspection_snapshots();
+
+DROP TRIGGER IF EXISTS inspection_snapshot_delete ON "fertiscan_0.0.19".guaranteed;
+CREATE TRIGGER inspection_snapshot_delete
+AFTER DELETE ON "fertiscan_0.0.19".guaranteed
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION "fertiscan_0.0.19".delete_label_inspection_snapshots();
+
+DROP TRIGGER IF EXISTS inspection_snapshot_trigger ON "fertiscan_0.0.19".ingredient;
+DROP TRIGGER IF EXISTS inspection_snapshot_insert ON "fertiscan_0.0.19".ingredient;
+CREATE TRIGGER inspection_snapshot_insert
+AFTER INSERT ON "fertiscan_0.0.19".ingredient
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION "fertiscan_0.0.19".delete_label_inspection_snapshots();
+
+DROP TRIGGER IF EXISTS inspection_snapshot_update ON "fertiscan_0.0.19".ingredient;
+CREATE TRIGGER inspection_snapshot_update
+AFTER UPDATE ON "fertiscan_0.0.19".ingredient
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION "fertiscan_0.0.19".delete_label_inspection_snapshots();
+
+DROP TRIGGER IF EXISTS inspection_snapshot_delete ON "fertiscan_0.0.19".ingredient;
+CREATE TRIGGER inspection_snapshot_delete
+AFTER DELETE ON "fertiscan_0.0.19".ingredient
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION "fertiscan_0.0.19".delete_label_inspection_snapshots();
@@ -0,0 +1,330 @@
+-- Register several inspections of a user in a single call, for bulk
+-- ingestion. input_jsons is an array of new_inspection documents and the
+-- result is the array of the new_inspection results, in the same order.
+-- new_inspection calls it with a single document.
+--
+-- Every table is filled with a single INSERT ... SELECT
+-- over all the documents, so the statement-level OLAP triggers run once per
+-- table for the whole batch. The ids of the labels, inspections and
+-- organizations are generated up front to tie the rows back to their document.
+CREATE OR REPLACE FUNCTION "fertiscan_0.0.19".new_inspections(user_id uuid, input_jsons jsonb)
+ RETURNS jsonb
+ LANGUAGE plpgsql
+AS $function$
+DECLARE
+    label_ids uuid[];
+    inspection_ids uuid[];
+    organizations jsonb;
+    metrics jsonb;
+    sub_type_rec RECORD;
+    results jsonb;
+BEGIN
+    IF jsonb_typeof(input_jsons) IS DISTINCT FROM 'array' THEN
+        RAISE EXCEPTION 'new_inspections expects an array of inspections';
+    END IF;
+
+    label_ids := ARRAY(
+        SELECT uuid_generate_v4() FROM generate_series(1, jsonb_array_length(input_jsons))
+    );
+    inspection_ids := ARRAY(
+        SELECT uuid_generate_v4() FROM generate_series(1, jsonb_array_length(input_jsons))
+    );
+
+-- LABEL INFORMATION
+    INSERT INTO "fertiscan_0.0.19".label_information (
+        id, product_name, lot_number, npk, n, p, k,
+        guaranteed_title_en, guaranteed_title_fr, title_is_minimal, record_keeping
+    )
+    SELECT
+        label_ids[docs.ord],
+        docs.doc->'product'->>'name',
+        docs.doc->'product'->>'lot_number',
+        docs.doc->'product'->>'npk',
+        (docs.doc->'product'->>'n')::float,
+        (docs.doc->'product'->>'p')::float,
+        (docs.doc->'product'->>'k')::float,
+        docs.doc->'guaranteed_analysis'->'title'->>'en',
+        docs.doc->'guaranteed_analysis'->'title'->>'fr',
+        (docs.doc->'guaranteed_analysis'->>'is_minimal')::boolean,
+        NULL -- record_keeping not handled yet
+    FROM jsonb_array_elements(input_jsons) WITH ORDINALITY AS docs(doc, ord)
+    ORDER BY docs.ord;
+-- LABEL END
+
+-- METRICS
+    -- The weights, density and volume of every document, in the order
+    -- new_inspection inserts them
+    SELECT COALESCE(jsonb_agg(jsonb_build_object(
+        'ord', metric_rows.ord,
+        'value', metric_rows.value,
+        'unit', metric_rows.unit,
+        'metric_type', metric_rows.metric_type
+    ) ORDER BY metric_rows.ord, metric_rows.kind_ord, metric_rows.item_ord), '[]'::jsonb)
+    INTO metrics
+    FROM (
+        SELECT
+            docs.ord, 1 AS kind_ord, items.item_ord,
+            items.item->>'value' AS value,
+            items.item->>'unit' AS unit,
+            'weight' AS metric_type
+        FROM jsonb_array_elements(input_jsons) WITH ORDINALITY AS docs(doc, ord)
+        CROSS JOIN LATERAL jsonb_array_elements(
+            COALESCE(docs.doc->'product'->'metrics'->'weight', '[]'::jsonb)
+        ) WITH ORDINALITY AS items(item, item_ord)
+        -- CHECK IF ANY FIELD IS NOT NULL
+        WHERE COALESCE(items.item->>'value', items.item->>'unit', '') <> ''
+        UNION ALL
+        SELECT
+            docs.ord, kinds.kind_ord, 1,
+            docs.doc->'product'->'metrics'->kinds.metric_type->>'value',
+            docs.doc->'product'->'metrics'->kinds.metric_type->>'unit',
+            kinds.metric_type
+        FROM jsonb_array_elements(input_jsons) WITH ORDINALITY AS docs(doc, ord)
+        CROSS JOIN (VALUES (2, 'density'), (3, 'volume')) AS kinds(kind_ord, metric_type)
+        WHERE docs.doc->'product'->'metrics'->kinds.metric_type->>'value' IS NOT NULL
+    ) AS metric_rows;
+
+    -- Insert the units read for the first time, once each
+    INSERT INTO "fertiscan_0.0.19".unit (unit, to_si_unit)
+    SELECT DISTINCT ON (lower(new_units.unit))
+        new_units.unit,
+        NULL
+    FROM jsonb_array_elements(metrics) WITH ORDINALITY AS metric_rows(metric, position)
+    CROSS JOIN LATERAL (SELECT metric_rows.metric->>'unit' AS unit) AS new_units
+    WHERE new_units.unit IS NOT NULL
+    AND NOT EXISTS (
+        SELECT 1 FROM "fertiscan_0.0.19".unit WHERE unit.unit ILIKE new_units.unit
+    )
+    ORDER BY lower(new_units.unit), metric_rows.position;
+
+    INSERT INTO "fertiscan_0.0.19".metric (value, unit_id, edited, metric_type, label_id)
+    SELECT
+        (metric_rows.metric->>'value')::float,
+        units.id,
+        FALSE,
+        (metric_rows.metric->>'metric_type')::"fertiscan_0.0.19".metric_type,
+        label_ids[(metric_rows.metric->>'ord')::int]
+    FROM jsonb_array_elements(metrics) WITH ORDINALITY AS metric_rows(metric, position)
+    LEFT JOIN LATERAL (
+        SELECT unit.id
+        FROM "fertiscan_0.0.19".unit
+        WHERE unit.unit ILIKE metric_rows.metric->>'unit'
+        LIMIT 1
+    ) AS units ON TRUE
+    ORDER BY metric_rows.position;
+-- METRICS END
+
+-- INGREDIENTS
+    INSERT INTO "fertiscan_0.0.19".ingredient (
+        organic, active, name, value, unit, edited, label_id, language
+    )
+    SELECT
+        NULL, --We cant tell atm
+        NULL, --We cant tell atm
+        items.item->>'name',
+        (items.item->>'value')::float,
+        items.item->>'unit',
+        FALSE, --preset
+        label_ids[docs.ord],
+        languages.lang::"fertiscan_0.0.19".language
+    FROM jsonb_array_elements(input_jsons) WITH ORDINALITY AS docs(doc, ord)
+    CROSS JOIN LATERAL jsonb_object_keys(docs.doc->'ingredients') WITH ORDINALITY AS languages(lang, lang_ord)
+    CROSS JOIN LATERAL jsonb_array_elements(docs.doc->'ingredients'->languages.lang) WITH ORDINALITY AS items(item, item_ord)
+    -- Check if ANY field is not null
+    WHERE COALESCE(items.item->>'name', items.item->>'value', items.item->>'unit', '') <> ''
+    ORDER BY docs.ord, languages.lang_ord, items.item_ord;
+-- INGREDIENTS END
+
+-- SUB LABELS
+    FOR sub_type_rec IN
+        SELECT
+            sub_type.type_en,
+            jsonb_array_length(COALESCE(docs.doc -> sub_type.type_en -> 'en', '[]'::jsonb)) AS en_length,
+            jsonb_array_length(COALESCE(docs.doc -> sub_type.type_en -> 'fr', '[]'::jsonb)) AS fr_length
+        FROM jsonb_array_elements(input_jsons) AS docs(doc)
+        CROSS JOIN "fertiscan_0.0.19".sub_type
+    LOOP
+        IF sub_type_rec.en_length != sub_type_rec.fr_length THEN
+            RAISE NOTICE 'Array length mismatch for sub_type: %, EN length: %, FR length: %',
+                sub_type_rec.type_en, sub_type_rec.en_length, sub_type_rec.fr_length;
+        END IF;
+    END LOOP;
+
+    -- Pair the French and English values by index up to the longest array
+    INSERT INTO "fertiscan_0.0.19".sub_label (
+        text_content_fr, text_content_en, label_id, edited, sub_type_id
+    )
+    SELECT
+        sub_types.fr_array->>positions.pos,
+        sub_types.en_array->>positions.pos,
+        label_ids[docs.ord],
+        FALSE,
+        sub_types.sub_type_id
+    FROM jsonb_array_elements(input_jsons) WITH ORDINALITY AS docs(doc, ord)
+    CROSS JOIN LATERAL (
+        SELECT
+            sub_type.id AS sub_type_id,
+            sub_type.type_en,
+            COALESCE(docs.doc -> sub_type.type_en -> 'en', '[]'::jsonb) AS en_array,
+            COALESCE(docs.doc -> sub_type.type_en -> 'fr', '[]'::jsonb) AS fr_array
+        FROM "fertiscan_0.0.19".sub_type
+    ) AS sub_types
+    CROSS JOIN LATERAL generate_series(
+        0,
+        GREATEST(jsonb_array_length(sub_types.fr_array), jsonb_array_length(sub_types.en_array)) - 1
+    ) AS positions(pos)
+    ORDER BY docs.ord, sub_types.type_en, positions.pos;
+-- SUB_LABEL END
+
+-- GUARANTEED
+    INSERT INTO "fertiscan_0.0.19".guaranteed (
+        read_name, value, unit, edited, label_id, element_id, language
+    )
+    SELECT
+        items.item->>'name',
+        (items.item->>'value')::float,
+        items.item->>'unit',
+        FALSE,
+        label_ids[docs.ord],
+        NULL, -- We arent handeling element_id yet
+        languages.lang
+    FROM jsonb_array_elements(input_jsons) WITH ORDINALITY AS docs(doc, ord)
+    CROSS JOIN unnest(enum_range(NULL::"fertiscan_0.0.19".LANGUAGE)) WITH ORDINALITY AS languages(lang, lang_ord)
+    CROSS JOIN LATERAL jsonb_array_elements(
+        COALESCE(docs.doc->'guaranteed_analysis'->(languages.lang::text), '[]'::jsonb)
+    ) WITH ORDINALITY AS items(item, item_ord)
+    -- Check if any of the fields are not null
+    WHERE COALESCE(items.item->>'name', items.item->>'value', items.item->>'unit', '') <> ''
+    ORDER BY docs.ord, languages.lang_ord, items.item_ord;
+-- GUARANTEED END
+
+-- REGISTRATION NUMBER
+    INSERT INTO "fertiscan_0.0.19".registration_number_information (
+        identifier, is_an_ingredient, name, label_id, edited
+    )
+    SELECT
+        items.item->>'registration_number',
+        (items.item->>'is_an_ingredient')::BOOLEAN,
+        NULL,
+        label_ids[docs.ord],
+        FALSE
+    FROM jsonb_array_elements(input_jsons) WITH ORDINALITY AS docs(doc, ord)
+    CROSS JOIN LATERAL jsonb_array_elements(
+        COALESCE(docs.doc-> 'product'-> 'registration_numbers', '[]'::jsonb)
+    ) WITH ORDINALITY AS items(item, item_ord)
+    -- Check make sure we dont create an empty registration number
+    WHERE COALESCE(items.item->>'registration_number', '') <> ''
+    ORDER BY docs.ord, items.item_ord;
+-- REGISTRATION NUMBER END
+
+-- ORGANIZATIONS INFO
+    -- The organizations that are not empty, the first one of each document
+    -- being its main contact
+    SELECT COALESCE(jsonb_agg(jsonb_build_object(
+        'ord', docs.ord,
+        'position', orgs.position,
+        'id', uuid_generate_v4(),
+        'is_main_contact', orgs.rank = 1,
+        'organization', orgs.organization
+    ) ORDER BY docs.ord, orgs.position), '[]'::jsonb)
+    INTO organizations
+    FROM jsonb_array_elements(input_jsons) WITH ORDINALITY AS docs(doc, ord)
+    CROSS JOIN LATERAL (
+        SELECT
+            items.organization,
+            items.position,
+            row_number() OVER (ORDER BY items.position) AS rank
+        FROM jsonb_array_elements(
+            COALESCE(docs.doc->'organizations', '[]'::jsonb)
+        ) WITH ORDINALITY AS items(organization, position)
+        -- Check if any of the fields are not null
+        WHERE COALESCE(items.organization->>'name',
+            items.organization->>'address',
+            items.organization->>'website',
+            items.organization->>'phone_number',
+            '') <> ''
+    ) AS orgs;
+
+    INSERT INTO "fertiscan_0.0.19".organization_information (
+        id, name, website, phone_number, address, edited, label_id, is_main_contact
+    )
+    SELECT
+        (orgs.org->>'id')::uuid,
+        orgs.org->'organization'->>'name',
+        orgs.org->'organization'->>'website',
+        orgs.org->'organization'->>'phone_number',
+        orgs.org->'organization'->>'address',
+        FALSE,
+        label_ids[(orgs.org->>'ord')::int],
+        (orgs.org->>'is_main_contact')::boolean
+    FROM jsonb_array_elements(organizations) WITH ORDINALITY AS orgs(org, position)
+    ORDER BY orgs.position;
+-- ORGANIZATIONS INFO END
+
+-- INSPECTION
+    INSERT INTO "fertiscan_0.0.19".inspection (
+        id, inspector_id, label_info_id, sample_id, picture_set_id, inspection_comment
+    )
+    SELECT
+        inspection_ids[docs.ord],
+        user_id,
+        label_ids[docs.ord],
+        NULL, -- NOT handled yet
+        (docs.doc->>'picture_set_id')::uuid,
+        NULL
+    FROM jsonb_array_elements(input_jsons) WITH ORDINALITY AS docs(doc, ord)
+    ORDER BY docs.ord;
+
+    -- Build the result of each document as new_inspection does: the ids of
+    -- its label, organizations and inspection are added to it
+    SELECT COALESCE(jsonb_agg(
+        jsonb_set(
+            jsonb_set(
+                jsonb_set(
+                    CASE WHEN jsonb_typeof(docs.doc->'organizations') = 'array' THEN
+                        jsonb_set(docs.doc, '{organizations}', (
+                            SELECT COALESCE(jsonb_agg(
+                                CASE
+                                    WHEN org_ids.org IS NULL THEN items.organization
+                                    WHEN (org_ids.org->>'is_main_contact')::boolean THEN
+                                        items.organization || jsonb_build_object(
+                                            'is_main_contact', TRUE, 'id', org_ids.org->'id'
+                                        )
+                                    ELSE items.organization || jsonb_build_object('id', org_ids.org->'id')
+                                END
+                                ORDER BY items.position
+                            ), '[]'::jsonb)
+                            FROM jsonb_array_elements(docs.doc->'organizations')
+                                WITH ORDINALITY AS items(organization, position)
+                            LEFT JOIN jsonb_array_elements(organizations) AS org_ids(org)
+                            ON (org_ids.org->>'ord')::int = docs.ord
+                            AND (org_ids.org->>'position')::int = items.position
+                        ))
+                    ELSE docs.doc
+                    END,
+                    '{product,label_id}', to_jsonb(label_ids[docs.ord])
+                ),
+                '{inspection_id}', to_jsonb(inspection_ids[docs.ord])
+            ),
+            '{inspection_comment}', to_jsonb(''::text)
+        )
+        ORDER BY docs.ord
+    ), '[]'::jsonb)
+    INTO results
+    FROM jsonb_array_elements(input_jsons) WITH ORDINALITY AS docs(doc, ord);
+
+    -- TODO: remove olap transactions from Operational transactions
+    -- Update the Inspection_factual entries with the json
+    UPDATE "fertiscan_0.0.19".inspection_factual
+    SET original_dataset = finals.doc
+    FROM jsonb_array_elements(results) WITH ORDINALITY AS finals(doc, ord)
+    WHERE inspection_factual.inspection_id = inspection_ids[finals.ord];
+
+    -- Build the read model of the inspections
+    PERFORM "fertiscan_0.0.19".refresh_inspection_snapshot(ids.id)
+    FROM unnest(inspection_ids) AS ids(id);
+-- INSPECTION END
+
+    RETURN results;
+END;
+$function$;
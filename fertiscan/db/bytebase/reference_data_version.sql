@@ -0,0 +1,54 @@
+-- Version stamp of the reference tables cached by fertiscan.db.queries.reference
+-- (element_compound, unit, sub_type, province and region). Every change to
+-- these tables increments the version and notifies the
+-- fertiscan_reference_data channel with the name of the schema.
+CREATE TABLE IF NOT EXISTS "fertiscan_0.0.19"."reference_data_version" (
+    "id" boolean PRIMARY KEY DEFAULT TRUE CHECK (id),
+    "version" bigint NOT NULL DEFAULT 0,
+    "updated_at" timestamp NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT INTO "fertiscan_0.0.19".reference_data_version (id) VALUES (TRUE)
+ON CONFLICT (id) DO NOTHING;
+
+CREATE OR REPLACE FUNCTION "fertiscan_0.0.19".bump_reference_data_version()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE "fertiscan_0.0.19".reference_data_version
+    SET version = version + 1, updated_at = CURRENT_TIMESTAMP;
+    -- Identical notifications of a transaction are delivered once
+    PERFORM pg_notify('fertiscan_reference_data', TG_TABLE_SCHEMA);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Row level, so the statements that change nothing (ex: INSERT ... ON CONFLICT DO NOTHING) do not bump the version
+DROP TRIGGER IF EXISTS reference_data_version_trigger ON "fertiscan_0.0.19".element_compound;
+CREATE TRIGGER reference_data_version_trigger
+AFTER INSERT OR UPDATE OR DELETE ON "fertiscan_0.0.19".element_compound
+FOR EACH ROW
+EXECUTE FUNCTION "fertiscan_0.0.19".bump_reference_data_version();
+
+DROP TRIGGER IF EXISTS reference_data_version_trigger ON "fertiscan_0.0.19".unit;
+CREATE TRIGGER reference_data_version_trigger
+AFTER INSERT OR UPDATE OR DELETE ON "fertiscan_0.0.19".unit
+FOR EACH ROW
+EXECUTE FUNCTION "fertiscan_0.0.19".bump_reference_data_version();
+
+DROP TRIGGER IF EXISTS reference_data_version_trigger ON "fertiscan_0.0.19".sub_type;
+CREATE TRIGGER reference_data_version_trigger
+AFTER INSERT OR UPDATE OR DELETE ON "fertiscan_0.0.19".sub_type
+FOR EACH ROW
+EXECUTE FUNCTION "fertiscan_0.0.19".bump_reference_data_version();
+
+DROP TRIGGER IF EXISTS reference_data_version_trigger ON "fertiscan_0.0.19".province;
+CREATE TRIGGER reference_data_version_trigger
+AFTER INSERT OR UPDATE OR DELETE ON "fertiscan_0.0.19".province
+FOR EACH ROW
+EXECUTE FUNCTION "fertiscan_0.0.19".bump_reference_data_version();
+
+DROP TRIGGER IF EXISTS reference_data_version_trigger ON "fertiscan_0.0.19".region;
+CREATE TRIGGER reference_data_version_trigger
+AFTER INSERT OR UPDATE OR DELETE ON "fertiscan_0.0.19".region
+FOR EACH ROW
+EXECUTE FUNCTION "fertiscan_0.0.19".bump_reference_data_version();
@@ -0,0 +1,13 @@
+-- Trigram indexes backing the inspection search (fertiscan.db.queries.search):
+-- partial, case insensitive matches on the product name, the registration
+-- numbers and the organization names of the labels.
+CREATE EXTENSION IF NOT EXISTS pg_trgm WITH SCHEMA public;
+
+CREATE INDEX IF NOT EXISTS label_information_product_name_trgm_idx
+    ON "fertiscan_0.0.19".label_information USING gin (product_name public.gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS registration_number_information_identifier_trgm_idx
+    ON "fertiscan_0.0.19".registration_number_information USING gin (identifier public.gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS organization_information_name_trgm_idx
+    ON "fertiscan_0.0.19".organization_information USING gin (name public.gin_trgm_ops);
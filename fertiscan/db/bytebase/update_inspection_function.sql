@@ -562,6 +562,9 @@ BEGIN
         );
     END IF;
 
+    -- Rebuild the read model of the inspection
+    PERFORM "fertiscan_0.0.19".refresh_inspection_snapshot(inspection_id);
+
     -- Return the updated JSON without fertilizer_id
     RETURN updated_json;
 
@@ -0,0 +1,175 @@
+SET search_path TO "fertiscan_0.0.19";
+
+-- Function to replace the sub labels of a single sub type: delete old and insert new
+CREATE OR REPLACE FUNCTION "fertiscan_0.0.19".update_sub_labels_of_type(
+    p_label_id uuid,
+    p_type_en text,
+    new_sub_label jsonb
+)
+RETURNS void AS $$
+DECLARE
+    sub_type_id_value uuid;
+BEGIN
+    SELECT id INTO sub_type_id_value FROM sub_type WHERE type_en = p_type_en;
+    IF sub_type_id_value IS NULL THEN
+        RAISE EXCEPTION 'Unknown sub type: %', p_type_en;
+    END IF;
+
+    DELETE FROM sub_label WHERE label_id = p_label_id AND sub_type_id = sub_type_id_value;
+
+    -- The french and english texts are paired by their position
+    INSERT INTO sub_label (text_content_fr, text_content_en, label_id, edited, sub_type_id)
+    SELECT
+        texts.fr,
+        texts.en,
+        p_label_id,
+        NULL,  -- not handled
+        sub_type_id_value
+    FROM ROWS FROM (
+        jsonb_array_elements_text(COALESCE(new_sub_label->'fr', '[]'::jsonb)),
+        jsonb_array_elements_text(COALESCE(new_sub_label->'en', '[]'::jsonb))
+    ) AS texts(fr, en);
+END;
+$$ LANGUAGE plpgsql;
+
+
+-- Function to upsert the fertilizer of a verified inspection from its stored label
+CREATE OR REPLACE FUNCTION "fertiscan_0.0.19".upsert_inspection_fertilizer(
+    p_inspection_id uuid,
+    p_label_id uuid
+)
+RETURNS void AS $$
+DECLARE
+    org_info_id uuid;
+    organization_id uuid;
+BEGIN
+    -- The main contact, or the only organization of the label
+    SELECT id INTO org_info_id
+    FROM organization_information
+    WHERE label_id = p_label_id
+    ORDER BY is_main_contact DESC
+    LIMIT 1;
+    IF org_info_id IS NULL THEN
+        RAISE WARNING 'at least one Organization information is required for a verified inspection';
+    ELSIF (SELECT count(*) FROM organization_information WHERE label_id = p_label_id) > 1
+        AND NOT (SELECT is_main_contact FROM organization_information WHERE id = org_info_id) THEN
+        RAISE WARNING 'Main contact organization information is required and was not found';
+    ELSE
+        organization_id := upsert_organization(org_info_id);
+    END IF;
+
+    PERFORM upsert_fertilizer(
+        (SELECT product_name FROM label_information WHERE id = p_label_id),
+        (
+            SELECT identifier
+            FROM registration_number_information
+            WHERE label_id = p_label_id AND is_an_ingredient
+            LIMIT 1
+        ),
+        organization_id,
+        p_inspection_id
+    );
+END;
+$$ LANGUAGE plpgsql;
+
+
+drop FUNCTION IF EXISTS "fertiscan_0.0.19".update_inspection_sections;
+-- Function to update only the given sections of an inspection.
+-- The update is rejected with the FS409 error code if the inspection was
+-- updated since p_expected_updated_at (optimistic concurrency).
+-- Returns the new updated_at of the inspection.
+CREATE OR REPLACE FUNCTION "fertiscan_0.0.19".update_inspection_sections(
+    p_inspection_id uuid,
+    p_inspector_id uuid,
+    p_expected_updated_at timestamp,
+    p_sections jsonb
+)
+RETURNS timestamp AS $$
+DECLARE
+    inspection_row "fertiscan_0.0.19".inspection%ROWTYPE;
+    section_name text;
+BEGIN
+    -- Lock the inspection until the end of the transaction
+    SELECT * INTO inspection_row
+    FROM inspection
+    WHERE id = p_inspection_id
+    FOR UPDATE;
+    IF NOT FOUND OR inspection_row.inspector_id != p_inspector_id THEN
+        RAISE EXCEPTION 'Unauthorized: Inspector ID mismatch or inspection not found';
+    END IF;
+    IF inspection_row.updated_at IS DISTINCT FROM p_expected_updated_at THEN
+        RAISE EXCEPTION 'Inspection % was updated at %, expected %',
+            p_inspection_id, inspection_row.updated_at, p_expected_updated_at
+            USING ERRCODE = 'FS409';
+    END IF;
+    IF p_sections IS NULL OR p_sections = '{}'::jsonb THEN
+        RETURN inspection_row.updated_at;
+    END IF;
+
+    FOR section_name IN SELECT jsonb_object_keys(p_sections)
+    LOOP
+        CASE section_name
+        WHEN 'product' THEN
+            UPDATE label_information
+            SET
+                product_name = p_sections->'product'->>'name',
+                lot_number = p_sections->'product'->>'lot_number',
+                npk = p_sections->'product'->>'npk',
+                n = (NULLIF(p_sections->'product'->>'n', '')::float),
+                p = (NULLIF(p_sections->'product'->>'p', '')::float),
+                k = (NULLIF(p_sections->'product'->>'k', '')::float),
+                record_keeping = (p_sections->'product'->>'record_keeping')::boolean
+            WHERE id = inspection_row.label_info_id;
+        WHEN 'metrics' THEN
+            PERFORM update_metrics(inspection_row.label_info_id, p_sections->'metrics');
+        WHEN 'registration_numbers' THEN
+            PERFORM update_registration_number(
+                inspection_row.label_info_id, p_sections->'registration_numbers'
+            );
+        WHEN 'organizations' THEN
+            PERFORM upsert_organization_info(
+                p_sections->'organizations', inspection_row.label_info_id
+            );
+        WHEN 'guaranteed_analysis' THEN
+            UPDATE label_information
+            SET
+                guaranteed_title_en = p_sections->'guaranteed_analysis'->'title'->>'en',
+                guaranteed_title_fr = p_sections->'guaranteed_analysis'->'title'->>'fr',
+                title_is_minimal = (p_sections->'guaranteed_analysis'->>'is_minimal')::boolean
+            WHERE id = inspection_row.label_info_id;
+            PERFORM update_guaranteed(
+                inspection_row.label_info_id, p_sections->'guaranteed_analysis'
+            );
+        WHEN 'ingredients' THEN
+            PERFORM update_ingredients(inspection_row.label_info_id, p_sections->'ingredients');
+        WHEN 'cautions', 'instructions' THEN
+            PERFORM update_sub_labels_of_type(
+                inspection_row.label_info_id, section_name, p_sections->section_name
+            );
+        WHEN 'inspection' THEN
+            UPDATE inspection
+            SET
+                verified = COALESCE((p_sections->'inspection'->>'verified')::boolean, FALSE),
+                inspection_comment = p_sections->'inspection'->>'inspection_comment',
+                picture_set_id = (p_sections->'inspection'->>'picture_set_id')::uuid
+            WHERE id = p_inspection_id;
+        ELSE
+            RAISE EXCEPTION 'Unknown inspection section: %', section_name;
+        END CASE;
+    END LOOP;
+
+    UPDATE inspection
+    SET updated_at = clock_timestamp()
+    WHERE id = p_inspection_id
+    RETURNING * INTO inspection_row;
+
+    IF inspection_row.verified THEN
+        PERFORM upsert_inspection_fertilizer(p_inspection_id, inspection_row.label_info_id);
+    END IF;
+
+    -- Rebuild the read model of the inspection
+    PERFORM "fertiscan_0.0.19".refresh_inspection_snapshot(p_inspection_id);
+
+    RETURN inspection_row.updated_at;
+END;
+$$ LANGUAGE plpgsql;
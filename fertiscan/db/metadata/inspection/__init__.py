@@ -4,6 +4,7 @@ The metadata is generated in a json format and is used to store the metadata in
 
 """
 
+import json
 from datetime import datetime
 from typing import List, Optional
 
@@ -25,7 +26,7 @@ from fertiscan.db.queries import (
     registration_number,
     sub_label,
 )
-from fertiscan.db.queries.errors import QueryError
+from fertiscan.db.queries.errors import LabelInformationNotFoundError, QueryError
 
 
 class ValidatedModel(BaseModel):
@@ -356,9 +357,99 @@ def build_inspection_import(analysis_form: dict, user_id, picture_set_id: UUID4)
         raise BuildInspectionImportError(f"Unexpected error: {e}") from e
 
 
-def build_inspection_export(cursor, inspection_id) -> str:
+def build_inspection_export(cursor, inspection_id, inspection_json: dict = None) -> str:
     """
     This funtion build an inspection json object from the database.
+    The whole inspection is fetched with a single get_inspection_json query,
+    unless its result is already given as inspection_json.
+    """
+    try:
+        if inspection_json is None:
+            inspection_json = inspection.get_inspection_json(cursor, inspection_id)
+        return build_inspection_export_from_json(inspection_json)
+    except QueryError as e:
+        raise BuildInspectionExportError(f"Error fetching data: {e}") from e
+    except Exception as e:
+        raise BuildInspectionImportError(f"Unexpected error: {e}") from e
+
+
+def build_inspection_export_from_json(inspection_json: dict) -> str:
+    """
+    This funtion build an inspection json object from the document returned
+    by the get_inspection_json database function, validating it once.
+
+    Parameters:
+    - inspection_json (dict): The document returned by get_inspection_json.
+
+    Returns:
+    - The inspection in a string format.
+    """
+    db_inspection = DBInspection.model_validate(inspection_json["inspection"])
+    if inspection_json.get("product") is None:
+        raise LabelInformationNotFoundError(
+            "Error: could not get the label information: "
+            + str(db_inspection.label_info_id)
+        )
+
+    # get the label information
+    product_info = ProductInformation(**inspection_json["product"])
+
+    # get metrics information
+    metrics = Metrics.model_validate(inspection_json.get("metrics"))
+    metrics.volume = metrics.volume or Metric()
+    metrics.density = metrics.density or Metric()
+    product_info.metrics = metrics
+
+    # Retrieve the registration numbers
+    product_info.registration_numbers = [
+        RegistrationNumber.model_validate(reg_number)
+        for reg_number in inspection_json.get("registration_numbers") or []
+    ]
+
+    # get the organizations information (Company and Manufacturer)
+    org_list = [
+        OrganizationInformation.model_validate(org)
+        for org in inspection_json.get("organizations") or []
+    ]
+
+    # Get all the sub labels
+    sub_labels = inspection_json.get("sub_labels") or {}
+    cautions = SubLabel.model_validate(sub_labels.get("cautions"))
+    instructions = SubLabel.model_validate(sub_labels.get("instructions"))
+
+    # Get the guaranteed analysis
+    guaranteed_analysis = GuaranteedAnalysis.model_validate(
+        inspection_json.get("guaranteed_analysis")
+    )
+
+    # Get the ingredients but if the fertilizer is record keeping, the ingredients are not displayed
+    if not product_info.record_keeping:
+        ingredients = ValuesObjects.model_validate(inspection_json.get("ingredients"))
+    else:
+        ingredients = ValuesObjects(en=[], fr=[])
+
+    inspection_formatted = Inspection(
+        inspection_id=str(db_inspection.id),
+        inspector_id=str(db_inspection.inspector_id),
+        inspection_comment=db_inspection.inspection_comment,
+        cautions=cautions,
+        organizations=org_list,
+        guaranteed_analysis=guaranteed_analysis,
+        instructions=instructions,
+        product=product_info,
+        verified=db_inspection.verified,
+        ingredients=ingredients,
+        picture_set_id=db_inspection.picture_set_id,
+    )
+
+    return inspection_formatted.model_dump_json()
+
+
+def build_inspection_export_from_sections(cursor, inspection_id) -> str:
+    """
+    This funtion build an inspection json object from the database, with one
+    query per section of the inspection. It does not use get_inspection_json,
+    so it can be used to check the documents built by it.
     """
     try:
         label_info_id = inspection.get_inspection(cursor, inspection_id)[
@@ -434,6 +525,80 @@ def build_inspection_export(cursor, inspection_id) -> str:
         raise BuildInspectionImportError(f"Unexpected error: {e}") from e
 
 
+def check_inspection_snapshot(cursor, inspection_id) -> list:
+    """
+    This function compares the stored inspection_snapshot of an inspection
+    with the export built by build_inspection_export_from_sections. The
+    snapshot is a get_inspection_json document, so it is compared with the
+    per-section queries rather than with get_inspection_json itself.
+
+    Parameters:
+    - cursor (cursor): The cursor of the database.
+    - inspection_id (str): The UUID of the inspection.
+
+    Returns:
+    - The list of the top level fields that differ, ["snapshot"] if the
+      snapshot is missing, or an empty list if the snapshot is consistent.
+    """
+    stored = inspection.get_stored_inspection_snapshot(cursor, inspection_id)
+    if stored is None:
+        return ["snapshot"]
+    expected = json.loads(build_inspection_export_from_sections(cursor, inspection_id))
+    try:
+        actual = json.loads(build_inspection_export_from_json(stored[0]))
+    except Exception:
+        return ["snapshot"]
+    return [
+        key
+        for key in sorted(set(expected) | set(actual))
+        if expected.get(key) != actual.get(key)
+    ]
+
+
+# Fields of ProductInformation stored in label_information, the other fields
+# of the product are sections of their own or are not updated
+PRODUCT_SECTION_FIELDS = {"name", "lot_number", "npk", "n", "p", "k", "record_keeping"}
+
+# Fields of Inspection stored in the inspection table
+INSPECTION_SECTION_FIELDS = {"verified", "inspection_comment", "picture_set_id"}
+
+
+def diff_inspection_sections(current: Inspection, updated: Inspection) -> dict:
+    """
+    This function compares two versions of an inspection section by section.
+
+    Parameters:
+    - current (Inspection): The inspection as it is stored.
+    - updated (Inspection): The inspection as it should be.
+
+    Returns:
+    - A dict of the updated value of each section that changed, in the format
+      expected by the update_inspection_sections database function.
+    """
+    current_json = current.model_dump(mode="json")
+    updated_json = updated.model_dump(mode="json")
+    sections = {
+        "product": lambda i: {
+            k: v for k, v in i["product"].items() if k in PRODUCT_SECTION_FIELDS
+        },
+        "metrics": lambda i: i["product"]["metrics"],
+        "registration_numbers": lambda i: i["product"]["registration_numbers"],
+        "organizations": lambda i: i["organizations"],
+        "guaranteed_analysis": lambda i: i["guaranteed_analysis"],
+        "ingredients": lambda i: i["ingredients"],
+        "cautions": lambda i: i["cautions"],
+        "instructions": lambda i: i["instructions"],
+        "inspection": lambda i: {
+            k: v for k, v in i.items() if k in INSPECTION_SECTION_FIELDS
+        },
+    }
+    return {
+        name: section(updated_json)
+        for name, section in sections.items()
+        if section(current_json) != section(updated_json)
+    }
+
+
 def split_value_unit(value_unit: str) -> dict:
     """
     This function splits the value and unit from a string.
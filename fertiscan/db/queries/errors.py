@@ -23,6 +23,7 @@ Query exceptions hierarchy:
 Each QueryError sub type exception also has specific errors sub types related to creation, retrieval, updating, and deletion, as well as a 'not found' error.
 """
 
+import inspect
 from functools import wraps
 
 from psycopg import Error
@@ -64,6 +65,12 @@ class InspectionRetrievalError(InspectionQueryError):
     pass
 
 
+class InspectionConflictError(InspectionUpdateError):
+    """Raised when an inspection was updated since it was read."""
+
+    pass
+
+
 class InspectionDeleteError(InspectionQueryError):
     """Raised when an error occurs during the deletion of an inspection."""
 
@@ -609,6 +616,21 @@ def handle_query_errors(error_cls=QueryError):
     """Decorator for handling query errors."""
 
     def decorator(func):
+        if inspect.iscoroutinefunction(func):
+
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                try:
+                    return await func(*args, **kwargs)
+                except QueryError:
+                    raise
+                except Error as db_error:
+                    raise error_cls(f"Database error: {db_error}") from db_error
+                except Exception as e:
+                    raise error_cls(f"Unexpected error: {e}") from e
+
+            return async_wrapper
+
         @wraps(func)
         def wrapper(*args, **kwargs):
             try:
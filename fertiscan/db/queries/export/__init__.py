@@ -0,0 +1,222 @@
+"""
+This module represent the bulk export of the inspections for analytics.
+
+Each exported table is read with a server-side cursor, so the rows are
+streamed in batches instead of being loaded in memory at once. The rows of
+every table carry the id of their inspection and can be restricted to the
+inspections updated in a time window, which is how an export is made
+incremental. As inspection.updated_at is the start time of the writing
+transaction, a window must overlap the previous one to catch the
+transactions committed after it was exported; the inspections already
+exported in the overlap are excluded by their (id, updated_at).
+"""
+
+from psycopg import Connection, Cursor
+
+from fertiscan.db.queries.errors import (
+    InspectionQueryError,
+    InspectionRetrievalError,
+    handle_query_errors,
+)
+
+# Restricts the rows to the inspections updated in (since, until] that are
+# not already exported at the same updated_at
+_UPDATED_FILTER = """
+        (%(since)s::timestamp IS NULL OR inspection.updated_at > %(since)s::timestamp)
+        AND (%(until)s::timestamp IS NULL OR inspection.updated_at <= %(until)s::timestamp)
+        AND NOT EXISTS (
+            SELECT 1
+            FROM unnest(%(exported_ids)s::uuid[], %(exported_at)s::timestamp[])
+                AS exported(id, updated_at)
+            WHERE exported.id = inspection.id
+            AND exported.updated_at = inspection.updated_at
+        )
+"""
+
+EXPORT_QUERIES = {
+    "inspection": """
+        SELECT
+            inspection.id AS inspection_id,
+            inspection.verified,
+            inspection.upload_date,
+            inspection.updated_at,
+            inspection.verified_date,
+            inspection.inspector_id,
+            inspection.label_info_id AS label_id,
+            inspection.picture_set_id,
+            inspection.sample_id,
+            inspection.inspection_comment
+        FROM
+            inspection
+        WHERE
+            {filter}
+        """,
+    "label_information": """
+        SELECT
+            inspection.id AS inspection_id,
+            label_information.id AS label_id,
+            label_information.product_name,
+            label_information.lot_number,
+            label_information.npk,
+            label_information.n,
+            label_information.p,
+            label_information.k,
+            label_information.guaranteed_title_en,
+            label_information.guaranteed_title_fr,
+            label_information.title_is_minimal,
+            label_information.record_keeping
+        FROM
+            inspection
+        JOIN
+            label_information ON label_information.id = inspection.label_info_id
+        WHERE
+            {filter}
+        """,
+    "guaranteed": """
+        SELECT
+            inspection.id AS inspection_id,
+            guaranteed.id AS guaranteed_id,
+            guaranteed.read_name,
+            guaranteed.value,
+            guaranteed.unit,
+            guaranteed.language::text AS language,
+            element_compound.symbol AS element_symbol,
+            guaranteed.edited
+        FROM
+            inspection
+        JOIN
+            guaranteed ON guaranteed.label_id = inspection.label_info_id
+        LEFT JOIN
+            element_compound ON element_compound.id = guaranteed.element_id
+        WHERE
+            {filter}
+        """,
+    "metric": """
+        SELECT
+            inspection.id AS inspection_id,
+            metric.id AS metric_id,
+            metric.metric_type::text AS metric_type,
+            metric.value,
+            unit.unit,
+            unit.to_si_unit,
+            metric.edited
+        FROM
+            inspection
+        JOIN
+            metric ON metric.label_id = inspection.label_info_id
+        LEFT JOIN
+            unit ON unit.id = metric.unit_id
+        WHERE
+            {filter}
+        """,
+    "organization_information": """
+        SELECT
+            inspection.id AS inspection_id,
+            organization_information.id AS organization_information_id,
+            organization_information.name,
+            organization_information.website,
+            organization_information.phone_number,
+            organization_information.address,
+            organization_information.is_main_contact,
+            organization_information.edited
+        FROM
+            inspection
+        JOIN
+            organization_information ON organization_information.label_id = inspection.label_info_id
+        WHERE
+            {filter}
+        """,
+}
+
+
+@handle_query_errors(InspectionRetrievalError)
+def get_export_high_water_mark(cursor: Cursor):
+    """
+    This function gets the latest update time of the inspections. An export
+    bounded by it can be continued by the next one from this time on.
+
+    Parameters:
+    - cursor (Cursor): The database cursor.
+
+    Returns:
+    - The greatest inspection.updated_at, None if there is no inspection.
+    """
+    cursor.execute("SELECT max(updated_at) FROM inspection")
+    return cursor.fetchone()[0]
+
+
+@handle_query_errors(InspectionRetrievalError)
+def get_inspection_versions(cursor: Cursor, since, until) -> list:
+    """
+    This function gets the inspections updated in (since, until], which an
+    export of this window has written. They are excluded from the next
+    export when its window overlaps this one.
+
+    Parameters:
+    - cursor (Cursor): The database cursor.
+    - since (datetime): The exclusive start of the window.
+    - until (datetime): The inclusive end of the window.
+
+    Returns:
+    - A list of tuples (inspection_id, updated_at).
+    """
+    query = """
+        SELECT 
+            id, 
+            updated_at
+        FROM 
+            inspection
+        WHERE 
+            updated_at > %s AND updated_at <= %s
+        """
+    cursor.execute(query, (since, until))
+    return cursor.fetchall()
+
+
+def iter_export_batches(
+    connection: Connection,
+    table: str,
+    batch_size: int = 10000,
+    since=None,
+    until=None,
+    exclude=None,
+):
+    """
+    This function streams the rows of an exported table with a server-side
+    cursor. It must be called within a transaction, which the cursor lives in.
+
+    Parameters:
+    - connection (Connection): The connection to the database.
+    - table (str): The exported table, one of EXPORT_QUERIES.
+    - batch_size (int, optional): The number of rows of each batch. Default is 10000.
+    - since (datetime, optional): Only export the inspections updated after it.
+    - until (datetime, optional): Only export the inspections updated at or before it.
+    - exclude (list, optional): The (inspection_id, updated_at) already exported,
+      as returned by get_inspection_versions.
+
+    Yields:
+    - A tuple (columns, rows) per batch, where columns is the cursor description.
+    """
+    if table not in EXPORT_QUERIES:
+        raise InspectionQueryError(
+            f"Unknown export table: {table}. Expected one of {list(EXPORT_QUERIES)}"
+        )
+    try:
+        with connection.cursor(name=f"export_{table}") as cursor:
+            cursor.itersize = batch_size
+            exclude = exclude or []
+            cursor.execute(
+                EXPORT_QUERIES[table].format(filter=_UPDATED_FILTER),
+                {
+                    "since": since,
+                    "until": until,
+                    "exported_ids": [str(id) for id, _ in exclude],
+                    "exported_at": [updated_at for _, updated_at in exclude],
+                },
+            )
+            while rows := cursor.fetchmany(batch_size):
+                yield cursor.description, rows
+    except InspectionQueryError:
+        raise
+    except Exception as e:
+        raise InspectionRetrievalError(f"Export of {table} failed: {e}") from e
@@ -6,11 +6,12 @@ This module represent the function for the table inspection:
 import json
 from uuid import UUID
 
-from psycopg import Cursor
+from psycopg import Cursor, Error
 from psycopg.rows import dict_row
-from psycopg.sql import SQL
+from psycopg.sql import SQL, Identifier
 
 from fertiscan.db.queries.errors import (
+    InspectionConflictError,
     InspectionCreationError,
     InspectionDeleteError,
     InspectionNotFoundError,
@@ -74,6 +75,33 @@ def new_inspection_with_label_info(cursor: Cursor, user_id, label_json):
     return cursor.fetchone()[0]
 
 
+@handle_query_errors(InspectionCreationError)
+def new_inspections_with_label_info(cursor: Cursor, user_id, label_jsons: list) -> list:
+    """
+    This function calls the new_inspections function within the database to
+    register several inspections of a user in a single query.
+
+    Parameters:
+    - cursor (cursor): The cursor of the database.
+    - user_id (str): The UUID of the user.
+    - label_jsons (list): The label information of each inspection in a json format.
+
+    Returns:
+    - The list of the json with ids of each inspection, in the order of label_jsons.
+    """
+    if not label_jsons:
+        return []
+    query = """
+        SELECT new_inspections(%s, %s::jsonb)
+        """
+    documents = [
+        json.loads(label_json) if isinstance(label_json, str) else label_json
+        for label_json in label_jsons
+    ]
+    cursor.execute(query, (user_id, json.dumps(documents)))
+    return cursor.fetchone()[0]
+
+
 @handle_query_errors(InspectionQueryError)
 def is_a_inspection_id(cursor: Cursor, inspection_id) -> bool:
     """
@@ -193,6 +221,155 @@ def get_inspection_dict(cursor: Cursor, inspection_id: str | UUID):
         return dict_cursor.fetchone()
 
 
+@handle_query_errors(InspectionRetrievalError)
+def get_inspection_json(cursor: Cursor, inspection_id: str | UUID) -> dict:
+    """
+    This function gets a whole inspection, with its label information,
+    metrics, registration numbers, organizations, sub labels, guaranteed
+    analysis and ingredients, in a single query.
+
+    Parameters:
+    - cursor (Cursor): The database cursor.
+    - inspection_id (str): The UUID of the inspection.
+
+    Returns:
+    - The inspection as a dictionary with the "inspection" row and one key per section.
+    """
+    query = """
+        SELECT get_inspection_json(%s);
+        """
+    cursor.execute(query, (str(inspection_id),))
+    if (result := cursor.fetchone()) and result[0] is not None:
+        return result[0]
+    raise InspectionNotFoundError(f"Inspection with id {inspection_id} not found")
+
+
+@handle_query_errors(InspectionRetrievalError)
+def get_inspection_snapshot(cursor: Cursor, inspection_id: str | UUID) -> dict:
+    """
+    This function gets the inspection_snapshot read model of an inspection.
+    When the snapshot is missing or stale, the inspection is built from the
+    normalized tables as with get_inspection_json, without writing anything:
+    snapshots are only rebuilt by the write paths and by
+    refresh_inspection_snapshots.
+
+    Parameters:
+    - cursor (Cursor): The database cursor.
+    - inspection_id (str): The UUID of the inspection.
+
+    Returns:
+    - The inspection as returned by get_inspection_json.
+    """
+    query = """
+        SELECT get_inspection_snapshot(%s);
+        """
+    cursor.execute(query, (str(inspection_id),))
+    if (result := cursor.fetchone()) and result[0] is not None:
+        return result[0]
+    raise InspectionNotFoundError(f"Inspection with id {inspection_id} not found")
+
+
+@handle_query_errors(InspectionRetrievalError)
+def get_stored_inspection_snapshot(cursor: Cursor, inspection_id: str | UUID):
+    """
+    This function gets the inspection_snapshot row of an inspection as it is
+    stored, without checking its freshness.
+
+    Parameters:
+    - cursor (Cursor): The database cursor.
+    - inspection_id (str): The UUID of the inspection.
+
+    Returns:
+    - A tuple (snapshot, is_fresh), or None if the inspection has no snapshot.
+    """
+    query = """
+        SELECT 
+            inspection_snapshot.snapshot,
+            inspection_snapshot.inspection_updated_at IS NOT DISTINCT FROM inspection.updated_at
+        FROM 
+            inspection_snapshot
+        JOIN
+            inspection
+        ON
+            inspection_snapshot.inspection_id = inspection.id
+        WHERE 
+            inspection_snapshot.inspection_id = %s
+        """
+    cursor.execute(query, (str(inspection_id),))
+    return cursor.fetchone()
+
+
+@handle_query_errors(InspectionUpdateError)
+def refresh_inspection_snapshots(cursor: Cursor, inspection_ids: list) -> int:
+    """
+    This function rebuilds the inspection_snapshot of the given inspections.
+
+    Parameters:
+    - cursor (Cursor): The database cursor.
+    - inspection_ids (list): The UUIDs of the inspections.
+
+    Returns:
+    - The number of snapshots rebuilt.
+    """
+    if not inspection_ids:
+        return 0
+    query = """
+        SELECT 
+            refresh_inspection_snapshot(ids.id)
+        FROM 
+            unnest(%s::uuid[]) AS ids(id)
+        """
+    cursor.execute(query, ([str(id) for id in inspection_ids],))
+    return sum(1 for row in cursor.fetchall() if row[0] is not None)
+
+
+@handle_query_errors(InspectionQueryError)
+def get_inspection_ids_after(
+    cursor: Cursor, after_id=None, limit: int = 500, stale_only: bool = False
+) -> list:
+    """
+    This function gets a page of inspection ids ordered by id.
+
+    Parameters:
+    - cursor (Cursor): The database cursor.
+    - after_id (str, optional): The last id of the previous page.
+    - limit (int, optional): The size of the page. Default is 500.
+    - stale_only (bool, optional): Only return the inspections whose snapshot is missing or stale. Default is False.
+
+    Returns:
+    - The list of the inspection ids.
+    """
+    query = """
+        SELECT 
+            inspection.id
+        FROM 
+            inspection
+        LEFT JOIN
+            inspection_snapshot
+        ON
+            inspection_snapshot.inspection_id = inspection.id
+        WHERE 
+            (%(after_id)s::uuid IS NULL OR inspection.id > %(after_id)s::uuid)
+            AND (
+                NOT %(stale_only)s
+                OR inspection_snapshot.inspection_id IS NULL
+                OR inspection_snapshot.inspection_updated_at IS DISTINCT FROM inspection.updated_at
+            )
+        ORDER BY 
+            inspection.id
+        LIMIT %(limit)s
+        """
+    cursor.execute(
+        query,
+        {
+            "after_id": str(after_id) if after_id is not None else None,
+            "stale_only": stale_only,
+            "limit": limit,
+        },
+    )
+    return [row[0] for row in cursor.fetchall()]
+
+
 @handle_query_errors(InspectionQueryError)
 def get_inspection_original_dataset(cursor: Cursor, inspection_id):
     """
@@ -302,6 +479,229 @@ def get_all_user_inspection_filter_verified(cursor: Cursor, user_id, verified: b
     return cursor.fetchall()
 
 
+# Columns an inspection listing can be sorted on, the id breaks the ties
+INSPECTION_SORT_COLUMNS = ("updated_at", "upload_date")
+
+
+def _user_inspection_filters(
+    user_id,
+    verified: bool | None = None,
+    updated_from=None,
+    updated_to=None,
+    product_name_prefix: str | None = None,
+):
+    """
+    This function builds the WHERE clause shared by the listing of the
+    inspections of a user and its count estimate.
+
+    Returns:
+    - A tuple (conditions, params) of the SQL conditions and their parameters.
+    """
+    conditions = [SQL("inspection.inspector_id = %(user_id)s")]
+    params = {"user_id": user_id}
+    if verified is not None:
+        conditions.append(SQL("inspection.verified = %(verified)s"))
+        params["verified"] = verified
+    if updated_from is not None:
+        conditions.append(SQL("inspection.updated_at >= %(updated_from)s"))
+        params["updated_from"] = updated_from
+    if updated_to is not None:
+        conditions.append(SQL("inspection.updated_at < %(updated_to)s"))
+        params["updated_to"] = updated_to
+    if product_name_prefix:
+        # Matches the lower(product_name) text_pattern_ops index
+        conditions.append(
+            SQL("lower(label_info.product_name) LIKE %(product_name_pattern)s")
+        )
+        escaped = (
+            product_name_prefix.lower()
+            .replace("\\", "\\\\")
+            .replace("%", "\\%")
+            .replace("_", "\\_")
+        )
+        params["product_name_pattern"] = escaped + "%"
+    return conditions, params
+
+
+def _user_inspection_page_query(
+    user_id,
+    limit: int = 50,
+    after: tuple | None = None,
+    sort: str = "updated_at",
+    descending: bool = True,
+    verified: bool | None = None,
+    updated_from=None,
+    updated_to=None,
+    product_name_prefix: str | None = None,
+):
+    """
+    This function builds the query of get_user_inspection_page.
+
+    Returns:
+    - A tuple (query, params) of the query and its parameters.
+    """
+    if sort not in INSPECTION_SORT_COLUMNS:
+        raise InspectionQueryError(f"Cannot sort inspections on {sort}")
+    conditions, params = _user_inspection_filters(
+        user_id, verified, updated_from, updated_to, product_name_prefix
+    )
+    # Never NULL, so the row comparison of the keyset is total. The same
+    # expression as the indexes of inspection_listing_index.sql, inlined so
+    # the planner can use them.
+    column = SQL("COALESCE({}, '-infinity'::timestamp)").format(
+        Identifier("inspection", sort)
+    )
+    if after is not None:
+        comparison = SQL("<") if descending else SQL(">")
+        conditions.append(
+            SQL(
+                "({}, inspection.id) {} ("
+                "COALESCE(%(after_value)s::timestamp, '-infinity'::timestamp), "
+                "%(after_id)s::uuid)"
+            ).format(column, comparison)
+        )
+        params["after_value"], params["after_id"] = after
+    params["limit"] = limit
+    direction = SQL("DESC") if descending else SQL("ASC")
+    query = SQL(
+        """
+        SELECT 
+            inspection.id as inspection_id,
+            inspection.upload_date as upload_date,
+            inspection.updated_at as updated_at,
+            inspection.sample_id as sample_id,
+            inspection.picture_set_id as picture_set_id,
+            label_info.id as label_info_id,
+            label_info.product_name as product_name,
+            company_info.id as company_info_id,
+            company_info.name as company_name,
+            inspection.verified as verified
+        FROM 
+            inspection
+        LEFT JOIN 
+            label_information as label_info
+        ON
+            inspection.label_info_id = label_info.id
+        LEFT JOIN LATERAL (
+            SELECT 
+                id,
+                name
+            FROM 
+                organization_information
+            WHERE 
+                label_id = label_info.id AND is_main_contact = TRUE
+            LIMIT 1
+        ) as company_info ON TRUE
+        WHERE 
+            {conditions}
+        ORDER BY 
+            {column} {direction}, inspection.id {direction}
+        LIMIT %(limit)s
+        """
+    ).format(
+        conditions=SQL(" AND ").join(conditions),
+        column=column,
+        direction=direction,
+    )
+    return query, params
+
+
+@handle_query_errors(InspectionRetrievalError)
+def get_user_inspection_page(
+    cursor: Cursor,
+    user_id,
+    limit: int = 50,
+    after: tuple | None = None,
+    sort: str = "updated_at",
+    descending: bool = True,
+    verified: bool | None = None,
+    updated_from=None,
+    updated_to=None,
+    product_name_prefix: str | None = None,
+):
+    """
+    This function gets a page of the inspections of a user, ordered by the
+    sort column and the id. The next page is fetched by giving the sort
+    value and the id of the last row as after. Inspections without a sort
+    value are ordered as the oldest ones.
+
+    Parameters:
+    - cursor (cursor): The cursor of the database.
+    - user_id (str): The UUID of the user.
+    - limit (int, optional): The size of the page. Default is 50.
+    - after (tuple, optional): The (sort value, id) of the last row of the previous page, the sort value may be None.
+    - sort (str, optional): The column to sort on, one of INSPECTION_SORT_COLUMNS. Default is updated_at.
+    - descending (bool, optional): Sort the newest inspections first. Default is True.
+    - verified (bool, optional): Only return the inspections with this verified status.
+    - updated_from (datetime, optional): Only return the inspections updated at or after this date.
+    - updated_to (datetime, optional): Only return the inspections updated before this date.
+    - product_name_prefix (str, optional): Only return the labels whose product name starts with this prefix, ignoring case.
+
+    Returns:
+    - The inspections of the page, with the same columns as get_all_user_inspection_filter_verified.
+    """
+    query, params = _user_inspection_page_query(
+        user_id,
+        limit,
+        after,
+        sort,
+        descending,
+        verified,
+        updated_from,
+        updated_to,
+        product_name_prefix,
+    )
+    cursor.execute(query, params)
+    return cursor.fetchall()
+
+
+@handle_query_errors(InspectionQueryError)
+def estimate_user_inspection_count(
+    cursor: Cursor,
+    user_id,
+    verified: bool | None = None,
+    updated_from=None,
+    updated_to=None,
+    product_name_prefix: str | None = None,
+) -> int:
+    """
+    This function estimates the number of inspections of a user matching the
+    filters of get_user_inspection_page from the query planner statistics,
+    without counting the rows.
+
+    Parameters:
+    - cursor (cursor): The cursor of the database.
+    - user_id (str): The UUID of the user.
+    - The filters of get_user_inspection_page.
+
+    Returns:
+    - The estimated number of inspections.
+    """
+    conditions, params = _user_inspection_filters(
+        user_id, verified, updated_from, updated_to, product_name_prefix
+    )
+    query = SQL(
+        """
+        EXPLAIN (FORMAT JSON)
+        SELECT 
+            inspection.id
+        FROM 
+            inspection
+        LEFT JOIN 
+            label_information as label_info
+        ON
+            inspection.label_info_id = label_info.id
+        WHERE 
+            {conditions}
+        """
+    ).format(conditions=SQL(" AND ").join(conditions))
+    cursor.execute(query, params)
+    plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
 @handle_query_errors(InspectionRetrievalError)
 def get_all_user_inspection(cursor: Cursor, user_id):
     """
@@ -399,6 +799,53 @@ def update_inspection(
     raise InspectionUpdateError("Failed to update inspection. No data returned.")
 
 
+@handle_query_errors(InspectionUpdateError)
+def update_inspection_sections(
+    cursor: Cursor,
+    inspection_id: str | UUID,
+    user_id: str | UUID,
+    expected_updated_at,
+    sections: dict,
+):
+    """
+    Update only the given sections of an inspection in the database.
+
+    Parameters:
+    - cursor (Cursor): Database cursor for executing queries.
+    - inspection_id (str | UUID): UUID or string of the inspection to update.
+    - user_id (str | UUID): UUID or string of the user performing the update.
+    - expected_updated_at (datetime | str): The updated_at of the inspection when it was read.
+    - sections (dict): The new value of each changed section (product, metrics,
+      registration_numbers, organizations, guaranteed_analysis, ingredients,
+      cautions, instructions or inspection).
+
+    Returns:
+    - datetime: The new updated_at of the inspection.
+
+    Raises:
+    - InspectionConflictError: If the inspection was updated since expected_updated_at.
+    - InspectionUpdateError: Custom error for handling specific update issues.
+    """
+    query = SQL("SELECT update_inspection_sections(%s, %s, %s::timestamp, %s)")
+    try:
+        cursor.execute(
+            query,
+            (
+                str(inspection_id),
+                str(user_id),
+                expected_updated_at,
+                json.dumps(sections),
+            ),
+        )
+    except Error as e:
+        if e.sqlstate == "FS409":
+            raise InspectionConflictError(str(e.diag.message_primary)) from e
+        raise
+    if result := cursor.fetchone():
+        return result[0]
+    raise InspectionUpdateError("Failed to update inspection. No data returned.")
+
+
 @handle_query_errors(InspectionDeleteError)
 def delete_inspection(
     cursor: Cursor,
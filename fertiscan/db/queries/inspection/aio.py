@@ -0,0 +1,106 @@
+"""
+This module represent the functions for the table inspection used on the hot
+paths of the async API, written for psycopg AsyncCursor. See
+fertiscan.db.queries.inspection for the other functions.
+"""
+
+from uuid import UUID
+
+from psycopg import AsyncCursor
+
+from fertiscan.db.queries.errors import (
+    InspectionCreationError,
+    InspectionNotFoundError,
+    InspectionRetrievalError,
+    handle_query_errors,
+)
+from fertiscan.db.queries.inspection import _user_inspection_page_query
+
+
+@handle_query_errors(InspectionCreationError)
+async def is_inspection_verified(cursor: AsyncCursor, inspection_id):
+    """
+    This function checks if the inspection has been verified.
+
+    Parameters:
+    - cursor (AsyncCursor): The cursor of the database.
+    - inspection_id (str): The UUID of the inspection.
+
+    Returns:
+    - The value if the inspection has been verified.
+    """
+
+    query = """
+        SELECT 
+            verified
+        FROM 
+            inspection
+        WHERE 
+            id = %s
+        """
+    await cursor.execute(query, (inspection_id,))
+    if result := await cursor.fetchone():
+        return result[0]
+    raise InspectionNotFoundError(
+        "Failed to check inspection verification status. No data returned."
+    )
+
+
+@handle_query_errors(InspectionRetrievalError)
+async def get_inspection_snapshot(
+    cursor: AsyncCursor, inspection_id: str | UUID
+) -> dict:
+    """
+    This function gets the inspection_snapshot read model of an inspection,
+    see fertiscan.db.queries.inspection.get_inspection_snapshot.
+
+    Parameters:
+    - cursor (AsyncCursor): The database cursor.
+    - inspection_id (str): The UUID of the inspection.
+
+    Returns:
+    - The inspection as returned by get_inspection_json.
+    """
+    query = """
+        SELECT get_inspection_snapshot(%s);
+        """
+    await cursor.execute(query, (str(inspection_id),))
+    if (result := await cursor.fetchone()) and result[0] is not None:
+        return result[0]
+    raise InspectionNotFoundError(f"Inspection with id {inspection_id} not found")
+
+
+@handle_query_errors(InspectionRetrievalError)
+async def get_user_inspection_page(
+    cursor: AsyncCursor,
+    user_id,
+    limit: int = 50,
+    after: tuple | None = None,
+    sort: str = "updated_at",
+    descending: bool = True,
+    verified: bool | None = None,
+    updated_from=None,
+    updated_to=None,
+    product_name_prefix: str | None = None,
+):
+    """
+    This function gets a page of the inspections of a user, see
+    fertiscan.db.queries.inspection.get_user_inspection_page for the
+    parameters.
+
+    Returns:
+    - The inspections of the page, with the same columns as get_all_user_inspection_filter_verified.
+    """
+    query, params = _user_inspection_page_query(
+        user_id,
+        limit,
+        after,
+        sort,
+        descending,
+        verified,
+        updated_from,
+        updated_to,
+        product_name_prefix,
+    )
+    await cursor.execute(query, params)
+    return await cursor.fetchall()
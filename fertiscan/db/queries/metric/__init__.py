@@ -13,6 +13,7 @@ from fertiscan.db.queries.errors import (
     UnitQueryError,
     handle_query_errors,
 )
+from fertiscan.db.queries import reference
 
 
 @handle_query_errors(MetricQueryError)
@@ -228,6 +229,7 @@ def new_unit(cursor: Cursor, unit, to_si_unit):
             to_si_unit,
         ),
     )
+    reference.invalidate_reference_data()
     if result := cursor.fetchone():
         return result[0]
     raise UnitCreationError("Failed to create unit. No data returned.")
@@ -245,6 +247,9 @@ def is_a_unit(cursor: Cursor, unit):
     Returns:
     - boolean: if the unit exists.
     """
+    data = reference.get_reference_data(cursor)
+    if data is not None and unit in data["unit_ids"]:
+        return True
 
     query = """
         SELECT EXISTS(
@@ -272,6 +277,9 @@ def get_unit_id(cursor: Cursor, unit):
     Returns:
     - The UUID of the unit.
     """
+    data = reference.get_reference_data(cursor)
+    if data is not None and (unit_id := data["unit_ids"].get(unit)):
+        return unit_id
 
     query = """
         SELECT
@@ -15,6 +15,7 @@ from fertiscan.db.queries.errors import (
     MicronutrientRetrievalError,
     handle_query_errors,
 )
+from fertiscan.db.queries import reference
 
 
 @handle_query_errors(ElementCompoundCreationError)
@@ -39,6 +40,7 @@ def new_element(cursor: Cursor, number, name_fr, name_en, symbol):
         RETURNING id
         """
     cursor.execute(query, (number, name_fr, name_en, symbol))
+    reference.invalidate_reference_data()
     if result := cursor.fetchone():
         return result[0]
     raise ElementCompoundCreationError("Failed to create element. No data returned.")
@@ -48,6 +50,8 @@ def new_element(cursor: Cursor, number, name_fr, name_en, symbol):
 def get_element_id_full_search(cursor: Cursor, name):
     """
     This function get the element in the database.
+    The french and english names and the symbol are matched ignoring case and
+    accents, from the reference data cache first.
 
     Parameters:
     - cursor (cursor): The cursor of the database.
@@ -56,6 +60,9 @@ def get_element_id_full_search(cursor: Cursor, name):
     Returns:
     - str: The UUID of the element.
     """
+    data = reference.get_reference_data(cursor)
+    if data is not None and (element_id := reference.find_element_id(data, name)):
+        return element_id
 
     query = """
         SELECT id
@@ -82,6 +89,9 @@ def get_element_id_name(cursor: Cursor, name):
     Returns:
     - str: The UUID of the element.
     """
+    data = reference.get_reference_data(cursor)
+    if data is not None and (element_id := data["element_ids_by_name"].get(name)):
+        return element_id
 
     query = """
         SELECT 
@@ -112,6 +122,11 @@ def get_element_id_symbol(cursor: Cursor, symbol):
     Returns:
     - str: The UUID of the element.
     """
+    data = reference.get_reference_data(cursor)
+    if data is not None and (
+        element_id := data["element_ids_by_symbol"].get(symbol.casefold())
+    ):
+        return element_id
 
     query = """
         SELECT 
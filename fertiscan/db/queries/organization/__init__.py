@@ -25,6 +25,7 @@ from fertiscan.db.queries.errors import (
     RegionRetrievalError,
     handle_query_errors,
 )
+from fertiscan.db.queries import reference
 
 
 @handle_query_errors(OrganizationInformationCreationError)
@@ -587,6 +588,7 @@ def new_region(cursor: Cursor, name, province_id):
             name,
         ),
     )
+    reference.invalidate_reference_data()
     if result := cursor.fetchone():
         return result[0]
     raise RegionCreationError("Failed to create Region. No data returned.")
@@ -662,6 +664,11 @@ def get_region_by_province(cursor: Cursor, province_id):
     Returns:
     - dict: The region
     """
+    # The cached regions miss the uncommitted rows of an open transaction
+    if not reference.has_open_transaction(cursor):
+        data = reference.get_reference_data(cursor)
+        if data is not None and int(province_id) in data["regions_by_province"]:
+            return list(data["regions_by_province"][int(province_id)])
     query = """
         SELECT 
             id, 
@@ -699,6 +706,7 @@ def new_province(cursor: Cursor, name):
             id
         """
     cursor.execute(query, (name,))
+    reference.invalidate_reference_data()
     if result := cursor.fetchone():
         return result[0]
     raise ProvinceCreationError("Failed to create Province. No data returned.")
@@ -743,6 +751,11 @@ def get_all_province(cursor: Cursor):
     Returns:
     - dict: The province
     """
+    # The cached provinces miss the uncommitted rows of an open transaction
+    if not reference.has_open_transaction(cursor):
+        data = reference.get_reference_data(cursor)
+        if data is not None:
+            return list(data["provinces"])
     query = """
         SELECT 
             id, 
@@ -0,0 +1,200 @@
+"""
+This module represent the process-wide cache of the reference tables:
+element_compound, unit, sub_type, province and region.
+
+The tables are loaded in a single query and kept in memory per schema. Their
+version stamp (reference_data_version, incremented by a trigger on every
+change) is checked at most every REFERENCE_DATA_CHECK_INTERVAL seconds and
+the tables are reloaded when it changed. A process can also listen to the
+fertiscan_reference_data channel with watch_reference_data to drop the cache
+as soon as a change is committed.
+
+The data is only cached when it is loaded by a transaction that has not
+written anything yet, so uncommitted rows never end up in the cache. The
+lookup functions of the query modules fall back to the database on a miss.
+The functions returning whole lists (ex: every province) cannot detect a
+miss, so they only use the cache outside of a transaction, see
+has_open_transaction.
+"""
+
+import time
+import unicodedata
+from uuid import UUID
+
+from psycopg import Cursor
+from psycopg.pq import TransactionStatus
+
+from fertiscan.db.queries.errors import QueryError, handle_query_errors
+
+# Seconds between two checks of the version stamp of the reference tables
+REFERENCE_DATA_CHECK_INTERVAL = 30.0
+
+# Channel notified with the name of the schema when a reference table changes
+REFERENCE_DATA_CHANNEL = "fertiscan_reference_data"
+
+# One reference data per schema, see load_reference_data
+_reference_data: dict = {}
+
+
+def normalize_name(name: str) -> str:
+    """
+    This function returns the key of a name in the case and accent
+    insensitive lookups: "Azote ", "azote" and "AZOTÉ" have the same key.
+    """
+    decomposed = unicodedata.normalize("NFKD", name.strip())
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+
+def _schema_key(cursor: Cursor):
+    return getattr(cursor.connection, "_datastore_schema", None)
+
+
+def has_open_transaction(cursor: Cursor) -> bool:
+    """
+    This function tells if a transaction is open on the connection of the
+    cursor. Its uncommitted rows would be missing from the cached lists, and
+    telling whether it wrote anything would take a query as costly as reading
+    the list itself, so the lists are read from the database instead.
+    """
+    return cursor.connection.info.transaction_status != TransactionStatus.IDLE
+
+
+@handle_query_errors(QueryError)
+def load_reference_data(cursor: Cursor) -> dict | None:
+    """
+    This function loads every reference table in a single query and caches
+    them for the schema of the cursor.
+
+    Parameters:
+    - cursor (cursor): The cursor of the database.
+
+    Returns:
+    - The reference data, or None if the transaction of the cursor has
+      already written to the database, in which case nothing is cached.
+    """
+    query = """
+        SELECT
+            (SELECT version FROM reference_data_version),
+            pg_current_xact_id_if_assigned() IS NULL,
+            (
+                SELECT COALESCE(json_agg(json_build_array(id, number, name_fr, name_en, symbol) ORDER BY id), '[]')
+                FROM element_compound
+            ),
+            (
+                SELECT COALESCE(json_agg(json_build_array(id, unit, to_si_unit) ORDER BY unit), '[]')
+                FROM unit
+            ),
+            (
+                SELECT COALESCE(json_agg(json_build_array(id, type_fr, type_en) ORDER BY type_en), '[]')
+                FROM sub_type
+            ),
+            (
+                SELECT COALESCE(json_agg(json_build_array(id, name) ORDER BY id), '[]')
+                FROM province
+            ),
+            (
+                SELECT COALESCE(json_agg(json_build_array(id, province_id, name) ORDER BY name), '[]')
+                FROM region
+            )
+        """
+    cursor.execute(query)
+    version, is_clean, elements, units, sub_types, provinces, regions = (
+        cursor.fetchone()
+    )
+    if not is_clean:
+        return None
+
+    data = {
+        "version": version,
+        "checked_at": time.monotonic(),
+        "element_ids_by_name": {},
+        "element_ids_by_normalized_name": {},
+        "element_ids_by_symbol": {},
+        "unit_ids": {},
+        "sub_type_ids": {},
+        "provinces": [(province_id, name) for province_id, name in provinces],
+        "regions_by_province": {},
+    }
+    for element_id, _, name_fr, name_en, symbol in elements:
+        for name in (name_fr, name_en):
+            data["element_ids_by_name"].setdefault(name, element_id)
+            data["element_ids_by_normalized_name"].setdefault(
+                normalize_name(name), element_id
+            )
+        data["element_ids_by_symbol"].setdefault(symbol.casefold(), element_id)
+    for unit_id, unit, _ in units:
+        data["unit_ids"].setdefault(unit, UUID(unit_id))
+    for sub_type_id, type_fr, type_en in sub_types:
+        for type_name in (type_fr, type_en):
+            data["sub_type_ids"].setdefault(type_name.casefold(), UUID(sub_type_id))
+    for region_id, province_id, name in regions:
+        data["regions_by_province"].setdefault(province_id, []).append(
+            (UUID(region_id), province_id, name)
+        )
+    _reference_data[_schema_key(cursor)] = data
+    return data
+
+
+@handle_query_errors(QueryError)
+def get_reference_data(cursor: Cursor) -> dict | None:
+    """
+    This function returns the cached reference data of the schema of the
+    cursor, loading it if it is missing or if its version changed.
+
+    Parameters:
+    - cursor (cursor): The cursor of the database.
+
+    Returns:
+    - The reference data, or None if it is not cached and cannot be loaded
+      by the transaction of the cursor (see load_reference_data).
+    """
+    data = _reference_data.get(_schema_key(cursor))
+    if data is None:
+        return load_reference_data(cursor)
+    if time.monotonic() - data["checked_at"] > REFERENCE_DATA_CHECK_INTERVAL:
+        cursor.execute("SELECT version FROM reference_data_version")
+        if cursor.fetchone()[0] != data["version"]:
+            return load_reference_data(cursor)
+        data["checked_at"] = time.monotonic()
+    return data
+
+
+def invalidate_reference_data(schema: str | None = None):
+    """
+    This function drops the cached reference data of a schema, or of every
+    schema, so it is reloaded on next use. It is called by the functions
+    creating reference rows.
+    """
+    if schema is None:
+        _reference_data.clear()
+    else:
+        _reference_data.pop(schema, None)
+
+
+def watch_reference_data(connection):
+    """
+    This function listens to the changes of the reference tables and drops
+    the cached data of the changed schema as soon as they are committed. It
+    never returns: run it in its own thread with a dedicated autocommit
+    connection.
+
+    Parameters:
+    - connection: The connection used to listen, in autocommit mode.
+    """
+    connection.execute(f"LISTEN {REFERENCE_DATA_CHANNEL}")
+    for notify in connection.notifies():
+        invalidate_reference_data(notify.payload)
+
+
+def find_element_id(data: dict, name: str):
+    """
+    This function finds an element by its french or english name or by its
+    symbol, ignoring case and accents.
+
+    Returns:
+    - The id of the element, or None if it is not in the reference data.
+    """
+    element_id = data["element_ids_by_normalized_name"].get(normalize_name(name))
+    if element_id is None:
+        element_id = data["element_ids_by_symbol"].get(name.strip().casefold())
+    return element_id
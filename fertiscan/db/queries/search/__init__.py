@@ -0,0 +1,110 @@
+"""
+This module represent the search of the inspections by product name,
+registration number or organization name.
+
+The matching is done with pg_trgm: a text matches a field if it is contained
+in it (ignoring case) or if it is similar to one of its words. The indexes
+are created by search_index.sql.
+"""
+
+from psycopg import Cursor
+
+from fertiscan.db.queries.errors import (
+    InspectionQueryError,
+    InspectionRetrievalError,
+    handle_query_errors,
+)
+
+# The searchable fields: name -> (table, column)
+SEARCH_FIELDS = {
+    "product_name": ("label_information", "product_name"),
+    "registration_number": ("registration_number_information", "identifier"),
+    "organization": ("organization_information", "name"),
+}
+
+
+def _field_matches(field: str) -> str:
+    """Return the query of the labels matching the search text on a field."""
+    table, column = SEARCH_FIELDS[field]
+    label_id = "id" if table == "label_information" else "label_id"
+    return f"""
+        SELECT
+            {table}.{label_id} AS label_id,
+            public.word_similarity(%(text)s, {table}.{column}) AS score
+        FROM
+            {table}
+        WHERE
+            {table}.{column} ILIKE %(pattern)s
+            OR %(text)s OPERATOR(public.<%%) {table}.{column}
+    """
+
+
+@handle_query_errors(InspectionRetrievalError)
+def search_inspections(
+    cursor: Cursor,
+    search_text: str,
+    user_id=None,
+    fields=tuple(SEARCH_FIELDS),
+    limit: int = 20,
+    offset: int = 0,
+) -> list:
+    """
+    This function searches the inspections whose product name, registration
+    numbers or organization names match a text.
+
+    Parameters:
+    - cursor (Cursor): The database cursor.
+    - search_text (str): The text to search, a part of a name or number.
+    - user_id (str, optional): Only search the inspections of this user.
+    - fields (tuple, optional): The fields searched, keys of SEARCH_FIELDS. Default is all of them.
+    - limit (int, optional): The size of the page. Default is 20.
+    - offset (int, optional): The number of results skipped. Default is 0.
+
+    Returns:
+    - A list of tuples (inspection_id, score, total) ordered by decreasing
+      score, where score is the best similarity of the text with a field of
+      the inspection (1 for an exact word) and total the number of matching
+      inspections.
+    """
+    search_text = (search_text or "").strip()
+    if not search_text:
+        raise InspectionQueryError("The search text cannot be empty")
+    unknown = set(fields) - set(SEARCH_FIELDS)
+    if unknown or not fields:
+        raise InspectionQueryError(
+            f"Unknown search fields: {sorted(unknown)}. Expected some of {list(SEARCH_FIELDS)}"
+        )
+    escaped = (
+        search_text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    )
+    matches = " UNION ALL ".join(_field_matches(field) for field in fields)
+    query = f"""
+        WITH matches AS ({matches})
+        SELECT
+            inspection.id,
+            max(matches.score) AS score,
+            count(*) OVER () AS total
+        FROM
+            matches
+        JOIN
+            inspection ON inspection.label_info_id = matches.label_id
+        WHERE
+            %(user_id)s::uuid IS NULL OR inspection.inspector_id = %(user_id)s::uuid
+        GROUP BY
+            inspection.id
+        ORDER BY
+            score DESC, inspection.id
+        LIMIT %(limit)s
+        OFFSET %(offset)s
+        """
+    cursor.execute(
+        query,
+        {
+            "text": search_text,
+            "pattern": f"%{escaped}%",
+            "user_id": str(user_id) if user_id is not None else None,
+            "limit": limit,
+            "offset": offset,
+        },
+    )
+    return cursor.fetchall()
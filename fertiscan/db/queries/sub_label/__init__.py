@@ -15,6 +15,7 @@ from fertiscan.db.queries.errors import (
     SubTypeQueryError,
     handle_query_errors,
 )
+from fertiscan.db.queries import reference
 
 
 @handle_query_errors(SubLabelCreationError)
@@ -267,6 +268,7 @@ def new_sub_type(cursor: Cursor, type_fr, type_en):
             id
     """
     cursor.execute(query, (type_fr, type_en))
+    reference.invalidate_reference_data()
     if result := cursor.fetchone():
         return result[0]
     raise SubTypeCreationError("Failed to create SubType. No data returned.")
@@ -284,6 +286,12 @@ def get_sub_type_id(cursor: Cursor, type_name):
     Returns:
     - The UUID of the sub type.
     """
+    data = reference.get_reference_data(cursor)
+    if data is not None and (
+        sub_type_id := data["sub_type_ids"].get(type_name.casefold())
+    ):
+        return sub_type_id
+
     query = """
         SELECT 
             id
@@ -3,6 +3,7 @@ import os
 
 from dotenv import load_dotenv
 
+import datastore
 import datastore.blob.azure_storage_api as azure_storage
 import nachet.db.metadata.inference as inference_metadata
 import nachet.db.metadata.machine_learning as ml_metadata
@@ -244,19 +245,61 @@ async def upload_pictures(
                 # create the seed
                 seed_id = str(seed.new_seed(cursor=cursor, seed_name=seed_name))
 
-        pictures_id = []
-        for picture_encoded in pictures:
-            id = await upload_picture_known(
+        if not user.is_a_user_id(cursor=cursor, user_id=user_id):
+            raise user.UserNotFoundError(
+                f"User not found based on the given id: {user_id}"
+            )
+        if picture_set_id is None:
+            picture_set_id = user.get_default_picture_set(cursor, user_id)
+        folder_name = picture.get_picture_set_name(cursor, picture_set_id)
+        if folder_name is None:
+            folder_name = str(picture_set_id)
+
+        # The pictures rows are created in a savepoint, released only once
+        # every blob is uploaded
+        with cursor.connection.transaction():
+            # Create all the picture instances in DB
+            pictures_id = picture.new_pictures(
+                cursor=cursor,
+                picture=json.dumps([]),
+                picture_set_id=picture_set_id,
+                nb_pictures=len(pictures),
+                seed_id=seed_id,
+            )
+            # Create pictures metadata and update DB instances (with link to Azure blob)
+            picture.update_pictures_metadata(
                 cursor,
-                user_id,
-                picture_encoded,
+                [
+                    (
+                        str(picture_id),
+                        json.dumps(
+                            {
+                                "link": container_client.url
+                                + "/"
+                                + azure_storage.build_blob_name(
+                                    folder_name, str(picture_id)
+                                ),
+                                "nb_seeds": nb_seeds,
+                                "zoom": zoom_level,
+                                "description": "Uploaded through the API",
+                            }
+                        ),
+                        0,
+                    )
+                    for picture_id in pictures_id
+                ],
+            )
+            # Upload the pictures to the Blob Storage, the uploaded blobs are
+            # removed if one of them fails
+            await azure_storage.upload_images(
                 container_client,
-                seed_id,
-                picture_set_id,
-                nb_seeds,
-                zoom_level,
+                folder_name,
+                str(picture_set_id),
+                [
+                    (str(picture_id), picture_encoded)
+                    for picture_id, picture_encoded in zip(pictures_id, pictures)
+                ],
             )
-            pictures_id.append(id)
 
         return pictures_id
     except seed.SeedNotFoundError as e:
@@ -297,56 +340,64 @@ async def register_inference_result(
         )
         inference_dict["pipeline_id"] = str(pipeline_id)
 
+        nb_object = int(inference_dict["totalBoxes"])
+        boxes = [inference_dict["boxes"][box_index] for box_index in range(nb_object)]
+
+        # TODO: adapt for multiple types of objects
+        if boxes and type != 1:
+            raise inference.InferenceCreationError("Error: type not recognized")
+
+        # Resolve every label of the inference at once, before the first
+        # write of the transaction so the seed catalogue can be cached
+        labels = []
+        for box in boxes:
+            labels.append(box["label"])
+            labels.extend(topN["label"] for topN in box.get("topN", []))
+        seed_ids = seed.get_seed_ids(cursor, labels)
+
         inference_id = inference.new_inference(
             cursor, trimmed_inference, user_id, picture_id, type, pipeline_id
         )
-        nb_object = int(inference_dict["totalBoxes"])
         inference_dict["inference_id"] = str(inference_id)
 
-        # loop through the boxes
-        for box_index in range(nb_object):
-            # TODO: adapt for multiple types of objects
-            if type == 1:
-                # TODO : adapt for the seed_id in the inference_dict
-                top_id = seed.get_seed_id(
-                    cursor, inference_dict["boxes"][box_index]["label"]
-                )
-                inference_dict["boxes"][box_index]["object_type_id"] = 1
-            else:
-                raise inference.InferenceCreationError("Error: type not recognized")
-            box = inference_metadata.build_object_import(
-                inference_dict["boxes"][box_index]
-            )
-            object_inference_id = inference.new_inference_object(
-                cursor, inference_id, box, type, False
-            )
-            inference_dict["boxes"][box_index]["box_id"] = str(object_inference_id)
-            # loop through the topN Prediction
-            top_score = -1
-            if "topN" in inference_dict["boxes"][box_index]:
-                for topN in inference_dict["boxes"][box_index]["topN"]:
-
-                    # Retrieve the right seed_id
-                    seed_id = seed.get_seed_id(cursor, topN["label"])
-                    id = inference.new_seed_object(
-                        cursor, seed_id, object_inference_id, topN["score"]
+        boxes_metadata = []
+        for box in boxes:
+            box["object_type_id"] = 1
+            boxes_metadata.append(inference_metadata.build_object_import(box))
+        object_ids = inference.new_inference_objects(
+            cursor, inference_id, boxes_metadata, type, False
+        )
+
+        # One seed_object per topN prediction, or the box label if there is none
+        seed_objects = []
+        for box, object_id in zip(boxes, object_ids):
+            box["box_id"] = str(object_id)
+            if "topN" in box:
+                for topN in box["topN"]:
+                    seed_objects.append(
+                        (seed_ids[topN["label"]], object_id, topN["score"])
                     )
+            else:
+                seed_objects.append((seed_ids[box["label"]], object_id, box["score"]))
+        seed_object_ids = iter(inference.new_seed_objects(cursor, seed_objects))
+
+        top_ids = []
+        for box, object_id in zip(boxes, object_ids):
+            # TODO : adapt for the seed_id in the inference_dict
+            top_id = seed_ids[box["label"]]
+            if "topN" in box:
+                top_score = -1
+                for topN in box["topN"]:
+                    id = next(seed_object_ids)
                     topN["object_id"] = str(id)
                     if topN["score"] > top_score:
                         top_score = topN["score"]
                         top_id = id
             else:
-                seed_id = seed.get_seed_id(
-                    cursor, inference_dict["boxes"][box_index]["label"]
-                )
-                top_id = inference.new_seed_object(
-                    cursor,
-                    seed_id,
-                    object_inference_id,
-                    inference_dict["boxes"][box_index]["score"],
-                )
-            inference.set_inference_object_top_id(cursor, object_inference_id, top_id)
-            inference_dict["boxes"][box_index]["top_id"] = str(top_id)
+                top_id = next(seed_object_ids)
+            top_ids.append((object_id, top_id))
+            box["top_id"] = str(top_id)
+        inference.set_inference_objects_top_id(cursor, top_ids)
 
         return inference_dict
     except ValueError:
@@ -604,49 +655,19 @@ async def import_ml_structure_from_json_version(cursor, ml_version: dict):
         # set the pipeline active if not the test pipeline
         if pipeline_name != "test_pipeline":
             machine_learning.set_active_pipeline(cursor, str(pipeline_id))
+    machine_learning.invalidate_ml_caches()
 
 
 async def get_ml_structure(cursor):
     """
     This function retrieves the machine learning structure from the database.
+    The structure is built with a single query and cached, see get_ml_structure_etag.
 
     Returns a usable json object with the machine learning structure for the FE and BE
     """
     try:
-        ml_structure = {"pipelines": [], "models": []}
-        pipelines = machine_learning.get_active_pipeline(cursor)
-        if len(pipelines) == 0:
-            raise MLRetrievalError("No Active pipelines found in the database.")
-        model_list = []
-        for pipeline in pipelines:
-            # (id, name, active:bool, is_default: bool, data, model_ids: array)
-            pipeline_name = pipeline[1]
-            pipeline_id = pipeline[0]
-            default = pipeline[3]
-            model_ids = pipeline[5]
-            pipeline_dict = ml_metadata.build_pipeline_export(
-                pipeline[4], pipeline_name, pipeline_id, default, model_ids
-            )
-            ml_structure["pipelines"].append(pipeline_dict)
-            for model_id in model_ids:
-                if model_id not in model_list:
-                    model_list.append(model_id)
-                model_db = machine_learning.get_model(cursor, model_id)
-                # (id, name, endpoint_name, task_name, data,version: str)
-                model_name = model_db[1]
-                model_endpoint = model_db[2]
-                model_task = model_db[3]
-                model_version = model_db[5]
-                model_dict = ml_metadata.build_model_export(
-                    model_db[4],
-                    model_id,
-                    model_name,
-                    model_endpoint,
-                    model_task,
-                    model_version,
-                )
-                ml_structure["models"].append(model_dict)
-        return ml_structure
+        cached = await _get_cached_ml_structure(cursor)
+        return cached["structure"]
     except MLRetrievalError:
         raise
     except Exception as e:
@@ -654,6 +675,60 @@ async def get_ml_structure(cursor):
         raise Exception("Datastore Unhandled Error")
 
 
+async def get_ml_structure_etag(cursor):
+    """
+    This function returns the ETag of the machine learning structure returned
+    by get_ml_structure. It only changes when the structure changes, so clients
+    can skip downloading a structure they already have.
+    """
+    try:
+        cached = await _get_cached_ml_structure(cursor)
+        return cached["etag"]
+    except MLRetrievalError:
+        raise
+    except Exception as e:
+        print(e)
+        raise Exception("Datastore Unhandled Error")
+
+
+async def _get_cached_ml_structure(cursor):
+    """
+    This function returns the cached machine learning structure and its ETag,
+    building it when it is not cached.
+    """
+    cached = machine_learning.get_cached_ml_structure(cursor)
+    if cached is not None:
+        return cached
+    # Read before the structure, see get_ml_cache_state
+    state = machine_learning.get_ml_cache_state(cursor)
+    ml_structure = {"pipelines": [], "models": []}
+    pipelines = machine_learning.get_active_pipelines_with_models(cursor)
+    if len(pipelines) == 0:
+        raise MLRetrievalError("No Active pipelines found in the database.")
+    model_list = []
+    # (id, name, is_default: bool, data, model_ids: array, models: list of dict)
+    for pipeline_id, pipeline_name, default, data, model_ids, models in pipelines:
+        pipeline_dict = ml_metadata.build_pipeline_export(
+            data, pipeline_name, pipeline_id, default, model_ids
+        )
+        ml_structure["pipelines"].append(pipeline_dict)
+        for model in models:
+            # Models shared by several pipelines are only listed once
+            if model["id"] in model_list:
+                continue
+            model_list.append(model["id"])
+            model_dict = ml_metadata.build_model_export(
+                model["data"],
+                model["id"],
+                model["name"],
+                model["endpoint_name"],
+                model["task"],
+                model["version"],
+            )
+            ml_structure["models"].append(model_dict)
+    return machine_learning.cache_ml_structure(cursor, ml_structure, state)
+
+
 async def get_seed_info(cursor):
     """
     This function retrieves the seed information from the database.
@@ -669,12 +744,17 @@ async def get_seed_info(cursor):
     return seed_dict
 
 
-async def get_picture_sets_info(cursor, user_id: str):
+async def get_picture_sets_info(
+    cursor, user_id: str, limit: int = None, after_picture_set_id: str = None
+):
     """This function retrieves the picture sets names and number of pictures from the database.
     This also retrieve for each picture in the picture set their name, if an inference exist and if the picture is validated.
+    Everything is retrieved in a single query.
 
     Args:
         user_id (str): id of the user
+        limit (int, optional): maximum number of picture sets to return, for pagination
+        after_picture_set_id (str, optional): id of the last picture set of the previous page
     """
     try:
         # Check if user exists
@@ -683,33 +763,29 @@ async def get_picture_sets_info(cursor, user_id: str):
                 f"User not found based on the given id: {user_id}"
             )
 
-        result = []
-        picture_sets = picture.get_user_picture_sets(cursor, user_id)
-        for picture_set in picture_sets:
-            picture_set_info = {}
-            picture_set_id = picture_set[0]
-            picture_set_name = picture_set[1]
-
-            picture_set_info["picture_set_id"] = str(picture_set_id)
-            picture_set_info["folder_name"] = picture_set_name
-
-            pictures = picture.get_picture_set_pictures(cursor, picture_set_id)
-            picture_set_info["nb_pictures"] = len(pictures)
-
-            picture_set_info["pictures"] = []
-            for pic in pictures:
-                picture_info = {}
-                picture_id = pic[0]
-                picture_info["picture_id"] = str(picture_id)
-
-                is_validated = picture.is_picture_validated(cursor, picture_id)
-                inference_exist = picture.check_picture_inference_exist(
-                    cursor, picture_id
-                )
-                picture_info["is_validated"] = is_validated
-                picture_info["inference_exist"] = inference_exist
+        picture_sets = picture.get_user_picture_sets_info(
+            cursor, user_id, limit, after_picture_set_id
+        )
+        if len(picture_sets) == 0 and after_picture_set_id is None:
+            raise picture.GetPictureSetError(
+                f"Error: PictureSet not found for user:{user_id}"
+            )
 
-                picture_set_info["pictures"].append(picture_info)
+        result = []
+        for picture_set_id, picture_set_name, nb_pictures, pictures in picture_sets:
+            picture_set_info = {
+                "picture_set_id": str(picture_set_id),
+                "folder_name": picture_set_name,
+                "nb_pictures": nb_pictures,
+                "pictures": [
+                    {
+                        "picture_id": str(pic["picture_id"]),
+                        "is_validated": pic["is_validated"],
+                        "inference_exist": pic["inference_exist"],
+                    }
+                    for pic in pictures
+                ],
+            }
             result.append(picture_set_info)
         return result
     except (
@@ -793,27 +869,7 @@ async def get_picture_blob(cursor, user_id: str, container_client, picture_id: s
         picture_id (str): id of the picture set
     """
     try:
-        # Check if user exists
-        if not user.is_a_user_id(cursor=cursor, user_id=user_id):
-            raise user.UserNotFoundError(
-                f"User not found based on the given id: {user_id}"
-            )
-        # Check if picture set exists
-        if not picture.is_a_picture_id(cursor, picture_id):
-            raise picture.PictureNotFoundError(
-                f"Picture set not found based on the given id: {picture_id}"
-            )
-        # Check user is owner of the picture set where the picutre is
-        picture_set_id = picture.get_picture_picture_set_id(cursor, picture_id)
-        if str(picture.get_picture_set_owner_id(cursor, picture_set_id)) != user_id:
-            raise UserNotOwnerError(
-                f"User can't access this picture, user uuid :{user_id}, picture : {picture_id}"
-            )
-        if str(user.get_default_picture_set(cursor, user_id)) == str(picture_set_id):
-            folder_name = "General"
-        else:
-            folder_name = picture.get_picture_set_name(cursor, picture_set_id)
-        blob_name = azure_storage.build_blob_name(folder_name, str(picture_id))
+        blob_name = _get_picture_blob_name(cursor, user_id, picture_id)
         picture_blob = await azure_storage.get_blob(container_client, blob_name)
         return picture_blob
     except (
@@ -824,6 +880,74 @@ async def get_picture_blob(cursor, user_id: str, container_client, picture_id: s
         raise e
 
 
+def _get_picture_blob_name(cursor, user_id: str, picture_id: str):
+    """
+    Checks that the user owns the picture and returns the name of its blob.
+    """
+    # Check if user exists
+    if not user.is_a_user_id(cursor=cursor, user_id=user_id):
+        raise user.UserNotFoundError(
+            f"User not found based on the given id: {user_id}"
+        )
+    # Check if picture set exists
+    if not picture.is_a_picture_id(cursor, picture_id):
+        raise picture.PictureNotFoundError(
+            f"Picture set not found based on the given id: {picture_id}"
+        )
+    # Check user is owner of the picture set where the picutre is
+    picture_set_id = picture.get_picture_picture_set_id(cursor, picture_id)
+    if str(picture.get_picture_set_owner_id(cursor, picture_set_id)) != user_id:
+        raise UserNotOwnerError(
+            f"User can't access this picture, user uuid :{user_id}, picture : {picture_id}"
+        )
+    if str(user.get_default_picture_set(cursor, user_id)) == str(picture_set_id):
+        folder_name = "General"
+    else:
+        folder_name = picture.get_picture_set_name(cursor, picture_set_id)
+    return azure_storage.build_blob_name(folder_name, str(picture_id))
+
+
+async def get_picture_url(cursor, user_id: str, container_client, picture_id: str):
+    """
+    Returns an url the client can download the given picture from directly,
+    signed with a read-only SAS of the blob valid for a few minutes
+
+    Args:
+        cursor: The cursor object to interact with the database.
+        user_id (str): id of the user
+        picture_id (str): id of the picture
+    """
+    try:
+        blob_name = _get_picture_blob_name(cursor, user_id, picture_id)
+        return azure_storage.build_blob_sas_url(
+            container_client, blob_name, NACHET_BLOB_KEY
+        )
+    except (
+        user.UserNotFoundError,
+        picture.PictureNotFoundError,
+        UserNotOwnerError,
+    ) as e:
+        raise e
+
+
+async def get_picture_urls(cursor, user_id: str, container_client, picture_ids: list):
+    """
+    Returns the urls the client can download the given pictures from directly,
+    see datastore.get_picture_urls
+
+    Args:
+        cursor: The cursor object to interact with the database.
+        user_id (str): id of the user
+        picture_ids (list): ids of the pictures
+
+    Returns:
+        dict {picture_id: url}
+    """
+    return await datastore.get_picture_urls(
+        cursor, user_id, picture_ids, container_client, NACHET_BLOB_KEY
+    )
+
+
 async def delete_picture_set_with_archive(
     cursor, user_id, picture_set_id, container_client
 ):
@@ -885,15 +1009,17 @@ async def delete_picture_set_with_archive(
             folder_name=folder_name,
         )
 
+        # The folder is registered under the id its pictures are tagged with
         folder_created = await azure_storage.create_dev_container_folder(
-            dev_container_client, str(picture_set_id), folder_name, str(user_id)
+            dev_container_client, str(dev_picture_set_id), folder_name, str(user_id)
         )
         if not folder_created:
             raise FolderCreationError(
                 f"Error while creating this folder : {picture_set_id}"
             )
 
-        for picture_id in picture.get_validated_pictures(cursor, picture_set_id):
+        blob_names = []
+        for picture_id in validated_pictures:
             picture_metadata = picture.get_picture(cursor, picture_id)
             # change the link in the metadata
             blob_name = azure_storage.build_blob_name(folder_name, str(picture_id))
@@ -909,19 +1035,20 @@ async def delete_picture_set_with_archive(
             picture.update_picture_picture_set_id(
                 cursor, picture_id, dev_picture_set_id
             )
-            # move the picture to the dev container
-            if not (
-                await azure_storage.move_blob(
-                    blob_name,
-                    dev_blob_name,
-                    str(dev_picture_set_id),
-                    container_client,
-                    dev_container_client,
-                )
-            ):
-                raise BlobUploadError(
-                    f"Error while moving the picture : {picture_id} to the dev container"
-                )
+            blob_names.append((blob_name, dev_blob_name))
+        # move the pictures to the dev container, copied by the storage service
+        try:
+            await azure_storage.move_blobs(
+                blob_names,
+                str(dev_picture_set_id),
+                container_client,
+                dev_container_client,
+                NACHET_BLOB_KEY,
+            )
+        except azure_storage.MoveBlobError as e:
+            raise BlobUploadError(
+                f"Error while moving the pictures of {picture_set_id} to the dev container: {e}"
+            )
 
         if len(picture.get_validated_pictures(cursor, picture_set_id)) > 0:
             raise picture.PictureSetDeleteError(
@@ -929,7 +1056,13 @@ async def delete_picture_set_with_archive(
             )
 
         # Delete the folder in the blob storage
-        await azure_storage.delete_folder(container_client, str(picture_set_id))
+        deletion = await azure_storage.delete_folder(
+            container_client, str(picture_set_id)
+        )
+        if deletion["failed"]:
+            raise azure_storage.DeleteFolderError(
+                f"{len(deletion['failed'])} blobs of the picture set {picture_set_id} could not be deleted: {deletion['failed']}"
+            )
         # Delete the picture set
         picture.delete_picture_set(cursor, picture_set_id)
 
@@ -939,6 +1072,7 @@ async def delete_picture_set_with_archive(
         picture.PictureSetNotFoundError,
         picture.PictureSetDeleteError,
         UserNotOwnerError,
+        azure_storage.DeleteFolderError,
     ) as e:
         raise e
     except Exception as e:
@@ -0,0 +1,63 @@
+-- Version stamps of the data cached in process by nachet.db.queries: the seed
+-- catalogue ("seed") and the machine learning structure and lookups
+-- ("machine_learning"). Every change to their tables increments the version of
+-- the cache and notifies the nachet_cache channel with "<schema>:<name>".
+CREATE TABLE IF NOT EXISTS cache_version (
+    "name" text PRIMARY KEY,
+    "version" bigint NOT NULL DEFAULT 0,
+    "updated_at" timestamp NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT INTO cache_version (name) VALUES ('seed'), ('machine_learning')
+ON CONFLICT (name) DO NOTHING;
+
+-- The name of the cache is the argument of the trigger
+CREATE OR REPLACE FUNCTION bump_cache_version()
+RETURNS TRIGGER AS $$
+BEGIN
+    EXECUTE format(
+        'UPDATE %I.cache_version SET version = version + 1, updated_at = CURRENT_TIMESTAMP WHERE name = $1',
+        TG_TABLE_SCHEMA
+    ) USING TG_ARGV[0];
+    -- Identical notifications of a transaction are delivered once
+    PERFORM pg_notify('nachet_cache', TG_TABLE_SCHEMA || ':' || TG_ARGV[0]);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Row level, so the statements that change nothing do not bump the version
+DROP TRIGGER IF EXISTS cache_version_trigger ON seed;
+CREATE TRIGGER cache_version_trigger
+AFTER INSERT OR UPDATE OR DELETE ON seed
+FOR EACH ROW
+EXECUTE FUNCTION bump_cache_version('seed');
+
+DROP TRIGGER IF EXISTS cache_version_trigger ON pipeline;
+CREATE TRIGGER cache_version_trigger
+AFTER INSERT OR UPDATE OR DELETE ON pipeline
+FOR EACH ROW
+EXECUTE FUNCTION bump_cache_version('machine_learning');
+
+DROP TRIGGER IF EXISTS cache_version_trigger ON pipeline_model;
+CREATE TRIGGER cache_version_trigger
+AFTER INSERT OR UPDATE OR DELETE ON pipeline_model
+FOR EACH ROW
+EXECUTE FUNCTION bump_cache_version('machine_learning');
+
+DROP TRIGGER IF EXISTS cache_version_trigger ON model;
+CREATE TRIGGER cache_version_trigger
+AFTER INSERT OR UPDATE OR DELETE ON model
+FOR EACH ROW
+EXECUTE FUNCTION bump_cache_version('machine_learning');
+
+DROP TRIGGER IF EXISTS cache_version_trigger ON model_version;
+CREATE TRIGGER cache_version_trigger
+AFTER INSERT OR UPDATE OR DELETE ON model_version
+FOR EACH ROW
+EXECUTE FUNCTION bump_cache_version('machine_learning');
+
+DROP TRIGGER IF EXISTS cache_version_trigger ON task;
+CREATE TRIGGER cache_version_trigger
+AFTER INSERT OR UPDATE OR DELETE ON task
+FOR EACH ROW
+EXECUTE FUNCTION bump_cache_version('machine_learning');
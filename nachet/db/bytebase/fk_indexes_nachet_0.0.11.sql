@@ -0,0 +1,26 @@
+-- Index migration for nachet_0.0.11
+-- The schema only indexes the primary keys, while the queries of
+-- datastore.db.queries and nachet.db.queries filter and join on the foreign
+-- keys below. Every statement is idempotent so the migration can be replayed.
+-- Benchmark: datastore/bin/benchmark-indexes.py nachet
+
+-- Pictures and picture sets
+CREATE INDEX IF NOT EXISTS picture_set_owner_id_idx ON "nachet_0.0.11".picture_set (owner_id);
+CREATE INDEX IF NOT EXISTS picture_picture_set_id_idx ON "nachet_0.0.11".picture (picture_set_id);
+CREATE INDEX IF NOT EXISTS users_default_set_id_idx ON "nachet_0.0.11".users (default_set_id);
+CREATE INDEX IF NOT EXISTS picture_seed_picture_id_idx ON "nachet_0.0.11".picture_seed (picture_id);
+CREATE INDEX IF NOT EXISTS picture_seed_seed_id_idx ON "nachet_0.0.11".picture_seed (seed_id);
+
+-- Inferences and their objects
+CREATE INDEX IF NOT EXISTS inference_picture_id_idx ON "nachet_0.0.11".inference (picture_id);
+CREATE INDEX IF NOT EXISTS inference_user_id_idx ON "nachet_0.0.11".inference (user_id);
+CREATE INDEX IF NOT EXISTS inference_pipeline_id_idx ON "nachet_0.0.11".inference (pipeline_id);
+CREATE INDEX IF NOT EXISTS object_inference_id_idx ON "nachet_0.0.11".object (inference_id);
+CREATE INDEX IF NOT EXISTS seed_obj_object_id_idx ON "nachet_0.0.11".seed_obj (object_id);
+CREATE INDEX IF NOT EXISTS seed_obj_seed_id_idx ON "nachet_0.0.11".seed_obj (seed_id);
+
+-- Pipelines and models
+CREATE INDEX IF NOT EXISTS pipeline_model_pipeline_id_idx ON "nachet_0.0.11".pipeline_model (pipeline_id);
+CREATE INDEX IF NOT EXISTS pipeline_model_model_id_idx ON "nachet_0.0.11".pipeline_model (model_id);
+CREATE INDEX IF NOT EXISTS model_version_model_id_idx ON "nachet_0.0.11".model_version (model_id);
+CREATE INDEX IF NOT EXISTS pipeline_default_user_id_idx ON "nachet_0.0.11".pipeline_default (user_id);
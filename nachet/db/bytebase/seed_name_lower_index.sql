@@ -0,0 +1,3 @@
+-- Case-insensitive exact lookups of seeds by name (seed.get_seed_id and
+-- seed.get_seed_ids on a seed catalogue miss)
+CREATE INDEX IF NOT EXISTS seed_lower_name_idx ON seed (lower(name));
@@ -140,8 +140,8 @@ def rebuild_inference(cursor, inf) :
                 model = Model(name=model_name, version=version)
                 models.append(model)
         
-        objects = inference.get_objects_by_inference(cursor, inference_id)
-        boxes = rebuild_boxes_export(cursor, objects)
+        objects_tree = inference.get_inference_tree(cursor, inference_id)
+        boxes = build_boxes_export(objects_tree)
     
         inf = Inference(
             boxes = boxes,
@@ -157,6 +157,52 @@ def rebuild_inference(cursor, inf) :
         raise e
 
 
+def build_boxes_export(objects_tree) -> list[InferenceObject]:
+    """
+    This function builds the boxes object from the rows returned by
+    inference.get_inference_tree in a single pass, without querying the database.
+
+    Parameters:
+    - objects_tree: The rows of get_inference_tree for an inference.
+
+    Returns:
+    - The boxes object as an array of InferenceObject.
+    """
+    try :
+        boxes = []
+        for box_id, box_metadata, top_id, is_verified, top_label, seeds in objects_tree:
+            box_metadata = json.loads(json.dumps(box_metadata))
+            topN = [
+                Seed(
+                    label = seed_obj["label"],
+                    object_id = str(seed_obj["object_id"]),
+                    score = seed_obj["score"]
+                )
+                for seed_obj in seeds
+            ]
+            if is_verified:
+                top_score = 1
+            else :
+                top_score = max(topN, key=lambda seed: seed.score).score
+
+            boxes.append(InferenceObject(
+                box = Box(**box_metadata.get("box")),
+                box_id = str(box_id),
+                color = box_metadata.get("color"),
+                label = top_label,
+                object_type_id = 1,
+                overlapping = box_metadata.get("overlapping"),
+                overlappingIndices = box_metadata.get("overlappingIndices"),
+                score = top_score,
+                topN = topN,
+                top_id = str(top_id),
+                is_verified = is_verified
+            ))
+        return boxes
+    except ValidationError as e :
+        raise e
+
+
 def rebuild_boxes_export(cursor, objects) :
     """
     This function rebuilds the boxes object from the database.
@@ -0,0 +1,123 @@
+"""
+This file contains the queries for the cache_version table.
+
+The data cached in process by the nachet query modules (ex: the seed
+catalogue) is stamped with the version of its cache, incremented by a trigger
+on every change to its tables (see nachet/db/bytebase/cache_version.sql). The
+modules compare it at most every CACHE_VERSION_CHECK_INTERVAL seconds and
+reload their data when it changed, so the changes committed by any process
+are picked up. A process can also listen to the nachet_cache channel with
+watch_cache_versions to drop its caches as soon as a change is committed.
+
+A schema without the cache_version table (created by db-creation.py) caches
+nothing: the modules query the database every time, see has_cache_version.
+"""
+
+import time
+
+# Seconds between two checks of the version of a cache
+CACHE_VERSION_CHECK_INTERVAL = 30.0
+
+# Channel notified with "<schema>:<name>" when the tables of a cache change
+CACHE_VERSION_CHANNEL = "nachet_cache"
+
+# Functions dropping the cached data of a schema, by name of cache
+_invalidators: dict = {}
+
+# Schemas where the cache_version table was found, or when it was last missing
+_cache_version_tables: dict = {}
+
+
+def schema_key(cursor):
+    """
+    This function returns the schema of the connection of the cursor, used as
+    the key of the caches. It is None for a connection whose schema is
+    unknown, in which case nothing should be cached.
+    """
+    return getattr(cursor.connection, "_datastore_schema", None)
+
+
+def has_cache_version(cursor) -> bool:
+    """
+    This function tells if the schema of the cursor has the cache_version
+    table. Once found, it is not looked up again; a missing table is looked
+    up again after CACHE_VERSION_CHECK_INTERVAL seconds, so a schema migrated
+    while the process runs starts being cached.
+
+    Parameters:
+    - cursor (cursor): The cursor of the database.
+
+    Returns:
+    - True if the cache_version table exists, False otherwise.
+    """
+    key = schema_key(cursor)
+    cached = _cache_version_tables.get(key)
+    if cached is True:
+        return True
+    if cached is not None and time.monotonic() - cached <= CACHE_VERSION_CHECK_INTERVAL:
+        return False
+    try:
+        query = """
+            SELECT to_regclass('cache_version') IS NOT NULL
+            """
+        cursor.execute(query)
+        exists = cursor.fetchone()[0]
+    except Exception:
+        raise Exception("Error: cache version could not be retrieved")
+    if key is not None:
+        _cache_version_tables[key] = True if exists else time.monotonic()
+    return exists
+
+
+def register_cache(name: str, invalidate):
+    """
+    This function registers the function dropping the cached data of a schema
+    for the cache name, called by watch_cache_versions.
+
+    Parameters:
+    - name (str): The name of the cache in the cache_version table.
+    - invalidate (function): Called with the name of the changed schema.
+    """
+    _invalidators.setdefault(name, []).append(invalidate)
+
+
+def get_cache_version(cursor, name: str) -> int:
+    """
+    This function returns the current version of a cache.
+
+    Parameters:
+    - cursor (cursor): The cursor of the database.
+    - name (str): The name of the cache in the cache_version table.
+
+    Returns:
+    - The version of the cache.
+    """
+    try:
+        query = """
+            SELECT 
+                version 
+            FROM 
+                cache_version
+            WHERE 
+                name = %s
+            """
+        cursor.execute(query, (name,))
+        return cursor.fetchone()[0]
+    except Exception:
+        raise Exception("Error: cache version could not be retrieved")
+
+
+def watch_cache_versions(connection):
+    """
+    This function listens to the changes of the cached tables and drops the
+    cached data of the changed schema as soon as they are committed. It never
+    returns: run it in its own thread with a dedicated autocommit connection.
+
+    Parameters:
+    - connection: The connection used to listen, in autocommit mode.
+    """
+    connection.execute(f"LISTEN {CACHE_VERSION_CHANNEL}")
+    for notify in connection.notifies():
+        schema, _, name = notify.payload.rpartition(":")
+        for invalidate in _invalidators.get(name, []):
+            invalidate(schema)
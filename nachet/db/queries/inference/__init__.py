@@ -325,6 +325,59 @@ def new_inference_object(cursor, inference_id: str,box_metadata:str,type_id:int,
     except Exception:
         raise InferenceCreationError("Error: inference object not uploaded")
 
+def new_inference_objects(cursor, inference_id: str, boxes_metadata: list, type_id: int, manual_detection: bool = False):
+    """
+    This function uploads several new inference objects to the database in a single query.
+
+    Parameters:
+    - cursor (cursor): The cursor of the database.
+    - inference_id (str): The UUID of the inference.
+    - boxes_metadata (list): The metadata of each object. Must be formatted as json.
+    - type_id (int): The UUID of the type.
+
+    Returns:
+    - The list of UUID of the inference objects, in the order of boxes_metadata.
+    """
+    if not boxes_metadata:
+        return []
+    try:
+        query = """
+            WITH new_object AS (
+                SELECT
+                    gen_random_uuid() AS id,
+                    box_metadata,
+                    ord
+                FROM
+                    unnest(%s::json[]) WITH ORDINALITY AS t(box_metadata, ord)
+            ), inserted AS (
+                INSERT INTO 
+                    object(
+                        id,
+                        inference_id,
+                        box_metadata,
+                        type_id,
+                        manual_detection
+                        )
+                SELECT
+                    id, %s, box_metadata, %s, %s
+                FROM
+                    new_object
+            )
+            SELECT id FROM new_object ORDER BY ord
+            """
+        cursor.execute(
+            query,
+            (
+                boxes_metadata,
+                inference_id,
+                type_id,
+                manual_detection,
+            ),
+        )
+        return [row[0] for row in cursor.fetchall()]
+    except Exception:
+        raise InferenceCreationError("Error: inference objects not uploaded")
+
 def get_inference_object(cursor, inference_object_id: str):
     """
         This function gets an object from the database.
@@ -390,6 +443,59 @@ def get_objects_by_inference(cursor, inference_id: str):
     except Exception:
         raise InferenceObjectNotFoundError(f"Error: could not get objects for inference {inference_id}")
 
+def get_inference_tree(cursor, inference_id: str):
+    """
+    This function gets all the objects of an inference along with their top
+    seed and topN candidates in a single query, so an inference can be rebuilt
+    without a round trip per object or per seed.
+
+    Parameters:
+    - cursor (cursor): The cursor of the database.
+    - inference_id (str): The UUID of the inference.
+
+    Returns:
+    - A list of (object_id, box_metadata, top_id, is_verified, top_label, topN)
+      where topN is a list of {"object_id", "label", "score"} dicts.
+    """
+    try:
+        query = """
+            SELECT 
+                o.id,
+                o.box_metadata,
+                COALESCE(o.verified_id, o.top_id),
+                o.verified_id IS NOT NULL,
+                top_seed.name,
+                COALESCE(top_n.seeds, '[]'::json)
+            FROM 
+                object o
+            LEFT JOIN 
+                seed_obj top_so ON top_so.id = COALESCE(o.verified_id, o.top_id)
+            LEFT JOIN 
+                seed top_seed ON top_seed.id = top_so.seed_id
+            LEFT JOIN LATERAL (
+                SELECT 
+                    json_agg(
+                        json_build_object(
+                            'object_id', so.id,
+                            'label', s.name,
+                            'score', so.score
+                        )
+                    ) AS seeds
+                FROM 
+                    seed_obj so
+                LEFT JOIN 
+                    seed s ON s.id = so.seed_id
+                WHERE 
+                    so.object_id = o.id
+            ) top_n ON TRUE
+            WHERE 
+                o.inference_id = %s
+            """
+        cursor.execute(query, (inference_id,))
+        return cursor.fetchall()
+    except Exception:
+        raise InferenceObjectNotFoundError(f"Error: could not get objects for inference {inference_id}")
+
 def set_inference_object_top_id(cursor, inference_object_id: str, top_id:str):
     """
     This function sets the top_id of an inference.
@@ -413,6 +519,33 @@ def set_inference_object_top_id(cursor, inference_object_id: str, top_id:str):
     except Exception:
         raise Exception(f"Error: could not set top_id {top_id} for inference {inference_object_id}")
     
+def set_inference_objects_top_id(cursor, top_ids: list):
+    """
+    This function sets the top_id of several inference objects in a single query.
+
+    Parameters:
+    - cursor (cursor): The cursor of the database.
+    - top_ids (list): (inference_object_id, top_id) tuples.
+    """
+    if not top_ids:
+        return
+    try:
+        object_ids, seed_object_ids = zip(*top_ids)
+        query = """
+            UPDATE 
+                object
+            SET
+                top_id = v.top_id,
+                updated_at = now()
+            FROM
+                unnest(%s::uuid[], %s::uuid[]) AS v(id, top_id)
+            WHERE 
+                object.id = v.id
+            """
+        cursor.execute(query, (list(object_ids), list(seed_object_ids)))
+    except Exception:
+        raise Exception("Error: could not set top_id of the inference objects")
+
 def get_inference_object_top_id(cursor, inference_object_id: str):
     """
     This function gets the top_id of an inference.
@@ -549,6 +682,52 @@ def new_seed_object(cursor, seed_id: str, object_id:str,score:float):
         raise SeedObjectCreationError("Error: seed object not uploaded")
 
 
+def new_seed_objects(cursor, seed_objects: list):
+    """
+    This function uploads several new seed objects (seed predictions) to the database in a single query.
+
+    Parameters:
+    - cursor (cursor): The cursor of the database.
+    - seed_objects (list): (seed_id, object_id, score) tuples.
+
+    Returns:
+    - The list of UUID of the seed objects, in the order of seed_objects.
+    """
+    if not seed_objects:
+        return []
+    try:
+        seed_ids, object_ids, scores = zip(*seed_objects)
+        query = """
+            WITH new_seed_obj AS (
+                SELECT
+                    gen_random_uuid() AS id,
+                    seed_id,
+                    object_id,
+                    score,
+                    ord
+                FROM
+                    unnest(%s::uuid[], %s::uuid[], %s::float[])
+                        WITH ORDINALITY AS t(seed_id, object_id, score, ord)
+            ), inserted AS (
+                INSERT INTO 
+                    seed_obj(
+                        id,
+                        seed_id,
+                        object_id,
+                        score
+                        )
+                SELECT
+                    id, seed_id, object_id, score
+                FROM
+                    new_seed_obj
+            )
+            SELECT id FROM new_seed_obj ORDER BY ord
+            """
+        cursor.execute(query, (list(seed_ids), list(object_ids), list(scores)))
+        return [row[0] for row in cursor.fetchall()]
+    except Exception:
+        raise SeedObjectCreationError("Error: seed objects not uploaded")
+
 def set_object_box_metadata(cursor,object_id:str, metadata:str):
     """
     This function sets the metadata of an object.
@@ -2,6 +2,51 @@
 This module contains the queries related to the machine learning structure (model and pipelines) in the database.
 """
 
+import copy
+import hashlib
+import json
+import time
+
+from datastore.cache import MISSING, LRUCache
+from nachet.db.queries.cache_version import (
+    CACHE_VERSION_CHECK_INTERVAL,
+    get_cache_version,
+    has_cache_version,
+    register_cache,
+    schema_key,
+)
+
+# Name of the machine learning tables in the cache_version table
+ML_CACHE = "machine_learning"
+
+# Columns added to the cached lookups, read in the same snapshot as their row.
+# The name of the cache is ML_CACHE.
+ML_CACHE_STATE_COLUMNS = """
+    pg_current_xact_id_if_assigned() IS NULL,
+    (SELECT version FROM cache_version WHERE name = 'machine_learning')
+"""
+
+# The same columns for a schema without the cache_version table: the state
+# is never clean, so nothing is cached
+ML_UNCACHED_STATE_COLUMNS = """
+    false,
+    NULL::bigint
+"""
+
+# One cached machine learning structure per schema, see cache_ml_structure
+_ml_structure_cache: dict = {}
+
+# Version of the machine learning tables the caches of a schema were filled
+# at, and when it was last compared to the database, see check_ml_caches
+_ml_cache_versions: dict = {}
+
+# Lookups done for every inference, keyed by (schema, name or id). Like the
+# machine learning structure, they are only filled by clean transactions and
+# dropped when the version of the machine learning tables changes.
+_pipeline_id_by_model_name = LRUCache(maxsize=256, ttl=300.0)
+_pipeline_by_id = LRUCache(maxsize=256, ttl=300.0)
+_model_by_id = LRUCache(maxsize=256, ttl=300.0)
+
 class NonExistingTaskEWarning(UserWarning):
     pass
 class PipelineCreationError(Exception):
@@ -44,6 +89,7 @@ def new_pipeline(cursor, pipeline,pipeline_name, model_ids, active:bool=False):
         pipeline_id=cursor.fetchone()[0]
         for model_id in model_ids:
             new_pipeline_model(cursor,pipeline_id,model_id)
+        invalidate_ml_caches(schema_key(cursor))
         
         return pipeline_id
     except(Exception):
@@ -124,19 +170,25 @@ def get_pipeline(cursor,pipeline_id:str):
     Returns:
     - The pipeline.
     """
+    check_ml_caches(cursor)
+    key = (schema_key(cursor), str(pipeline_id))
+    pipeline = _pipeline_by_id.get(key)
+    if pipeline is not MISSING:
+        return copy.deepcopy(pipeline)
     try:
-        query = """
-            SELECT data
+        query = f"""
+            SELECT data, {_ml_cache_state_columns(cursor)}
             FROM pipeline
             WHERE id = %s
             """
         cursor.execute(
             query,
-            (
-                pipeline_id,
-            ),
+            (pipeline_id,),
         )
-        pipeline=cursor.fetchone()[0]
+        row=cursor.fetchone()
+        pipeline=row[0]
+        if _can_cache(key[0], _ml_cache_state(row)):
+            _pipeline_by_id.set(key, copy.deepcopy(pipeline))
         return pipeline
     except(Exception):
         raise PipelineCreationError("Error: pipeline not found")
@@ -160,6 +212,7 @@ def set_active_pipeline(cursor, pipeline_id):
                 pipeline_id,
             ),
         )
+        invalidate_ml_caches(schema_key(cursor))
     except(Exception):
         raise PipelineCreationError("Error: pipeline not found")
 
@@ -195,6 +248,229 @@ def get_active_pipeline(cursor):
     except(Exception):
         raise PipelineCreationError("Error: pipeline not found")
     
+def get_active_pipelines_with_models(cursor):
+    """
+    This function gets all the active pipelines with their models, tasks and
+    active model versions in a single query.
+
+    Parameters:
+    - cursor (cursor): The cursor of the database.
+
+    Returns:
+    - Array of (id, name, is_default, data, model_ids, models) where models is a
+      list of {"id", "name", "endpoint_name", "task", "data", "version"} dicts.
+    """
+    try:
+        query = """
+            SELECT 
+                p.id,
+                p.name,
+                p.is_default,
+                p.data,
+                array_agg(pm.model_id),
+                COALESCE(
+                    json_agg(
+                        json_build_object(
+                            'id', m.id,
+                            'name', m.name,
+                            'endpoint_name', m.endpoint_name,
+                            'task', t.name,
+                            'data', v.data,
+                            'version', v.version
+                        )
+                    ) FILTER (WHERE m.id IS NOT NULL),
+                    '[]'::json
+                )
+            FROM 
+                pipeline as p 
+            LEFT JOIN
+                pipeline_model as pm 
+            ON 
+                p.id=pm.pipeline_id 
+            LEFT JOIN
+                model as m
+            ON
+                pm.model_id=m.id
+            LEFT JOIN
+                task as t 
+            ON 
+                m.task_id=t.id 
+            LEFT JOIN
+                model_version as v
+            ON
+                m.active_version=v.id
+            WHERE
+                p.active is True
+            GROUP BY
+                p.id ;
+            """
+        cursor.execute(query)
+        pipelines=cursor.fetchall()
+        return pipelines
+    except(Exception):
+        raise PipelineCreationError("Error: pipeline not found")
+
+def _ml_cache_state_columns(cursor) -> str:
+    """
+    This function returns the columns added to the cached lookups for the
+    schema of the cursor, see ML_CACHE_STATE_COLUMNS.
+    """
+    if has_cache_version(cursor):
+        return ML_CACHE_STATE_COLUMNS
+    return ML_UNCACHED_STATE_COLUMNS
+
+def _ml_cache_state(row) -> dict:
+    """
+    This function returns the state of a row ending with ML_CACHE_STATE_COLUMNS.
+    """
+    return {"version": row[-1], "is_clean": row[-2]}
+
+def get_ml_cache_state(cursor):
+    """
+    This function gets the version of the machine learning tables and whether
+    the transaction of the cursor has written to the database yet. It is read
+    before the data to cache: the data is then at least as recent as the
+    version, and is not cached if the transaction is not clean, as it could
+    contain uncommitted rows.
+
+    Parameters:
+    - cursor (cursor): The cursor of the database.
+
+    Returns:
+    - A dict with the "version" and "is_clean". The state is never clean if
+      the schema has no cache_version table.
+    """
+    if not has_cache_version(cursor):
+        return {"version": None, "is_clean": False}
+    try:
+        query = """
+            SELECT
+                (SELECT version FROM cache_version WHERE name = %s),
+                pg_current_xact_id_if_assigned() IS NULL
+            """
+        cursor.execute(query, (ML_CACHE,))
+        state = cursor.fetchone()
+        return {"version": state[0], "is_clean": state[1]}
+    except(Exception):
+        raise PipelineCreationError("Error: machine learning cache version not found")
+
+def check_ml_caches(cursor):
+    """
+    This function drops the caches of the schema of the cursor if the machine
+    learning tables changed since they were filled. The version is compared
+    at most every CACHE_VERSION_CHECK_INTERVAL seconds.
+
+    Parameters:
+    - cursor (cursor): The cursor of the database.
+    """
+    key = schema_key(cursor)
+    cached = _ml_cache_versions.get(key)
+    if cached is None or time.monotonic() - cached["checked_at"] <= CACHE_VERSION_CHECK_INTERVAL:
+        return
+    if get_cache_version(cursor, ML_CACHE) != cached["version"]:
+        invalidate_ml_caches(key)
+    else:
+        cached["checked_at"] = time.monotonic()
+
+def _can_cache(key, state: dict) -> bool:
+    """
+    This function tells if data read after state can be cached for the schema
+    key, dropping the caches of the schema filled at another version.
+    """
+    if key is None or not state["is_clean"]:
+        return False
+    cached = _ml_cache_versions.get(key)
+    if cached is not None and cached["version"] != state["version"]:
+        invalidate_ml_caches(key)
+    _ml_cache_versions.setdefault(
+        key, {"version": state["version"], "checked_at": time.monotonic()}
+    )
+    return True
+
+def get_cached_ml_structure(cursor):
+    """
+    This function gets the cached machine learning structure of the schema of the cursor.
+
+    Parameters:
+    - cursor (cursor): The cursor of the database.
+
+    Returns:
+    - A dict with a copy of the "structure" and its "etag", or None if it is not cached or outdated.
+    """
+    check_ml_caches(cursor)
+    entry = _ml_structure_cache.get(schema_key(cursor))
+    if entry is None:
+        return None
+    return {"structure": copy.deepcopy(entry["structure"]), "etag": entry["etag"]}
+
+def cache_ml_structure(cursor, ml_structure: dict, state: dict):
+    """
+    This function caches the machine learning structure of the schema of the cursor.
+    The ETag is a hash of the serialized structure, it changes only when the structure does.
+
+    Parameters:
+    - cursor (cursor): The cursor of the database.
+    - ml_structure (dict): The machine learning structure as built by nachet.get_ml_structure.
+    - state (dict): The state returned by get_ml_cache_state before the structure was read.
+      Nothing is cached if the transaction had written to the database.
+
+    Returns:
+    - A dict with a copy of the "structure" and its "etag".
+    """
+    serialized = json.dumps(ml_structure, sort_keys=True, default=str)
+    entry = {
+        "structure": copy.deepcopy(ml_structure),
+        "etag": hashlib.sha256(serialized.encode("utf-8")).hexdigest(),
+    }
+    key = schema_key(cursor)
+    if _can_cache(key, state):
+        _ml_structure_cache[key] = entry
+    return {"structure": copy.deepcopy(entry["structure"]), "etag": entry["etag"]}
+
+def invalidate_ml_structure(schema: str | None = None):
+    """
+    This function drops the cached machine learning structure of a schema, or
+    of every schema, see invalidate_ml_caches.
+    """
+    if schema is None:
+        _ml_structure_cache.clear()
+    else:
+        _ml_structure_cache.pop(schema, None)
+
+def invalidate_ml_caches(schema: str | None = None):
+    """
+    This function drops every cached lookup of this module of a schema, or of
+    every schema, including the machine learning structure. It is called by
+    the functions changing the pipelines, the models or their versions, while
+    the other transactions and processes see the version of the machine
+    learning tables change once the change is committed.
+    """
+    invalidate_ml_structure(schema)
+    lookups = (_pipeline_id_by_model_name, _pipeline_by_id, _model_by_id)
+    if schema is None:
+        _ml_cache_versions.clear()
+        for lookup in lookups:
+            lookup.invalidate()
+    else:
+        _ml_cache_versions.pop(schema, None)
+        for lookup in lookups:
+            lookup.invalidate_matching(lambda key: key[0] == schema)
+
+register_cache(ML_CACHE, invalidate_ml_caches)
+
+def get_cache_stats():
+    """
+    This function returns the hit and miss counters of the lookup caches of this module.
+
+    Returns:
+    - A dict of {"hits", "misses", "size", "maxsize"} per cache.
+    """
+    return {
+        "pipeline_id_by_model_name": _pipeline_id_by_model_name.stats(),
+        "pipeline_by_id": _pipeline_by_id.stats(),
+        "model_by_id": _model_by_id.stats(),
+    }
+
 def set_nachet_default_pipeline(cursor,pipeline_id:str):
     """
     This function sets the given pipeline as the default pipeline.
@@ -225,6 +501,7 @@ def set_nachet_default_pipeline(cursor,pipeline_id:str):
                 pipeline_id,
             ),
         )
+        invalidate_ml_caches(schema_key(cursor))
     except(Exception):
         raise PipelineCreationError("Error: pipeline not found")
     
@@ -263,6 +540,7 @@ def new_pipeline_model(cursor,pipeline_id,model_id):
             ),
         )
         pipeline_model_id=cursor.fetchone()[0]
+        invalidate_ml_caches(schema_key(cursor))
         return pipeline_model_id
     except(Exception):
         raise PipelineCreationError("Error: pipeline model not uploaded")
@@ -278,10 +556,16 @@ def get_pipeline_id_from_model_name(cursor,model_name:str):
     Returns:
     - The UUID of the model.
     """
+    check_ml_caches(cursor)
+    key = (schema_key(cursor), model_name)
+    pipeline_id = _pipeline_id_by_model_name.get(key)
+    if pipeline_id is not MISSING:
+        return pipeline_id
     try:
-        query = """
+        query = f"""
             SELECT 
-                pm.pipeline_id
+                pm.pipeline_id,
+                {_ml_cache_state_columns(cursor)}
             FROM  
                 pipeline_model as pm  
             LEFT JOIN  
@@ -291,11 +575,12 @@ def get_pipeline_id_from_model_name(cursor,model_name:str):
             """
         cursor.execute(
             query,
-            (
-                model_name,
-            ),
+            (model_name,),
         )
-        model_id=cursor.fetchone()[0]
+        row=cursor.fetchone()
+        model_id=row[0]
+        if _can_cache(key[0], _ml_cache_state(row)):
+            _pipeline_id_by_model_name.set(key, model_id)
         return model_id
     except(ValueError):
         raise NonExistingTaskEWarning(f"Warning: the given model '{model_name}' was not found")
@@ -335,6 +620,7 @@ def new_model(cursor,name,endpoint_name,task_id:int):
             ),
         )
         model_id=cursor.fetchone()[0]
+        invalidate_ml_caches(schema_key(cursor))
         return model_id
     except(Exception):
         raise PipelineCreationError("Error: model not uploaded")
@@ -365,6 +651,7 @@ def set_active_model(cursor,model_id,version_id):
                 model_id,
             ),
         )
+        invalidate_ml_caches(schema_key(cursor))
     except(Exception):
         raise PipelineCreationError("Error: model not uploaded")
     
@@ -473,14 +760,20 @@ def get_model(cursor,model_id:str):
     Returns:
     - The model.
     """
+    check_ml_caches(cursor)
+    key = (schema_key(cursor), str(model_id))
+    model = _model_by_id.get(key)
+    if model is not MISSING:
+        return model
     try:
-        query = """
+        query = f"""
             SELECT 
                 m.id,m.name,
                 m.endpoint_name,
                 t.name,
                 v.data,
-                v.version
+                v.version,
+                {_ml_cache_state_columns(cursor)}
             FROM
                 model as m
             LEFT JOIN
@@ -495,11 +788,14 @@ def get_model(cursor,model_id:str):
             """
         cursor.execute(
             query,
-            (
-                model_id,
-            )
+            (model_id,)
         )
-        model=cursor.fetchone()
+        row=cursor.fetchone()
+        if row is None:
+            return None
+        model=row[:-2]
+        if _can_cache(key[0], _ml_cache_state(row)):
+            _model_by_id.set(key, model)
         return model
     except(Exception):
         raise PipelineCreationError("Error: model not found")
@@ -537,6 +833,7 @@ def new_model_version(cursor, model_id, version,data):
             ),
         )
         model_version_id=cursor.fetchone()
+        invalidate_ml_caches(schema_key(cursor))
         return model_version_id[0]
     except(Exception):
         raise PipelineCreationError("Error: model version not uploaded")
@@ -2,6 +2,23 @@
 This file contains the queries for the seed table.
 """
 
+import time
+from uuid import UUID
+
+from nachet.db.queries.cache_version import (
+    CACHE_VERSION_CHECK_INTERVAL,
+    get_cache_version,
+    has_cache_version,
+    register_cache,
+    schema_key,
+)
+
+# Name of the seed catalogue in the cache_version table
+SEED_CACHE = "seed"
+
+# One catalogue per schema, see get_seed_catalogue
+_seed_catalogues: dict = {}
+
 
 class SeedNotFoundError(Exception):
     pass
@@ -56,9 +73,94 @@ def get_all_seeds(cursor):
         raise Exception("Error: seeds could not be retrieved")    
 
 
+def load_seed_catalogue(cursor) -> dict:
+    """
+    This function loads the seed catalogue of the schema of the cursor in a
+    single query and caches it, unless the transaction of the cursor has
+    already written to the database: its uncommitted seeds (ex: created with
+    new_seed and then rolled back) never end up in the cache.
+
+    Parameters:
+    - cursor (cursor): The cursor of the database.
+
+    Returns:
+    - The seed catalogue, see get_seed_catalogue.
+    """
+    try:
+        query = """
+            SELECT
+                (SELECT version FROM cache_version WHERE name = %s),
+                pg_current_xact_id_if_assigned() IS NULL,
+                (
+                    SELECT COALESCE(json_agg(json_build_array(id, name)), '[]')
+                    FROM seed
+                )
+            """
+        cursor.execute(query, (SEED_CACHE,))
+        version, is_clean, seeds = cursor.fetchone()
+    except Exception:
+        raise Exception("Error: seeds could not be retrieved")
+    catalogue = {
+        "version": version,
+        "checked_at": time.monotonic(),
+        "ids": {},
+        "names": {},
+    }
+    for seed_id, seed_name in seeds:
+        seed_id = UUID(seed_id)
+        catalogue["ids"].setdefault(seed_name.lower(), seed_id)
+        catalogue["names"][str(seed_id)] = seed_name
+    key = schema_key(cursor)
+    if is_clean and key is not None:
+        _seed_catalogues[key] = catalogue
+    return catalogue
+
+
+def get_seed_catalogue(cursor) -> dict:
+    """
+    This function returns the seed catalogue of the schema of the cursor.
+    The catalogue is kept in memory and reloaded when the version of the seed
+    table changed, which is checked at most every CACHE_VERSION_CHECK_INTERVAL
+    seconds (see nachet.db.queries.cache_version).
+
+    Parameters:
+    - cursor (cursor): The cursor of the database.
+
+    Returns:
+    - A dict with "ids" (lowercase name -> UUID) and "names" (UUID -> name).
+      Both are empty if the schema has no cache_version table, so the seeds
+      are queried directly.
+    """
+    catalogue = _seed_catalogues.get(schema_key(cursor))
+    if catalogue is None:
+        if not has_cache_version(cursor):
+            return {"version": None, "checked_at": None, "ids": {}, "names": {}}
+        return load_seed_catalogue(cursor)
+    if time.monotonic() - catalogue["checked_at"] > CACHE_VERSION_CHECK_INTERVAL:
+        if get_cache_version(cursor, SEED_CACHE) != catalogue["version"]:
+            return load_seed_catalogue(cursor)
+        catalogue["checked_at"] = time.monotonic()
+    return catalogue
+
+
+def invalidate_seed_catalogue(schema: str | None = None):
+    """
+    This function drops the cached seed catalogue of a schema, or of every
+    schema, so it is reloaded on next use.
+    """
+    if schema is None:
+        _seed_catalogues.clear()
+    else:
+        _seed_catalogues.pop(schema, None)
+
+
+register_cache(SEED_CACHE, invalidate_seed_catalogue)
+
+
 def get_seed_id(cursor, seed_name: str) -> str:
     """
     This function retrieve the UUUID of a seed.
+    The name is matched case-insensitively, from the seed catalogue first.
 
     Parameters:
     - cursor (cursor): The cursor of the database.
@@ -67,6 +169,9 @@ def get_seed_id(cursor, seed_name: str) -> str:
     Returns:
     - The UUID of the seed.
     """
+    seed_id = get_seed_catalogue(cursor)["ids"].get(seed_name.lower())
+    if seed_id is not None:
+        return seed_id
     try:
         query = """
             SELECT 
@@ -74,9 +179,8 @@ def get_seed_id(cursor, seed_name: str) -> str:
             FROM 
                 seed
             WHERE 
-                name ILIKE %s
+                lower(name) = lower(%s)
                 """
-        seed_name= "%"+seed_name
         cursor.execute(query, (seed_name,))
         result = cursor.fetchone()[0]
         return result
@@ -85,6 +189,50 @@ def get_seed_id(cursor, seed_name: str) -> str:
     except Exception:
         raise Exception("unhandled error")
 
+def get_seed_ids(cursor, seed_names: list) -> dict:
+    """
+    This function retrieves the UUID of several seeds, with a single query for
+    the names missing from the seed catalogue.
+    Names are matched the same way as in get_seed_id.
+
+    Parameters:
+    - cursor (cursor): The cursor of the database.
+    - seed_names (list): Names of the seeds.
+
+    Returns:
+    - A dict mapping each given name to the UUID of its seed.
+    """
+    catalogue = get_seed_catalogue(cursor)["ids"]
+    result = {}
+    missing = []
+    for name in dict.fromkeys(seed_names):
+        if name.lower() in catalogue:
+            result[name] = catalogue[name.lower()]
+        else:
+            missing.append(name)
+    if not missing:
+        return result
+    try:
+        query = """
+            SELECT DISTINCT ON (l.name)
+                l.name,
+                s.id
+            FROM 
+                unnest(%s::text[]) AS l(name)
+            JOIN 
+                seed s ON lower(s.name) = lower(l.name)
+            ORDER BY 
+                l.name
+                """
+        cursor.execute(query, (missing,))
+        result.update(cursor.fetchall())
+    except Exception:
+        raise Exception("unhandled error")
+    missing = [name for name in missing if name not in result]
+    if missing:
+        raise SeedNotFoundError(f"Error: seed not found {missing}")
+    return result
+
 def get_seed_name(cursor, seed_id:str) -> str :
     """
     This function retrieves the name of a seed from the database.
@@ -96,6 +244,9 @@ def get_seed_name(cursor, seed_id:str) -> str :
     Returns:
     - The name of the seed.
     """
+    seed_name = get_seed_catalogue(cursor)["names"].get(str(seed_id))
+    if seed_name is not None:
+        return seed_name
     try:
         query = """
             SELECT 
@@ -133,7 +284,11 @@ def new_seed(cursor, seed_name: str):
             query,
             (seed_name,),
         )
-        return cursor.fetchone()[0]
+        seed_id = cursor.fetchone()[0]
+        # Other transactions reload it once the new seed is committed, as the
+        # trigger of the seed table bumps its version
+        invalidate_seed_catalogue(schema_key(cursor))
+        return seed_id
     except Exception:
         raise SeedCreationError("Error: picture_set not uploaded")
 
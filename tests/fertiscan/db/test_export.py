@@ -0,0 +1,104 @@
+"""
+This is a test script for the database packages.
+It tests the functions of the inspection export.
+"""
+
+import datetime
+import json
+import os
+import unittest
+
+import datastore.db as db
+import fertiscan.db.metadata.inspection as metadata
+from datastore.db.queries import picture, user
+from fertiscan.db.queries import export, inspection
+from fertiscan.db.queries.errors import InspectionQueryError
+
+DB_CONNECTION_STRING = os.environ.get("FERTISCAN_DB_URL")
+if DB_CONNECTION_STRING is None or DB_CONNECTION_STRING == "":
+    raise ValueError("FERTISCAN_DB_URL is not set")
+
+DB_SCHEMA = os.environ.get("FERTISCAN_SCHEMA_TESTING")
+if DB_SCHEMA is None or DB_SCHEMA == "":
+    raise ValueError("FERTISCAN_SCHEMA_TESTING is not set")
+
+
+class test_export(unittest.TestCase):
+    def setUp(self):
+        self.con = db.connect_db(DB_CONNECTION_STRING, DB_SCHEMA)
+        self.cursor = self.con.cursor()
+        db.create_search_path(self.con, self.cursor, DB_SCHEMA)
+
+        with open("tests/fertiscan/analyse.json") as f:
+            self.analyse = json.load(f)
+        self.user_id = user.register_user(self.cursor, "test-export@email")
+        self.picture_set_id = picture.new_picture_set(
+            self.cursor, json.dumps({}), self.user_id
+        )
+        formatted_analysis = metadata.build_inspection_import(
+            self.analyse, self.user_id, self.picture_set_id
+        )
+        self.inspection_id = inspection.new_inspection_with_label_info(
+            self.cursor, self.user_id, formatted_analysis
+        )["inspection_id"]
+        self.cursor.execute(
+            "SELECT updated_at FROM inspection WHERE id = %s", (self.inspection_id,)
+        )
+        self.updated_at = self.cursor.fetchone()[0]
+
+    def tearDown(self):
+        self.con.rollback()
+        db.end_query(self.con, self.cursor)
+
+    def export_rows(self, table, **kwargs):
+        rows = []
+        for columns, batch in export.iter_export_batches(self.con, table, **kwargs):
+            names = [column.name for column in columns]
+            rows.extend(dict(zip(names, row)) for row in batch)
+        return [row for row in rows if str(row["inspection_id"]) == str(self.inspection_id)]
+
+    def test_get_export_high_water_mark(self):
+        self.assertGreaterEqual(
+            export.get_export_high_water_mark(self.cursor), self.updated_at
+        )
+
+    def test_iter_export_batches(self):
+        for table in export.EXPORT_QUERIES:
+            self.assertTrue(self.export_rows(table), table)
+        label = self.export_rows("label_information")[0]
+        self.assertEqual(label["product_name"], self.analyse["fertiliser_name"])
+        metric_types = {row["metric_type"] for row in self.export_rows("metric")}
+        self.assertIn("weight", metric_types)
+
+    def test_iter_export_batches_batch_size(self):
+        batches = list(
+            export.iter_export_batches(self.con, "guaranteed", batch_size=1)
+        )
+        self.assertTrue(all(len(rows) == 1 for _, rows in batches))
+
+    def test_iter_export_batches_updated_window(self):
+        before = self.updated_at - datetime.timedelta(seconds=1)
+        self.assertTrue(self.export_rows("inspection", since=before))
+        self.assertFalse(self.export_rows("inspection", since=self.updated_at))
+        self.assertFalse(self.export_rows("inspection", until=before))
+
+    def test_iter_export_batches_exclude(self):
+        before = self.updated_at - datetime.timedelta(seconds=1)
+        exported = export.get_inspection_versions(self.cursor, before, self.updated_at)
+        self.assertIn(
+            str(self.inspection_id), [str(id) for id, _ in exported]
+        )
+        self.assertFalse(
+            self.export_rows("metric", since=before, exclude=exported)
+        )
+        # A later update of the inspection is exported again
+        stale = [(self.inspection_id, before)]
+        self.assertTrue(self.export_rows("metric", since=before, exclude=stale))
+
+    def test_iter_export_batches_unknown_table(self):
+        with self.assertRaises(InspectionQueryError):
+            list(export.iter_export_batches(self.con, "users"))
+
+
+if __name__ == "__main__":
+    unittest.main()
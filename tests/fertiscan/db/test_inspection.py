@@ -5,6 +5,7 @@ It tests the functions in the inspection.
 
 import os
 import unittest
+import uuid
 
 import datastore.db as db
 from datastore.db.metadata import picture_set, validator
@@ -63,6 +64,88 @@ class test_inspection(unittest.TestCase):
         self.assertEqual(inspection_data[3], self.user_id)
         self.assertEqual(inspection_data[6], self.picture_set_id)
 
+    def test_get_inspection_json(self):
+        inspection_id = inspection.new_inspection(
+            self.cursor, self.user_id, self.picture_set_id, False
+        )
+        inspection_json = inspection.get_inspection_json(self.cursor, inspection_id)
+        self.assertEqual(inspection_json["inspection"]["id"], str(inspection_id))
+        self.assertEqual(
+            inspection_json["inspection"]["inspector_id"], str(self.user_id)
+        )
+        self.assertEqual(
+            inspection_json["inspection"]["picture_set_id"], str(self.picture_set_id)
+        )
+        for key in (
+            "product",
+            "metrics",
+            "registration_numbers",
+            "organizations",
+            "sub_labels",
+            "guaranteed_analysis",
+            "ingredients",
+        ):
+            self.assertIn(key, inspection_json)
+
+    def test_get_inspection_json_not_found(self):
+        with self.assertRaises(inspection.InspectionNotFoundError):
+            inspection.get_inspection_json(self.cursor, str(uuid.uuid4()))
+
+    def test_get_inspection_snapshot(self):
+        inspection_id = inspection.new_inspection(
+            self.cursor, self.user_id, self.picture_set_id, False
+        )
+        self.assertIsNone(
+            inspection.get_stored_inspection_snapshot(self.cursor, inspection_id)
+        )
+        snapshot = inspection.get_inspection_snapshot(self.cursor, inspection_id)
+        self.assertEqual(
+            snapshot, inspection.get_inspection_json(self.cursor, inspection_id)
+        )
+        # Reads never write the snapshot
+        self.assertIsNone(
+            inspection.get_stored_inspection_snapshot(self.cursor, inspection_id)
+        )
+        inspection.refresh_inspection_snapshots(self.cursor, [inspection_id])
+        stored, is_fresh = inspection.get_stored_inspection_snapshot(
+            self.cursor, inspection_id
+        )
+        self.assertEqual(stored, snapshot)
+        self.assertTrue(is_fresh)
+
+        # The snapshot is deleted once the inspection is updated, even
+        # without a new updated_at
+        self.cursor.execute(
+            "UPDATE inspection SET verified = TRUE WHERE id = %s",
+            (inspection_id,),
+        )
+        self.assertIsNone(
+            inspection.get_stored_inspection_snapshot(self.cursor, inspection_id)
+        )
+        snapshot = inspection.get_inspection_snapshot(self.cursor, inspection_id)
+        self.assertTrue(snapshot["inspection"]["verified"])
+
+    def test_get_inspection_snapshot_not_found(self):
+        with self.assertRaises(inspection.InspectionNotFoundError):
+            inspection.get_inspection_snapshot(self.cursor, str(uuid.uuid4()))
+
+    def test_refresh_inspection_snapshots(self):
+        inspection_id = inspection.new_inspection(
+            self.cursor, self.user_id, self.picture_set_id, False
+        )
+        self.assertIn(
+            inspection_id,
+            inspection.get_inspection_ids_after(self.cursor, stale_only=True, limit=None),
+        )
+        count = inspection.refresh_inspection_snapshots(
+            self.cursor, [inspection_id, uuid.uuid4()]
+        )
+        self.assertEqual(count, 1)
+        self.assertNotIn(
+            inspection_id,
+            inspection.get_inspection_ids_after(self.cursor, stale_only=True, limit=None),
+        )
+
     def test_get_all_user_inspection(self):
         inspection_id = inspection.new_inspection(
             self.cursor, self.user_id, self.picture_set_id, False
@@ -95,6 +178,81 @@ class test_inspection(unittest.TestCase):
         self.assertEqual(inspection_data2[0][0], inspection_id)
         self.assertFalse(inspection_data2[0][9])  # Not verified
 
+    def test_get_user_inspection_page(self):
+        # Inspections created in the same transaction share their updated_at,
+        # so the pages are ordered by id
+        inspection_ids = [
+            inspection.new_inspection(
+                self.cursor, self.user_id, self.picture_set_id, i % 2 == 0
+            )
+            for i in range(5)
+        ]
+        seen = []
+        after = None
+        while True:
+            page = inspection.get_user_inspection_page(
+                self.cursor, self.user_id, limit=2, after=after
+            )
+            if not page:
+                break
+            self.assertLessEqual(len(page), 2)
+            seen.extend(row[0] for row in page)
+            after = (page[-1][2], page[-1][0])
+        self.assertEqual(seen, sorted(inspection_ids, key=str, reverse=True))
+
+        ascending = inspection.get_user_inspection_page(
+            self.cursor, self.user_id, sort="upload_date", descending=False
+        )
+        self.assertEqual(
+            [row[0] for row in ascending], sorted(inspection_ids, key=str)
+        )
+
+        verified = inspection.get_user_inspection_page(
+            self.cursor, self.user_id, verified=True
+        )
+        self.assertEqual(len(verified), 3)
+        self.assertTrue(all(row[9] for row in verified))
+
+        with self.assertRaises(inspection.InspectionQueryError):
+            inspection.get_user_inspection_page(self.cursor, self.user_id, sort="id")
+
+    def test_get_user_inspection_page_null_sort_value(self):
+        inspection_ids = [
+            inspection.new_inspection(self.cursor, self.user_id, self.picture_set_id)
+            for _ in range(3)
+        ]
+        null_ids = inspection_ids[1:]
+        self.cursor.execute(
+            "UPDATE inspection SET updated_at = NULL WHERE id = ANY(%s::uuid[])",
+            ([str(id) for id in null_ids],),
+        )
+        seen = []
+        after = None
+        while page := inspection.get_user_inspection_page(
+            self.cursor, self.user_id, limit=1, after=after
+        ):
+            seen.append(page[0][0])
+            after = (page[0][2], page[0][0])
+        # The inspections without updated_at come last, ordered by id
+        self.assertEqual(
+            seen, [inspection_ids[0]] + sorted(null_ids, key=str, reverse=True)
+        )
+
+    def test_get_user_inspection_page_product_name_prefix(self):
+        inspection.new_inspection(self.cursor, self.user_id, self.picture_set_id)
+        page = inspection.get_user_inspection_page(
+            self.cursor, self.user_id, product_name_prefix="%"
+        )
+        self.assertEqual(page, [])
+
+    def test_estimate_user_inspection_count(self):
+        inspection.new_inspection(self.cursor, self.user_id, self.picture_set_id)
+        estimate = inspection.estimate_user_inspection_count(
+            self.cursor, self.user_id, verified=False
+        )
+        self.assertIsInstance(estimate, int)
+        self.assertGreaterEqual(estimate, 0)
+
     # Deprecated function at the moment
     # def test_get_all_organization_inspection(self):
     #     company_id = organization.new_organization(
@@ -0,0 +1,126 @@
+"""
+This is a test script for the database packages.
+It tests the reference data cache.
+"""
+
+import os
+import unittest
+
+import datastore.db as db
+from fertiscan.db.queries import metric, nutrients, organization, reference, sub_label
+
+DB_CONNECTION_STRING = os.environ.get("FERTISCAN_DB_URL")
+if DB_CONNECTION_STRING is None or DB_CONNECTION_STRING == "":
+    raise ValueError("FERTISCAN_DB_URL is not set")
+
+DB_SCHEMA = os.environ.get("FERTISCAN_SCHEMA_TESTING")
+if DB_SCHEMA is None or DB_SCHEMA == "":
+    raise ValueError("FERTISCAN_SCHEMA_TESTING is not set")
+
+
+class test_reference(unittest.TestCase):
+    def setUp(self):
+        self.con = db.connect_db(DB_CONNECTION_STRING, DB_SCHEMA)
+        self.cursor = self.con.cursor()
+        db.create_search_path(self.con, self.cursor, DB_SCHEMA)
+        reference.invalidate_reference_data()
+
+    def tearDown(self):
+        self.con.rollback()
+        db.end_query(self.con, self.cursor)
+        reference.invalidate_reference_data()
+
+    def test_load_reference_data(self):
+        data = reference.load_reference_data(self.cursor)
+        self.assertIsNotNone(data)
+        self.assertIs(reference.get_reference_data(self.cursor), data)
+        self.cursor.execute("SELECT count(*) FROM province")
+        self.assertEqual(len(data["provinces"]), self.cursor.fetchone()[0])
+
+    def test_load_reference_data_after_write(self):
+        metric.new_unit(self.cursor, "reference-unit", 1.0)
+        self.assertIsNone(reference.load_reference_data(self.cursor))
+        # The lookups fall back to the database and see the new unit
+        self.assertTrue(metric.is_a_unit(self.cursor, "reference-unit"))
+        self.assertIsNotNone(metric.get_unit_id(self.cursor, "reference-unit"))
+
+    def test_element_lookups(self):
+        self.cursor.execute(
+            "SELECT id, name_fr, name_en, symbol FROM element_compound LIMIT 1"
+        )
+        element_id, name_fr, name_en, symbol = self.cursor.fetchone()
+        reference.load_reference_data(self.cursor)
+        self.assertEqual(
+            nutrients.get_element_id_full_search(self.cursor, name_en.upper()),
+            element_id,
+        )
+        self.assertEqual(
+            nutrients.get_element_id_full_search(self.cursor, f" {name_fr.lower()} "),
+            element_id,
+        )
+        self.assertEqual(
+            nutrients.get_element_id_name(self.cursor, name_fr), element_id
+        )
+        self.assertEqual(
+            nutrients.get_element_id_symbol(self.cursor, symbol.lower()), element_id
+        )
+
+    def test_sub_type_and_region_lookups(self):
+        self.cursor.execute("SELECT id, type_en FROM sub_type LIMIT 1")
+        sub_type_id, type_en = self.cursor.fetchone()
+        province_id = organization.new_province(self.cursor, "reference-province")
+        region_id = organization.new_region(
+            self.cursor, "reference-region", province_id
+        )
+        self.assertEqual(
+            sub_label.get_sub_type_id(self.cursor, type_en.upper()), sub_type_id
+        )
+        self.assertIn(
+            (province_id, "reference-province"),
+            organization.get_all_province(self.cursor),
+        )
+        self.assertEqual(
+            [row[0] for row in organization.get_region_by_province(self.cursor, province_id)],
+            [region_id],
+        )
+
+    def test_lists_see_uncommitted_rows(self):
+        # Loaded outside of a transaction, then rows are written without
+        # dropping the cache
+        self.assertIsNotNone(reference.get_reference_data(self.cursor))
+        self.con.commit()
+        organization.get_all_province(self.cursor)
+        self.cursor.execute(
+            "INSERT INTO province (name) VALUES ('reference-province') RETURNING id"
+        )
+        province_id = self.cursor.fetchone()[0]
+        self.cursor.execute(
+            "INSERT INTO region (province_id, name) VALUES (%s, 'reference-region') RETURNING id",
+            (province_id,),
+        )
+        region_id = self.cursor.fetchone()[0]
+        self.assertIn(
+            (province_id, "reference-province"),
+            organization.get_all_province(self.cursor),
+        )
+        self.assertEqual(
+            [row[0] for row in organization.get_region_by_province(self.cursor, province_id)],
+            [region_id],
+        )
+
+    def test_version_change_reloads(self):
+        data = reference.load_reference_data(self.cursor)
+        self.cursor.execute(
+            "UPDATE reference_data_version SET version = version + 1"
+        )
+        data["checked_at"] = 0
+        # Written by this transaction, so the new version is not cached
+        self.assertIsNone(reference.get_reference_data(self.cursor))
+
+    def test_normalize_name(self):
+        self.assertEqual(reference.normalize_name(" Azoté "), "azote")
+        self.assertEqual(reference.normalize_name("MAGNÉSIUM"), "magnesium")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+"""
+This is a test script for the database packages.
+It tests the search of the inspections.
+"""
+
+import json
+import os
+import unittest
+
+import datastore.db as db
+import fertiscan.db.metadata.inspection as metadata
+from datastore.db.queries import picture, user
+from fertiscan.db.queries import inspection, search
+from fertiscan.db.queries.errors import InspectionQueryError
+
+DB_CONNECTION_STRING = os.environ.get("FERTISCAN_DB_URL")
+if DB_CONNECTION_STRING is None or DB_CONNECTION_STRING == "":
+    raise ValueError("FERTISCAN_DB_URL is not set")
+
+DB_SCHEMA = os.environ.get("FERTISCAN_SCHEMA_TESTING")
+if DB_SCHEMA is None or DB_SCHEMA == "":
+    raise ValueError("FERTISCAN_SCHEMA_TESTING is not set")
+
+
+class test_search(unittest.TestCase):
+    def setUp(self):
+        self.con = db.connect_db(DB_CONNECTION_STRING, DB_SCHEMA)
+        self.cursor = self.con.cursor()
+        db.create_search_path(self.con, self.cursor, DB_SCHEMA)
+
+        with open("tests/fertiscan/analyse.json") as f:
+            self.analyse = json.load(f)
+        self.user_id = user.register_user(self.cursor, "test-search@email")
+        self.picture_set_id = picture.new_picture_set(
+            self.cursor, json.dumps({}), self.user_id
+        )
+        self.inspection_ids = []
+        for name in ("Zyxwv Bloom 10-5-5", "Zyxwv Garden 20-20-20"):
+            self.analyse["fertiliser_name"] = name
+            formatted_analysis = metadata.build_inspection_import(
+                self.analyse, self.user_id, self.picture_set_id
+            )
+            self.inspection_ids.append(
+                inspection.new_inspection_with_label_info(
+                    self.cursor, self.user_id, formatted_analysis
+                )["inspection_id"]
+            )
+
+    def tearDown(self):
+        self.con.rollback()
+        db.end_query(self.con, self.cursor)
+
+    def result_ids(self, *args, **kwargs):
+        rows = search.search_inspections(self.cursor, *args, **kwargs)
+        return [str(row[0]) for row in rows]
+
+    def test_search_product_name(self):
+        ids = self.result_ids("zyxwv", user_id=self.user_id)
+        self.assertEqual(set(ids), {str(i) for i in self.inspection_ids})
+        ids = self.result_ids("Zyxwv Garden", user_id=self.user_id)
+        # The closest product name is ranked first
+        self.assertEqual(ids[0], str(self.inspection_ids[1]))
+
+    def test_search_registration_number(self):
+        ids = self.result_ids(
+            "12345678", user_id=self.user_id, fields=("registration_number",)
+        )
+        self.assertEqual(set(ids), {str(i) for i in self.inspection_ids})
+
+    def test_search_organization(self):
+        ids = self.result_ids(
+            "greengrow", user_id=self.user_id, fields=("organization",)
+        )
+        self.assertEqual(set(ids), {str(i) for i in self.inspection_ids})
+
+    def test_search_pagination(self):
+        first = search.search_inspections(
+            self.cursor, "zyxwv", user_id=self.user_id, limit=1
+        )
+        second = search.search_inspections(
+            self.cursor, "zyxwv", user_id=self.user_id, limit=1, offset=1
+        )
+        self.assertEqual(len(first), 1)
+        self.assertEqual(first[0][2], 2)
+        self.assertNotEqual(first[0][0], second[0][0])
+        self.assertGreaterEqual(first[0][1], second[0][1])
+
+    def test_search_escaped_pattern(self):
+        self.assertEqual(self.result_ids("%", user_id=self.user_id), [])
+
+    def test_search_invalid(self):
+        with self.assertRaises(InspectionQueryError):
+            search.search_inspections(self.cursor, "  ")
+        with self.assertRaises(InspectionQueryError):
+            search.search_inspections(self.cursor, "zyxwv", fields=("comment",))
+
+
+if __name__ == "__main__":
+    unittest.main()
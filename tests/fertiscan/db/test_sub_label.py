@@ -163,6 +163,24 @@ class test_sub_label(unittest.TestCase):
             for item in data[key]:
                 self.assertEqual(data[key][item], [])
 
+    def test_sub_label_olap_dimension(self):
+        cautions_id = sub_label.get_sub_type_id(self.cursor, "cautions")
+        sub_label_ids = [
+            sub_label.new_sub_label(
+                self.cursor, text, text, self.label_id, cautions_id, False
+            )
+            for text in (self.text_fr, self.text_fr_2)
+        ]
+        label_dimension = label.get_label_dimension(self.cursor, self.label_id)
+        self.assertEqual(label_dimension[3], sub_label_ids)
+
+        # The statement-level trigger removes every deleted sub_label at once
+        self.cursor.execute(
+            "DELETE FROM sub_label WHERE label_id = %s", (self.label_id,)
+        )
+        label_dimension = label.get_label_dimension(self.cursor, self.label_id)
+        self.assertEqual(label_dimension[3], [])
+
     def test_has_sub_label(self):
         sub_label.new_sub_label(
             self.cursor,
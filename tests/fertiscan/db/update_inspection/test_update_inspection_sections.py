@@ -0,0 +1,174 @@
+import asyncio
+import datetime
+import json
+import os
+import unittest
+
+from dotenv import load_dotenv
+
+import datastore.db.__init__ as db
+import fertiscan
+from datastore.db.queries.picture import new_picture_set
+from fertiscan.db.metadata.inspection import Inspection, diff_inspection_sections
+from fertiscan.db.queries.errors import InspectionConflictError
+from fertiscan.db.queries.inspection import (
+    get_inspection_dict,
+    update_inspection_sections,
+)
+
+load_dotenv()
+
+# Constants for test configuration
+DB_CONNECTION_STRING = os.environ.get("FERTISCAN_DB_URL")
+if not DB_CONNECTION_STRING:
+    raise ValueError("FERTISCAN_DB_URL is not set")
+
+DB_SCHEMA = os.environ.get("FERTISCAN_SCHEMA_TESTING")
+if not DB_SCHEMA:
+    raise ValueError("FERTISCAN_SCHEMA_TESTING is not set")
+
+TEST_INSPECTION_JSON_PATH = "tests/fertiscan/inspection.json"
+
+
+class TestUpdateInspectionSections(unittest.TestCase):
+    def setUp(self):
+        self.conn = db.connect_db(DB_CONNECTION_STRING, DB_SCHEMA)
+        self.cursor = db.cursor(self.conn)
+        db.create_search_path(self.conn, self.cursor, DB_SCHEMA)
+
+        self.cursor.execute(
+            """
+            INSERT INTO users (email) 
+            VALUES (%s)
+            ON CONFLICT (email) DO UPDATE 
+            SET email = EXCLUDED.email 
+            RETURNING id;
+            """,
+            ("inspector@example.com",),
+        )
+        self.inspector_id = self.cursor.fetchone()[0]
+
+        with open(TEST_INSPECTION_JSON_PATH, "r") as file:
+            create_input_json = json.load(file)
+        self.picture_set_id = new_picture_set(
+            self.cursor, json.dumps({}), self.inspector_id
+        )
+        create_input_json["picture_set_id"] = str(self.picture_set_id)
+
+        self.cursor.execute(
+            "SELECT new_inspection(%s, %s);",
+            (self.inspector_id, json.dumps(create_input_json)),
+        )
+        self.inspection_id = str(self.cursor.fetchone()[0].get("inspection_id"))
+        self.updated_at = get_inspection_dict(self.cursor, self.inspection_id)[
+            "updated_at"
+        ]
+        self.inspection = Inspection.model_validate_json(
+            asyncio.run(
+                fertiscan.get_full_inspection_json(self.cursor, self.inspection_id)
+            )
+        )
+
+    def tearDown(self):
+        self.conn.rollback()
+        self.cursor.close()
+        self.conn.close()
+
+    def sub_label_ids(self, type_en):
+        self.cursor.execute(
+            """
+            SELECT sub_label.id
+            FROM sub_label
+            JOIN sub_type ON sub_type.id = sub_label.sub_type_id
+            JOIN inspection ON inspection.label_info_id = sub_label.label_id
+            WHERE inspection.id = %s AND sub_type.type_en = %s
+            ORDER BY sub_label.id
+            """,
+            (self.inspection_id, type_en),
+        )
+        return [row[0] for row in self.cursor.fetchall()]
+
+    def test_diff_inspection_sections(self):
+        altered = self.inspection.model_copy(deep=True)
+        self.assertEqual(diff_inspection_sections(self.inspection, altered), {})
+
+        altered.cautions.en = ["Updated caution"] + altered.cautions.en[1:]
+        altered.product.lot_number = "LOT-UPDATED"
+        sections = diff_inspection_sections(self.inspection, altered)
+        self.assertEqual(set(sections), {"cautions", "product"})
+        self.assertEqual(sections["cautions"]["en"][0], "Updated caution")
+        self.assertNotIn("metrics", sections["product"])
+
+    def test_update_only_changed_sections(self):
+        instructions_ids = self.sub_label_ids("instructions")
+        cautions_ids = self.sub_label_ids("cautions")
+        altered = self.inspection.model_copy(deep=True)
+        altered.cautions.en = ["Updated caution"] + altered.cautions.en[1:]
+
+        updated, updated_at = asyncio.run(
+            fertiscan.update_inspection_sections(
+                self.cursor,
+                self.inspection_id,
+                self.inspector_id,
+                altered,
+                self.updated_at,
+            )
+        )
+
+        self.assertEqual(updated.cautions.en[0], "Updated caution")
+        self.assertEqual(updated.instructions, self.inspection.instructions)
+        self.assertGreater(updated_at, self.updated_at)
+        # The rows of the unchanged sections are kept
+        self.assertEqual(self.sub_label_ids("instructions"), instructions_ids)
+        self.assertNotEqual(self.sub_label_ids("cautions"), cautions_ids)
+
+    def test_update_without_changes(self):
+        updated, updated_at = asyncio.run(
+            fertiscan.update_inspection_sections(
+                self.cursor,
+                self.inspection_id,
+                self.inspector_id,
+                self.inspection,
+                self.updated_at.isoformat(),
+            )
+        )
+        self.assertEqual(updated, self.inspection)
+        self.assertEqual(updated_at, self.updated_at)
+
+    def test_update_conflict(self):
+        altered = self.inspection.model_copy(deep=True)
+        altered.inspection_comment = "First update"
+        asyncio.run(
+            fertiscan.update_inspection_sections(
+                self.cursor,
+                self.inspection_id,
+                self.inspector_id,
+                altered,
+                self.updated_at,
+            )
+        )
+        altered.inspection_comment = "Second update from the same version"
+        with self.assertRaises(InspectionConflictError):
+            asyncio.run(
+                fertiscan.update_inspection_sections(
+                    self.cursor,
+                    self.inspection_id,
+                    self.inspector_id,
+                    altered,
+                    self.updated_at,
+                )
+            )
+
+    def test_update_inspection_sections_conflict(self):
+        with self.assertRaises(InspectionConflictError):
+            update_inspection_sections(
+                self.cursor,
+                self.inspection_id,
+                self.inspector_id,
+                self.updated_at - datetime.timedelta(seconds=1),
+                {"inspection": {"verified": False}},
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
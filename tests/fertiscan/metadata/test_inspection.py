@@ -86,6 +86,54 @@ class TestInspectionExport(unittest.TestCase):
         self.assertTrue(data["guaranteed_analysis"]["is_minimal"])
         self.assertEqual(data["picture_set_id"], str(self.picture_set_id))
 
+    def test_new_inspections(self):
+        inspection_dicts = inspection.new_inspections_with_label_info(
+            self.cursor, self.user_id, [self.formatted_analysis] * 3
+        )
+        self.assertEqual(len(inspection_dicts), 3)
+        inspection_ids = {d["inspection_id"] for d in inspection_dicts}
+        self.assertEqual(len(inspection_ids), 3)
+        for inspection_dict in inspection_dicts:
+            data = json.loads(
+                metadata.build_inspection_export(
+                    self.cursor, str(inspection_dict["inspection_id"])
+                )
+            )
+            self.assertEqual(data["product"]["name"], self.analyse["fertiliser_name"])
+            self.assertEqual(
+                len(data["guaranteed_analysis"]["en"]),
+                len(json.loads(self.formatted_analysis)["guaranteed_analysis"]["en"]),
+            )
+            self.assertCountEqual(
+                [o["id"] for o in data["organizations"]],
+                [o["id"] for o in inspection_dict["organizations"]],
+            )
+            self.assertTrue(inspection_dict["organizations"][0]["is_main_contact"])
+        self.assertEqual(
+            len({d["product"]["label_id"] for d in inspection_dicts}), 3
+        )
+        self.assertEqual(
+            inspection.new_inspections_with_label_info(self.cursor, self.user_id, []),
+            [],
+        )
+
+    def test_check_inspection_snapshot(self):
+        inspection_dict = inspection.new_inspection_with_label_info(
+            self.cursor, self.user_id, self.formatted_analysis
+        )
+        inspection_id = str(inspection_dict["inspection_id"])
+        self.assertEqual(
+            json.loads(
+                metadata.build_inspection_export_from_sections(
+                    self.cursor, inspection_id
+                )
+            ),
+            json.loads(metadata.build_inspection_export(self.cursor, inspection_id)),
+        )
+        self.assertEqual(
+            metadata.check_inspection_snapshot(self.cursor, inspection_id), []
+        )
+
     def test_no_organization(self):
         self.analyse["organizations"] = []
 
@@ -567,7 +615,7 @@ class TestInspectionExport(unittest.TestCase):
         self.assertEqual(inspection_data["organizations"][0]["name"], test_str)
         self.assertEqual(inspection_data["organizations"][1]["website"], test_str)
 
-    @patch("fertiscan.db.queries.inspection.get_inspection")
+    @patch("fertiscan.db.queries.inspection.get_inspection_json")
     def test_query_error(self, mock_get_inspection):
         # Simulate QueryError being raised
         mock_get_inspection.side_effect = QueryError("Simulated query error")
@@ -581,7 +629,7 @@ class TestInspectionExport(unittest.TestCase):
         self.assertIn("Error fetching data", str(context.exception))
         self.assertIn("Simulated query error", str(context.exception))
 
-    @patch("fertiscan.db.queries.inspection.get_inspection")
+    @patch("fertiscan.db.queries.inspection.get_inspection_json")
     def test_unexpected_error(self, mock_get_inspection):
         mock_get_inspection.side_effect = TypeError("Simulated unexpected error")
 
@@ -1,3 +1,4 @@
+import asyncio
 import unittest
 
 from psycopg import Error as PsycopgError
@@ -63,5 +64,17 @@ class TestHandleQueryErrors(unittest.TestCase):
         self.assertIn("Database error: DB error", str(cm.exception))
 
 
+    # Test to ensure coroutines keep the same error handling
+    def test_async_db_error_handling(self):
+        @handle_query_errors()
+        async def async_function_raises_db_error():
+            raise PsycopgError("DB error")
+
+        with self.assertRaises(QueryError) as cm:
+            asyncio.run(async_function_raises_db_error())
+
+        self.assertIn("Database error: DB error", str(cm.exception))
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -264,6 +264,85 @@ class test_inference_functions(unittest.TestCase):
                 "The object id is not in the list of expected objects",
             )
 
+    def test_new_inference_objects(self):
+        """
+        This test checks if the new_inference_objects function uploads every object in order
+        """
+        inference_id = inference.new_inference(
+            self.cursor, self.inference_trim, self.user_id, self.picture_id, self.type, self.pipeline_id
+        )
+        boxes = [json.dumps(box) for box in self.inference["boxes"]]
+        objects_id = inference.new_inference_objects(
+            self.cursor, inference_id, boxes, self.type
+        )
+        self.assertEqual(len(objects_id), len(boxes))
+        for object_id, box in zip(objects_id, self.inference["boxes"]):
+            object = inference.get_inference_object(self.cursor, object_id)
+            self.assertEqual(object[1], box)
+            self.assertEqual(object[2], inference_id)
+
+    def test_new_seed_objects_and_top_ids(self):
+        """
+        This test checks if the new_seed_objects and set_inference_objects_top_id functions work in bulk
+        """
+        inference_id = inference.new_inference(
+            self.cursor, self.inference_trim, self.user_id, self.picture_id, self.type, self.pipeline_id
+        )
+        objects_id = inference.new_inference_objects(
+            self.cursor,
+            inference_id,
+            [json.dumps(box) for box in self.inference["boxes"]],
+            self.type,
+        )
+        seed_objects_id = inference.new_seed_objects(
+            self.cursor, [(self.seed_id, object_id, 0.5) for object_id in objects_id]
+        )
+        self.assertEqual(len(seed_objects_id), len(objects_id))
+
+        inference.set_inference_objects_top_id(
+            self.cursor, list(zip(objects_id, seed_objects_id))
+        )
+        for object_id, seed_object_id in zip(objects_id, seed_objects_id):
+            self.assertEqual(
+                inference.get_inference_object_top_id(self.cursor, object_id),
+                seed_object_id,
+            )
+            self.assertEqual(
+                inference.get_seed_object_id(self.cursor, self.seed_id, object_id),
+                seed_object_id,
+            )
+
+    def test_get_inference_tree(self):
+        """
+        This test checks if the get_inference_tree function returns every object with its top seed and topN
+        """
+        inference_id = inference.new_inference(
+            self.cursor, self.inference_trim, self.user_id, self.picture_id, self.type, self.pipeline_id
+        )
+        inference_obj_id = inference.new_inference_object(
+            self.cursor, inference_id, json.dumps(self.inference["boxes"][0]), self.type
+        )
+        seed_obj_id = inference.new_seed_object(
+            self.cursor,
+            self.seed_id,
+            inference_obj_id,
+            self.inference["boxes"][0]["score"],
+        )
+        inference.set_inference_object_top_id(
+            self.cursor, inference_obj_id, seed_obj_id
+        )
+
+        tree = inference.get_inference_tree(self.cursor, inference_id)
+        self.assertEqual(len(tree), 1)
+        object_id, _, top_id, is_verified, top_label, top_n = tree[0]
+        self.assertEqual(object_id, inference_obj_id)
+        self.assertEqual(top_id, seed_obj_id)
+        self.assertFalse(is_verified)
+        self.assertEqual(top_label, self.seed_name)
+        self.assertEqual(len(top_n), 1)
+        self.assertEqual(top_n[0]["object_id"], str(seed_obj_id))
+        self.assertEqual(top_n[0]["label"], self.seed_name)
+
     def test_get_inference_object_top_id(self):
         """
         This test checks if the get_inference_object_top_id function returns the correct top_id of an inference object
@@ -71,6 +71,51 @@ class test_inference_functions(unittest.TestCase):
             )
 
 
+    def test_build_boxes_export(self):
+        """
+        This test checks if the build_boxes_export function rebuilds the boxes from the inference tree rows
+        """
+        box = {
+            "box": self.boxes[0]["box"],
+            "color": self.boxes[0]["color"],
+            "overlapping": False,
+            "overlappingIndices": [],
+        }
+        objects_tree = [
+            (
+                "box-1",
+                box,
+                "seed-obj-1",
+                False,
+                "top_label_name",
+                [
+                    {"object_id": "seed-obj-1", "label": "top_label_name", "score": 0.912},
+                    {"object_id": "seed-obj-2", "label": "test seed", "score": 0.053},
+                ],
+            ),
+            (
+                "box-2",
+                box,
+                "seed-obj-3",
+                True,
+                "test seed",
+                [{"object_id": "seed-obj-3", "label": "test seed", "score": 0.4}],
+            ),
+        ]
+        boxes = inference.build_boxes_export(objects_tree)
+        self.assertEqual(len(boxes), 2)
+        self.assertEqual(boxes[0].box_id, "box-1")
+        self.assertEqual(boxes[0].label, "top_label_name")
+        self.assertEqual(boxes[0].score, 0.912)
+        self.assertEqual(boxes[0].top_id, "seed-obj-1")
+        self.assertFalse(boxes[0].is_verified)
+        self.assertEqual(len(boxes[0].topN), 2)
+        self.assertEqual(boxes[0].topN[1].label, "test seed")
+        self.assertEqual(boxes[1].score, 1)
+        self.assertTrue(boxes[1].is_verified)
+        self.assertEqual(boxes[1].color, self.boxes[0]["color"])
+
+
 class test_machine_learning_functions(unittest.TestCase):
     def setUp(self):
         base_dir = os.path.dirname(os.path.abspath(__file__))
@@ -69,6 +69,63 @@ class test_seed_functions(unittest.TestCase):
         with self.assertRaises(seed.SeedNotFoundError):
             seed.get_seed_id(self.cursor, "nonexistant_seed")
 
+    def test_get_seed_id_case_insensitive(self):
+        """
+        This test checks if the get_seed_id function matches the seed name regardless of its case
+        """
+        seed_uuid = seed.new_seed(self.cursor, self.seed_name)
+        fetch_id = seed.get_seed_id(self.cursor, self.seed_name.upper())
+
+        self.assertEqual(seed_uuid, fetch_id)
+
+    def test_seed_catalogue_refresh_on_new_seed(self):
+        """
+        This test checks if the seed catalogue is refreshed when a new seed is created
+        """
+        catalogue = seed.get_seed_catalogue(self.cursor)
+        self.assertNotIn(self.seed_name.lower(), catalogue["ids"])
+
+        seed_uuid = seed.new_seed(self.cursor, self.seed_name)
+        catalogue = seed.get_seed_catalogue(self.cursor)
+        self.assertEqual(catalogue["ids"][self.seed_name.lower()], seed_uuid)
+        self.assertEqual(catalogue["names"][str(seed_uuid)], self.seed_name)
+        self.assertEqual(seed.get_seed_name(self.cursor, seed_uuid), self.seed_name)
+
+    def test_seed_catalogue_rollback(self):
+        """
+        This test checks if a seed rolled back never stays in the seed catalogue
+        """
+        seed.new_seed(self.cursor, self.seed_name)
+        # Read by the transaction that created the seed, so it is not cached
+        self.assertIn(self.seed_name.lower(), seed.get_seed_catalogue(self.cursor)["ids"])
+        self.con.rollback()
+
+        self.assertNotIn(self.seed_name.lower(), seed.get_seed_catalogue(self.cursor)["ids"])
+        with self.assertRaises(seed.SeedNotFoundError):
+            seed.get_seed_id(self.cursor, self.seed_name)
+
+    def test_get_seed_ids(self):
+        """
+        This test checks if the get_seed_ids function returns the UUID of every given seed
+        """
+        seed_uuid = seed.new_seed(self.cursor, self.seed_name)
+        other_uuid = seed.new_seed(self.cursor, "other-test-name")
+        fetch_ids = seed.get_seed_ids(
+            self.cursor, [self.seed_name, "other-test-name", self.seed_name]
+        )
+
+        self.assertEqual(
+            fetch_ids, {self.seed_name: seed_uuid, "other-test-name": other_uuid}
+        )
+
+    def test_get_nonexistant_seed_ids(self):
+        """
+        This test checks if the get_seed_ids function raises an exception when a seed does not exist
+        """
+        seed.new_seed(self.cursor, self.seed_name)
+        with self.assertRaises(seed.SeedNotFoundError):
+            seed.get_seed_ids(self.cursor, [self.seed_name, "nonexistant_seed"])
+
     def test_get_seed_id_error(self):
         """
         This test checks if the get_seed_id function raises an exception when the connection fails
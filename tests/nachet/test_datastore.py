@@ -11,6 +11,7 @@ from PIL import Image, ImageChops
 import json
 import uuid
 import asyncio
+import urllib.request
 import datastore.db.__init__ as db
 import datastore.__init__ as datastore
 import nachet.__init__ as nachet
@@ -105,6 +106,34 @@ class test_ml_structure(unittest.TestCase):
                         f"Key {key} was not found and expected in the returned dictionary",
                     )
 
+    def test_get_ml_structure_cache(self):
+        """
+        Test that the structure is cached with a stable ETag and refreshed when the active pipelines change.
+        """
+        ml_structure = asyncio.run(nachet.get_ml_structure(self.cursor))
+        etag = asyncio.run(nachet.get_ml_structure_etag(self.cursor))
+        self.assertEqual(asyncio.run(nachet.get_ml_structure_etag(self.cursor)), etag)
+        model_ids = [model["model_id"] for model in ml_structure["models"]]
+        self.assertEqual(len(model_ids), len(set(model_ids)))
+
+        asyncio.run(
+            nachet.import_ml_structure_from_json_version(self.cursor, self.ml_dict)
+        )
+        self.assertNotEqual(asyncio.run(nachet.get_ml_structure_etag(self.cursor)), etag)
+
+    def test_get_ml_structure_cache_rollback(self):
+        """
+        Test that a structure read by a transaction that changed the pipelines is never cached.
+        """
+        etag = asyncio.run(nachet.get_ml_structure_etag(self.cursor))
+        asyncio.run(
+            nachet.import_ml_structure_from_json_version(self.cursor, self.ml_dict)
+        )
+        self.assertNotEqual(asyncio.run(nachet.get_ml_structure_etag(self.cursor)), etag)
+        self.con.rollback()
+
+        self.assertEqual(asyncio.run(nachet.get_ml_structure_etag(self.cursor)), etag)
+
     def test_get_ml_structure_eeror(self):
         """
         Test the get version function.
@@ -410,6 +439,47 @@ class test_picture(unittest.TestCase):
         difference = ImageChops.difference(blob_image, self.image)
         self.assertTrue(difference.getbbox() is None)
 
+    def test_get_picture_url(self):
+        """
+        This test checks if the get_picture_url function returns a signed url to download the picture
+        """
+        picture_id = asyncio.run(
+            nachet.upload_picture_unknown(
+                self.cursor, self.user_id, self.pic_encoded, self.container_client
+            )
+        )
+        url = asyncio.run(
+            nachet.get_picture_url(
+                self.cursor, str(self.user_id), self.container_client, str(picture_id)
+            )
+        )
+        blob = asyncio.run(
+            nachet.get_picture_blob(
+                self.cursor, str(self.user_id), self.container_client, str(picture_id)
+            )
+        )
+        with urllib.request.urlopen(url) as response:
+            self.assertEqual(response.read(), blob)
+
+    def test_get_picture_url_error_user_not_found(self):
+        """
+        This test checks if the get_picture_url function correctly raise an exception if the user given doesn't exist in db
+        """
+        picture_id = asyncio.run(
+            nachet.upload_picture_unknown(
+                self.cursor, self.user_id, self.pic_encoded, self.container_client
+            )
+        )
+        with self.assertRaises(datastore.user.UserNotFoundError):
+            asyncio.run(
+                nachet.get_picture_url(
+                    self.cursor,
+                    str(uuid.uuid4()),
+                    self.container_client,
+                    str(picture_id),
+                )
+            )
+
     def test_get_picture_blob_error_user_not_found(self):
         """
         This test checks if the get_pictures_inferences function correctly raise an exception if the user given doesn't exist in db
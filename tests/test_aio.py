@@ -0,0 +1,343 @@
+"""
+This is a test script for the aio modules of the datastore.
+They are run against mocked async cursors and container clients.
+"""
+
+import asyncio
+import json
+import unittest
+import uuid
+from unittest.mock import AsyncMock, MagicMock
+
+import datastore
+import datastore.aio as datastore_aio
+import datastore.blob.azure_storage_api as azure_storage
+import datastore.blob.azure_storage_api.aio as azure_storage_aio
+import datastore.db.queries.picture.aio as picture_aio
+import fertiscan.db.queries.inspection.aio as inspection_aio
+from fertiscan.db.queries.errors import InspectionNotFoundError, InspectionQueryError
+
+
+class MockAsyncCursor:
+    def __init__(self, rows):
+        self.execute = AsyncMock()
+        self.fetchone = AsyncMock(side_effect=rows)
+        self.fetchall = AsyncMock(side_effect=rows)
+
+
+class test_aio(unittest.TestCase):
+    def test_query(self):
+        cursor = MockAsyncCursor([("picture_set_name",)])
+        result = asyncio.run(
+            picture_aio.get_picture_set_name(cursor, str(uuid.uuid4()))
+        )
+        self.assertEqual(result, "picture_set_name")
+        cursor.execute.assert_awaited_once()
+
+    def test_query_error_handling(self):
+        cursor = MockAsyncCursor([None])
+        with self.assertRaises(InspectionNotFoundError):
+            asyncio.run(
+                inspection_aio.is_inspection_verified(cursor, str(uuid.uuid4()))
+            )
+
+    def test_inspection_page(self):
+        cursor = MockAsyncCursor([[("inspection",)]])
+        user_id = str(uuid.uuid4())
+        result = asyncio.run(
+            inspection_aio.get_user_inspection_page(
+                cursor, user_id, 10, sort="upload_date", verified=True
+            )
+        )
+        self.assertEqual(result, [("inspection",)])
+        _, params = cursor.execute.await_args.args
+        self.assertEqual(params, {"user_id": user_id, "verified": True, "limit": 10})
+        with self.assertRaises(InspectionQueryError):
+            asyncio.run(inspection_aio.get_user_inspection_page(cursor, user_id, sort="id"))
+
+    def test_blob(self):
+        blob_name = "folder/blob"
+        downloader = MagicMock()
+        downloader.readall = AsyncMock(return_value=b"content")
+        blob_client = MagicMock()
+        blob_client.download_blob = AsyncMock(return_value=downloader)
+        container_client = MagicMock()
+        container_client.get_blob_client.return_value = blob_client
+
+        result = asyncio.run(azure_storage_aio.get_blob(container_client, blob_name))
+        self.assertEqual(result, b"content")
+        container_client.get_blob_client.assert_called_once_with(blob_name)
+
+    def test_run_concurrently(self):
+        def double(value):
+            if value < 0:
+                raise ValueError("negative")
+            return value * 2
+
+        async def async_double(value):
+            return double(value)
+
+        arguments = [(1,), (-1,), (3,)]
+        for results in (
+            azure_storage.run_concurrently(double, arguments, 2),
+            asyncio.run(
+                azure_storage_aio.run_concurrently(async_double, arguments, 2)
+            ),
+        ):
+            self.assertEqual(results[0], 2)
+            self.assertIsInstance(results[1], ValueError)
+            self.assertEqual(results[2], 6)
+
+    def test_move_blobs(self):
+        def container(name):
+            container_client = MagicMock()
+            container_client.delete_blobs = AsyncMock()
+
+            def get_blob_client(blob_name):
+                blob_client = MagicMock()
+                blob_client.url = f"https://account/{name}/{blob_name}?sv=sas"
+                blob_client.credential = None
+                blob_client.start_copy_from_url = AsyncMock(
+                    return_value={"copy_id": "id", "copy_status": "pending"}
+                )
+                properties = MagicMock()
+                properties.copy.status = "success"
+                blob_client.get_blob_properties = AsyncMock(return_value=properties)
+                return blob_client
+
+            container_client.get_blob_client.side_effect = get_blob_client
+            return container_client
+
+        source = container("source")
+        destination = container("destination")
+        blob_names = [(f"folder/{i}", f"user/folder/{i}") for i in range(300)]
+        folder_uuid = str(uuid.uuid4())
+        with unittest.mock.patch.object(azure_storage_aio, "COPY_POLL_INTERVAL", 0):
+            result = asyncio.run(
+                azure_storage_aio.move_blobs(
+                    blob_names, folder_uuid, source, destination, None, 4
+                )
+            )
+        self.assertEqual(result, [dest for _, dest in blob_names])
+        # The sources are deleted in batches of at most MAX_BATCH_SIZE blobs
+        self.assertEqual(source.delete_blobs.await_count, 2)
+        destination.delete_blobs.assert_not_awaited()
+
+    def test_move_blobs_error(self):
+        source = MagicMock()
+        source.get_blob_client.return_value.credential = None
+        source.get_blob_client.return_value.url = "https://account/source/blob"
+        source.delete_blobs = AsyncMock()
+        destination = MagicMock()
+        destination.delete_blobs = AsyncMock()
+        copy_status = iter(["success", "failed"])
+
+        def get_blob_client(blob_name):
+            blob_client = MagicMock()
+            blob_client.credential = None
+            blob_client.start_copy_from_url = AsyncMock(
+                return_value={"copy_id": "id", "copy_status": next(copy_status)}
+            )
+            return blob_client
+
+        destination.get_blob_client.side_effect = get_blob_client
+        with self.assertRaises(azure_storage.MoveBlobError):
+            asyncio.run(
+                azure_storage_aio.move_blobs(
+                    [("a", "dest/a"), ("b", "dest/b")], None, source, destination, None, 1
+                )
+            )
+        # The copy already done is deleted and the sources are kept
+        destination.delete_blobs.assert_awaited_once_with("dest/a")
+        source.delete_blobs.assert_not_awaited()
+
+    def test_iter_blobs(self):
+        contents = {f"folder/{i}": f"content {i}".encode() for i in range(10)}
+        running = 0
+        max_running = 0
+
+        def get_blob_client(blob_name):
+            async def readall():
+                nonlocal running, max_running
+                running += 1
+                max_running = max(max_running, running)
+                # The downloads complete in the reverse order of their start
+                await asyncio.sleep(0.01 * (10 - int(blob_name.split("/")[1])))
+                running -= 1
+                return contents[blob_name]
+
+            downloader = MagicMock()
+            downloader.readall = readall
+            blob_client = MagicMock()
+            blob_client.download_blob = AsyncMock(return_value=downloader)
+            return blob_client
+
+        container_client = MagicMock()
+        container_client.get_blob_client.side_effect = get_blob_client
+
+        async def collect():
+            return [
+                item
+                async for item in azure_storage_aio.iter_blobs(
+                    container_client, list(contents), 3
+                )
+            ]
+
+        result = asyncio.run(collect())
+        self.assertEqual(dict(result), contents)
+        self.assertLessEqual(max_running, 3)
+        self.assertNotEqual([name for name, _ in result], list(contents))
+
+        def sync_get_blob_client(blob_name):
+            blob_client = MagicMock()
+            blob_client.download_blob.return_value.readall.return_value = contents[
+                blob_name
+            ]
+            return blob_client
+
+        container_client.get_blob_client.side_effect = sync_get_blob_client
+        self.assertEqual(
+            dict(azure_storage.iter_blobs(container_client, list(contents), 3)),
+            contents,
+        )
+
+    def test_iter_blobs_error(self):
+        container_client = MagicMock()
+        container_client.get_blob_client.return_value.download_blob = AsyncMock(
+            side_effect=Exception("Resource not found")
+        )
+
+        async def collect():
+            return [
+                item
+                async for item in azure_storage_aio.iter_blobs(
+                    container_client, ["a", "b"], 2
+                )
+            ]
+
+        with self.assertRaises(azure_storage.GetBlobError):
+            asyncio.run(collect())
+
+    def test_container_client_cache(self):
+        datastore.invalidate_container_clients()
+        user_id = str(uuid.uuid4())
+        service_clients = []
+
+        def from_connection_string(conn_str, credential, raw_response_hook):
+            service_client = MagicMock()
+            service_client.hook = raw_response_hook
+            service_client.get_container_client.return_value = MagicMock(
+                spec=datastore_aio.ContainerClient
+            )
+            service_clients.append(service_client)
+            return service_client
+
+        async def mount_container(*args, blob_service_client=None):
+            container_client = MagicMock(spec=datastore_aio.ContainerClient)
+            container_client.service_client = blob_service_client
+            return container_client
+
+        # The clients keep their event loop alive
+        loops = []
+
+        async def get_clients():
+            loops.append(asyncio.get_running_loop())
+            first = await datastore_aio.get_user_container_client(
+                user_id, "storage_url", "account", "a2V5"
+            )
+            second = await datastore_aio.get_user_container_client(
+                user_id, "storage_url", "account", "a2V5"
+            )
+            return first, second
+
+        with (
+            unittest.mock.patch.object(
+                datastore_aio.BlobServiceClient,
+                "from_connection_string",
+                side_effect=from_connection_string,
+            ),
+            unittest.mock.patch.object(
+                azure_storage_aio, "mount_container", side_effect=mount_container
+            ) as mock_mount_container,
+        ):
+            first, second = asyncio.run(get_clients())
+            self.assertIs(first, second)
+            self.assertEqual(mock_mount_container.call_count, 1)
+            # The async clients are not shared between event loops, but the
+            # container is known to exist
+            third, _ = asyncio.run(get_clients())
+            self.assertIsNot(third, first)
+            self.assertEqual(mock_mount_container.call_count, 1)
+            self.assertEqual(len(service_clients), 2)
+            service_clients[1].get_container_client.assert_called_once()
+
+            datastore.invalidate_container_clients(user_id)
+            asyncio.run(get_clients())
+            self.assertEqual(mock_mount_container.call_count, 2)
+
+            # A container deleted elsewhere is mounted again once the storage
+            # service reports it missing
+            response = MagicMock()
+            response.http_response.status_code = 404
+            response.http_response.headers = {"x-ms-error-code": "ContainerNotFound"}
+            response.http_request.url = (
+                f"https://account/{datastore.azure_storage.build_container_name(user_id)}/blob"
+            )
+            asyncio.run(service_clients[-1].hook(response))
+            asyncio.run(get_clients())
+            self.assertEqual(mock_mount_container.call_count, 3)
+            # The clients of the closed event loops are dropped, only those of
+            # the last one are left
+            self.assertEqual(
+                datastore.get_container_client_cache_stats()["container_clients"]["size"],
+                1,
+            )
+        datastore.invalidate_container_clients()
+
+    def test_delete_folder_report(self):
+        picture_set_id = str(uuid.uuid4())
+        registry = {
+            "folder": {"folder_uuid": picture_set_id, "image_count": 300},
+        }
+        blobs = [MagicMock(tags={"picture_set_uuid": picture_set_id}) for _ in range(300)]
+        for i, blob in enumerate(blobs):
+            blob.name = f"folder/{i}"
+        # A blob of the folder from another picture set is kept
+        other = MagicMock(tags={"picture_set_uuid": str(uuid.uuid4())})
+        other.name = "folder/other"
+
+        async def list_blobs(name_starts_with, include):
+            for blob in blobs + [other]:
+                yield blob
+
+        downloader = MagicMock()
+        downloader.readall = AsyncMock(return_value=json.dumps(registry))
+        container_client = MagicMock()
+        container_client.get_blob_client.return_value.download_blob = AsyncMock(
+            return_value=downloader
+        )
+        container_client.list_blobs = list_blobs
+        failed_part = MagicMock(status_code=403, reason="Forbidden")
+        ok_part = MagicMock(status_code=202)
+        container_client.delete_blobs = AsyncMock(
+            side_effect=[
+                None,
+                azure_storage.PartialBatchErrorException(
+                    "partial failure", None, [failed_part] + [ok_part] * 43
+                ),
+            ]
+        )
+
+        result = asyncio.run(
+            azure_storage_aio.delete_folder(container_client, picture_set_id, False, 1)
+        )
+        self.assertEqual(container_client.delete_blobs.await_count, 2)
+        self.assertEqual(list(result["failed"]), ["folder/256"])
+        self.assertEqual(len(result["deleted"]), 299)
+        self.assertNotIn("folder/other", result["deleted"])
+        # The folder stays in the registry until all its blobs are deleted
+        container_client.get_blob_client.return_value.upload_blob.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,6 @@
 import asyncio
 import io
+import json
 import os
 import unittest
 import uuid
@@ -9,17 +10,26 @@ from PIL import Image
 
 import datastore.blob.__init__ as blob
 from datastore.blob.azure_storage_api import (
+    BlobSasError,
     ConnectionStringError,
     CreateDirectoryError,
+    DeleteFolderError,
     FolderListError,
     GenerateHashError,
     GetBlobError,
     GetFolderUUIDError,
     MountContainerError,
+    MoveBlobError,
+    FOLDER_REGISTRY_BLOB,
     build_blob_name,
+    build_blob_sas_url,
     build_container_name,
     create_folder,
+    delete_folder,
+    find_folder_blobs,
+    get_folder_registry,
     generate_hash,
+    update_folder_registry,
     get_blob,
     get_blobs_from_tag,
     get_directories,
@@ -27,7 +37,10 @@ from datastore.blob.azure_storage_api import (
     is_a_folder,
     mount_container,
     move_blob,
+    move_blobs,
     upload_image,
+    upload_images,
+    UploadImageError,
     get_image_count,
 )
 
@@ -210,6 +223,82 @@ class TestUploadImage(unittest.TestCase):
             )
 
 
+class TestUploadImages(unittest.TestCase):
+    def setUp(self):
+        self.storage_url = BLOB_CONNECTION_STRING
+        self.tier = "testuser"
+        self.container_uuid = str(uuid.uuid4())
+        self.container_name = f"{self.tier}-{self.container_uuid}"
+        self.blob_service_client = blob.create_BlobServiceClient(self.storage_url)
+        self.container_client = self.blob_service_client.create_container(
+            self.container_name
+        )
+        self.image = Image.new("RGB", (1980, 1080), "blue")
+        self.image_byte = self.image.tobytes()
+        self.image_hash = asyncio.run(generate_hash(self.image_byte))
+        self.folder_name = "test_folder"
+        self.folder_uuid = str(uuid.uuid4())
+        asyncio.run(
+            create_folder(self.container_client, self.folder_uuid, self.folder_name)
+        )
+        self.images = [(str(uuid.uuid4()), self.image_hash) for _ in range(3)]
+
+    def tearDown(self):
+        self.container_client.delete_container()
+
+    def test_upload_images(self):
+        result = asyncio.run(
+            upload_images(
+                self.container_client, self.folder_name, self.folder_uuid, self.images
+            )
+        )
+        expected_result = [
+            build_blob_name(self.folder_name, image_uuid)
+            for image_uuid, _ in self.images
+        ]
+        self.assertEqual(result, expected_result)
+        self.assertEqual(
+            asyncio.run(get_image_count(self.container_client, self.folder_name)), 3
+        )
+        blobs = asyncio.run(get_blobs_from_tag(self.container_client, self.folder_uuid))
+        self.assertEqual(len(blobs), 4)
+
+    def test_upload_images_partial_failure(self):
+        """
+        This test checks if the uploaded images are removed when one upload fails
+        """
+        # An existing blob cannot be uploaded again
+        asyncio.run(
+            upload_image(
+                self.container_client,
+                self.folder_name,
+                self.folder_uuid,
+                self.image_hash,
+                self.images[0][0],
+            )
+        )
+        with self.assertRaises(UploadImageError):
+            asyncio.run(
+                upload_images(
+                    self.container_client,
+                    self.folder_name,
+                    self.folder_uuid,
+                    self.images,
+                )
+            )
+        self.assertEqual(
+            asyncio.run(get_image_count(self.container_client, self.folder_name)), 1
+        )
+
+    def test_upload_images_wrong_folder(self):
+        with self.assertRaises(CreateDirectoryError):
+            asyncio.run(
+                upload_images(
+                    self.container_client, "not_folder", self.folder_uuid, self.images
+                )
+            )
+
+
 class TestIsAFolder(unittest.TestCase):
     def setUp(self):
         self.storage_url = BLOB_CONNECTION_STRING
@@ -365,6 +454,45 @@ class TestGetBlobsFromTag(unittest.TestCase):
         with self.assertRaises(Exception):
             asyncio.run(get_blobs_from_tag(self.container_client, tag))
 
+    def test_find_folder_blobs(self):
+        result = asyncio.run(find_folder_blobs(self.container_client, self.folder_uuid))
+        self.assertCountEqual(
+            result,
+            [
+                build_blob_name(self.folder_name, self.folder_name, "json"),
+                build_blob_name(self.folder_name, self.image_uuid),
+            ],
+        )
+
+    def test_find_folder_blobs_unregistered(self):
+        asyncio.run(
+            update_folder_registry(
+                self.container_client,
+                lambda registry: registry.pop(self.folder_name),
+            )
+        )
+        result = asyncio.run(find_folder_blobs(self.container_client, self.folder_uuid))
+        self.assertEqual(len(result), 2)
+
+    def test_delete_folder(self):
+        result = asyncio.run(delete_folder(self.container_client, self.folder_uuid))
+        self.assertEqual(len(result["deleted"]), 2)
+        self.assertEqual(result["failed"], {})
+        self.assertEqual(
+            asyncio.run(find_folder_blobs(self.container_client, self.folder_uuid)),
+            [],
+        )
+        registry = asyncio.run(get_folder_registry(self.container_client))
+        self.assertNotIn(self.folder_name, registry)
+
+    def test_delete_folder_error(self):
+        mock_container_client = Mock()
+        mock_container_client.get_blob_client.side_effect = Exception(
+            "Resource not found"
+        )
+        with self.assertRaises(DeleteFolderError):
+            asyncio.run(delete_folder(mock_container_client, self.folder_uuid))
+
 
 class TestGetDirectories(unittest.TestCase):
     def setUp(self):
@@ -421,6 +549,28 @@ class TestGetDirectories(unittest.TestCase):
             asyncio.run(get_directories(mock_container_client))
 
 
+class TestBuildBlobSasUrl(unittest.TestCase):
+    def setUp(self):
+        self.blob_service_client = blob.create_BlobServiceClient(
+            BLOB_CONNECTION_STRING
+        )
+        self.container_client = self.blob_service_client.get_container_client(
+            "testuser-" + str(uuid.uuid4())
+        )
+
+    def test_build_blob_sas_url(self):
+        url = build_blob_sas_url(self.container_client, "folder/blob", BLOB_KEY)
+        self.assertTrue(url.startswith(self.container_client.url + "/folder/blob?"))
+        self.assertIn("sp=r&", url)
+        self.assertIn("sr=b&", url)
+
+    def test_build_blob_sas_url_error(self):
+        mock_container_client = Mock()
+        mock_container_client.get_blob_client.return_value.credential = None
+        with self.assertRaises(BlobSasError):
+            build_blob_sas_url(mock_container_client, "folder/blob")
+
+
 class TestMoveBlob(unittest.TestCase):
     def setUp(self):
         self.storage_url = os.environ.get("NACHET_STORAGE_URL")
@@ -464,6 +614,62 @@ class TestMoveBlob(unittest.TestCase):
         blob = asyncio.run(get_blob(self.container_client_dest, self.blob_name))
         self.assertEqual(str(blob.decode()), self.blob)
 
+    def test_move_blobs(self):
+        folder_uuid = str(uuid.uuid4())
+        blob_names = [(self.blob_name, f"{folder_uuid}/{self.blob_name}")]
+        for i in range(3):
+            name = f"{self.blob_name}_{i}"
+            self.container_client_source.upload_blob(name=name, data=self.blob)
+            blob_names.append((name, f"{folder_uuid}/{name}"))
+
+        result = asyncio.run(
+            move_blobs(
+                blob_names,
+                folder_uuid,
+                self.container_client_source,
+                self.container_client_dest,
+            )
+        )
+        self.assertEqual(result, [dest for _, dest in blob_names])
+        self.assertEqual(len(list(self.container_client_source.list_blobs())), 0)
+        for _, dest in blob_names:
+            blob_client = self.container_client_dest.get_blob_client(dest)
+            self.assertEqual(blob_client.download_blob().readall().decode(), self.blob)
+            self.assertEqual(
+                blob_client.get_blob_tags(), {"picture_set_uuid": folder_uuid}
+            )
+
+    def test_move_blobs_error(self):
+        with self.assertRaises(MoveBlobError):
+            asyncio.run(
+                move_blobs(
+                    [(self.blob_name, self.blob_name), ("missing", "missing")],
+                    None,
+                    self.container_client_source,
+                    self.container_client_dest,
+                )
+            )
+        # The source is kept and the copy is deleted
+        self.assertEqual(
+            asyncio.run(get_blob(self.container_client_source, self.blob_name)).decode(),
+            self.blob,
+        )
+        self.assertEqual(len(list(self.container_client_dest.list_blobs())), 0)
+
+    def test_move_blobs_error_cause(self):
+        mock_container_client_source = Mock()
+        mock_container_client_source.get_blob_client.side_effect = KeyError("client")
+        with self.assertRaises(MoveBlobError) as context:
+            asyncio.run(
+                move_blobs(
+                    [(self.blob_name, self.blob_name)],
+                    None,
+                    mock_container_client_source,
+                    self.container_client_dest,
+                )
+            )
+        self.assertIsInstance(context.exception.__cause__, KeyError)
+
     def test_move_blob_error(self):
         mock_container_client_source = Mock()
         mock_container_client_source.get_blob_client.side_effect = Exception(
@@ -551,5 +757,102 @@ class TestGetImageCount(unittest.TestCase):
         self.assertEqual(result, 2)
 
 
+class TestFolderRegistry(unittest.TestCase):
+    def setUp(self):
+        self.storage_url = BLOB_CONNECTION_STRING
+        self.tier = "testuser"
+        self.container_uuid = str(uuid.uuid4())
+        self.container_name = f"{self.tier}-{self.container_uuid}"
+        self.blob_service_client = blob.create_BlobServiceClient(self.storage_url)
+        self.container_client = self.blob_service_client.create_container(
+            self.container_name
+        )
+        self.image = Image.new("RGB", (1980, 1080), "blue")
+        self.image_byte = self.image.tobytes()
+        self.image_hash = asyncio.run(generate_hash(self.image_byte))
+        self.image_uuid = str(uuid.uuid4())
+        self.folder_name = "test_folder"
+        self.folder_uuid = str(uuid.uuid4())
+        asyncio.run(
+            create_folder(self.container_client, self.folder_uuid, self.folder_name)
+        )
+
+    def tearDown(self):
+        self.container_client.delete_container()
+
+    def test_registry_maintained(self):
+        registry = asyncio.run(get_folder_registry(self.container_client))
+        self.assertEqual(registry[self.folder_name]["folder_uuid"], self.folder_uuid)
+        self.assertEqual(registry[self.folder_name]["image_count"], 0)
+
+        asyncio.run(
+            upload_image(
+                self.container_client,
+                self.folder_name,
+                self.folder_uuid,
+                self.image_hash,
+                self.image_uuid,
+            )
+        )
+        # Overwriting an existing image should not change the count
+        asyncio.run(
+            upload_image(
+                self.container_client,
+                self.folder_name,
+                self.folder_uuid,
+                self.image_hash,
+                self.image_uuid,
+            )
+        )
+        registry = asyncio.run(get_folder_registry(self.container_client))
+        self.assertEqual(registry[self.folder_name]["image_count"], 1)
+
+        asyncio.run(delete_folder(self.container_client, self.folder_uuid))
+        registry = asyncio.run(get_folder_registry(self.container_client))
+        self.assertNotIn(self.folder_name, registry)
+
+    def test_registry_rebuild(self):
+        asyncio.run(
+            upload_image(
+                self.container_client,
+                self.folder_name,
+                self.folder_uuid,
+                self.image_hash,
+                self.image_uuid,
+            )
+        )
+        self.container_client.delete_blob(FOLDER_REGISTRY_BLOB)
+        registry = asyncio.run(get_folder_registry(self.container_client))
+        self.assertEqual(registry[self.folder_name]["folder_uuid"], self.folder_uuid)
+        self.assertEqual(registry[self.folder_name]["image_count"], 1)
+
+    def test_registry_no_listing(self):
+        registry = {
+            self.folder_name: {
+                "folder_uuid": self.folder_uuid,
+                "date_created": "2024-01-01 00:00:00",
+                "image_count": 3,
+            }
+        }
+        mock_container_client = Mock()
+        mock_downloader = (
+            mock_container_client.get_blob_client.return_value.download_blob.return_value
+        )
+        mock_downloader.readall.return_value = json.dumps(registry)
+        mock_container_client.list_blobs.side_effect = FolderListError(
+            "Container should not be listed"
+        )
+        self.assertTrue(
+            asyncio.run(is_a_folder(mock_container_client, self.folder_name))
+        )
+        self.assertEqual(
+            asyncio.run(get_folder_uuid(mock_container_client, self.folder_name)),
+            self.folder_uuid,
+        )
+        self.assertEqual(
+            asyncio.run(get_image_count(mock_container_client, self.folder_name)), 3
+        )
+
+
 if __name__ == "__main__":
     unittest.main()
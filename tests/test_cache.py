@@ -0,0 +1,150 @@
+"""
+This is a test script for the in-memory cache of the datastore.
+"""
+
+import unittest
+from unittest.mock import MagicMock, patch
+
+import nachet.db.queries.cache_version as cache_version
+import nachet.db.queries.machine_learning as machine_learning
+from datastore.cache import MISSING, LRUCache
+
+
+class test_lru_cache(unittest.TestCase):
+    def setUp(self):
+        self.cache = LRUCache(maxsize=2, ttl=10.0)
+
+    def test_get_set(self):
+        self.assertIs(self.cache.get("a"), MISSING)
+        self.cache.set("a", 1)
+        self.assertEqual(self.cache.get("a"), 1)
+        self.assertEqual(self.cache.stats()["hits"], 1)
+        self.assertEqual(self.cache.stats()["misses"], 1)
+
+    def test_cached_none(self):
+        self.cache.set("a", None)
+        self.assertIsNone(self.cache.get("a"))
+
+    def test_evicts_least_recently_used(self):
+        self.cache.set("a", 1)
+        self.cache.set("b", 2)
+        self.cache.get("a")
+        self.cache.set("c", 3)
+        self.assertEqual(self.cache.get("a"), 1)
+        self.assertIs(self.cache.get("b"), MISSING)
+        self.assertEqual(self.cache.stats()["size"], 2)
+
+    def test_expires(self):
+        with patch("datastore.cache.time.monotonic", return_value=100.0):
+            self.cache.set("a", 1)
+        with patch("datastore.cache.time.monotonic", return_value=105.0):
+            self.assertEqual(self.cache.get("a"), 1)
+        with patch("datastore.cache.time.monotonic", return_value=111.0):
+            self.assertIs(self.cache.get("a"), MISSING)
+        self.assertEqual(self.cache.stats()["size"], 0)
+
+    def test_invalidate(self):
+        self.cache.set("a", 1)
+        self.cache.set("b", 2)
+        self.cache.invalidate("a")
+        self.assertIs(self.cache.get("a"), MISSING)
+        self.assertEqual(self.cache.get("b"), 2)
+        self.cache.invalidate()
+        self.assertEqual(self.cache.stats()["size"], 0)
+
+    def test_invalidate_matching(self):
+        self.cache.set(("scope", "a"), 1)
+        self.cache.set(("scope", "b"), 2)
+        self.cache.invalidate_matching(lambda key: key[1] == "a")
+        self.assertIs(self.cache.get(("scope", "a")), MISSING)
+        self.assertEqual(self.cache.get(("scope", "b")), 2)
+
+
+class test_ml_lookup_cache(unittest.TestCase):
+    def setUp(self):
+        machine_learning.invalidate_ml_caches()
+        self.cursor = MagicMock()
+        self.cursor.connection._datastore_schema = "schema"
+        patcher = patch.object(
+            machine_learning, "has_cache_version", return_value=True
+        )
+        self.has_cache_version = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        machine_learning.invalidate_ml_caches()
+
+    def test_cached_by_clean_transaction(self):
+        # (data, is_clean, version)
+        self.cursor.fetchone.return_value = ({"name": "pipeline"}, True, 1)
+        machine_learning.get_pipeline(self.cursor, "id")
+        self.assertEqual(
+            machine_learning.get_pipeline(self.cursor, "id"), {"name": "pipeline"}
+        )
+        self.cursor.execute.assert_called_once()
+
+    def test_not_cached_by_dirty_transaction(self):
+        self.cursor.fetchone.return_value = ({"name": "pipeline"}, False, 1)
+        machine_learning.get_pipeline(self.cursor, "id")
+        machine_learning.get_pipeline(self.cursor, "id")
+        self.assertEqual(self.cursor.execute.call_count, 2)
+
+    def test_not_cached_without_schema(self):
+        self.cursor.connection._datastore_schema = None
+        self.cursor.fetchone.return_value = ("pipeline_id", True, 1)
+        machine_learning.get_pipeline_id_from_model_name(self.cursor, "model")
+        machine_learning.get_pipeline_id_from_model_name(self.cursor, "model")
+        self.assertEqual(self.cursor.execute.call_count, 2)
+
+    def test_not_cached_without_cache_version_table(self):
+        self.has_cache_version.return_value = False
+        self.cursor.fetchone.return_value = ({"name": "pipeline"}, False, None)
+        machine_learning.get_pipeline(self.cursor, "id")
+        machine_learning.get_pipeline(self.cursor, "id")
+        self.assertEqual(self.cursor.execute.call_count, 2)
+        self.assertNotIn("cache_version", self.cursor.execute.call_args[0][0])
+        self.assertFalse(machine_learning.get_ml_cache_state(self.cursor)["is_clean"])
+
+    def test_invalidate_schema(self):
+        model = ("model_id", "name", "endpoint", "task", {}, "1")
+        self.cursor.fetchone.return_value = model + (True, 1)
+        other = MagicMock()
+        other.connection._datastore_schema = "other"
+        other.fetchone.return_value = self.cursor.fetchone.return_value
+        machine_learning.get_model(self.cursor, "id")
+        machine_learning.get_model(other, "id")
+
+        machine_learning.invalidate_ml_caches("schema")
+        self.assertEqual(machine_learning.get_model(other, "id"), model)
+        other.execute.assert_called_once()
+        machine_learning.get_model(self.cursor, "id")
+        self.assertEqual(self.cursor.execute.call_count, 2)
+
+
+class test_cache_version_table(unittest.TestCase):
+    def setUp(self):
+        cache_version._cache_version_tables.clear()
+        self.addCleanup(cache_version._cache_version_tables.clear)
+        self.cursor = MagicMock()
+        self.cursor.connection._datastore_schema = "schema"
+
+    def test_found_once(self):
+        self.cursor.fetchone.return_value = (True,)
+        self.assertTrue(cache_version.has_cache_version(self.cursor))
+        self.assertTrue(cache_version.has_cache_version(self.cursor))
+        self.cursor.execute.assert_called_once()
+
+    def test_missing_looked_up_again(self):
+        self.cursor.fetchone.return_value = (False,)
+        with patch("nachet.db.queries.cache_version.time.monotonic", return_value=100.0):
+            self.assertFalse(cache_version.has_cache_version(self.cursor))
+            self.assertFalse(cache_version.has_cache_version(self.cursor))
+        self.cursor.execute.assert_called_once()
+        self.cursor.fetchone.return_value = (True,)
+        with patch("nachet.db.queries.cache_version.time.monotonic", return_value=200.0):
+            self.assertTrue(cache_version.has_cache_version(self.cursor))
+        self.assertEqual(self.cursor.execute.call_count, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -7,6 +7,7 @@ import asyncio
 import io
 import os
 import unittest
+import urllib.request
 import uuid
 from unittest.mock import MagicMock, patch
 
@@ -156,6 +157,17 @@ class test_user(unittest.TestCase):
             )
         )
         self.assertTrue(container_client.exists())
+        # The client is cached for the next calls
+        self.assertIs(
+            asyncio.run(
+                datastore.get_user_container_client(
+                    user_id, BLOB_CONNECTION_STRING, BLOB_ACCOUNT, BLOB_KEY, "test-user"
+                )
+            ),
+            container_client,
+        )
+        container_client.delete_container()
+        datastore.invalidate_container_clients(user_id, "test-user")
 
 
 class test_picture(unittest.TestCase):
@@ -479,6 +491,116 @@ class test_picture(unittest.TestCase):
         for picture in pictures:
             self.assertTrue(picture["id"] in picture_ids)
 
+    def test_iter_picture_set_pictures(self):
+        """
+        This test checks the iter_picture_set_pictures function
+        """
+        picture_ids = asyncio.run(
+            datastore.upload_pictures(
+                self.cursor,
+                self.user_id,
+                [self.pic_encoded, self.pic_encoded, self.pic_encoded],
+                self.container_client,
+                self.picture_set_id,
+            )
+        )
+
+        async def collect(**kwargs):
+            return [
+                picture
+                async for picture in datastore.iter_picture_set_pictures(
+                    self.cursor,
+                    self.user_id,
+                    self.picture_set_id,
+                    self.container_client,
+                    **kwargs,
+                )
+            ]
+
+        pictures = asyncio.run(collect(max_concurrency=2))
+        self.assertEqual(len(pictures), 3)
+        for metadata, blob in pictures:
+            self.assertTrue(metadata["id"] in picture_ids)
+            self.assertEqual(blob, self.pic_encoded)
+
+        pictures = asyncio.run(collect(check_count=False, with_blobs=False))
+        self.assertEqual(len(pictures), 3)
+        for metadata, blob in pictures:
+            self.assertIsNone(blob)
+            self.assertTrue(metadata["url"].endswith(metadata["blob_name"]))
+            self.assertNotIn("?", metadata["url"])
+
+    def test_get_picture_urls(self):
+        """
+        This test checks the get_picture_urls function
+        """
+        picture_ids = asyncio.run(
+            datastore.upload_pictures(
+                self.cursor,
+                self.user_id,
+                [self.pic_encoded, self.pic_encoded],
+                self.container_client,
+                self.picture_set_id,
+            )
+        )
+        urls = asyncio.run(
+            datastore.get_picture_urls(
+                self.cursor, self.user_id, picture_ids, self.container_client, BLOB_KEY
+            )
+        )
+        self.assertCountEqual(urls.keys(), [str(pic_id) for pic_id in picture_ids])
+        for url in urls.values():
+            # Read only SAS of the blob
+            self.assertIn("sp=r&", url)
+            self.assertIn("sr=b&", url)
+            with urllib.request.urlopen(url) as response:
+                self.assertEqual(response.read(), self.pic_encoded)
+
+        url = asyncio.run(
+            datastore.get_picture_url(
+                self.cursor,
+                self.user_id,
+                picture_ids[0],
+                self.container_client,
+                BLOB_KEY,
+            )
+        )
+        self.assertIn(str(picture_ids[0]), url)
+
+    def test_get_picture_urls_error_picture_not_found(self):
+        """
+        This test checks if the get_picture_urls function correctly raise an exception if a picture doesn't exist in db
+        """
+        with self.assertRaises(datastore.picture.PictureNotFoundError):
+            asyncio.run(
+                datastore.get_picture_urls(
+                    self.cursor,
+                    self.user_id,
+                    [str(uuid.uuid4())],
+                    self.container_client,
+                    BLOB_KEY,
+                )
+            )
+
+    def test_iter_picture_set_pictures_error_user_not_found(self):
+        """
+        This test checks if the iter_picture_set_pictures function correctly raise an exception if the user given doesn't exist in db
+        """
+
+        async def collect():
+            return [
+                picture
+                async for picture in datastore.iter_picture_set_pictures(
+                    self.cursor,
+                    str(uuid.uuid4()),
+                    self.picture_set_id,
+                    self.container_client,
+                )
+            ]
+
+        with self.assertRaises(datastore.user.UserNotFoundError):
+            asyncio.run(collect())
+
     def test_get_picture_set_pictures_error_user_not_found(self):
         """
         This test checks if the get_picture_set_pictures function correctly raise an exception if the user given doesn't exist in db
@@ -337,6 +337,104 @@ class test_pictures_functions(unittest.TestCase):
         self.assertIsNotNone(picture_data, "The picture_data is None")
         self.assertNotEqual(len(picture_data), 0, "The picture_data is empty")
 
+    def test_new_pictures(self):
+        """
+        This test checks if the new_pictures function creates all the pictures in one query
+        """
+        picture_set_id = picture.new_picture_set(
+            self.cursor, self.picture_set, self.user_id
+        )
+
+        picture_ids = picture.new_pictures(self.cursor, self.picture, picture_set_id, 3)
+
+        self.assertEqual(len(picture_ids), 3)
+        for picture_id in picture_ids:
+            self.assertTrue(validator.is_valid_uuid(picture_id))
+        self.assertEqual(picture.count_pictures(self.cursor, picture_set_id), 3)
+
+    def test_update_pictures_metadata(self):
+        """
+        This test checks if the update_pictures_metadata function updates every picture
+        """
+        picture_set_id = picture.new_picture_set(
+            self.cursor, self.picture_set, self.user_id
+        )
+        picture_ids = picture.new_pictures(self.cursor, self.picture, picture_set_id, 2)
+
+        picture.update_pictures_metadata(
+            self.cursor,
+            [
+                (picture_id, json.dumps({"link": str(picture_id)}), 4)
+                for picture_id in picture_ids
+            ],
+        )
+
+        for picture_id in picture_ids:
+            picture_metadata = picture.get_picture(self.cursor, picture_id)
+            self.assertEqual(picture_metadata["link"], str(picture_id))
+
+    def test_get_user_picture_sets_overview(self):
+        """
+        This test checks if the get_user_picture_sets_overview function returns the sets and their number of pictures
+        """
+        picture_set_id = picture.new_picture_set(
+            self.cursor, self.picture_set, self.user_id, self.folder_name
+        )
+        empty_picture_set_id = picture.new_picture_set(
+            self.cursor, self.picture_set, self.user_id, self.folder_name + "2"
+        )
+        picture.new_pictures(self.cursor, self.picture, picture_set_id, 2)
+
+        overview = {
+            str(row[0]): (row[1], row[2])
+            for row in picture.get_user_picture_sets_overview(self.cursor, self.user_id)
+        }
+        self.assertEqual(overview[str(picture_set_id)], (self.folder_name, 2))
+        self.assertEqual(
+            overview[str(empty_picture_set_id)], (self.folder_name + "2", 0)
+        )
+
+    def test_get_user_picture_sets_info(self):
+        """
+        This test checks if the get_user_picture_sets_info function returns the pictures status and paginates
+        """
+        picture_set_ids = [
+            picture.new_picture_set(self.cursor, self.picture_set, self.user_id)
+            for _ in range(3)
+        ]
+        picture_ids = picture.new_pictures(
+            self.cursor, self.picture, picture_set_ids[0], 2
+        )
+
+        picture_sets = picture.get_user_picture_sets_info(self.cursor, self.user_id)
+        self.assertEqual(len(picture_sets), 3)
+        for picture_set_id, _, nb_pictures, pictures in picture_sets:
+            if str(picture_set_id) == str(picture_set_ids[0]):
+                self.assertEqual(nb_pictures, 2)
+                self.assertEqual(
+                    sorted(pic["picture_id"] for pic in pictures),
+                    sorted(str(picture_id) for picture_id in picture_ids),
+                )
+                for pic in pictures:
+                    self.assertFalse(pic["is_validated"])
+                    self.assertFalse(pic["inference_exist"])
+            else:
+                self.assertEqual(nb_pictures, 0)
+                self.assertEqual(pictures, [])
+
+        first_page = picture.get_user_picture_sets_info(
+            self.cursor, self.user_id, limit=2
+        )
+        second_page = picture.get_user_picture_sets_info(
+            self.cursor, self.user_id, limit=2, after_picture_set_id=first_page[-1][0]
+        )
+        self.assertEqual(len(first_page), 2)
+        self.assertEqual(len(second_page), 1)
+        self.assertEqual(
+            [row[0] for row in first_page + second_page],
+            [row[0] for row in picture_sets],
+        )
+
     def test_update_picture_metadata(self):
         """
         This test checks if the update_picture_metadata function updates the metadata
@@ -584,6 +682,34 @@ class test_pictures_functions(unittest.TestCase):
         with self.assertRaises(Exception):
             picture.get_picture_set_pictures(mock_cursor, picture_set_id)
 
+    def test_get_pictures_owner(self):
+        """
+        This test checks if the get_pictures_owner function returns the pictures with their picture set and owner
+        """
+        picture_set_id = picture.new_picture_set(
+            self.cursor, self.picture_set, self.user_id, self.folder_name
+        )
+        picture_id = picture.new_picture_unknown(
+            self.cursor, self.picture, picture_set_id, self.nb_seed
+        )
+
+        rows = picture.get_pictures_owner(self.cursor, [picture_id, uuid.uuid4()])
+        self.assertEqual(len(rows), 1)
+        pic_id, _, pic_set_id, picture_set_name, owner_id = rows[0]
+        self.assertEqual(str(pic_id), str(picture_id))
+        self.assertEqual(str(pic_set_id), str(picture_set_id))
+        self.assertEqual(picture_set_name, self.folder_name)
+        self.assertEqual(str(owner_id), str(self.user_id))
+
+    def test_get_pictures_owner_error(self):
+        """
+        This test checks if the get_pictures_owner function raises an error if connection fails
+        """
+        mock_cursor = MagicMock()
+        mock_cursor.fetchall.side_effect = Exception("Connection error")
+        with self.assertRaises(picture.GetPictureError):
+            picture.get_pictures_owner(mock_cursor, [str(uuid.uuid4())])
+
     def test_change_picture_set_id(self):
         old_picture_set_id = picture.new_picture_set(
             self.cursor, self.picture_set, self.user_id, self.folder_name
@@ -672,6 +798,52 @@ class test_pictures_functions(unittest.TestCase):
             )
 
 
+# --------------------  CONNECTION POOL --------------------
+class test_connection_pool(unittest.TestCase):
+    def tearDown(self):
+        db.close_pools()
+
+    def test_same_pool_per_schema(self):
+        pool = db.get_pool(DB_CONNECTION_STRING, DB_SCHEMA)
+        self.assertIs(pool, db.get_pool(DB_CONNECTION_STRING, DB_SCHEMA))
+
+    def test_pool_settings_mismatch(self):
+        pool = db.get_pool(DB_CONNECTION_STRING, DB_SCHEMA, max_size=2)
+        self.assertIs(pool, db.get_pool(DB_CONNECTION_STRING, DB_SCHEMA, max_size=2))
+        with self.assertRaises(db.PoolSettingsError):
+            db.get_pool(DB_CONNECTION_STRING, DB_SCHEMA, max_size=3)
+
+    def test_search_path_reset(self):
+        # A single connection so the second transaction gets the same one back
+        db.get_pool(DB_CONNECTION_STRING, DB_SCHEMA, min_size=1, max_size=1)
+        with db.transaction(DB_CONNECTION_STRING, DB_SCHEMA) as cursor:
+            db.create_search_path(cursor.connection, cursor, "public")
+            cursor.execute("SHOW search_path")
+            self.assertNotIn(DB_SCHEMA, cursor.fetchone()[0])
+        with db.transaction(DB_CONNECTION_STRING, DB_SCHEMA) as cursor:
+            cursor.execute("SHOW search_path")
+            self.assertIn(DB_SCHEMA, cursor.fetchone()[0])
+            self.assertEqual(cursor.connection._datastore_schema, DB_SCHEMA)
+
+    def test_transaction_search_path(self):
+        with db.transaction(DB_CONNECTION_STRING, DB_SCHEMA) as cursor:
+            cursor.execute("SHOW search_path")
+            self.assertIn(DB_SCHEMA, cursor.fetchone()[0])
+            # No extra round trip for a pooled connection
+            mock_cursor = MagicMock()
+            db.create_search_path(cursor.connection, mock_cursor, DB_SCHEMA)
+            mock_cursor.execute.assert_not_called()
+
+    def test_transaction_rollback(self):
+        email = "pool_test@email.gouv.ca"
+        with self.assertRaises(ValueError):
+            with db.transaction(DB_CONNECTION_STRING, DB_SCHEMA) as cursor:
+                user.register_user(cursor, email)
+                raise ValueError("rollback")
+        with db.transaction(DB_CONNECTION_STRING, DB_SCHEMA) as cursor:
+            self.assertFalse(user.is_user_registered(cursor, email))
+
+
 if __name__ == "__main__":
     unittest.main()
 